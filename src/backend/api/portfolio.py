@@ -5,7 +5,9 @@ Phase3で実装したAdvancedPortfolioManagerの機能をAPI化
 戦略配分、パフォーマンス追跡、リバランシングなどの機能を提供
 """
 
+import asyncio
 import logging
+import os
 from datetime import datetime
 from typing import Any, Dict, List, Optional
 
@@ -13,6 +15,8 @@ from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel, Field
 
 from src.backend.core.security import get_current_user
+from src.backend.portfolio.covariance import LEDOIT_WOLF, METHODS, get_covariance_service
+from src.backend.portfolio.optimizer import OptimizationConstraint, PortfolioOptimizer
 from src.backend.portfolio.strategy_portfolio_manager import (
     AdvancedPortfolioManager,
     StrategyStatus,
@@ -37,6 +41,27 @@ def get_portfolio_manager() -> AdvancedPortfolioManager:
     return _portfolio_manager
 
 
+# リクエスト間でフロンティアのキャッシュとプロセスプールを共有する最適化エンジン
+_portfolio_optimizer: Optional[PortfolioOptimizer] = None
+
+# 共有プロセスプールのワーカー数の上限（リクエストの max_workers はこれで頭打ちにする）
+FRONTIER_MAX_WORKERS = max(1, min(4, os.cpu_count() or 1))
+
+
+def get_portfolio_optimizer() -> PortfolioOptimizer:
+    """ポートフォリオ最適化エンジンのインスタンスを取得"""
+    global _portfolio_optimizer
+    if _portfolio_optimizer is None:
+        _portfolio_optimizer = PortfolioOptimizer()
+    return _portfolio_optimizer
+
+
+def close_portfolio_optimizer():
+    """最適化エンジンのプロセスプールを停止（アプリ終了時）"""
+    if _portfolio_optimizer is not None:
+        _portfolio_optimizer.close()
+
+
 # Pydantic models
 class StrategyAllocationRequest(BaseModel):
     """戦略追加リクエスト"""
@@ -91,6 +116,25 @@ class PortfolioSummaryResponse(BaseModel):
     trade_summary: Dict[str, Any]
 
 
+class EfficientFrontierRequest(BaseModel):
+    """効率的フロンティアリクエスト"""
+
+    assets: List[str] = Field(..., min_length=2, description="資産（シンボル）")
+    expected_returns: Dict[str, float] = Field(..., description="資産別の期待リターン")
+    covariance_matrix: Optional[Dict[str, Dict[str, float]]] = Field(
+        default=None, description="共分散行列 {asset: {asset: cov}}（未指定時は保存済み価格から推定）"
+    )
+    timeframe: str = Field(default="1h", description="共分散を推定する時間枠")
+    window: int = Field(default=90, ge=2, le=5000, description="共分散を推定する窓長（足の本数）")
+    covariance_method: str = Field(default=LEDOIT_WOLF, description=f"共分散の推定手法 {METHODS}")
+    num_portfolios: int = Field(default=50, ge=2, le=500, description="フロンティアの点数")
+    min_weight: Optional[float] = Field(default=None, ge=0.0, le=1.0, description="資産ごとの最小ウェイト")
+    max_weight: Optional[float] = Field(default=None, ge=0.0, le=1.0, description="資産ごとの最大ウェイト")
+    max_workers: Optional[int] = Field(
+        default=None, ge=1, le=32, description=f"並列計算のプロセス数（上限 {FRONTIER_MAX_WORKERS}）"
+    )
+
+
 class RebalanceResponse(BaseModel):
     """リバランシング提案"""
 
@@ -430,6 +474,69 @@ async def get_portfolio_optimization(current_user: dict = Depends(get_current_us
         raise HTTPException(status_code=500, detail=f"Failed to get portfolio optimization: {str(e)}")
 
 
+@router.post("/frontier", response_model=Dict[str, Any])
+async def get_efficient_frontier(request: EfficientFrontierRequest, current_user: dict = Depends(get_current_user)):
+    """効率的フロンティアを取得（同じ入力の再描画はキャッシュから返す）"""
+    try:
+        covariance_matrix = request.covariance_matrix
+        if covariance_matrix is None:
+            # 初回は Parquet から終値を読み込むため、イベントループの外で推定する
+            covariance_frame = await asyncio.to_thread(
+                get_covariance_service().get_covariance_frame,
+                request.assets,
+                request.timeframe,
+                window=request.window,
+                method=request.covariance_method,
+            )
+            covariance_matrix = covariance_frame.to_dict()
+
+        missing = [
+            asset
+            for asset in request.assets
+            if asset not in request.expected_returns
+            or any(other not in covariance_matrix.get(asset, {}) for other in request.assets)
+        ]
+        if missing:
+            raise ValueError(f"Missing expected returns or covariances for assets: {missing}")
+
+        constraints = []
+        for asset in request.assets:
+            if request.min_weight is not None:
+                constraints.append(OptimizationConstraint(asset, "min_weight", request.min_weight))
+            if request.max_weight is not None:
+                constraints.append(OptimizationConstraint(asset, "max_weight", request.max_weight))
+
+        # CPU 負荷の高い計算（プロセスプールの結果待ちを含む）はイベントループの外で実行
+        optimizer = get_portfolio_optimizer()
+        max_workers = min(request.max_workers, FRONTIER_MAX_WORKERS) if request.max_workers else None
+        frontier = await asyncio.to_thread(
+            optimizer.generate_efficient_frontier,
+            request.assets,
+            request.expected_returns,
+            covariance_matrix,
+            num_portfolios=request.num_portfolios,
+            constraints=constraints,
+            max_workers=max_workers,
+        )
+
+        return {
+            "assets": request.assets,
+            "frontier": frontier,
+            "points": len(frontier),
+            "cache": {
+                "hits": optimizer.stats["frontier_cache_hits"],
+                "misses": optimizer.stats["frontier_cache_misses"],
+            },
+            "timestamp": datetime.now().isoformat(),
+        }
+
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Failed to generate efficient frontier: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to generate efficient frontier: {str(e)}")
+
+
 @router.get("/health")
 async def portfolio_health_check():
     """ポートフォリオシステムのヘルスチェック"""
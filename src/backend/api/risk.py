@@ -14,6 +14,11 @@ from pydantic import BaseModel, Field
 
 from src.backend.core.security import get_current_user
 from src.backend.risk.advanced_risk_manager import AdvancedRiskManager
+from src.backend.risk.correlation_tracker import (
+    STRATEGY_CORRELATION_KEY,
+    SYMBOL_CORRELATION_KEY,
+    get_correlation_tracker,
+)
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -28,7 +33,12 @@ def get_risk_manager() -> AdvancedRiskManager:
     if _risk_manager is None:
         # AdvancedRiskManagerに空のconfigを渡して初期化
         # 実装では適切なデフォルト値が使用される
-        _risk_manager = AdvancedRiskManager(config={})
+        # 相関はリスク監視と共有のトラッカーを参照する
+        _risk_manager = AdvancedRiskManager(
+            config={},
+            correlation_tracker=get_correlation_tracker(STRATEGY_CORRELATION_KEY, window=126),
+            symbol_correlation_tracker=get_correlation_tracker(SYMBOL_CORRELATION_KEY, window=126),
+        )
     return _risk_manager
 
 
@@ -332,6 +342,36 @@ async def get_available_stress_test_scenarios(
     return {"scenarios": scenarios}
 
 
+@router.get("/correlation")
+async def get_correlation_matrix(
+    target: Literal["strategies", "symbols"] = Query(default="strategies", description="相関の対象"),
+    shrinkage: Optional[float] = Query(default=None, ge=0.0, le=1.0, description="対角への縮小強度"),
+    current_user: dict = Depends(get_current_user),
+):
+    """戦略間・シンボル間の現在の相関行列を取得（逐次更新済みの値を返す）"""
+    try:
+        risk_manager = get_risk_manager()
+        tracker = (
+            risk_manager.correlation_tracker if target == "strategies" else risk_manager.symbol_correlation_tracker
+        )
+
+        correlation_matrix = tracker.correlation(shrinkage=shrinkage)
+        correlation_matrix = correlation_matrix.astype(object).where(correlation_matrix.notna(), None)
+
+        return {
+            "target": target,
+            "correlation_matrix": correlation_matrix.to_dict(),
+            "max_correlation": tracker.max_abs_correlation(),
+            "observations": len(tracker),
+            "stats": tracker.get_stats(),
+            "calculated_at": datetime.now().isoformat(),
+        }
+
+    except Exception as e:
+        logger.error(f"Failed to get correlation matrix: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to get correlation matrix: {str(e)}")
+
+
 @router.get("/health")
 async def risk_health_check():
     """リスクシステムのヘルスチェック"""
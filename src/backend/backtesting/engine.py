@@ -12,13 +12,26 @@ from typing import Any, Dict, List, Optional
 import numpy as np
 import pandas as pd
 
-from src.backend.core.supabase_db import get_supabase_client
+from src.backend.core.supabase_db import DEFAULT_BATCH_SIZE, batch_write, get_supabase_client
+from src.backend.data_pipeline.resampler import OHLCVResampler
 from src.backend.fee_models.base import TradeType
 from src.backend.fee_models.exchanges import FeeModelFactory
 from src.backend.risk.position_sizing import RiskManager
+from src.backend.risk.rolling_risk import RollingVolatilityTracker
+from src.backend.utils.timeframes import timeframe_to_seconds
 
 logger = logging.getLogger(__name__)
 
+# 保存されていない時間枠を集約する元の時間枠
+BASE_TIMEFRAME = "1m"
+PRICE_COLUMNS = {
+    "open_price": "open",
+    "high_price": "high",
+    "low_price": "low",
+    "close_price": "close",
+    "volume": "volume",
+}
+
 
 @dataclass
 class DataQualityReport:
@@ -118,7 +131,13 @@ class DataValidator:
             "4h": timedelta(hours=4),
             "1d": timedelta(days=1),
         }
-        return intervals.get(timeframe, timedelta(hours=1))
+        if timeframe in intervals:
+            return intervals[timeframe]
+        try:
+            # 2h, 3d など1分足から集約した任意の時間枠
+            return timedelta(seconds=timeframe_to_seconds(timeframe))
+        except ValueError:
+            return timedelta(hours=1)
 
     @staticmethod
     def _calculate_quality_score(total: int, missing: int, duplicates: int, issues: int) -> float:
@@ -170,6 +189,9 @@ class RealDataLoader:
             )
 
             if not response.data:
+                if timeframe != BASE_TIMEFRAME:
+                    # 保存されていない時間枠は1分足から集約する
+                    return await self._load_resampled_data(symbol, timeframe, start_date, end_date, exchange)
                 logger.warning(f"No data found for {symbol} {timeframe} from {start_date} to {end_date}")
                 return pd.DataFrame()
 
@@ -184,6 +206,52 @@ class RealDataLoader:
             logger.error(f"Error loading real data for {symbol}: {e}")
             return pd.DataFrame()
 
+    async def _load_resampled_data(
+        self,
+        symbol: str,
+        timeframe: str,
+        start_date: datetime,
+        end_date: datetime,
+        exchange: str = "binance",
+    ) -> pd.DataFrame:
+        """1分足を読み込み、指定の時間枠に集約（確定した足のみ）"""
+        normalized_symbol = symbol.replace("/", "")
+
+        rows: List[Dict[str, Any]] = []
+        while True:
+            response = (
+                self.supabase.table("price_data")
+                .select("timestamp,open_price,high_price,low_price,close_price,volume")
+                .eq("exchange", exchange)
+                .eq("symbol", normalized_symbol)
+                .eq("timeframe", BASE_TIMEFRAME)
+                .gte("timestamp", start_date.isoformat())
+                .lte("timestamp", end_date.isoformat())
+                .order("timestamp")
+                .range(len(rows), len(rows) + DEFAULT_BATCH_SIZE - 1)
+                .execute()
+            )
+            rows.extend(response.data or [])
+            if len(response.data or []) < DEFAULT_BATCH_SIZE:
+                break
+
+        if not rows:
+            logger.warning(f"No data found for {symbol} {timeframe} from {start_date} to {end_date}")
+            return pd.DataFrame()
+
+        minutes = pd.DataFrame(rows).rename(columns=PRICE_COLUMNS)
+        resampler = OHLCVResampler(BASE_TIMEFRAME, max_base_bars=len(minutes))
+        resampler.add_base_bars(normalized_symbol, minutes)
+        df = resampler.resample(normalized_symbol, timeframe).rename(columns={v: k for k, v in PRICE_COLUMNS.items()})
+
+        df = df.reset_index()
+        df.insert(0, "exchange", exchange)
+        df.insert(1, "symbol", normalized_symbol)
+        df.insert(2, "timeframe", timeframe)
+
+        logger.info(f"Resampled {len(rows)} {BASE_TIMEFRAME} records into {len(df)} {timeframe} records for {symbol}")
+        return df
+
     async def get_available_data_range(
         self, symbol: str, timeframe: str, exchange: str = "binance"
     ) -> tuple[Optional[datetime], Optional[datetime]]:
@@ -224,6 +292,10 @@ class RealDataLoader:
             if latest_response.data:
                 latest = datetime.fromisoformat(latest_response.data[0]["timestamp"])
 
+            if oldest is None and latest is None and timeframe != BASE_TIMEFRAME:
+                # 1分足から集約できる範囲
+                return await self.get_available_data_range(symbol, BASE_TIMEFRAME, exchange)
+
             return oldest, latest
 
         except Exception as e:
@@ -446,13 +518,21 @@ class BacktestEngine:
         exchange: str = "binance",
         use_real_data: bool = True,
         data_quality_threshold: float = 0.95,
+        db_batch_size: int = DEFAULT_BATCH_SIZE,
+        volatility_tracker: Optional[RollingVolatilityTracker] = None,
     ):
+        """
+        Args:
+            volatility_tracker: サイジングに使うボラティリティトラッカー（ポートフォリオのサイジングと共有する場合に指定。
+                reset() で消去されるため、ライブの共有トラッカーは渡さない）
+        """
         self.initial_capital = initial_capital
         self.commission = commission
         self.slippage = slippage
         self.exchange = exchange
         self.use_real_data = use_real_data
         self.data_quality_threshold = data_quality_threshold
+        self.db_batch_size = db_batch_size
 
         # 手数料モデル
         self.fee_model = FeeModelFactory.create(exchange)
@@ -466,6 +546,10 @@ class BacktestEngine:
 
         # リスク管理
         self.risk_manager = None
+        # シンボル別のローリングボラティリティ（ポジションサイジングに使う）
+        if volatility_tracker is None:
+            volatility_tracker = RollingVolatilityTracker()
+        self.volatility_tracker = volatility_tracker
 
         # データ関連
         self.data_loader = RealDataLoader() if use_real_data else None
@@ -726,6 +810,7 @@ class BacktestEngine:
         # 既存ポジションの更新
         if symbol in self.portfolio.positions:
             self.portfolio.positions[symbol].update_pnl(current_price)
+        self.volatility_tracker.update_price(symbol, current_price)
 
         # シグナルの処理
         if signals.get("enter_long"):
@@ -753,15 +838,30 @@ class BacktestEngine:
             }
         )
 
-    def _process_long_entry(self, timestamp: datetime, symbol: str, price: float, strategy_name: str):
-        """ロングエントリーを処理"""
+    def _process_long_entry(
+        self,
+        timestamp: datetime,
+        symbol: str,
+        price: float,
+        strategy_name: str,
+        position_size: Optional[float] = None,
+        position_key: Optional[str] = None,
+    ):
+        """ロングエントリーを処理
+
+        Args:
+            position_size: 計算済みのポジションサイズ（None ならここで計算）
+            position_key: ポジションの保持キー（既定はシンボル）
+        """
+        position_key = position_key or symbol
 
         # 既にポジションがある場合はスキップ
-        if symbol in self.portfolio.positions:
+        if position_key in self.portfolio.positions:
             return
 
         # ポジションサイズの計算
-        position_size = self._calculate_position_size(symbol, price, strategy_name)
+        if position_size is None:
+            position_size = self._calculate_position_size(symbol, price, strategy_name)
 
         if position_size <= 0:
             return
@@ -793,7 +893,7 @@ class BacktestEngine:
             entry_time=timestamp,
         )
 
-        self.portfolio.positions[symbol] = position
+        self.portfolio.positions[position_key] = position
         self.portfolio.cash -= required_capital + fee
 
         # 取引記録
@@ -813,13 +913,16 @@ class BacktestEngine:
 
         logger.info(f"Long entry: {symbol} @ ${execution_price:.2f}, size: {position_size:.6f}")
 
-    def _process_long_exit(self, timestamp: datetime, symbol: str, price: float, strategy_name: str):
+    def _process_long_exit(
+        self, timestamp: datetime, symbol: str, price: float, strategy_name: str, position_key: Optional[str] = None
+    ):
         """ロングイグジットを処理"""
+        position_key = position_key or symbol
 
-        if symbol not in self.portfolio.positions:
+        if position_key not in self.portfolio.positions:
             return
 
-        position = self.portfolio.positions[symbol]
+        position = self.portfolio.positions[position_key]
 
         if position.side != OrderSide.BUY:
             return
@@ -837,7 +940,7 @@ class BacktestEngine:
         self.portfolio.cash += execution_price * position.size - fee
 
         # ポジションを削除
-        del self.portfolio.positions[symbol]
+        del self.portfolio.positions[position_key]
 
         # 取引記録
         trade = Trade(
@@ -861,15 +964,30 @@ class BacktestEngine:
 
         logger.info(f"Long exit: {symbol} @ ${execution_price:.2f}, PnL: ${realized_pnl:.2f}")
 
-    def _process_short_entry(self, timestamp: datetime, symbol: str, price: float, strategy_name: str):
-        """ショートエントリーを処理"""
+    def _process_short_entry(
+        self,
+        timestamp: datetime,
+        symbol: str,
+        price: float,
+        strategy_name: str,
+        position_size: Optional[float] = None,
+        position_key: Optional[str] = None,
+    ):
+        """ショートエントリーを処理
+
+        Args:
+            position_size: 計算済みのポジションサイズ（None ならここで計算）
+            position_key: ポジションの保持キー（既定はシンボル）
+        """
+        position_key = position_key or symbol
 
         # 既にポジションがある場合はスキップ
-        if symbol in self.portfolio.positions:
+        if position_key in self.portfolio.positions:
             return
 
         # ポジションサイズの計算
-        position_size = self._calculate_position_size(symbol, price, strategy_name)
+        if position_size is None:
+            position_size = self._calculate_position_size(symbol, price, strategy_name)
 
         if position_size <= 0:
             return
@@ -901,7 +1019,7 @@ class BacktestEngine:
             entry_time=timestamp,
         )
 
-        self.portfolio.positions[symbol] = position
+        self.portfolio.positions[position_key] = position
         self.portfolio.cash -= fee
 
         # 取引記録
@@ -921,13 +1039,16 @@ class BacktestEngine:
 
         logger.info(f"Short entry: {symbol} @ ${execution_price:.2f}, size: {position_size:.6f}")
 
-    def _process_short_exit(self, timestamp: datetime, symbol: str, price: float, strategy_name: str):
+    def _process_short_exit(
+        self, timestamp: datetime, symbol: str, price: float, strategy_name: str, position_key: Optional[str] = None
+    ):
         """ショートイグジットを処理"""
+        position_key = position_key or symbol
 
-        if symbol not in self.portfolio.positions:
+        if position_key not in self.portfolio.positions:
             return
 
-        position = self.portfolio.positions[symbol]
+        position = self.portfolio.positions[position_key]
 
         if position.side != OrderSide.SELL:
             return
@@ -945,7 +1066,7 @@ class BacktestEngine:
         self.portfolio.cash += realized_pnl
 
         # ポジションを削除
-        del self.portfolio.positions[symbol]
+        del self.portfolio.positions[position_key]
 
         # 取引記録
         trade = Trade(
@@ -971,21 +1092,33 @@ class BacktestEngine:
 
     def _calculate_position_size(self, symbol: str, price: float, strategy_name: str) -> float:
         """ポジションサイズを計算"""
+        return float(self._calculate_position_sizes([symbol], np.array([price]), [strategy_name])[0])
 
+    def _calculate_position_sizes(
+        self,
+        symbols: List[str],
+        prices: np.ndarray,
+        strategy_names: List[str],
+        signal_strengths: Any = 1.0,
+    ) -> np.ndarray:
+        """同じバーの複数エントリーのポジションサイズを一括計算
+
+        ボラティリティはシンボル別のローリングボラティリティ（観測不足の間は 2%）を使う。
+        """
         if self.risk_manager:
             # リスク管理を使用
-            return self.risk_manager.calculate_position_size(
-                strategy_name=strategy_name,
+            return self.risk_manager.calculate_position_sizes(
+                strategy_names,
                 capital=self.portfolio.equity,
-                signal_strength=1.0,
-                volatility=0.02,  # 簡略化
+                signal_strength=signal_strengths,
+                volatility=self.volatility_tracker.volatilities(symbols),
                 win_rate=0.5,
                 avg_win=0.01,
                 avg_loss=0.01,
             )
         else:
             # 固定サイズ（総資産の5%）
-            return (self.portfolio.equity * 0.05) / price
+            return (self.portfolio.equity * 0.05) / np.asarray(prices, dtype=float)
 
     def _update_stats(self, timestamp: datetime):
         """統計情報を更新"""
@@ -1238,6 +1371,7 @@ class BacktestEngine:
 
         self.orders = []
         self.equity_curve = []
+        self.volatility_tracker.reset()
 
         self.stats = {
             "total_trades": 0,
@@ -1250,6 +1384,35 @@ class BacktestEngine:
 
         logger.info("BacktestEngine reset")
 
+    @staticmethod
+    def _equity_curve_records(backtest_id: str, equity_curve: pd.DataFrame) -> List[Dict[str, Any]]:
+        """資産曲線を保存用レコードに変換（列単位で変換し、行ごとの iterrows を避ける）"""
+        size = len(equity_curve)
+        timestamps = pd.to_datetime(equity_curve["timestamp"])
+        columns = {
+            "timestamp": [timestamp.isoformat() for timestamp in timestamps],
+            "equity": equity_curve["equity"].astype(float).tolist(),
+            "cash": (equity_curve["cash"].astype(float).tolist() if "cash" in equity_curve else [0.0] * size),
+            "unrealized_pnl": (
+                equity_curve["unrealized_pnl"].astype(float).tolist()
+                if "unrealized_pnl" in equity_curve
+                else [0.0] * size
+            ),
+        }
+
+        return [
+            {
+                "backtest_id": backtest_id,
+                "timestamp": timestamp,
+                "equity": equity,
+                "cash": cash,
+                "unrealized_pnl": unrealized_pnl,
+            }
+            for timestamp, equity, cash, unrealized_pnl in zip(
+                columns["timestamp"], columns["equity"], columns["cash"], columns["unrealized_pnl"]
+            )
+        ]
+
     async def save_results_to_database(self, result: BacktestResult) -> str:
         """バックテスト結果をSupabaseに保存"""
         try:
@@ -1284,11 +1447,10 @@ class BacktestEngine:
 
             backtest_id = backtest_response.data[0]["id"]
 
-            # 取引履歴を保存
+            # 取引履歴を保存（IDは使わないため書き込んだ行は返させない）
             if result.trades:
-                trade_records = []
-                for trade in result.trades:
-                    trade_record = {
+                trade_records = [
+                    {
                         "backtest_id": backtest_id,
                         "timestamp": trade.timestamp.isoformat(),
                         "symbol": trade.symbol,
@@ -1299,31 +1461,19 @@ class BacktestEngine:
                         "realized_pnl": float(trade.realized_pnl),
                         "strategy_name": trade.strategy_name,
                     }
-                    trade_records.append(trade_record)
-
-                # バッチサイズで分割して保存
-                batch_size = 1000
-                for i in range(0, len(trade_records), batch_size):
-                    batch = trade_records[i : i + batch_size]
-                    supabase.table("backtest_trades").insert(batch).execute()
+                    for trade in result.trades
+                ]
+                batch_write(supabase, "backtest_trades", trade_records, self.db_batch_size, returning=False)
 
             # 資産曲線を保存
             if not result.equity_curve.empty:
-                equity_records = []
-                for _, row in result.equity_curve.iterrows():
-                    equity_record = {
-                        "backtest_id": backtest_id,
-                        "timestamp": row["timestamp"].isoformat(),
-                        "equity": float(row["equity"]),
-                        "cash": float(row.get("cash", 0)),
-                        "unrealized_pnl": float(row.get("unrealized_pnl", 0)),
-                    }
-                    equity_records.append(equity_record)
-
-                # バッチサイズで分割して保存
-                for i in range(0, len(equity_records), batch_size):
-                    batch = equity_records[i : i + batch_size]
-                    supabase.table("backtest_equity_curve").insert(batch).execute()
+                batch_write(
+                    supabase,
+                    "backtest_equity_curve",
+                    self._equity_curve_records(backtest_id, result.equity_curve),
+                    self.db_batch_size,
+                    returning=False,
+                )
 
             logger.info(f"Backtest results saved to database with ID: {backtest_id}")
             return str(backtest_id)
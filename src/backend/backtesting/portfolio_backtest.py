@@ -0,0 +1,320 @@
+"""
+複数戦略・複数シンボルのポートフォリオバックテスト
+
+AdvancedPortfolioManager に登録した戦略群を、シンボルごとの足をヒープで時刻順にマージした1本の系列に対して
+1パスで実行する。資金は全戦略で共有し、定期的に rebalance_strategies() で配分を見直して、
+ポートフォリオ全体の資産曲線を1本だけ記録する。
+"""
+
+import copy
+import heapq
+import logging
+from dataclasses import asdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.backend.portfolio.strategy_portfolio_manager import (
+    STRATEGY_CORRELATION_WINDOW,
+    AdvancedPortfolioManager,
+    StrategyStatus,
+    TradeRecord,
+)
+from src.backend.risk.correlation_tracker import OnlineCovarianceTracker
+from src.backend.strategies.base import Signal
+
+from .engine import PRICE_COLUMNS, BacktestEngine, BacktestResult
+
+logger = logging.getLogger(__name__)
+
+OHLCV_FIELDS = ["open", "high", "low", "close", "volume"]
+
+# (時刻, シンボル順, シンボル, OHLCV)
+Bar = Tuple[Any, int, str, Dict[str, float]]
+
+
+def iter_bars(symbol: str, order: int, df: pd.DataFrame) -> Iterator[Bar]:
+    """OHLCV DataFrame（timestamp 列または時刻インデックス）を時刻順の足に変換"""
+    df = df.rename(columns=PRICE_COLUMNS)
+    timestamps = df["timestamp"] if "timestamp" in df.columns else df.index.to_series()
+    columns = [df[field].to_numpy(dtype=float) for field in OHLCV_FIELDS]
+    for timestamp, *values in zip(timestamps.tolist(), *columns):
+        yield timestamp, order, symbol, dict(zip(OHLCV_FIELDS, values))
+
+
+def merge_bars(data: Dict[str, pd.DataFrame]) -> Iterator[Bar]:
+    """シンボルごとの足を時刻順にマージ（同時刻はシンボルの指定順）"""
+    streams = [
+        iter_bars(symbol, order, df.sort_values("timestamp") if "timestamp" in df.columns else df.sort_index())
+        for order, (symbol, df) in enumerate(data.items())
+    ]
+    return heapq.merge(*streams, key=lambda bar: (bar[0], bar[1]))
+
+
+class PortfolioBacktestEngine(BacktestEngine):
+    """ポートフォリオバックテストエンジン
+
+    - 足は購読している（strategy.symbol が一致する）戦略にだけ渡す
+    - 同じ時刻の足で発生したエントリーは _calculate_position_sizes でまとめてサイジングし、
+      戦略の目標配分（target_weight）で按分する
+    - ポジションは戦略×シンボルごとに保持する（同じシンボルを複数戦略が売買しても干渉しない）
+    - 渡されたマネージャーは変更せず、戦略・配分を複製した専用のマネージャーで実行する
+      （相関・ボラティリティトラッカーも専用のものを使い、共有トラッカーには書き込まない）
+    """
+
+    def __init__(
+        self,
+        portfolio_manager: AdvancedPortfolioManager,
+        rebalance_interval: Optional[timedelta] = None,
+        **engine_kwargs,
+    ):
+        """
+        Args:
+            portfolio_manager: 戦略と配分を保持するマネージャー（実行ごとに複製し、このインスタンスは変更しない）
+            rebalance_interval: rebalance_strategies() を呼ぶ間隔（None ならリバランスしない）
+        """
+        engine_kwargs.setdefault("initial_capital", portfolio_manager.initial_capital)
+        super().__init__(**engine_kwargs)
+        self.source_manager = portfolio_manager
+        self.portfolio_manager = self._backtest_manager()
+        self.rebalance_interval = rebalance_interval
+        self.rebalance_log: List[Dict[str, Any]] = []
+
+    def _backtest_manager(self) -> AdvancedPortfolioManager:
+        """元のマネージャーの戦略・配分・設定を複製した実行用マネージャー
+
+        実行ごとに作り直すので、同じデータに対する結果は何度実行しても変わらない。
+        足ごとのボラティリティはエンジン専用のトラッカーに蓄積し、サイジングも同じトラッカーを参照する。
+        """
+        source = self.source_manager
+        manager = AdvancedPortfolioManager(
+            initial_capital=self.initial_capital,
+            max_trade_history=source.max_trade_history,
+            # 仮想の取引は実取引のアーカイブに書き込まない
+            trade_archiver=lambda trades: None,
+            correlation_tracker=OnlineCovarianceTracker(window=STRATEGY_CORRELATION_WINDOW),
+            risk_manager=copy.deepcopy(source.risk_manager),
+            volatility_tracker=self.volatility_tracker,
+            covariance_service=source.covariance_service,
+        )
+        manager.risk_limits = dict(source.risk_limits)
+        manager.risk_settings = dict(source.risk_settings)
+        manager.strategy_allocations = copy.deepcopy(source.strategy_allocations)
+        return manager
+
+    @staticmethod
+    def position_key(strategy_name: str, symbol: str) -> str:
+        return f"{strategy_name}:{symbol}"
+
+    def subscriptions(self) -> Dict[str, List[str]]:
+        """シンボルごとの購読戦略名"""
+        subscribed: Dict[str, List[str]] = {}
+        for strategy_name, allocation in self.portfolio_manager.strategy_allocations.items():
+            subscribed.setdefault(allocation.strategy_instance.symbol, []).append(strategy_name)
+        return subscribed
+
+    async def run_portfolio_backtest_with_real_data(
+        self, timeframe: str, start_date: datetime, end_date: datetime
+    ) -> BacktestResult:
+        """購読シンボルの実データを読み込んでポートフォリオバックテストを実行"""
+        if not self.data_loader:
+            raise ValueError("Real data loader not initialized")
+
+        data = {}
+        for symbol in self.subscriptions():
+            df = await self.data_loader.load_ohlcv_data(symbol, timeframe, start_date, end_date, self.exchange)
+            if df.empty:
+                logger.warning(f"No data loaded for {symbol} {timeframe}, skipping")
+                continue
+
+            quality_report = self.data_validator.validate_ohlcv_data(df, symbol, timeframe)
+            self.data_quality_reports[f"{symbol}_{timeframe}"] = quality_report
+            if not quality_report.is_valid(self.data_quality_threshold):
+                logger.warning(f"Data quality for {symbol} below threshold ({quality_report.quality_score:.3f})")
+            data[symbol] = df
+
+        if not data:
+            raise ValueError(f"No data available for portfolio backtest on {timeframe}")
+        return self.run_portfolio_backtest(data)
+
+    def run_portfolio_backtest(self, data: Dict[str, pd.DataFrame]) -> BacktestResult:
+        """シンボルごとの OHLCV からポートフォリオバックテストを1パスで実行"""
+        self.performance_monitor.start()
+        self.reset()
+        self.rebalance_log = []
+        self.portfolio_manager = self._backtest_manager()
+        for allocation in self.portfolio_manager.strategy_allocations.values():
+            allocation.strategy_instance.reset()
+        self._sync_allocations()
+
+        subscriptions = self.subscriptions()
+        unsubscribed = sorted(set(data) - set(subscriptions))
+        if unsubscribed:
+            logger.warning(f"No strategies subscribed to {unsubscribed}, skipping")
+        streams = {symbol: df for symbol, df in data.items() if symbol in subscriptions}
+        self.performance_monitor.checkpoint("initialization")
+
+        next_rebalance = None
+        group: List[Bar] = []
+        bars_processed = 0
+        for bar in merge_bars(streams):
+            if group and bar[0] != group[0][0]:
+                next_rebalance = self._process_group(group, subscriptions, next_rebalance)
+                group = []
+            group.append(bar)
+            bars_processed += 1
+        if group:
+            self._process_group(group, subscriptions, next_rebalance)
+        self.performance_monitor.checkpoint("main_processing")
+
+        result = self.get_results("portfolio")
+        result.metrics["bars_processed"] = bars_processed
+        result.metrics["strategies"] = self._strategy_breakdown()
+        result.metrics["rebalances"] = self.rebalance_log
+        if self.data_quality_reports:
+            result.metrics["data_quality"] = {key: asdict(report) for key, report in self.data_quality_reports.items()}
+        result.metrics["performance"] = self.performance_monitor.finish()
+        return result
+
+    def _process_group(
+        self, group: List[Bar], subscriptions: Dict[str, List[str]], next_rebalance: Optional[Any]
+    ) -> Optional[Any]:
+        """同じ時刻の足をまとめて処理し、次回のリバランス時刻を返す"""
+        timestamp = group[0][0]
+
+        # 価格を反映してから購読戦略のシグナルを集める
+        fired: List[Tuple[str, str, float, Signal]] = []
+        for _, _, symbol, ohlcv in group:
+            price = ohlcv["close"]
+            for position in self.portfolio.positions.values():
+                if position.symbol == symbol:
+                    position.update_pnl(price)
+            self.volatility_tracker.update_price(symbol, price)
+
+            for strategy_name in subscriptions[symbol]:
+                allocation = self.portfolio_manager.strategy_allocations.get(strategy_name)
+                if allocation is None or allocation.status != StrategyStatus.ACTIVE:
+                    continue
+                signal = allocation.strategy_instance.update({"timestamp": timestamp, **ohlcv})
+                if signal:
+                    allocation.last_signal = signal
+                    fired.append((strategy_name, symbol, price, signal))
+
+        # イグジットで資金を戻してからエントリーする
+        exits = [item for item in fired if item[3].action.startswith("exit")]
+        entries = [item for item in fired if item[3].action.startswith("enter")]
+        for strategy_name, symbol, price, signal in exits:
+            self._execute(timestamp, strategy_name, symbol, price, signal)
+
+        if entries:
+            sizes = self._calculate_position_sizes(
+                [symbol for _, symbol, _, _ in entries],
+                np.array([price for _, _, price, _ in entries]),
+                [strategy_name for strategy_name, _, _, _ in entries],
+                np.array([signal.strength for _, _, _, signal in entries]),
+            )
+            weights = np.array(
+                [self.portfolio_manager.strategy_allocations[name].target_weight for name, _, _, _ in entries]
+            )
+            for (strategy_name, symbol, price, signal), size in zip(entries, sizes * weights):
+                self._execute(timestamp, strategy_name, symbol, price, signal, float(size))
+
+        self.portfolio.equity = self.portfolio.get_total_value()
+        self._update_stats(timestamp)
+        self.equity_curve.append(
+            {
+                "timestamp": timestamp,
+                "equity": self.portfolio.equity,
+                "cash": self.portfolio.cash,
+                "unrealized_pnl": sum(pos.unrealized_pnl for pos in self.portfolio.positions.values()),
+            }
+        )
+
+        if self.rebalance_interval is None:
+            return None
+        if next_rebalance is None:
+            return timestamp + self.rebalance_interval
+        if timestamp >= next_rebalance:
+            self._rebalance(timestamp)
+            return timestamp + self.rebalance_interval
+        return next_rebalance
+
+    def _execute(
+        self,
+        timestamp: Any,
+        strategy_name: str,
+        symbol: str,
+        price: float,
+        signal: Signal,
+        position_size: Optional[float] = None,
+    ):
+        """シグナルを約定させ、戦略の状態とマネージャーの取引履歴に反映"""
+        key = self.position_key(strategy_name, symbol)
+        trades_before = len(self.portfolio.trades)
+        if signal.action == "enter_long":
+            self._process_long_entry(timestamp, symbol, price, strategy_name, position_size, key)
+        elif signal.action == "enter_short":
+            self._process_short_entry(timestamp, symbol, price, strategy_name, position_size, key)
+        elif signal.action == "exit_long":
+            self._process_long_exit(timestamp, symbol, price, strategy_name, key)
+        elif signal.action == "exit_short":
+            self._process_short_exit(timestamp, symbol, price, strategy_name, key)
+
+        if len(self.portfolio.trades) == trades_before:
+            return
+
+        trade = self.portfolio.trades[-1]
+        allocation = self.portfolio_manager.strategy_allocations[strategy_name]
+        allocation.strategy_instance.update_position(signal.action, trade.price, timestamp)
+        self.portfolio_manager.record_trade(
+            TradeRecord(
+                strategy_name=strategy_name,
+                symbol=symbol,
+                action=signal.action,
+                quantity=trade.amount,
+                price=trade.price,
+                timestamp=timestamp,
+                signal_strength=signal.strength,
+                pnl=trade.realized_pnl if signal.action.startswith("exit") else None,
+                commission=trade.fee,
+            )
+        )
+
+    def _sync_allocations(self):
+        """共有資金の現在の資産額を各戦略の配分資本に反映"""
+        self.portfolio_manager.current_capital = self.portfolio.equity
+        for allocation in self.portfolio_manager.strategy_allocations.values():
+            allocation.allocated_capital = self.portfolio.equity * allocation.target_weight
+
+    def _rebalance(self, timestamp: Any):
+        """rebalance_strategies() で配分を見直す"""
+        actions = self.portfolio_manager.rebalance_strategies()
+        self._sync_allocations()
+        self.rebalance_log.append(
+            {
+                "timestamp": timestamp,
+                "equity": self.portfolio.equity,
+                "actions": actions,
+                "weights": {
+                    name: allocation.target_weight
+                    for name, allocation in self.portfolio_manager.strategy_allocations.items()
+                },
+            }
+        )
+
+    def _strategy_breakdown(self) -> Dict[str, Dict[str, Any]]:
+        """戦略別の取引数・実現損益"""
+        breakdown = {
+            name: {"trades": 0, "realized_pnl": 0.0, "fees": 0.0, "target_weight": allocation.target_weight}
+            for name, allocation in self.portfolio_manager.strategy_allocations.items()
+        }
+        for trade in self.portfolio.trades:
+            entry = breakdown.get(trade.strategy_name)
+            if entry is None:
+                continue
+            entry["trades"] += 1
+            entry["realized_pnl"] += trade.realized_pnl
+            entry["fees"] += trade.fee
+        return breakdown
@@ -38,6 +38,8 @@ class Settings(BaseSettings):
 
     # Database
     DUCKDB_PATH: str = "./data/crypto_bot.duckdb"
+    PAPER_WALLET_JOURNAL_DIR: str = "./data/paper_wallet"
+    PORTFOLIO_TRADE_ARCHIVE_DIR: str = "./data/portfolio_trades"
 
     # Supabase
     SUPABASE_URL: str = ""
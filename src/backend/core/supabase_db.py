@@ -4,7 +4,7 @@ SQLAlchemyの代替として、Supabase SDKを使用したデータベース操
 """
 
 import logging
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Sequence
 
 from supabase import Client, create_client
 
@@ -12,6 +12,51 @@ from src.backend.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# 一括書き込み時の1リクエストあたりの件数
+DEFAULT_BATCH_SIZE = 1000
+
+
+def batch_write(
+    client: Client,
+    table_name: str,
+    records: Sequence[Dict[str, Any]],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    on_conflict: Optional[str] = None,
+    returning: bool = True,
+) -> List[Dict[str, Any]]:
+    """レコードを batch_size 件ずつ分割して insert / upsert する
+
+    Args:
+        client: Supabaseクライアント
+        table_name: テーブル名
+        records: 書き込むレコード
+        batch_size: 1リクエストあたりの件数
+        on_conflict: 指定時はこの列で upsert する
+        returning: False の場合は書き込んだ行を返さない（転送量を削減）
+
+    Returns:
+        List[Dict]: 書き込まれた行（records と同じ順序、returning=False の場合は空）
+    """
+    if batch_size <= 0:
+        raise ValueError("batch_size must be positive")
+
+    table = client.table(table_name)
+    returning_method = "representation" if returning else "minimal"
+    written: List[Dict[str, Any]] = []
+
+    for start in range(0, len(records), batch_size):
+        batch = list(records[start : start + batch_size])
+        if on_conflict:
+            query = table.upsert(batch, on_conflict=on_conflict, returning=returning_method)
+        else:
+            query = table.insert(batch, returning=returning_method)
+
+        response = query.execute()
+        if returning:
+            written.extend(response.data or [])
+
+    return written
+
 
 class SupabaseConnection:
     """Supabase接続を管理するクラス"""
@@ -87,6 +132,26 @@ class SupabaseTable:
             logger.error(f"{self.table_name}への挿入エラー: {e}")
             raise
 
+    def insert_many(
+        self, records: Sequence[Dict[str, Any]], batch_size: int = DEFAULT_BATCH_SIZE
+    ) -> List[Dict[str, Any]]:
+        """複数レコードを分割して挿入"""
+        try:
+            return batch_write(self.connection.client, self.table_name, records, batch_size)
+        except Exception as e:
+            logger.error(f"{self.table_name}への一括挿入エラー: {e}")
+            raise
+
+    def upsert_many(
+        self, records: Sequence[Dict[str, Any]], on_conflict: str, batch_size: int = DEFAULT_BATCH_SIZE
+    ) -> List[Dict[str, Any]]:
+        """複数レコードを分割してupsert"""
+        try:
+            return batch_write(self.connection.client, self.table_name, records, batch_size, on_conflict=on_conflict)
+        except Exception as e:
+            logger.error(f"{self.table_name}への一括upsertエラー: {e}")
+            raise
+
     def update(self, data: Dict[str, Any], **filters) -> List[Dict[str, Any]]:
         """既存のレコードを更新"""
         try:
@@ -1,27 +1,96 @@
 import asyncio
 import logging
+import time
 from dataclasses import asdict
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 
 import pandas as pd
 
 from src.backend.core.database import get_db
 from src.backend.core.supabase_db import get_supabase_client
+from src.backend.data_pipeline.high_water_mark import HighWaterMarkIndex, last_closed_bar_open, next_bar_close
+from src.backend.data_pipeline.rate_limiter import TokenBucket, get_rate_limiter
+from src.backend.data_pipeline.resampler import OHLCVResampler
 from src.backend.exchanges.base import OHLCV, AbstractExchangeAdapter, TimeFrame
 from src.backend.exchanges.factory import ExchangeFactory
+from src.backend.portfolio.covariance import CovarianceService, get_covariance_service
+from src.backend.trading.price_bus import price_bus
+from src.backend.utils.timeframes import timeframe_to_seconds
 
 logger = logging.getLogger(__name__)
 
+FUNDING_RATES_TABLE_DDL = """
+CREATE TABLE IF NOT EXISTS funding_rates (
+    timestamp TIMESTAMP,
+    symbol VARCHAR,
+    funding_rate DECIMAL(10, 6),
+    next_funding_time TIMESTAMP,
+    PRIMARY KEY (timestamp, symbol)
+)
+"""
+
+OPEN_INTERESTS_TABLE_DDL = """
+CREATE TABLE IF NOT EXISTS open_interests (
+    timestamp TIMESTAMP,
+    symbol VARCHAR,
+    open_interest DECIMAL(20, 8),
+    open_interest_value DECIMAL(20, 8),
+    PRIMARY KEY (timestamp, symbol)
+)
+"""
+
+FUNDING_RATES_INSERT = """
+INSERT OR REPLACE INTO funding_rates
+(timestamp, symbol, funding_rate, next_funding_time)
+VALUES (?, ?, ?, ?)
+"""
+
+OPEN_INTERESTS_INSERT = """
+INSERT OR REPLACE INTO open_interests
+(timestamp, symbol, open_interest, open_interest_value)
+VALUES (?, ?, ?, ?)
+"""
+
+# 資金調達率・建玉の実行予定を管理するキー（時間枠と区別する）
+DERIVATIVES_SCHEDULE_KEY = "derivatives"
+
+
+def _as_utc(timestamp: datetime) -> datetime:
+    """タイムゾーンなしの時刻はUTCとして扱う"""
+    return timestamp if timestamp.tzinfo else timestamp.replace(tzinfo=timezone.utc)
+
 
 class DataCollector:
     """データ収集クラス"""
 
-    def __init__(self, exchange_name: str = "binance"):
+    def __init__(
+        self,
+        exchange_name: str = "binance",
+        max_concurrency: int = 8,
+        rate_limiter: Optional[TokenBucket] = None,
+        data_dir: Optional[Path] = None,
+        resample_locally: bool = True,
+        covariance_service: Optional[CovarianceService] = None,
+    ):
         self.exchange_name = exchange_name
         self.adapter: Optional[AbstractExchangeAdapter] = None
-        self.data_dir = Path("data")
+
+        # 取引所ごとのREST呼び出し予算（同じ取引所のコレクター間で共有）
+        self.rate_limiter = rate_limiter or get_rate_limiter(exchange_name)
+        self.max_concurrency = max_concurrency
+        self._tables_ready = False
+
+        # 収集サイクルの指標
+        self.stats: Dict[str, Dict[str, float]] = {
+            kind: {"cycles": 0, "requests": 0, "errors": 0, "db_rows": 0, "total_duration": 0.0}
+            for kind in ("funding_rates", "open_interests")
+        }
+        self.stats["ohlcv"] = {"cycles": 0, "requests": 0, "skipped": 0, "errors": 0, "bars_written": 0}
+        self.last_cycle_metrics: Dict[str, Dict[str, Any]] = {}
+
+        self.data_dir = Path(data_dir) if data_dir else Path("data")
         self.data_dir.mkdir(exist_ok=True)
 
         # Parquet ファイルの保存先
@@ -48,10 +117,24 @@ class DataCollector:
             TimeFrame.DAY_1,
         ]
 
+        # 保存済みの最新確定足（高水位マーク）と、未記録時に遡る期間
+        self.hwm_index = HighWaterMarkIndex(self.data_dir / "hwm" / f"{exchange_name}.json")
+        self.initial_lookback = timedelta(days=1)
+        self.max_ohlcv_limit = 1000
+
+        # 取引所からは1分足だけを取得し、上位時間枠はローカルで集約する
+        self.resample_locally = resample_locally
+        self.base_timeframe = TimeFrame.MINUTE_1
+        self.resampler = OHLCVResampler(self.base_timeframe.value)
+
+        # 収集した確定足で共分散のリターン窓を差分更新する（既定は共有サービス）
+        self.covariance_service = covariance_service if covariance_service is not None else get_covariance_service()
+
     async def initialize(self):
         """初期化"""
         try:
             self.adapter = ExchangeFactory.create_adapter(self.exchange_name)
+            self._ensure_tables()
             logger.info(f"DataCollector initialized with {self.exchange_name}")
         except Exception as e:
             logger.error(f"Failed to initialize DataCollector: {e}")
@@ -79,47 +162,87 @@ class DataCollector:
             raise
 
     async def collect_funding_rates(self, symbols: List[str]) -> Dict[str, Any]:
-        """資金調達率を収集"""
+        """資金調達率を収集（レート予算内で並列取得し、一括保存）"""
         if not self.adapter:
             raise RuntimeError("DataCollector not initialized")
 
-        funding_rates = {}
-
-        for symbol in symbols:
-            try:
-                funding_rate = await self.adapter.fetch_funding_rate(symbol)
-                funding_rates[symbol] = asdict(funding_rate)
-
-                # データベースに保存
-                await self._save_funding_rate_to_db(funding_rate)
-
-            except Exception as e:
-                logger.error(f"Error collecting funding rate for {symbol}: {e}")
-                funding_rates[symbol] = {"error": str(e)}
-
+        funding_rates, collected = await self._collect_concurrently(
+            "funding_rates", symbols, self.adapter.fetch_funding_rate
+        )
+        await self._timed_save("funding_rates", self._save_funding_rates_to_db, collected)
         return funding_rates
 
     async def collect_open_interest(self, symbols: List[str]) -> Dict[str, Any]:
-        """建玉データを収集"""
+        """建玉データを収集（レート予算内で並列取得し、一括保存）"""
         if not self.adapter:
             raise RuntimeError("DataCollector not initialized")
 
-        open_interests = {}
-
-        for symbol in symbols:
-            try:
-                open_interest = await self.adapter.fetch_open_interest(symbol)
-                open_interests[symbol] = asdict(open_interest)
-
-                # データベースに保存
-                await self._save_open_interest_to_db(open_interest)
-
-            except Exception as e:
-                logger.error(f"Error collecting open interest for {symbol}: {e}")
-                open_interests[symbol] = {"error": str(e)}
-
+        open_interests, collected = await self._collect_concurrently(
+            "open_interests", symbols, self.adapter.fetch_open_interest
+        )
+        await self._timed_save("open_interests", self._save_open_interests_to_db, collected)
         return open_interests
 
+    async def _collect_concurrently(
+        self, kind: str, symbols: List[str], fetch: Callable[[str], Awaitable[Any]]
+    ) -> Tuple[Dict[str, Any], List[Any]]:
+        """シンボルごとの取得をトークンバケットの予算内で並列実行し、サイクル指標を記録"""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        latencies: List[float] = []
+
+        async def fetch_one(symbol: str):
+            async with semaphore:
+                await self.rate_limiter.acquire()
+                started = time.perf_counter()
+                try:
+                    return await fetch(symbol)
+                finally:
+                    latencies.append(time.perf_counter() - started)
+
+        cycle_started = time.perf_counter()
+        outcomes = await asyncio.gather(*(fetch_one(symbol) for symbol in symbols), return_exceptions=True)
+
+        results: Dict[str, Any] = {}
+        collected: List[Any] = []
+        errors: Dict[str, str] = {}
+        for symbol, outcome in zip(symbols, outcomes):
+            if isinstance(outcome, Exception):
+                logger.error(f"Error collecting {kind} for {symbol}: {outcome}")
+                results[symbol] = {"error": str(outcome)}
+                errors[symbol] = str(outcome)
+            else:
+                results[symbol] = asdict(outcome)
+                collected.append(outcome)
+
+        latencies.sort()
+        metrics = {
+            "symbols": len(symbols),
+            "succeeded": len(collected),
+            "failed": len(errors),
+            "duration": time.perf_counter() - cycle_started,
+            "latency_p50": latencies[len(latencies) // 2] if latencies else 0.0,
+            "latency_max": latencies[-1] if latencies else 0.0,
+            "errors": errors,
+            "completed_at": datetime.now(timezone.utc).isoformat(),
+        }
+        self.last_cycle_metrics[kind] = metrics
+
+        stats = self.stats[kind]
+        stats["cycles"] += 1
+        stats["requests"] += len(symbols)
+        stats["errors"] += len(errors)
+        stats["total_duration"] += metrics["duration"]
+        return results, collected
+
+    async def _timed_save(self, kind: str, save: Callable[[List[Any]], Awaitable[int]], records: List[Any]):
+        """一括保存を実行し、書き込み件数と所要時間をサイクル指標に追加"""
+        started = time.perf_counter()
+        written = await save(records)
+        metrics = self.last_cycle_metrics.get(kind, {})
+        metrics["db_rows"] = written
+        metrics["db_write_duration"] = time.perf_counter() - started
+        self.stats[kind]["db_rows"] += written
+
     async def collect_batch_ohlcv(
         self,
         symbols: List[str],
@@ -143,6 +266,16 @@ class DataCollector:
                 ohlcv_data = await task
                 results[symbol][timeframe.value] = ohlcv_data
 
+                # 最新の終値を価格バスに配信（ストリームより古ければ破棄される）
+                if ohlcv_data:
+                    latest = ohlcv_data[-1]
+                    await price_bus.publish(
+                        symbol.replace("/", ""),
+                        latest.close,
+                        timestamp=latest.timestamp,
+                        source=f"{self.exchange_name}_ohlcv",
+                    )
+
                 # Parquet ファイルに保存
                 await self._save_ohlcv_to_parquet(symbol, timeframe, ohlcv_data)
 
@@ -155,6 +288,179 @@ class DataCollector:
 
         return results
 
+    async def collect_incremental_ohlcv(
+        self,
+        symbols: List[str],
+        timeframes: List[TimeFrame],
+        now: Optional[datetime] = None,
+    ) -> Dict[str, Dict[str, List[OHLCV]]]:
+        """高水位マークより新しい確定足だけを取得して保存
+
+        前回の保存以降に確定した足がない (シンボル, 時間枠) は取引所に問い合わせない。
+        未確定の足は保存せず、確定後の次回サイクルで取得する。
+        """
+        if not self.adapter:
+            raise RuntimeError("DataCollector not initialized")
+
+        now = now or datetime.now(timezone.utc)
+        stats = self.stats["ohlcv"]
+        stats["cycles"] += 1
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def collect_one(symbol: str, timeframe: TimeFrame) -> List[OHLCV]:
+            seconds = timeframe_to_seconds(timeframe.value)
+            latest_closed = last_closed_bar_open(timeframe.value, now)
+            since = self._next_since(symbol, timeframe, now)
+            if since > latest_closed:
+                stats["skipped"] += 1
+                return []
+
+            # 未確定足の分を含めて必要な本数だけ要求する
+            limit = min(self.max_ohlcv_limit, int((latest_closed - since).total_seconds()) // seconds + 2)
+            async with semaphore:
+                await self.rate_limiter.acquire()
+                stats["requests"] += 1
+                ohlcv_data = await self.collect_ohlcv(symbol, timeframe, since=since, limit=limit)
+
+            if ohlcv_data:
+                # 最新の終値を価格バスに配信（ストリームより古ければ破棄される）
+                latest = ohlcv_data[-1]
+                await price_bus.publish(
+                    symbol.replace("/", ""),
+                    latest.close,
+                    timestamp=latest.timestamp,
+                    source=f"{self.exchange_name}_ohlcv",
+                )
+
+            new_bars = [bar for bar in ohlcv_data if since <= _as_utc(bar.timestamp) <= latest_closed]
+            if not new_bars:
+                return []
+
+            await self._save_ohlcv_to_parquet(symbol, timeframe, new_bars)
+            if await self._save_ohlcv_to_supabase(symbol, timeframe, new_bars):
+                # 保存に成功した場合のみ高水位マークを進める（失敗時は次回再取得）
+                self.hwm_index.update(self.exchange_name, symbol, timeframe.value, _as_utc(new_bars[-1].timestamp))
+            stats["bars_written"] += len(new_bars)
+            return new_bars
+
+        pairs = [(symbol, timeframe) for symbol in symbols for timeframe in timeframes]
+        outcomes = await asyncio.gather(*(collect_one(*pair) for pair in pairs), return_exceptions=True)
+
+        results: Dict[str, Dict[str, List[OHLCV]]] = {symbol: {} for symbol in symbols}
+        for (symbol, timeframe), outcome in zip(pairs, outcomes):
+            if isinstance(outcome, Exception):
+                logger.error(f"Error in incremental collection for {symbol} {timeframe.value}: {outcome}")
+                stats["errors"] += 1
+                outcome = []
+            results[symbol][timeframe.value] = outcome
+
+        try:
+            self.hwm_index.save()
+        except Exception as e:
+            logger.error(f"Error saving high-water marks: {e}")
+
+        return results
+
+    async def collect_resampled_ohlcv(
+        self,
+        symbols: List[str],
+        timeframes: List[TimeFrame],
+        now: Optional[datetime] = None,
+    ) -> Dict[str, Dict[str, List[OHLCV]]]:
+        """1分足を差分取得し、上位時間枠の新しく確定した足を集約して保存
+
+        取引所へは1分足の1系列だけを問い合わせ、上位時間枠は OHLCVResampler で生成する。
+        """
+        if not timeframes:
+            return {symbol: {} for symbol in symbols}
+
+        now = now or datetime.now(timezone.utc)
+        for symbol in symbols:
+            self._load_base_bars(symbol)
+
+        base = self.base_timeframe.value
+        base_results = await self.collect_incremental_ohlcv(symbols, [self.base_timeframe], now=now)
+
+        results: Dict[str, Dict[str, List[OHLCV]]] = {}
+        for symbol in symbols:
+            new_bars = base_results[symbol][base]
+            if new_bars:
+                self.resampler.add_base_bars(symbol, new_bars)
+            results[symbol] = {base: new_bars}
+
+            for timeframe in timeframes:
+                if timeframe == self.base_timeframe:
+                    continue
+                try:
+                    results[symbol][timeframe.value] = await self._store_resampled_bars(symbol, timeframe)
+                except Exception as e:
+                    logger.error(f"Error resampling {symbol} {timeframe.value}: {e}")
+                    results[symbol][timeframe.value] = []
+
+        try:
+            self.hwm_index.save()
+        except Exception as e:
+            logger.error(f"Error saving high-water marks: {e}")
+
+        return results
+
+    async def _store_resampled_bars(self, symbol: str, timeframe: TimeFrame) -> List[OHLCV]:
+        """高水位マークより新しい確定済みの集約足を保存"""
+        since = self.hwm_index.next_since(self.exchange_name, symbol, timeframe.value)
+        bars = self.resampler.to_ohlcv(symbol, timeframe.value, start=since)
+        if not bars:
+            return []
+
+        await self._save_ohlcv_to_parquet(symbol, timeframe, bars)
+        if await self._save_ohlcv_to_supabase(symbol, timeframe, bars):
+            self.hwm_index.update(self.exchange_name, symbol, timeframe.value, bars[-1].timestamp)
+        return bars
+
+    def _load_base_bars(self, symbol: str):
+        """再起動後など、リサンプラーが空の場合は保存済みの1分足を読み込む"""
+        if self.resampler.has_base_bars(symbol):
+            return
+
+        filepath = self.parquet_dir / f"{symbol.replace('/', '_')}_{self.base_timeframe.value}.parquet"
+        if not filepath.exists():
+            return
+
+        try:
+            df = pd.read_parquet(filepath).tail(self.resampler.max_base_bars)
+            self.resampler.add_base_bars(symbol, df)
+        except Exception as e:
+            logger.error(f"Error loading base bars from {filepath}: {e}")
+
+    def _next_since(self, symbol: str, timeframe: TimeFrame, now: datetime) -> datetime:
+        """次に取得する足の開始時刻（高水位マーク → Parquet の最終足 → 初回遡り期間の順に決定）"""
+        since = self.hwm_index.next_since(self.exchange_name, symbol, timeframe.value)
+        if since is not None:
+            return since
+
+        last_stored = self._last_parquet_timestamp(symbol, timeframe)
+        if last_stored is not None:
+            self.hwm_index.update(self.exchange_name, symbol, timeframe.value, last_stored)
+            return self.hwm_index.next_since(self.exchange_name, symbol, timeframe.value)
+
+        seconds = timeframe_to_seconds(timeframe.value)
+        start = int((now - self.initial_lookback).timestamp()) // seconds * seconds
+        return datetime.fromtimestamp(start, tz=timezone.utc)
+
+    def _last_parquet_timestamp(self, symbol: str, timeframe: TimeFrame) -> Optional[datetime]:
+        """Parquet ファイルに保存済みの最新足の時刻"""
+        filepath = self.parquet_dir / f"{symbol.replace('/', '_')}_{timeframe.value}.parquet"
+        if not filepath.exists():
+            return None
+
+        try:
+            timestamps = pd.read_parquet(filepath, columns=["timestamp"])["timestamp"]
+            if timestamps.empty:
+                return None
+            return _as_utc(pd.Timestamp(timestamps.max()).to_pydatetime())
+        except Exception as e:
+            logger.error(f"Error reading last timestamp from {filepath}: {e}")
+            return None
+
     async def _save_ohlcv_to_parquet(self, symbol: str, timeframe: TimeFrame, ohlcv_data: List[OHLCV]):
         """OHLCV データを Parquet ファイルに保存"""
         if not ohlcv_data:
@@ -179,10 +485,10 @@ class DataCollector:
         df.to_parquet(filepath, index=False)
         logger.info(f"Saved {len(df)} records to {filepath}")
 
-    async def _save_ohlcv_to_supabase(self, symbol: str, timeframe: TimeFrame, ohlcv_data: List[OHLCV]):
-        """OHLCV データを Supabase に保存"""
+    async def _save_ohlcv_to_supabase(self, symbol: str, timeframe: TimeFrame, ohlcv_data: List[OHLCV]) -> bool:
+        """OHLCV データを Supabase に保存（成功したかどうかを返す）"""
         if not ohlcv_data:
-            return
+            return True
 
         try:
             supabase = get_supabase_client()
@@ -217,101 +523,106 @@ class DataCollector:
                     f"Saved batch {i // batch_size + 1}/{(len(records) - 1) // batch_size + 1} "
                     f"({len(batch)} records) to Supabase for {symbol} {timeframe.value}"
                 )
+            return True
 
         except Exception as e:
             logger.error(f"Error saving OHLCV data to Supabase: {e}")
             # Supabaseエラーでもメイン処理は継続
+            return False
 
-    async def _save_funding_rate_to_db(self, funding_rate):
-        """資金調達率をデータベースに保存"""
-        try:
-            # 簡易的な保存（実際はテーブル定義が必要）
-            query = """
-            INSERT OR REPLACE INTO funding_rates
-            (timestamp, symbol, funding_rate, next_funding_time)
-            VALUES (?, ?, ?, ?)
-            """
-
-            # テーブルが存在しない場合は作成
-            create_table_query = """
-            CREATE TABLE IF NOT EXISTS funding_rates (
-                timestamp TIMESTAMP,
-                symbol VARCHAR,
-                funding_rate DECIMAL(10, 6),
-                next_funding_time TIMESTAMP,
-                PRIMARY KEY (timestamp, symbol)
-            )
-            """
+    def _ensure_tables(self) -> bool:
+        """資金調達率・建玉テーブルを作成（コレクターごとに1回だけ実行）"""
+        if self._tables_ready:
+            return True
 
+        try:
             db = get_db()
-            db.execute(create_table_query)
-            db.execute(
-                query,
-                [
-                    funding_rate.timestamp,
-                    funding_rate.symbol,
-                    funding_rate.funding_rate,
-                    funding_rate.next_funding_time,
-                ],
-            )
-
+            db.execute(FUNDING_RATES_TABLE_DDL)
+            db.execute(OPEN_INTERESTS_TABLE_DDL)
+            self._tables_ready = True
         except Exception as e:
-            logger.error(f"Error saving funding rate to DB: {e}")
+            logger.error(f"Error creating data collection tables: {e}")
+        return self._tables_ready
 
-    async def _save_open_interest_to_db(self, open_interest):
-        """建玉データをデータベースに保存"""
-        try:
-            # 簡易的な保存（実際はテーブル定義が必要）
-            query = """
-            INSERT OR REPLACE INTO open_interests
-            (timestamp, symbol, open_interest, open_interest_value)
-            VALUES (?, ?, ?, ?)
-            """
-
-            # テーブルが存在しない場合は作成
-            create_table_query = """
-            CREATE TABLE IF NOT EXISTS open_interests (
-                timestamp TIMESTAMP,
-                symbol VARCHAR,
-                open_interest DECIMAL(20, 8),
-                open_interest_value DECIMAL(20, 8),
-                PRIMARY KEY (timestamp, symbol)
-            )
-            """
+    async def _save_funding_rates_to_db(self, funding_rates: List[Any]) -> int:
+        """資金調達率をデータベースに一括保存"""
+        if not funding_rates:
+            return 0
 
-            db = get_db()
-            db.execute(create_table_query)
-            db.execute(
-                query,
-                [
-                    open_interest.timestamp,
-                    open_interest.symbol,
-                    open_interest.open_interest,
-                    open_interest.open_interest_value,
-                ],
+        try:
+            self._ensure_tables()
+            get_db().executemany(
+                FUNDING_RATES_INSERT,
+                [[rate.timestamp, rate.symbol, rate.funding_rate, rate.next_funding_time] for rate in funding_rates],
             )
+            return len(funding_rates)
 
         except Exception as e:
-            logger.error(f"Error saving open interest to DB: {e}")
+            logger.error(f"Error saving funding rates to DB: {e}")
+            return 0
 
-    async def run_scheduled_collection(self):
-        """定期収集を実行"""
-        logger.info("Starting scheduled data collection...")
+    async def _save_open_interests_to_db(self, open_interests: List[Any]) -> int:
+        """建玉データをデータベースに一括保存"""
+        if not open_interests:
+            return 0
 
         try:
-            # 過去1日分のデータを収集
-            since = datetime.now(timezone.utc) - timedelta(days=1)
-
-            # OHLCV データを並列収集
-            ohlcv_results = await self.collect_batch_ohlcv(
-                symbols=self.symbols, timeframes=self.timeframes, since=since
+            self._ensure_tables()
+            get_db().executemany(
+                OPEN_INTERESTS_INSERT,
+                [[oi.timestamp, oi.symbol, oi.open_interest, oi.open_interest_value] for oi in open_interests],
             )
+            return len(open_interests)
+
+        except Exception as e:
+            logger.error(f"Error saving open interests to DB: {e}")
+            return 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """収集統計を取得"""
+        return {
+            "exchange": self.exchange_name,
+            "stats": {kind: dict(stats) for kind, stats in self.stats.items()},
+            "last_cycle": self.last_cycle_metrics,
+            "rate_limiter": self.rate_limiter.get_stats(),
+        }
+
+    def _update_covariance(self, ohlcv_results: Dict[str, Dict[str, List[OHLCV]]]):
+        """収集した確定足を共分散推定サービスに反映（失敗しても収集は続ける）"""
+        try:
+            self.covariance_service.update_from_results(ohlcv_results)
+        except Exception as e:
+            logger.error(f"Error updating covariance windows: {e}")
 
-            # 資金調達率を収集
-            funding_results = await self.collect_funding_rates(self.symbols)
+    async def run_scheduled_collection(
+        self, timeframes: Optional[List[TimeFrame]] = None, include_derivatives: bool = True
+    ):
+        """定期収集を実行
 
-            # 建玉データを収集
-            oi_results = await self.collect_open_interest(self.symbols)
+        Args:
+            timeframes: 収集する時間枠（None の場合は全時間枠）
+            include_derivatives: 資金調達率・建玉も収集するか
+        """
+        logger.info("Starting scheduled data collection...")
+
+        try:
+            timeframes = self.timeframes if timeframes is None else timeframes
+            if self.resample_locally:
+                # 1分足だけを取得し、上位時間枠は集約して保存
+                ohlcv_results = await self.collect_resampled_ohlcv(symbols=self.symbols, timeframes=timeframes)
+            else:
+                # 高水位マーク以降の確定足だけを並列収集
+                ohlcv_results = await self.collect_incremental_ohlcv(symbols=self.symbols, timeframes=timeframes)
+            self._update_covariance(ohlcv_results)
+
+            funding_results: Dict[str, Any] = {}
+            oi_results: Dict[str, Any] = {}
+            if include_derivatives:
+                # 資金調達率を収集
+                funding_results = await self.collect_funding_rates(self.symbols)
+
+                # 建玉データを収集
+                oi_results = await self.collect_open_interest(self.symbols)
 
             logger.info("Scheduled data collection completed successfully")
 
@@ -333,12 +644,20 @@ class DataCollector:
 
 
 class DataCollectorManager:
-    """データ収集管理クラス"""
+    """データ収集管理クラス
+
+    OHLCV は時間枠ごとに足の確定時刻に合わせて収集し（15分足は15分ごと）、
+    資金調達率・建玉は collection_interval ごとに収集する。
+    """
 
     def __init__(self):
         self.collectors: Dict[str, DataCollector] = {}
         self.is_running = False
-        self.collection_interval = 300  # 5分間隔
+        self.collection_interval = 300  # 資金調達率・建玉は5分間隔
+        self.bar_close_delay = 5  # 足の確定後、取引所側の集計を待つ秒数
+
+        # 次回の実行予定時刻（時間枠ごと + 資金調達率・建玉）
+        self._next_runs: Dict[str, datetime] = {}
 
     async def add_collector(self, exchange_name: str):
         """データ収集器を追加"""
@@ -348,6 +667,49 @@ class DataCollectorManager:
             self.collectors[exchange_name] = collector
             logger.info(f"Added data collector for {exchange_name}")
 
+    def _due_work(self, now: datetime) -> Tuple[List[TimeFrame], bool]:
+        """now 時点で実行予定を過ぎている時間枠と、資金調達率・建玉の収集要否"""
+        timeframes = {timeframe for collector in self.collectors.values() for timeframe in collector.timeframes}
+        due = sorted(
+            (timeframe for timeframe in timeframes if self._next_runs.get(timeframe.value, now) <= now),
+            key=lambda timeframe: timeframe_to_seconds(timeframe.value),
+        )
+        derivatives_due = self._next_runs.get(DERIVATIVES_SCHEDULE_KEY, now) <= now
+        return due, derivatives_due
+
+    def _schedule_next(self, due: List[TimeFrame], derivatives_due: bool, now: datetime):
+        """実行した収集の次回予定を設定"""
+        delay = timedelta(seconds=self.bar_close_delay)
+        for timeframe in due:
+            self._next_runs[timeframe.value] = next_bar_close(timeframe.value, now) + delay
+        if derivatives_due:
+            self._next_runs[DERIVATIVES_SCHEDULE_KEY] = now + timedelta(seconds=self.collection_interval)
+
+    def _seconds_until_next_run(self, now: datetime) -> float:
+        """次の実行予定までの秒数"""
+        if not self._next_runs:
+            return float(self.collection_interval)
+        return max(0.0, (min(self._next_runs.values()) - now).total_seconds())
+
+    async def run_due_collections(self, now: Optional[datetime] = None):
+        """実行予定を過ぎた収集を全取引所で並列実行"""
+        now = now or datetime.now(timezone.utc)
+        due, derivatives_due = self._due_work(now)
+        if not due and not derivatives_due:
+            return
+
+        collection_tasks = []
+        for collector in self.collectors.values():
+            timeframes = [timeframe for timeframe in due if timeframe in collector.timeframes]
+            task = asyncio.create_task(
+                collector.run_scheduled_collection(timeframes=timeframes, include_derivatives=derivatives_due)
+            )
+            collection_tasks.append(task)
+
+        # 並列実行
+        await asyncio.gather(*collection_tasks, return_exceptions=True)
+        self._schedule_next(due, derivatives_due, now)
+
     async def start_collection(self):
         """データ収集を開始"""
         if self.is_running:
@@ -359,17 +721,10 @@ class DataCollectorManager:
 
         while self.is_running:
             try:
-                # 各取引所のデータを収集
-                collection_tasks = []
-                for exchange_name, collector in self.collectors.items():
-                    task = asyncio.create_task(collector.run_scheduled_collection())
-                    collection_tasks.append(task)
-
-                # 並列実行
-                await asyncio.gather(*collection_tasks, return_exceptions=True)
+                await self.run_due_collections()
 
-                # 指定間隔で待機
-                await asyncio.sleep(self.collection_interval)
+                # 次の足の確定（または資金調達率・建玉の収集時刻）まで待機
+                await asyncio.sleep(self._seconds_until_next_run(datetime.now(timezone.utc)))
 
             except Exception as e:
                 logger.error(f"Error in collection loop: {e}")
@@ -0,0 +1,94 @@
+"""
+OHLCV収集の高水位マーク（HWM）管理
+(取引所, シンボル, 時間枠) ごとに保存済みの最新確定足の時刻を永続化し、
+次回の収集ではそれより新しい足だけを取得する
+"""
+
+import json
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Optional
+
+from src.backend.utils.timeframes import timeframe_to_seconds
+
+logger = logging.getLogger(__name__)
+
+
+def last_closed_bar_open(timeframe: str, now: datetime) -> datetime:
+    """now 時点で確定済みの最新足の開始時刻"""
+    seconds = timeframe_to_seconds(timeframe)
+    current_open = int(now.timestamp()) // seconds * seconds
+    return datetime.fromtimestamp(current_open - seconds, tz=timezone.utc)
+
+
+def next_bar_close(timeframe: str, now: datetime) -> datetime:
+    """now より後で最初に足が確定する時刻"""
+    seconds = timeframe_to_seconds(timeframe)
+    return datetime.fromtimestamp((int(now.timestamp()) // seconds + 1) * seconds, tz=timezone.utc)
+
+
+class HighWaterMarkIndex:
+    """高水位マークのインデックス（JSONファイルに永続化）"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._marks: Dict[str, datetime] = {}
+        self._dirty = False
+        self.load()
+
+    @staticmethod
+    def _key(exchange: str, symbol: str, timeframe: str) -> str:
+        return f"{exchange}|{symbol}|{timeframe}"
+
+    def load(self):
+        """ファイルから読み込み（存在しない・壊れている場合は空から始める）"""
+        if not self.path.exists():
+            return
+
+        try:
+            raw = json.loads(self.path.read_text())
+            self._marks = {key: datetime.fromisoformat(value) for key, value in raw.items()}
+        except Exception as e:
+            logger.error(f"Error loading high-water marks from {self.path}: {e}")
+            self._marks = {}
+
+    def save(self):
+        """変更があればファイルに保存（一時ファイル経由で置き換え）"""
+        if not self._dirty:
+            return
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp_path.write_text(json.dumps({key: value.isoformat() for key, value in sorted(self._marks.items())}))
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+
+    def get(self, exchange: str, symbol: str, timeframe: str) -> Optional[datetime]:
+        """保存済みの最新確定足の開始時刻"""
+        return self._marks.get(self._key(exchange, symbol, timeframe))
+
+    def update(self, exchange: str, symbol: str, timeframe: str, timestamp: datetime) -> bool:
+        """高水位マークを進める（後退はしない）"""
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=timezone.utc)
+
+        key = self._key(exchange, symbol, timeframe)
+        current = self._marks.get(key)
+        if current is not None and timestamp <= current:
+            return False
+
+        self._marks[key] = timestamp
+        self._dirty = True
+        return True
+
+    def next_since(self, exchange: str, symbol: str, timeframe: str) -> Optional[datetime]:
+        """次に取得すべき足の開始時刻（未記録なら None）"""
+        mark = self.get(exchange, symbol, timeframe)
+        if mark is None:
+            return None
+        return mark + timedelta(seconds=timeframe_to_seconds(timeframe))
+
+    def __len__(self) -> int:
+        return len(self._marks)
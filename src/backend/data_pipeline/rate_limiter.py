@@ -0,0 +1,101 @@
+"""
+取引所APIのレート予算管理
+取引所ごとのトークンバケットで、並列に発行するREST呼び出しの総量を制限する
+"""
+
+import asyncio
+import time
+from typing import Dict, Optional, Tuple
+
+# 取引所ごとの (1秒あたりの補充数, バケット容量)
+# 各取引所の公開REST上限より十分低く取り、取引処理側の呼び出しに余裕を残す
+DEFAULT_RATE_LIMITS: Dict[str, Tuple[float, float]] = {
+    "binance": (10.0, 20.0),
+    "bybit": (8.0, 16.0),
+    "bitget": (8.0, 16.0),
+    "hyperliquid": (5.0, 10.0),
+    "backpack": (5.0, 10.0),
+}
+FALLBACK_RATE_LIMIT: Tuple[float, float] = (5.0, 10.0)
+
+
+class TokenBucket:
+    """非同期トークンバケット
+
+    rate 個/秒でトークンを補充し、最大 capacity 個まで貯める。
+    acquire() はトークンが足りるまで待機し、待機中の呼び出しは到着順に処理される。
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self.stats = {"acquired": 0, "waits": 0, "wait_time": 0.0}
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def _get_lock(self) -> asyncio.Lock:
+        # 共有バケットは複数のイベントループから使われ得るため、ループごとにロックを作り直す
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._loop is not loop:
+            self._lock = asyncio.Lock()
+            self._loop = loop
+        return self._lock
+
+    @property
+    def available(self) -> float:
+        """現在使用可能なトークン数"""
+        self._refill()
+        return self._tokens
+
+    async def acquire(self, tokens: float = 1.0) -> float:
+        """トークンを取得（不足時は補充されるまで待機）
+
+        Returns:
+            float: 待機した秒数
+        """
+        if tokens > self.capacity:
+            raise ValueError("tokens exceeds bucket capacity")
+
+        waited = 0.0
+        async with self._get_lock():
+            self._refill()
+            while self._tokens < tokens:
+                delay = (tokens - self._tokens) / self.rate
+                await asyncio.sleep(delay)
+                waited += delay
+                self._refill()
+            self._tokens -= tokens
+
+        self.stats["acquired"] += 1
+        if waited > 0:
+            self.stats["waits"] += 1
+            self.stats["wait_time"] += waited
+        return waited
+
+    def get_stats(self) -> Dict[str, float]:
+        """統計情報を取得"""
+        return {**self.stats, "rate": self.rate, "capacity": self.capacity, "available": self.available}
+
+
+# 取引所ごとの共有バケット（同じ取引所の複数コレクターで予算を共有する）
+_rate_limiters: Dict[str, TokenBucket] = {}
+
+
+def get_rate_limiter(exchange_name: str, rate: float = None, capacity: float = None) -> TokenBucket:
+    """取引所のトークンバケットを取得（初回呼び出し時に作成）"""
+    limiter = _rate_limiters.get(exchange_name)
+    if limiter is None:
+        default_rate, default_capacity = DEFAULT_RATE_LIMITS.get(exchange_name, FALLBACK_RATE_LIMIT)
+        limiter = TokenBucket(rate or default_rate, capacity or default_capacity)
+        _rate_limiters[exchange_name] = limiter
+    return limiter
@@ -0,0 +1,259 @@
+"""
+1分足からの上位時間枠リサンプリング
+保存済みの1分足から任意の時間枠（15m, 2h, 3d, 1w, 1M など）を取引所と同じ区切りで集約し、
+新しい1分足が届くたびに影響する足だけを再計算してキャッシュを更新する
+"""
+
+import logging
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from src.backend.exchanges.base import OHLCV
+from src.backend.utils.timeframes import timeframe_to_seconds
+
+logger = logging.getLogger(__name__)
+
+OHLCV_COLUMNS = ["open", "high", "low", "close", "volume"]
+OHLCV_AGGREGATION = {"open": "first", "high": "max", "low": "min", "close": "last", "volume": "sum"}
+
+_WEEK_NS = 7 * 86400 * 10**9
+# 取引所の週足は月曜 00:00 UTC 始まり（UNIX エポックの 1970-01-01 は木曜）
+_WEEK_OFFSET_NS = 4 * 86400 * 10**9
+
+
+def _parse_timeframe(timeframe: str) -> Tuple[int, str]:
+    """時間枠文字列を (数量, 単位) に分解（"1w", "1M" も受け付ける）"""
+    amount, unit = timeframe[:-1], timeframe[-1:]
+    if unit in ("w", "M"):
+        if not amount.isdigit() or int(amount) <= 0:
+            raise ValueError(f"Unsupported timeframe: {timeframe}")
+        return int(amount), unit
+
+    timeframe_to_seconds(timeframe)
+    return int(amount), unit
+
+
+def bucket_starts(timestamps: pd.DatetimeIndex, timeframe: str) -> pd.DatetimeIndex:
+    """各時刻が属する足の開始時刻（取引所の区切りに合わせる）
+
+    - 秒・分・時間・日: UNIX エポックからの倍数（3d 足も取引所と同じくエポック基準）
+    - 週: 月曜 00:00 UTC 基準
+    - 月: 暦月の初日
+    """
+    amount, unit = _parse_timeframe(timeframe)
+    timestamps = pd.DatetimeIndex(timestamps)
+    if timestamps.tz is None:
+        timestamps = timestamps.tz_localize("UTC")
+    values = timestamps.tz_convert("UTC").as_unit("ns").asi8
+
+    if unit == "M":
+        months = (timestamps.year - 1970) * 12 + (timestamps.month - 1)
+        months = np.asarray(months) // amount * amount
+        starts = pd.to_datetime({"year": 1970 + months // 12, "month": months % 12 + 1, "day": 1}, utc=True)
+        return pd.DatetimeIndex(starts).as_unit(timestamps.unit)
+
+    if unit == "w":
+        period = amount * _WEEK_NS
+        starts = (values - _WEEK_OFFSET_NS) // period * period + _WEEK_OFFSET_NS
+    else:
+        period = timeframe_to_seconds(timeframe) * 10**9
+        starts = values // period * period
+    return pd.DatetimeIndex(pd.to_datetime(starts, utc=True)).as_unit(timestamps.unit)
+
+
+def bucket_end(start: pd.Timestamp, timeframe: str) -> pd.Timestamp:
+    """足の終了時刻（次の足の開始時刻）"""
+    amount, unit = _parse_timeframe(timeframe)
+    if unit == "M":
+        return start + pd.DateOffset(months=amount)
+    if unit == "w":
+        return start + pd.Timedelta(weeks=amount)
+    return start + pd.Timedelta(seconds=timeframe_to_seconds(timeframe))
+
+
+def resample_ohlcv(df: pd.DataFrame, timeframe: str) -> pd.DataFrame:
+    """OHLCV DataFrame（時刻インデックス）を上位時間枠に集約"""
+    if df.empty:
+        return pd.DataFrame(columns=OHLCV_COLUMNS, index=pd.DatetimeIndex([], tz="UTC", name="timestamp"))
+
+    grouped = df[OHLCV_COLUMNS].groupby(bucket_starts(df.index, timeframe), sort=True).agg(OHLCV_AGGREGATION)
+    grouped.index.name = "timestamp"
+    return grouped
+
+
+def _to_frame(bars: Union[pd.DataFrame, Iterable[OHLCV]]) -> pd.DataFrame:
+    """OHLCVリスト・DataFrameを時刻インデックスのDataFrameに変換"""
+    if isinstance(bars, pd.DataFrame):
+        df = bars.copy()
+        if "timestamp" in df.columns:
+            df = df.set_index("timestamp")
+    else:
+        bars = list(bars)
+        df = pd.DataFrame(
+            {column: [float(getattr(bar, column)) for bar in bars] for column in OHLCV_COLUMNS},
+            index=[bar.timestamp for bar in bars],
+        )
+
+    index = pd.DatetimeIndex(pd.to_datetime(df.index))
+    df.index = (index.tz_localize("UTC") if index.tz is None else index.tz_convert("UTC")).rename("timestamp")
+    return df[OHLCV_COLUMNS].astype(float)
+
+
+class OHLCVResampler:
+    """1分足からの上位時間枠リサンプラー
+
+    シンボルごとに基本足（1分足）を保持し、要求された時間枠の集約結果をキャッシュする。
+    新しい基本足を追加すると、キャッシュ済みの時間枠は変更のあった足以降だけを再集約する。
+    """
+
+    def __init__(self, base_timeframe: str = "1m", max_base_bars: int = 50_000, max_cached_bars: int = 5_000):
+        self.base_timeframe = base_timeframe
+        self.base_delta = pd.Timedelta(seconds=timeframe_to_seconds(base_timeframe))
+        self.max_base_bars = max_base_bars
+        self.max_cached_bars = max_cached_bars
+
+        self._base: Dict[str, pd.DataFrame] = {}
+        # 基本足が揃っている最初の時刻（これより前に始まる上位足は不完全）
+        self._coverage_start: Dict[str, pd.Timestamp] = {}
+        self._cache: Dict[Tuple[str, str], pd.DataFrame] = {}
+
+        self.stats = {"base_bars_added": 0, "cache_hits": 0, "cache_misses": 0, "incremental_updates": 0}
+
+    def _validate_timeframe(self, timeframe: str):
+        amount, unit = _parse_timeframe(timeframe)
+        if unit not in ("w", "M") and timeframe_to_seconds(timeframe) % self.base_delta.total_seconds() != 0:
+            raise ValueError(f"Timeframe {timeframe} is not a multiple of {self.base_timeframe}")
+
+    def symbols(self) -> List[str]:
+        """基本足を保持しているシンボル"""
+        return list(self._base)
+
+    def has_base_bars(self, symbol: str) -> bool:
+        return symbol in self._base and not self._base[symbol].empty
+
+    def add_base_bars(self, symbol: str, bars: Union[pd.DataFrame, Iterable[OHLCV]]) -> int:
+        """基本足を追加し、キャッシュ済みの上位時間枠を差分更新
+
+        Returns:
+            int: 追加（更新）した基本足の本数
+        """
+        new = _to_frame(bars)
+        if new.empty:
+            return 0
+
+        existing = self._base.get(symbol)
+        if existing is None or existing.empty:
+            base = new[~new.index.duplicated(keep="last")].sort_index()
+        elif new.index[0] > existing.index[-1] and new.index.is_monotonic_increasing:
+            # 通常は末尾への追記のみ
+            base = pd.concat([existing, new[~new.index.duplicated(keep="last")]])
+        else:
+            # 保持期間より古い足は反映しない
+            new = new[new.index >= existing.index[0]]
+            if new.empty:
+                return 0
+            base = pd.concat([existing, new])
+            base = base[~base.index.duplicated(keep="last")].sort_index()
+
+        if len(base) > self.max_base_bars:
+            base = base.iloc[-self.max_base_bars :]
+        self._base[symbol] = base
+
+        coverage = self._coverage_start.get(symbol)
+        if coverage is None or new.index.min() < coverage:
+            coverage = new.index.min()
+        # 保持期間から外れた足の分だけ、基本足が揃っている範囲も後ろにずらす
+        self._coverage_start[symbol] = max(coverage, base.index[0])
+
+        changed_from = new.index.min()
+        for (cached_symbol, timeframe), cached in list(self._cache.items()):
+            if cached_symbol == symbol:
+                self._cache[(symbol, timeframe)] = self._update_cached(base, cached, timeframe, changed_from)
+                self.stats["incremental_updates"] += 1
+
+        self.stats["base_bars_added"] += len(new)
+        return len(new)
+
+    def _update_cached(
+        self, base: pd.DataFrame, cached: pd.DataFrame, timeframe: str, changed_from: pd.Timestamp
+    ) -> pd.DataFrame:
+        """変更のあった足以降だけを再集約してキャッシュに反映"""
+        start = bucket_starts(pd.DatetimeIndex([changed_from]), timeframe)[0]
+        tail = resample_ohlcv(base.loc[start:], timeframe)
+        updated = pd.concat([cached[cached.index < start], tail])
+        if len(updated) > self.max_cached_bars:
+            updated = updated.iloc[-self.max_cached_bars :]
+        return updated
+
+    def _materialize(self, symbol: str, timeframe: str) -> pd.DataFrame:
+        key = (symbol, timeframe)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self.stats["cache_hits"] += 1
+            return cached
+
+        self._validate_timeframe(timeframe)
+        self.stats["cache_misses"] += 1
+        base = self._base.get(symbol)
+        if base is None:
+            return resample_ohlcv(pd.DataFrame(columns=OHLCV_COLUMNS), timeframe)
+
+        cached = resample_ohlcv(base, timeframe).iloc[-self.max_cached_bars :]
+        self._cache[key] = cached
+        return cached
+
+    def resample(
+        self,
+        symbol: str,
+        timeframe: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        include_partial: bool = False,
+    ) -> pd.DataFrame:
+        """上位時間枠の足を取得（時刻インデックスの DataFrame）
+
+        Args:
+            include_partial: 形成中の足・基本足が揃っていない足も含めるか
+        """
+        frame = self._materialize(symbol, timeframe)
+        if frame.empty:
+            return frame
+
+        if not include_partial:
+            base = self._base[symbol]
+            last_base_end = base.index[-1] + self.base_delta
+            if bucket_end(frame.index[-1], timeframe) > last_base_end:
+                frame = frame.iloc[:-1]
+            frame = frame[frame.index >= self._coverage_start[symbol]]
+
+        if start is not None:
+            frame = frame[frame.index >= pd.Timestamp(start)]
+        if end is not None:
+            frame = frame[frame.index <= pd.Timestamp(end)]
+        return frame
+
+    def to_ohlcv(self, symbol: str, timeframe: str, **kwargs) -> List[OHLCV]:
+        """上位時間枠の足を OHLCV のリストで取得"""
+        frame = self.resample(symbol, timeframe, **kwargs)
+        return [
+            OHLCV(timestamp.to_pydatetime().astimezone(timezone.utc), *map(float, values))
+            for timestamp, values in zip(frame.index, frame[OHLCV_COLUMNS].to_numpy())
+        ]
+
+    def invalidate(self, symbol: Optional[str] = None):
+        """キャッシュを破棄（symbol 指定時はそのシンボルのみ）"""
+        for key in list(self._cache):
+            if symbol is None or key[0] == symbol:
+                del self._cache[key]
+
+    def get_stats(self) -> Dict[str, int]:
+        """統計情報を取得"""
+        return {
+            **self.stats,
+            "symbols": len(self._base),
+            "cached_timeframes": len(self._cache),
+            "base_bars": sum(len(base) for base in self._base.values()),
+        }
@@ -5,9 +5,10 @@ SQLAlchemy ORM models for orders and trades
 
 import uuid
 import uuid as uuid_module
+from contextlib import asynccontextmanager, contextmanager
 from datetime import datetime, timezone
 from decimal import Decimal
-from typing import Dict, Optional
+from typing import AsyncIterator, Dict, Iterator, Optional
 
 from sqlalchemy import (
     JSON,
@@ -22,6 +23,7 @@ from sqlalchemy import (
     String,
     Text,
     TypeDecorator,
+    UniqueConstraint,
 )
 from sqlalchemy.dialects.postgresql import UUID as PostgresUUID
 from sqlalchemy.types import CHAR
@@ -69,6 +71,15 @@ from sqlalchemy.sql import func
 Base = declarative_base()
 
 
+def _utcnow() -> datetime:
+    """キーセットページングのソートキーになる列の既定値
+
+    SQLiteの CURRENT_TIMESTAMP は秒精度の別書式で保存され、カーソルとの比較がずれるため
+    アプリケーション側でマイクロ秒まで採番する。
+    """
+    return datetime.now(timezone.utc)
+
+
 class OrderModel(Base):
     """注文テーブルのSQLAlchemyモデル"""
 
@@ -125,11 +136,11 @@ class OrderModel(Base):
     client_order_id = Column(String(100))
 
     # タイムスタンプ
-    created_at = Column(DateTime(timezone=True), nullable=False, default=func.now())
+    created_at = Column(DateTime(timezone=True), nullable=False, default=_utcnow)
     submitted_at = Column(DateTime(timezone=True))
     filled_at = Column(DateTime(timezone=True))
     cancelled_at = Column(DateTime(timezone=True))
-    updated_at = Column(DateTime(timezone=True), nullable=False, default=func.now(), onupdate=func.now())
+    updated_at = Column(DateTime(timezone=True), nullable=False, default=_utcnow, onupdate=_utcnow)
 
     # エラー・手数料情報
     error_message = Column(Text)
@@ -159,6 +170,9 @@ class OrderModel(Base):
         Index("idx_orders_exchange_order_id", "exchange_order_id"),
         Index("idx_orders_paper_trading", "paper_trading"),
         Index("idx_orders_user_strategy_created", "user_id", "strategy_id", "created_at"),
+        # キーセットページング用（(created_at, id) 降順の範囲走査）
+        Index("idx_orders_user_created_id", "user_id", "created_at", "id"),
+        Index("idx_orders_user_status_created_id", "user_id", "status", "created_at", "id"),
     )
 
     @validates("quantity", "price")
@@ -284,7 +298,7 @@ class TradeModel(Base):
     exchange_order_id = Column(String(100))
 
     # タイムスタンプ
-    executed_at = Column(DateTime(timezone=True), nullable=False, default=func.now())
+    executed_at = Column(DateTime(timezone=True), nullable=False, default=_utcnow)
     created_at = Column(DateTime(timezone=True), nullable=False, default=func.now())
 
     # メタデータ
@@ -312,6 +326,10 @@ class TradeModel(Base):
         Index("idx_trades_paper_trading", "paper_trading"),
         Index("idx_trades_user_symbol_executed", "user_id", "symbol", "executed_at"),
         Index("idx_portfolio_lookup", "user_id", "exchange", "symbol", "paper_trading"),
+        # キーセットページング用（(executed_at, id) 降順の範囲走査）
+        Index("idx_trades_user_executed_id", "user_id", "executed_at", "id"),
+        Index("idx_trades_user_strategy_executed_id", "user_id", "strategy_id", "executed_at", "id"),
+        Index("idx_trades_user_symbol_executed_id", "user_id", "symbol", "executed_at", "id"),
     )
 
     @validates("quantity", "price")
@@ -370,7 +388,7 @@ class TradeModel(Base):
         return f"<TradeModel(id={self.id}, symbol={self.symbol}, side={self.side}, quantity={self.quantity}, price={self.price})>"
 
 
-# データベース統計用のマテリアライズドビュー（オプション）
+# データベース統計用の日次ロールアップ（trading_statistics.py が約定ごとに加算する）
 class TradingStatistics(Base):
     """取引統計テーブル（日次集計）"""
 
@@ -378,10 +396,11 @@ class TradingStatistics(Base):
 
     id = Column(UUID(), primary_key=True, default=uuid.uuid4)
     user_id = Column(UUID(), nullable=False)
-    strategy_id = Column(String(100))
+    # 一意キーの一部のため戦略なしは NULL ではなく空文字で持つ（NULL同士は一意制約で区別されない）
+    strategy_id = Column(String(100), nullable=False, default="")
     exchange = Column(String(50), nullable=False)
     symbol = Column(String(50), nullable=False)
-    paper_trading = Column(Boolean, default=False)
+    paper_trading = Column(Boolean, nullable=False, default=False)
     trade_date = Column(DateTime(timezone=True), nullable=False)
 
     # 集計データ
@@ -393,11 +412,22 @@ class TradingStatistics(Base):
     max_price = Column(Numeric(20, 8))
     buy_count = Column(Numeric(10, 0), default=0)
     sell_count = Column(Numeric(10, 0), default=0)
+    price_sum = Column(Numeric(28, 8))  # 平均価格を誤差なく加算更新するための価格合計
+    daily_pnl = Column(Numeric(20, 8), default=0)
 
     created_at = Column(DateTime(timezone=True), nullable=False, default=func.now())
     updated_at = Column(DateTime(timezone=True), nullable=False, default=func.now(), onupdate=func.now())
 
     __table_args__ = (
+        UniqueConstraint(
+            "user_id",
+            "strategy_id",
+            "exchange",
+            "symbol",
+            "paper_trading",
+            "trade_date",
+            name="uq_statistics_key",
+        ),
         Index("idx_statistics_user_date", "user_id", "trade_date"),
         Index("idx_statistics_strategy_date", "strategy_id", "trade_date"),
         Index("idx_statistics_symbol_date", "symbol", "trade_date"),
@@ -408,7 +438,7 @@ class TradingStatistics(Base):
         return {
             "id": str(self.id),
             "user_id": str(self.user_id),
-            "strategy_id": self.strategy_id,
+            "strategy_id": self.strategy_id or None,
             "exchange": self.exchange,
             "symbol": self.symbol,
             "paper_trading": self.paper_trading,
@@ -421,6 +451,7 @@ class TradingStatistics(Base):
             "max_price": float(self.max_price) if self.max_price else None,
             "buy_count": int(self.buy_count) if self.buy_count else 0,
             "sell_count": int(self.sell_count) if self.sell_count else 0,
+            "daily_pnl": float(self.daily_pnl) if self.daily_pnl else 0,
         }
 
 
@@ -611,42 +642,92 @@ class PaperWalletDefaultModel(Base):
 
 
 # データベース接続・セッション管理用のユーティリティクラス
+def to_async_database_url(database_url: str) -> str:
+    """同期ドライバのURLを非同期ドライバ（aiosqlite / asyncpg）のURLに変換"""
+    scheme, separator, rest = database_url.partition("://")
+    dialect = scheme.split("+", 1)[0]
+
+    if dialect == "sqlite":
+        return f"sqlite+aiosqlite{separator}{rest}"
+    if dialect in ("postgresql", "postgres"):
+        return f"postgresql+asyncpg{separator}{rest}"
+    return database_url
+
+
+def _set_sqlite_pragma(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    # WALモードで同時読み書きを改善
+    cursor.execute("PRAGMA journal_mode=WAL")
+    # 書き込み同期を改善
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    # ビジー時のタイムアウト設定
+    cursor.execute("PRAGMA busy_timeout=30000")
+    cursor.close()
+
+
 class DatabaseManager:
-    """データベース管理クラス"""
+    """データベース管理クラス
+
+    同期エンジンは常に作成し、非同期エンジン（aiosqlite / asyncpg）は
+    初回利用時に作成する。session_scope / async_session_scope は
+    1つの作業単位（unit of work）ごとにコミット・ロールバック・クローズを行う。
+    """
 
-    def __init__(self, database_url: str):
+    def __init__(
+        self,
+        database_url: str,
+        pool_size: int = 10,
+        max_overflow: int = 20,
+        pool_timeout: float = 30.0,
+        pool_recycle: int = 1800,
+        pool_pre_ping: bool = True,
+    ):
+        """
+        Args:
+            database_url: 同期ドライバのデータベースURL
+            pool_size: 常時保持する接続数（SQLite以外）
+            max_overflow: pool_size を超えて一時的に開ける接続数（SQLite以外）
+            pool_timeout: 接続待ちのタイムアウト秒数（SQLite以外）
+            pool_recycle: この秒数を超えた接続は作り直す（SQLite以外）
+            pool_pre_ping: 接続の貸し出し前に疎通確認を行う
+        """
         from sqlalchemy import create_engine, event
         from sqlalchemy.orm import sessionmaker
 
-        # SQLiteの同時実行制御を改善する設定
-        engine_kwargs = {"echo": False}
+        self.database_url = database_url
+        self.is_sqlite = "sqlite" in database_url
+        self.pool_options = {
+            "pool_size": pool_size,
+            "max_overflow": max_overflow,
+            "pool_timeout": pool_timeout,
+            "pool_recycle": pool_recycle,
+        }
+        self.pool_pre_ping = pool_pre_ping
 
-        if "sqlite" in database_url:
-            # SQLiteの場合、基本的な接続設定のみ
-            engine_kwargs.update(
-                {
-                    "connect_args": {"timeout": 20, "check_same_thread": False},
-                }
-            )
+        engine_kwargs = self._engine_kwargs()
+        if self.is_sqlite:
+            # SQLiteの同時実行制御を改善する設定
+            engine_kwargs["connect_args"] = {"timeout": 20, "check_same_thread": False}
 
         self.engine = create_engine(database_url, **engine_kwargs)
 
         # SQLiteの場合、WALモードを有効化
-        if "sqlite" in database_url:
-
-            @event.listens_for(self.engine, "connect")
-            def set_sqlite_pragma(dbapi_connection, connection_record):
-                cursor = dbapi_connection.cursor()
-                # WALモードで同時読み書きを改善
-                cursor.execute("PRAGMA journal_mode=WAL")
-                # 書き込み同期を改善
-                cursor.execute("PRAGMA synchronous=NORMAL")
-                # ビジー時のタイムアウト設定
-                cursor.execute("PRAGMA busy_timeout=30000")
-                cursor.close()
+        if self.is_sqlite:
+            event.listen(self.engine, "connect", _set_sqlite_pragma)
 
         self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
 
+        self.async_engine = None
+        self.AsyncSessionLocal = None
+
+    def _engine_kwargs(self) -> Dict:
+        """同期・非同期エンジン共通の設定"""
+        engine_kwargs = {"echo": False, "pool_pre_ping": self.pool_pre_ping}
+        if not self.is_sqlite:
+            # SQLiteはファイル単位のロックのためプールサイズ調整は行わない
+            engine_kwargs.update(self.pool_options)
+        return engine_kwargs
+
     def create_tables(self):
         """テーブルを作成"""
         Base.metadata.create_all(bind=self.engine)
@@ -662,3 +743,66 @@ class DatabaseManager:
     def get_engine(self):
         """エンジンを取得"""
         return self.engine
+
+    @contextmanager
+    def session_scope(self) -> Iterator:
+        """作業単位ごとのセッション（正常終了でコミット、例外でロールバック）"""
+        session = self.SessionLocal()
+        try:
+            yield session
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def get_async_engine(self):
+        """非同期エンジンを取得（初回呼び出し時に作成）"""
+        if self.async_engine is None:
+            from sqlalchemy import event
+            from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+            engine_kwargs = self._engine_kwargs()
+            if self.is_sqlite:
+                engine_kwargs["connect_args"] = {"timeout": 20}
+
+            self.async_engine = create_async_engine(to_async_database_url(self.database_url), **engine_kwargs)
+            if self.is_sqlite:
+                event.listen(self.async_engine.sync_engine, "connect", _set_sqlite_pragma)
+
+            self.AsyncSessionLocal = async_sessionmaker(self.async_engine, autoflush=False, expire_on_commit=False)
+
+        return self.async_engine
+
+    def get_async_session(self):
+        """非同期セッションを取得"""
+        self.get_async_engine()
+        return self.AsyncSessionLocal()
+
+    @asynccontextmanager
+    async def async_session_scope(self) -> AsyncIterator:
+        """作業単位ごとの非同期セッション（正常終了でコミット、例外でロールバック）"""
+        session = self.get_async_session()
+        try:
+            yield session
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+        finally:
+            await session.close()
+
+    async def create_tables_async(self):
+        """テーブルを作成（非同期エンジン経由）"""
+        async with self.get_async_engine().begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+
+    def dispose(self):
+        """同期エンジンの接続プールを解放"""
+        self.engine.dispose()
+
+    async def dispose_async(self):
+        """非同期エンジンの接続プールを解放"""
+        if self.async_engine is not None:
+            await self.async_engine.dispose()
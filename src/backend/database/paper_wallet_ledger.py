@@ -0,0 +1,452 @@
+"""
+Paper Trading用インメモリ残高台帳
+残高をメモリ上で確定させ、追記専用ジャーナルをまとめてDBに書き戻す（write-behind）
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import and_
+from sqlalchemy.exc import SQLAlchemyError
+
+from .models import DatabaseManager, PaperWalletModel, PaperWalletTransactionModel
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class AssetBalance:
+    """資産ごとの残高"""
+
+    balance: Decimal = Decimal("0")
+    locked: Decimal = Decimal("0")
+
+    @property
+    def available(self) -> Decimal:
+        return self.balance - self.locked
+
+    def to_dict(self) -> Dict[str, float]:
+        return {"total": float(self.balance), "locked": float(self.locked), "available": float(self.available)}
+
+
+@dataclass
+class BalanceChange:
+    """台帳に適用する1件の変更
+
+    target が "balance" なら残高、"locked" ならロック残高を amount だけ増減する
+    """
+
+    asset: str
+    amount: Decimal
+    transaction_type: str
+    target: str = "balance"
+    related_order_id: Optional[str] = None
+    description: Optional[str] = None
+
+
+@dataclass
+class JournalEntry:
+    """ジャーナルの1行（適用後のウォレット状態を持つので再生は冪等）"""
+
+    user_id: UUID
+    asset: str
+    transaction_type: str
+    amount: Decimal
+    balance_before: Decimal
+    balance_after: Decimal
+    wallet_balance: Decimal
+    wallet_locked: Decimal
+    related_order_id: Optional[str] = None
+    description: Optional[str] = None
+    created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    id: str = field(default_factory=lambda: str(uuid.uuid4()))
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {
+                "id": self.id,
+                "user_id": str(self.user_id),
+                "asset": self.asset,
+                "transaction_type": self.transaction_type,
+                "amount": str(self.amount),
+                "balance_before": str(self.balance_before),
+                "balance_after": str(self.balance_after),
+                "wallet_balance": str(self.wallet_balance),
+                "wallet_locked": str(self.wallet_locked),
+                "related_order_id": self.related_order_id,
+                "description": self.description,
+                "created_at": self.created_at.isoformat(),
+            }
+        )
+
+    @classmethod
+    def from_json(cls, line: str) -> "JournalEntry":
+        data = json.loads(line)
+        return cls(
+            id=data["id"],
+            user_id=UUID(data["user_id"]),
+            asset=data["asset"],
+            transaction_type=data["transaction_type"],
+            amount=Decimal(data["amount"]),
+            balance_before=Decimal(data["balance_before"]),
+            balance_after=Decimal(data["balance_after"]),
+            wallet_balance=Decimal(data["wallet_balance"]),
+            wallet_locked=Decimal(data["wallet_locked"]),
+            related_order_id=data.get("related_order_id"),
+            description=data.get("description"),
+            created_at=datetime.fromisoformat(data["created_at"]),
+        )
+
+
+class PaperWalletLedger:
+    """ユーザー単位で直列化されたインメモリ残高台帳
+
+    - 残高照会・取引決済はメモリ上で完結する（DBには触れない）
+    - 変更は追記専用ジャーナルに積まれ、flush() で1トランザクションにまとめてDBへ反映する
+    - journal_path を指定するとジャーナルをファイルにも追記し、起動時に未反映分を再生する
+    - start_background_flush() でバックグラウンドの書き戻しタスクを開始すると、書き戻しは
+      ワーカースレッドで行われ、apply() の呼び出し元（イベントループ）でDBコミットが走らない
+    """
+
+    def __init__(
+        self,
+        db_manager: DatabaseManager,
+        journal_path: Optional[str] = None,
+        flush_batch_size: int = 500,
+        flush_interval: float = 1.0,
+    ):
+        self.db_manager = db_manager
+        self.journal_path = journal_path
+        self.flush_batch_size = flush_batch_size
+        self.flush_interval = flush_interval
+
+        self._balances: Dict[UUID, Dict[str, AssetBalance]] = {}
+        self._user_locks: Dict[UUID, threading.RLock] = {}
+        self._user_locks_lock = threading.Lock()
+
+        self._pending: List[JournalEntry] = []
+        self._journal_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+        # バックグラウンド書き戻し
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_wakeup: Optional[asyncio.Event] = None
+        self._flush_loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self.stats = {"applied": 0, "rejected": 0, "flushes": 0, "flushed_entries": 0, "recovered_entries": 0}
+
+        if self.journal_path:
+            self.recover()
+
+    def _user_lock(self, user_id: UUID) -> threading.RLock:
+        with self._user_locks_lock:
+            lock = self._user_locks.get(user_id)
+            if lock is None:
+                lock = self._user_locks[user_id] = threading.RLock()
+            return lock
+
+    def _load_user(self, user_id: UUID) -> Dict[str, AssetBalance]:
+        """ユーザーの残高をDBから読み込む（初回のみ）"""
+        balances = self._balances.get(user_id)
+        if balances is not None:
+            return balances
+
+        session = self.db_manager.get_session()
+        try:
+            wallets = session.query(PaperWalletModel).filter(PaperWalletModel.user_id == user_id).all()
+            balances = {
+                wallet.asset: AssetBalance(Decimal(wallet.balance), Decimal(wallet.locked_balance))
+                for wallet in wallets
+            }
+        finally:
+            session.close()
+
+        self._balances[user_id] = balances
+        return balances
+
+    def get_balances(self, user_id: UUID) -> Dict[str, AssetBalance]:
+        """ユーザーの全残高（コピー）"""
+        with self._user_lock(user_id):
+            return {
+                asset: AssetBalance(balance.balance, balance.locked)
+                for asset, balance in self._load_user(user_id).items()
+            }
+
+    def get_balance(self, user_id: UUID, asset: str) -> Optional[AssetBalance]:
+        """特定資産の残高（ウォレットがなければNone）"""
+        with self._user_lock(user_id):
+            balance = self._load_user(user_id).get(asset)
+            return AssetBalance(balance.balance, balance.locked) if balance else None
+
+    def apply(self, user_id: UUID, changes: List[BalanceChange], create_missing: bool = True) -> bool:
+        """変更をまとめてアトミックに適用（1件でも不正なら何も適用しない）
+
+        Args:
+            create_missing: ウォレットがない資産への変更で新規作成するか
+        """
+        with self._user_lock(user_id):
+            balances = self._load_user(user_id)
+            working: Dict[str, AssetBalance] = {}
+            entries: List[JournalEntry] = []
+
+            for change in changes:
+                if change.amount == 0:
+                    continue
+
+                current = working.get(change.asset) or balances.get(change.asset)
+                if current is None:
+                    if not create_missing:
+                        logger.warning(f"Wallet not found: user={user_id}, asset={change.asset}")
+                        self.stats["rejected"] += 1
+                        return False
+                    current = AssetBalance()
+
+                updated = AssetBalance(current.balance, current.locked)
+                if change.target == "locked":
+                    before, updated.locked = current.locked, current.locked + change.amount
+                    after = updated.locked
+                else:
+                    before, updated.balance = current.balance, current.balance + change.amount
+                    after = updated.balance
+
+                # DBの制約（残高・ロック残高は非負、ロック残高は残高以下）と同じ条件で検証
+                if updated.balance < 0 or updated.locked < 0 or updated.locked > updated.balance:
+                    logger.warning(
+                        f"Insufficient balance: user={user_id}, asset={change.asset}, "
+                        f"balance={current.balance}, locked={current.locked}, "
+                        f"requested={change.amount} ({change.target})"
+                    )
+                    self.stats["rejected"] += 1
+                    return False
+
+                working[change.asset] = updated
+                entries.append(
+                    JournalEntry(
+                        user_id=user_id,
+                        asset=change.asset,
+                        transaction_type=change.transaction_type,
+                        amount=change.amount,
+                        balance_before=before,
+                        balance_after=after,
+                        wallet_balance=updated.balance,
+                        wallet_locked=updated.locked,
+                        related_order_id=change.related_order_id,
+                        description=change.description,
+                    )
+                )
+
+            balances.update(working)
+            self._append(entries)
+            self.stats["applied"] += len(entries)
+
+        self._maybe_flush()
+        return True
+
+    def evict(self, user_id: UUID):
+        """ユーザーのキャッシュを破棄（DBを直接更新した後に使用）"""
+        with self._user_lock(user_id):
+            self._balances.pop(user_id, None)
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    def _append(self, entries: List[JournalEntry]):
+        if not entries:
+            return
+
+        with self._journal_lock:
+            self._pending.extend(entries)
+            if self.journal_path:
+                with open(self.journal_path, "a", encoding="utf-8") as journal:
+                    journal.write("".join(entry.to_json() + "\n" for entry in entries))
+                    journal.flush()
+
+    def _maybe_flush(self):
+        if self.background_flush_running:
+            # 書き戻しはバックグラウンドタスクに任せ、件数がたまったら起こすだけ
+            if len(self._pending) >= self.flush_batch_size:
+                self._flush_loop.call_soon_threadsafe(self._flush_wakeup.set)
+            return
+
+        if len(self._pending) >= self.flush_batch_size or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    @property
+    def background_flush_running(self) -> bool:
+        return self._flush_task is not None and not self._flush_task.done()
+
+    def start_background_flush(self) -> asyncio.Task:
+        """flush_interval ごと（または flush_batch_size 件たまるごと）に書き戻すタスクを開始"""
+        if not self.background_flush_running:
+            self._flush_loop = asyncio.get_running_loop()
+            self._flush_wakeup = asyncio.Event()
+            self._flush_task = asyncio.create_task(self._run_background_flush())
+        return self._flush_task
+
+    async def stop_background_flush(self) -> int:
+        """バックグラウンドタスクを停止し、残りを書き戻す"""
+        task, self._flush_task = self._flush_task, None
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        return await asyncio.to_thread(self.flush)
+
+    async def _run_background_flush(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_wakeup.clear()
+
+            if self._pending:
+                try:
+                    await asyncio.to_thread(self.flush)
+                except Exception as e:
+                    logger.error(f"Background paper wallet flush failed: {e}")
+
+    def flush(self) -> int:
+        """未反映のジャーナルを1トランザクションでDBに書き込む"""
+        with self._flush_lock:
+            with self._journal_lock:
+                entries, self._pending = self._pending, []
+            self._last_flush = time.monotonic()
+
+            if not entries:
+                return 0
+
+            if not self._write_entries(entries):
+                # 失敗した分は先頭に戻して次回再試行
+                with self._journal_lock:
+                    self._pending[:0] = entries
+                return 0
+
+            self._rewrite_journal_file()
+            self.stats["flushes"] += 1
+            self.stats["flushed_entries"] += len(entries)
+            return len(entries)
+
+    def recover(self) -> int:
+        """ジャーナルファイルの未反映分をDBに再生（反映済みのエントリはスキップ）"""
+        if not self.journal_path or not os.path.exists(self.journal_path):
+            return 0
+
+        with open(self.journal_path, encoding="utf-8") as journal:
+            entries = [JournalEntry.from_json(line) for line in journal if line.strip()]
+
+        if not entries:
+            return 0
+
+        session = self.db_manager.get_session()
+        try:
+            entry_ids = [UUID(entry.id) for entry in entries]
+            applied = {
+                str(row.id)
+                for row in session.query(PaperWalletTransactionModel.id)
+                .filter(PaperWalletTransactionModel.id.in_(entry_ids))
+                .all()
+            }
+        finally:
+            session.close()
+
+        unapplied = [entry for entry in entries if entry.id not in applied]
+        if unapplied and not self._write_entries(unapplied):
+            raise RuntimeError(f"Failed to replay paper wallet journal: {self.journal_path}")
+
+        with self._journal_lock:
+            if not self._pending:
+                os.remove(self.journal_path)
+
+        self.stats["recovered_entries"] += len(unapplied)
+        logger.info(f"Paper wallet journal replayed: {len(unapplied)} entries")
+        return len(unapplied)
+
+    def _write_entries(self, entries: List[JournalEntry]) -> bool:
+        session = self.db_manager.get_session()
+        try:
+            wallets: Dict[Tuple[UUID, str], PaperWalletModel] = {}
+
+            # ウォレットは最終状態のみ反映
+            for entry in entries:
+                key = (entry.user_id, entry.asset)
+                wallet = wallets.get(key)
+                if wallet is None:
+                    wallet = (
+                        session.query(PaperWalletModel)
+                        .filter(and_(PaperWalletModel.user_id == entry.user_id, PaperWalletModel.asset == entry.asset))
+                        .with_for_update()
+                        .first()
+                    )
+                    if wallet is None:
+                        wallet = PaperWalletModel(user_id=entry.user_id, asset=entry.asset)
+                        session.add(wallet)
+                    wallets[key] = wallet
+
+                wallet.balance = entry.wallet_balance
+                wallet.locked_balance = entry.wallet_locked
+                wallet.updated_at = entry.created_at
+
+            session.flush()
+
+            session.add_all(
+                [
+                    PaperWalletTransactionModel(
+                        id=UUID(entry.id),
+                        wallet_id=wallets[(entry.user_id, entry.asset)].id,
+                        user_id=entry.user_id,
+                        asset=entry.asset,
+                        transaction_type=entry.transaction_type,
+                        amount=entry.amount,
+                        balance_before=entry.balance_before,
+                        balance_after=entry.balance_after,
+                        related_order_id=entry.related_order_id,
+                        description=entry.description,
+                        created_at=entry.created_at,
+                    )
+                    for entry in entries
+                ]
+            )
+
+            session.commit()
+            logger.debug(f"Paper wallet journal flushed: {len(entries)} entries")
+            return True
+
+        except SQLAlchemyError as e:
+            session.rollback()
+            logger.error(f"Failed to flush paper wallet journal: {e}")
+            return False
+        finally:
+            session.close()
+
+    def _rewrite_journal_file(self):
+        """反映済みエントリをジャーナルファイルから除く"""
+        if not self.journal_path:
+            return
+
+        with self._journal_lock:
+            if not self._pending:
+                # 未反映分がなければファイルごと消す
+                if os.path.exists(self.journal_path):
+                    os.remove(self.journal_path)
+                return
+            with open(self.journal_path, "w", encoding="utf-8") as journal:
+                journal.write("".join(entry.to_json() + "\n" for entry in self._pending))
+
+    def get_stats(self) -> Dict[str, int]:
+        """統計情報を取得"""
+        return {**self.stats, "pending": len(self._pending), "cached_users": len(self._balances)}
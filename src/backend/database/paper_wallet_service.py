@@ -3,18 +3,18 @@ Paper Trading用ウォレットサービス
 仮想残高の管理と取引履歴の記録
 """
 
+import asyncio
 import logging
-import threading
 from datetime import datetime, timezone
 from decimal import Decimal
-from typing import Dict, List
+from typing import Dict, List, Optional
 from uuid import UUID
 
-from sqlalchemy import and_, desc, func
+from sqlalchemy import and_, desc, func, select
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.orm import Session
 
 from .models import DatabaseManager, PaperWalletDefaultModel, PaperWalletModel, PaperWalletTransactionModel
+from .paper_wallet_ledger import BalanceChange, PaperWalletLedger
 
 logger = logging.getLogger(__name__)
 
@@ -23,13 +23,41 @@ class PaperWalletService:
     """
     Paper Trading用ウォレットサービス
     仮想残高の管理、取引実行、履歴記録を担当
+
+    残高はインメモリ台帳（PaperWalletLedger）が正となり、
+    取引履歴はジャーナルとしてまとめてDBに書き戻される。
     """
 
-    def __init__(self, db_manager: DatabaseManager):
+    def __init__(
+        self,
+        db_manager: DatabaseManager,
+        journal_path: Optional[str] = None,
+        flush_batch_size: int = 500,
+        flush_interval: float = 1.0,
+    ):
+        """
+        Args:
+            db_manager: データベースマネージャー
+            journal_path: ジャーナルファイルのパス（指定時はクラッシュ後に未反映分を再生）
+            flush_batch_size: この件数たまったらDBに書き戻す
+            flush_interval: 書き戻し間隔（秒、バックグラウンドタスク未開始時は前回からこの秒数経過後の更新で書き戻す）
+        """
         self.db_manager = db_manager
-        # ユーザー・アセット組み合わせごとのロック管理
-        self._locks = {}
-        self._locks_lock = threading.Lock()
+        self.ledger = PaperWalletLedger(
+            db_manager, journal_path=journal_path, flush_batch_size=flush_batch_size, flush_interval=flush_interval
+        )
+
+    def flush(self) -> int:
+        """未反映の取引をDBに書き戻す"""
+        return self.ledger.flush()
+
+    def start_background_flush(self) -> asyncio.Task:
+        """バックグラウンドの書き戻しタスクを開始（イベントループ上で呼ぶ）"""
+        return self.ledger.start_background_flush()
+
+    async def stop_background_flush(self) -> int:
+        """バックグラウンドの書き戻しタスクを停止し、残りを書き戻す"""
+        return await self.ledger.stop_background_flush()
 
     def initialize_user_wallet(
         self, user_id: UUID, default_setting: str = "beginner", force_reset: bool = False
@@ -45,6 +73,9 @@ class PaperWalletService:
         Returns:
             bool: 初期化成功フラグ
         """
+        # DBを直接更新するため、台帳の未反映分を先に書き戻す
+        self.flush()
+
         session = self.db_manager.get_session()
         try:
             # 既存ウォレットの確認
@@ -116,6 +147,7 @@ class PaperWalletService:
                     session.add(transaction)
 
             session.commit()
+            self.ledger.evict(user_id)
             logger.info(f"Paper wallet initialized for user {user_id} with setting {default_setting}")
             return True
 
@@ -136,25 +168,11 @@ class PaperWalletService:
         Returns:
             Dict: 資産別残高情報
         """
-        session = self.db_manager.get_session()
         try:
-            wallets = session.query(PaperWalletModel).filter(PaperWalletModel.user_id == user_id).all()
-
-            result = {}
-            for wallet in wallets:
-                result[wallet.asset] = {
-                    "total": float(wallet.balance),
-                    "locked": float(wallet.locked_balance),
-                    "available": float(wallet.get_available_balance()),
-                }
-
-            return result
-
+            return {asset: balance.to_dict() for asset, balance in self.ledger.get_balances(user_id).items()}
         except SQLAlchemyError as e:
             logger.error(f"Failed to get balances for user {user_id}: {e}")
             return {}
-        finally:
-            session.close()
 
     def get_asset_balance(self, user_id: UUID, asset: str) -> Dict[str, float]:
         """
@@ -167,36 +185,15 @@ class PaperWalletService:
         Returns:
             Dict: 残高情報
         """
-        session = self.db_manager.get_session()
         try:
-            wallet = (
-                session.query(PaperWalletModel)
-                .filter(and_(PaperWalletModel.user_id == user_id, PaperWalletModel.asset == asset))
-                .first()
-            )
-
-            if not wallet:
-                return {"total": 0.0, "locked": 0.0, "available": 0.0}
-
-            return {
-                "total": float(wallet.balance),
-                "locked": float(wallet.locked_balance),
-                "available": float(wallet.get_available_balance()),
-            }
-
+            balance = self.ledger.get_balance(user_id, asset)
         except SQLAlchemyError as e:
             logger.error(f"Failed to get balance for user {user_id}, asset {asset}: {e}")
-            return {"total": 0.0, "locked": 0.0, "available": 0.0}
-        finally:
-            session.close()
+            balance = None
 
-    def _get_user_asset_lock(self, user_id: UUID, asset: str) -> threading.Lock:
-        """ユーザー・アセット組み合わせごとのロックを取得"""
-        key = f"{user_id}_{asset}"
-        with self._locks_lock:
-            if key not in self._locks:
-                self._locks[key] = threading.Lock()
-            return self._locks[key]
+        if balance is None:
+            return {"total": 0.0, "locked": 0.0, "available": 0.0}
+        return balance.to_dict()
 
     def update_balance(
         self,
@@ -221,70 +218,12 @@ class PaperWalletService:
         Returns:
             bool: 更新成功フラグ
         """
-        # ユーザー・アセット固有のロックを取得
-        asset_lock = self._get_user_asset_lock(user_id, asset)
-
-        with asset_lock:
-            session = self.db_manager.get_session()
-            try:
-                # ウォレットを取得（行ロック）
-                wallet = (
-                    session.query(PaperWalletModel)
-                    .filter(and_(PaperWalletModel.user_id == user_id, PaperWalletModel.asset == asset))
-                    .with_for_update()
-                    .first()
-                )
-
-                # ウォレットが存在しない場合は作成
-                if not wallet:
-                    wallet = PaperWalletModel(
-                        user_id=user_id, asset=asset, balance=Decimal("0"), locked_balance=Decimal("0")
-                    )
-                    session.add(wallet)
-                    session.flush()  # IDを取得するため
-
-                # 新しい残高を計算
-                old_balance = wallet.balance
-                new_balance = old_balance + amount
-
-                # 残高が負になる場合はエラー
-                if new_balance < 0:
-                    logger.warning(
-                        f"Insufficient balance: user={user_id}, asset={asset}, current={old_balance}, requested={amount}"
-                    )
-                    session.rollback()
-                    return False
-
-                # 残高を更新
-                wallet.balance = new_balance
-                wallet.updated_at = datetime.now(timezone.utc)
-
-                # 取引ログを作成
-                transaction = PaperWalletTransactionModel(
-                    wallet_id=wallet.id,
-                    user_id=user_id,
-                    asset=asset,
-                    transaction_type=transaction_type,
-                    amount=amount,
-                    balance_before=old_balance,
-                    balance_after=new_balance,
-                    related_order_id=related_order_id,
-                    description=description,
-                )
-                session.add(transaction)
-
-                session.commit()
-                logger.debug(
-                    f"Balance updated: user={user_id}, asset={asset}, amount={amount}, new_balance={new_balance}"
-                )
-                return True
+        change = BalanceChange(asset, amount, transaction_type, "balance", related_order_id, description)
+        if not self.ledger.apply(user_id, [change]):
+            return False
 
-            except SQLAlchemyError as e:
-                session.rollback()
-                logger.error(f"Failed to update balance: user={user_id}, asset={asset}, amount={amount}, error={e}")
-                return False
-            finally:
-                session.close()
+        logger.debug(f"Balance updated: user={user_id}, asset={asset}, amount={amount}")
+        return True
 
     def lock_balance(self, user_id: UUID, asset: str, amount: Decimal, related_order_id: str = None) -> bool:
         """
@@ -299,58 +238,14 @@ class PaperWalletService:
         Returns:
             bool: ロック成功フラグ
         """
-        session = self.db_manager.get_session()
-        try:
-            # ウォレットを取得（行ロック）
-            wallet = (
-                session.query(PaperWalletModel)
-                .filter(and_(PaperWalletModel.user_id == user_id, PaperWalletModel.asset == asset))
-                .with_for_update()
-                .first()
-            )
-
-            if not wallet:
-                logger.warning(f"Wallet not found: user={user_id}, asset={asset}")
-                return False
-
-            # 利用可能残高をチェック
-            available = wallet.get_available_balance()
-            if available < amount:
-                logger.warning(
-                    f"Insufficient available balance: user={user_id}, asset={asset}, available={available}, requested={amount}"
-                )
-                return False
-
-            # ロック残高を更新
-            old_locked = wallet.locked_balance
-            new_locked = old_locked + amount
-            wallet.locked_balance = new_locked
-            wallet.updated_at = datetime.now(timezone.utc)
-
-            # ロック取引ログを作成
-            transaction = PaperWalletTransactionModel(
-                wallet_id=wallet.id,
-                user_id=user_id,
-                asset=asset,
-                transaction_type="lock",
-                amount=amount,
-                balance_before=old_locked,
-                balance_after=new_locked,
-                related_order_id=related_order_id,
-                description=f"Balance locked for order {related_order_id}",
-            )
-            session.add(transaction)
-
-            session.commit()
-            logger.debug(f"Balance locked: user={user_id}, asset={asset}, amount={amount}")
-            return True
-
-        except SQLAlchemyError as e:
-            session.rollback()
-            logger.error(f"Failed to lock balance: user={user_id}, asset={asset}, amount={amount}, error={e}")
+        change = BalanceChange(
+            asset, amount, "lock", "locked", related_order_id, f"Balance locked for order {related_order_id}"
+        )
+        if not self.ledger.apply(user_id, [change], create_missing=False):
             return False
-        finally:
-            session.close()
+
+        logger.debug(f"Balance locked: user={user_id}, asset={asset}, amount={amount}")
+        return True
 
     def unlock_balance(self, user_id: UUID, asset: str, amount: Decimal, related_order_id: str = None) -> bool:
         """
@@ -365,57 +260,14 @@ class PaperWalletService:
         Returns:
             bool: ロック解除成功フラグ
         """
-        session = self.db_manager.get_session()
-        try:
-            # ウォレットを取得（行ロック）
-            wallet = (
-                session.query(PaperWalletModel)
-                .filter(and_(PaperWalletModel.user_id == user_id, PaperWalletModel.asset == asset))
-                .with_for_update()
-                .first()
-            )
-
-            if not wallet:
-                logger.warning(f"Wallet not found: user={user_id}, asset={asset}")
-                return False
-
-            # ロック残高をチェック
-            if wallet.locked_balance < amount:
-                logger.warning(
-                    f"Insufficient locked balance: user={user_id}, asset={asset}, locked={wallet.locked_balance}, requested={amount}"
-                )
-                return False
-
-            # ロック残高を更新
-            old_locked = wallet.locked_balance
-            new_locked = old_locked - amount
-            wallet.locked_balance = new_locked
-            wallet.updated_at = datetime.now(timezone.utc)
-
-            # ロック解除取引ログを作成
-            transaction = PaperWalletTransactionModel(
-                wallet_id=wallet.id,
-                user_id=user_id,
-                asset=asset,
-                transaction_type="unlock",
-                amount=-amount,  # 負の値でロック解除を表現
-                balance_before=old_locked,
-                balance_after=new_locked,
-                related_order_id=related_order_id,
-                description=f"Balance unlocked after order {related_order_id}",
-            )
-            session.add(transaction)
-
-            session.commit()
-            logger.debug(f"Balance unlocked: user={user_id}, asset={asset}, amount={amount}")
-            return True
-
-        except SQLAlchemyError as e:
-            session.rollback()
-            logger.error(f"Failed to unlock balance: user={user_id}, asset={asset}, amount={amount}, error={e}")
+        change = BalanceChange(
+            asset, -amount, "unlock", "locked", related_order_id, f"Balance unlocked after order {related_order_id}"
+        )
+        if not self.ledger.apply(user_id, [change], create_missing=False):
             return False
-        finally:
-            session.close()
+
+        logger.debug(f"Balance unlocked: user={user_id}, asset={asset}, amount={amount}")
+        return True
 
     def execute_trade(
         self,
@@ -428,6 +280,7 @@ class PaperWalletService:
         fee_amount: Decimal,
         related_order_id: str = None,
         description: str = None,
+        unlock_amount: Decimal = Decimal("0"),
     ) -> bool:
         """
         取引を実行（複数資産の残高更新）
@@ -442,118 +295,40 @@ class PaperWalletService:
             fee_amount: 手数料
             related_order_id: 関連注文ID
             description: 説明
+            unlock_amount: 売却と同時に解除する売却資産のロック量（注文の約定分）
 
         Returns:
             bool: 取引実行成功フラグ
         """
-        session = self.db_manager.get_session()
-        try:
-            # トランザクション内でまとめて処理
-            success = True
-
-            # 1. 売却資産を減らす
-            if not self._update_balance_in_session(
-                session, user_id, sell_asset, -sell_amount, "trade_sell", related_order_id, description
-            ):
-                success = False
-
-            # 2. 購入資産を増やす
-            if success and not self._update_balance_in_session(
-                session, user_id, buy_asset, buy_amount, "trade_buy", related_order_id, description
-            ):
-                success = False
-
-            # 3. 手数料を差し引く
-            if (
-                success
-                and fee_amount > 0
-                and not self._update_balance_in_session(
-                    session, user_id, fee_asset, -fee_amount, "fee", related_order_id, f"Trading fee for {description}"
-                )
-            ):
-                success = False
-
-            if success:
-                session.commit()
-                logger.info(
-                    f"Trade executed: user={user_id}, -{sell_amount} {sell_asset}, +{buy_amount} {buy_asset}, -{fee_amount} {fee_asset}"
+        # ロック解除・売却・購入・手数料をまとめて適用（いずれか失敗すれば全体を破棄）
+        changes = [
+            BalanceChange(
+                sell_asset,
+                -unlock_amount,
+                "unlock",
+                "locked",
+                related_order_id,
+                f"Balance unlocked after order {related_order_id}",
+            ),
+            BalanceChange(sell_asset, -sell_amount, "trade_sell", "balance", related_order_id, description),
+            BalanceChange(buy_asset, buy_amount, "trade_buy", "balance", related_order_id, description),
+        ]
+        if fee_amount > 0:
+            changes.append(
+                BalanceChange(
+                    fee_asset, -fee_amount, "fee", "balance", related_order_id, f"Trading fee for {description}"
                 )
-                return True
-            else:
-                session.rollback()
-                logger.error(f"Trade execution failed: user={user_id}")
-                return False
-
-        except SQLAlchemyError as e:
-            session.rollback()
-            logger.error(f"Error executing trade: user={user_id}, error={e}")
-            return False
-        finally:
-            session.close()
-
-    def _update_balance_in_session(
-        self,
-        session: Session,
-        user_id: UUID,
-        asset: str,
-        amount: Decimal,
-        transaction_type: str,
-        related_order_id: str = None,
-        description: str = None,
-    ) -> bool:
-        """セッション内での残高更新（内部メソッド）"""
-        try:
-            # ウォレットを取得（行ロック）
-            wallet = (
-                session.query(PaperWalletModel)
-                .filter(and_(PaperWalletModel.user_id == user_id, PaperWalletModel.asset == asset))
-                .with_for_update()
-                .first()
             )
 
-            # ウォレットが存在しない場合は作成
-            if not wallet:
-                wallet = PaperWalletModel(
-                    user_id=user_id, asset=asset, balance=Decimal("0"), locked_balance=Decimal("0")
-                )
-                session.add(wallet)
-                session.flush()  # IDを取得
-
-            # 新しい残高を計算
-            old_balance = wallet.balance
-            new_balance = old_balance + amount
-
-            # 残高が負になる場合はエラー
-            if new_balance < 0:
-                logger.warning(
-                    f"Insufficient balance in trade: user={user_id}, asset={asset}, current={old_balance}, requested={amount}"
-                )
-                return False
-
-            # 残高を更新
-            wallet.balance = new_balance
-            wallet.updated_at = datetime.now(timezone.utc)
-
-            # 取引ログを作成
-            transaction = PaperWalletTransactionModel(
-                wallet_id=wallet.id,
-                user_id=user_id,
-                asset=asset,
-                transaction_type=transaction_type,
-                amount=amount,
-                balance_before=old_balance,
-                balance_after=new_balance,
-                related_order_id=related_order_id,
-                description=description,
-            )
-            session.add(transaction)
-
-            return True
-
-        except Exception as e:
-            logger.error(f"Error updating balance in session: {e}")
+        if not self.ledger.apply(user_id, changes):
+            logger.error(f"Trade execution failed: user={user_id}")
             return False
 
+        logger.info(
+            f"Trade executed: user={user_id}, -{sell_amount} {sell_asset}, +{buy_amount} {buy_asset}, -{fee_amount} {fee_asset}"
+        )
+        return True
+
     def get_transaction_history(
         self, user_id: UUID, asset: str = None, transaction_type: str = None, limit: int = 100, offset: int = 0
     ) -> List[Dict]:
@@ -570,27 +345,31 @@ class PaperWalletService:
         Returns:
             List[Dict]: 取引履歴リスト
         """
-        session = self.db_manager.get_session()
+        self.flush()
+
+        statement = self._transaction_history_statement(user_id, asset, transaction_type, limit, offset)
         try:
-            query = session.query(PaperWalletTransactionModel).filter(PaperWalletTransactionModel.user_id == user_id)
+            with self.db_manager.session_scope() as session:
+                return [tx.to_dict() for tx in session.execute(statement).scalars()]
 
-            if asset:
-                query = query.filter(PaperWalletTransactionModel.asset == asset)
+        except SQLAlchemyError as e:
+            logger.error(f"Failed to get transaction history: user={user_id}, error={e}")
+            return []
 
-            if transaction_type:
-                query = query.filter(PaperWalletTransactionModel.transaction_type == transaction_type)
+    @staticmethod
+    def _transaction_history_statement(
+        user_id: UUID, asset: str = None, transaction_type: str = None, limit: int = 100, offset: int = 0
+    ):
+        """取引履歴取得クエリを組み立て"""
+        statement = select(PaperWalletTransactionModel).where(PaperWalletTransactionModel.user_id == user_id)
 
-            transactions = (
-                query.order_by(desc(PaperWalletTransactionModel.created_at)).offset(offset).limit(limit).all()
-            )
+        if asset:
+            statement = statement.where(PaperWalletTransactionModel.asset == asset)
 
-            return [tx.to_dict() for tx in transactions]
+        if transaction_type:
+            statement = statement.where(PaperWalletTransactionModel.transaction_type == transaction_type)
 
-        except SQLAlchemyError as e:
-            logger.error(f"Failed to get transaction history: user={user_id}, error={e}")
-            return []
-        finally:
-            session.close()
+        return statement.order_by(desc(PaperWalletTransactionModel.created_at)).offset(offset).limit(limit)
 
     def get_portfolio_summary(self, user_id: UUID) -> Dict:
         """
@@ -602,6 +381,8 @@ class PaperWalletService:
         Returns:
             Dict: ポートフォリオサマリー
         """
+        self.flush()
+
         session = self.db_manager.get_session()
         try:
             # 残高情報
@@ -668,3 +449,89 @@ class PaperWalletService:
             bool: リセット成功フラグ
         """
         return self.initialize_user_wallet(user_id, default_setting, force_reset=True)
+
+    # 非同期版
+    # 残高操作はインメモリ台帳で完結するが、初回読み込みと書き戻しでDBに触れるため
+    # イベントループを塞がないようワーカースレッドで実行する（台帳はユーザー単位でロック済み）
+
+    async def flush_async(self) -> int:
+        """未反映の取引をDBに書き戻す（非同期版）"""
+        return await asyncio.to_thread(self.flush)
+
+    async def get_user_balances_async(self, user_id: UUID) -> Dict[str, Dict[str, float]]:
+        """ユーザーの全残高を取得（非同期版）"""
+        return await asyncio.to_thread(self.get_user_balances, user_id)
+
+    async def get_asset_balance_async(self, user_id: UUID, asset: str) -> Dict[str, float]:
+        """特定資産の残高を取得（非同期版）"""
+        return await asyncio.to_thread(self.get_asset_balance, user_id, asset)
+
+    async def update_balance_async(
+        self,
+        user_id: UUID,
+        asset: str,
+        amount: Decimal,
+        transaction_type: str,
+        related_order_id: str = None,
+        description: str = None,
+    ) -> bool:
+        """残高を更新（非同期版）"""
+        return await asyncio.to_thread(
+            self.update_balance, user_id, asset, amount, transaction_type, related_order_id, description
+        )
+
+    async def lock_balance_async(
+        self, user_id: UUID, asset: str, amount: Decimal, related_order_id: str = None
+    ) -> bool:
+        """残高をロック（非同期版）"""
+        return await asyncio.to_thread(self.lock_balance, user_id, asset, amount, related_order_id)
+
+    async def unlock_balance_async(
+        self, user_id: UUID, asset: str, amount: Decimal, related_order_id: str = None
+    ) -> bool:
+        """残高のロックを解除（非同期版）"""
+        return await asyncio.to_thread(self.unlock_balance, user_id, asset, amount, related_order_id)
+
+    async def execute_trade_async(
+        self,
+        user_id: UUID,
+        buy_asset: str,
+        sell_asset: str,
+        buy_amount: Decimal,
+        sell_amount: Decimal,
+        fee_asset: str,
+        fee_amount: Decimal,
+        related_order_id: str = None,
+        description: str = None,
+        unlock_amount: Decimal = Decimal("0"),
+    ) -> bool:
+        """取引を実行（非同期版）"""
+        return await asyncio.to_thread(
+            self.execute_trade,
+            user_id,
+            buy_asset,
+            sell_asset,
+            buy_amount,
+            sell_amount,
+            fee_asset,
+            fee_amount,
+            related_order_id,
+            description,
+            unlock_amount,
+        )
+
+    async def get_transaction_history_async(
+        self, user_id: UUID, asset: str = None, transaction_type: str = None, limit: int = 100, offset: int = 0
+    ) -> List[Dict]:
+        """取引履歴を取得（非同期版、非同期セッションで読み出す）"""
+        await self.flush_async()
+
+        statement = self._transaction_history_statement(user_id, asset, transaction_type, limit, offset)
+        try:
+            async with self.db_manager.async_session_scope() as session:
+                result = await session.execute(statement)
+                return [tx.to_dict() for tx in result.scalars()]
+
+        except SQLAlchemyError as e:
+            logger.error(f"Failed to get transaction history: user={user_id}, error={e}")
+            return []
@@ -181,6 +181,13 @@ CREATE INDEX IF NOT EXISTS idx_orders_user_strategy_created ON orders(user_id, s
 CREATE INDEX IF NOT EXISTS idx_trades_user_symbol_executed ON trades(user_id, symbol, executed_at);
 CREATE INDEX IF NOT EXISTS idx_portfolio_lookup ON trades(user_id, exchange, symbol, paper_trading);
 
+-- キーセットページング用インデックス（(created_at, id) / (executed_at, id) の降順範囲走査）
+CREATE INDEX IF NOT EXISTS idx_orders_user_created_id ON orders(user_id, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_orders_user_status_created_id ON orders(user_id, status, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_trades_user_executed_id ON trades(user_id, executed_at, id);
+CREATE INDEX IF NOT EXISTS idx_trades_user_strategy_executed_id ON trades(user_id, strategy_id, executed_at, id);
+CREATE INDEX IF NOT EXISTS idx_trades_user_symbol_executed_id ON trades(user_id, symbol, executed_at, id);
+
 -- パーティション（大量データ対応、オプション）
 -- 日付別パーティショニングの例（PostgreSQLの場合）
 -- CREATE TABLE orders_2024 PARTITION OF orders FOR VALUES FROM ('2024-01-01') TO ('2025-01-01');
@@ -226,23 +233,38 @@ BEGIN
 END;
 $$ LANGUAGE plpgsql;
 
--- 統計・パフォーマンス分析用ビュー
-CREATE OR REPLACE VIEW trading_statistics AS
-SELECT 
-    user_id,
-    strategy_id,
-    exchange,
-    symbol,
-    paper_trading,
-    DATE_TRUNC('day', executed_at) as trade_date,
-    COUNT(*) as trade_count,
-    SUM(quantity * price) as total_volume,
-    SUM(fee_amount) as total_fees,
-    AVG(price) as avg_price,
-    MIN(price) as min_price,
-    MAX(price) as max_price,
-    COUNT(CASE WHEN side = 'buy' THEN 1 END) as buy_count,
-    COUNT(CASE WHEN side = 'sell' THEN 1 END) as sell_count
-FROM trades
-GROUP BY user_id, strategy_id, exchange, symbol, paper_trading, DATE_TRUNC('day', executed_at)
-ORDER BY trade_date DESC;
\ No newline at end of file
+-- 統計・パフォーマンス分析用の日次ロールアップ
+-- 約定の書き込み時にアプリケーションが加算する（既存の約定は
+-- python -m src.backend.database.trading_statistics --database-url ... でバックフィル）
+DROP VIEW IF EXISTS trading_statistics;
+CREATE TABLE IF NOT EXISTS trading_statistics (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    user_id UUID NOT NULL,
+    strategy_id VARCHAR(100) NOT NULL DEFAULT '',  -- 戦略なしは空文字（一意キーの一部のため）
+    exchange VARCHAR(50) NOT NULL,
+    symbol VARCHAR(50) NOT NULL,
+    paper_trading BOOLEAN NOT NULL DEFAULT FALSE,
+    trade_date TIMESTAMPTZ NOT NULL,
+    
+    -- 集計データ
+    trade_count DECIMAL(10, 0) DEFAULT 0,
+    total_volume DECIMAL(20, 8) DEFAULT 0,
+    total_fees DECIMAL(20, 8) DEFAULT 0,
+    avg_price DECIMAL(20, 8),
+    min_price DECIMAL(20, 8),
+    max_price DECIMAL(20, 8),
+    buy_count DECIMAL(10, 0) DEFAULT 0,
+    sell_count DECIMAL(10, 0) DEFAULT 0,
+    price_sum DECIMAL(28, 8),
+    daily_pnl DECIMAL(20, 8) DEFAULT 0,
+    
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+
+    -- 約定の書き込みは INSERT ... ON CONFLICT (このキー) DO UPDATE で加算する
+    CONSTRAINT uq_statistics_key UNIQUE (user_id, strategy_id, exchange, symbol, paper_trading, trade_date)
+);
+
+CREATE INDEX IF NOT EXISTS idx_statistics_user_date ON trading_statistics(user_id, trade_date);
+CREATE INDEX IF NOT EXISTS idx_statistics_strategy_date ON trading_statistics(strategy_id, trade_date);
+CREATE INDEX IF NOT EXISTS idx_statistics_symbol_date ON trading_statistics(symbol, trade_date);
\ No newline at end of file
@@ -1,22 +1,108 @@
 """
 データベースサービス
 注文・取引データの永続化・取得機能
+
+各メソッドは同期版と非同期版（*_async）を持つ。クエリは共通のビルダーで組み立て、
+1回の呼び出しを1つの作業単位（DatabaseManager.session_scope / async_session_scope）として実行する。
 """
 
+import base64
+import json
 import logging
 from datetime import datetime, timezone
 from decimal import Decimal
-from typing import Dict, List, Optional
-from uuid import UUID
+from types import SimpleNamespace
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from uuid import UUID, uuid4
 
-from sqlalchemy import and_, desc, func
+from sqlalchemy import and_, case, desc, func, insert, literal, select, tuple_
 from sqlalchemy.exc import SQLAlchemyError
 
 from ..trading.orders.models import Order
 from .models import DatabaseManager, OrderModel, TradeModel
+from .trading_statistics import DailyAggregate, load_aggregates, record_trades
 
 logger = logging.getLogger(__name__)
 
+# 一括保存時の1回の挿入あたりの件数
+DEFAULT_BATCH_SIZE = 1000
+
+# キーセットページングに使える注文のソート列
+ORDER_SORT_COLUMNS = {"created_at": "created_at", "updated_at": "updated_at"}
+
+# update_order で更新可能なフィールド
+ORDER_UPDATABLE_FIELDS = (
+    "status",
+    "filled_quantity",
+    "remaining_quantity",
+    "average_fill_price",
+    "exchange_order_id",
+    "submitted_at",
+    "filled_at",
+    "cancelled_at",
+    "error_message",
+    "error_code",
+    "fee_amount",
+    "fee_currency",
+    "metadata",
+)
+
+
+def _chunks(rows: Sequence[Dict], batch_size: int) -> Iterator[Sequence[Dict]]:
+    """rows を batch_size 件ずつに分割"""
+    if batch_size <= 0:
+        raise ValueError("batch_size must be positive")
+    for start in range(0, len(rows), batch_size):
+        yield rows[start : start + batch_size]
+
+
+def encode_cursor(sort_value: datetime, row_id) -> str:
+    """ページ末尾の (ソートキー, ID) を不透明なカーソル文字列に変換"""
+    payload = json.dumps([sort_value.isoformat() if sort_value else None, str(row_id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], UUID]:
+    """カーソル文字列を (ソートキー, ID) に戻す"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return (datetime.fromisoformat(sort_value) if sort_value else None), UUID(row_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def _after_cursor(statement, sort_attribute, id_attribute, cursor: str):
+    """降順ソートでカーソル位置より後ろの行に絞り込む
+
+    (sort, id) の行値比較にすることで複合インデックスの範囲走査になり、
+    何ページ目でも先頭ページと同じコストで取得できる。
+    """
+    sort_value, row_id = decode_cursor(cursor)
+    return statement.where(
+        tuple_(sort_attribute, id_attribute)
+        < tuple_(literal(sort_value, sort_attribute.type), literal(row_id, id_attribute.type))
+    )
+
+
+def _page(models: List, limit: int, sort_attribute: str) -> Dict:
+    """limit + 1 件取得した結果からページと次ページのカーソルを作る"""
+    has_more = len(models) > limit
+    models = models[:limit]
+    next_cursor = None
+    if has_more:
+        last = models[-1]
+        next_cursor = encode_cursor(getattr(last, sort_attribute), last.id)
+
+    return {"items": [model.to_dict() for model in models], "next_cursor": next_cursor, "has_more": has_more}
+
+
+def _format_date(value) -> Optional[str]:
+    """日付集計の結果を文字列化（SQLiteの date() は文字列を返す）"""
+    if value is None:
+        return None
+    return value.isoformat() if hasattr(value, "isoformat") else str(value)
+
 
 class OrderService:
     """注文データベースサービス"""
@@ -24,6 +110,101 @@ class OrderService:
     def __init__(self, db_manager: DatabaseManager):
         self.db_manager = db_manager
 
+    @staticmethod
+    def _order_row(order: Order, user_id: UUID, strategy_id: str = None) -> Dict:
+        """OrderをOrderModelの列値に変換（IDはここで採番し、一括挿入でも対応が取れるようにする）"""
+        return dict(
+            id=uuid4(),
+            user_id=user_id,
+            strategy_id=strategy_id,
+            strategy_name=order.strategy_name,
+            exchange=order.exchange,
+            symbol=order.symbol,
+            order_type=order.order_type.value,
+            side=order.side.value,
+            quantity=order.amount,
+            price=order.price,
+            stop_price=order.stop_price,
+            time_in_force=order.time_in_force.value if order.time_in_force else "GTC",
+            oco_take_profit_price=order.oco_take_profit_price,
+            oco_stop_loss_price=order.oco_stop_loss_price,
+            status=order.status.value,
+            filled_quantity=order.filled_amount or 0,
+            remaining_quantity=order.remaining_amount or order.amount,
+            average_fill_price=order.average_fill_price,
+            exchange_order_id=order.exchange_order_id,
+            client_order_id=order.client_order_id,
+            submitted_at=order.submitted_at,
+            filled_at=order.filled_at,
+            cancelled_at=order.cancelled_at,
+            error_message=order.error_message,
+            fee_amount=order.fee_amount,
+            fee_currency=order.fee_currency,
+            paper_trading=getattr(order, "paper_trading", False),
+            order_metadata=getattr(order, "metadata", None),
+        )
+
+    @classmethod
+    def _build_order_model(cls, order: Order, user_id: UUID, strategy_id: str = None) -> OrderModel:
+        """OrderをOrderModelに変換"""
+        return OrderModel(**cls._order_row(order, user_id, strategy_id))
+
+    @staticmethod
+    def _apply_updates(order_model: OrderModel, updates: Dict):
+        """更新可能なフィールドのみ適用"""
+        for key, value in updates.items():
+            if key not in ORDER_UPDATABLE_FIELDS:
+                continue
+            if key == "metadata":
+                key = "order_metadata"
+            if hasattr(order_model, key):
+                setattr(order_model, key, value)
+
+    @staticmethod
+    def _orders_statement(
+        user_id: UUID = None,
+        strategy_id: str = None,
+        exchange: str = None,
+        symbol: str = None,
+        status: str = None,
+        paper_trading: bool = None,
+        limit: int = 100,
+        offset: int = 0,
+        order_by: str = "created_at",
+        cursor: str = None,
+    ):
+        """注文リスト取得クエリを組み立て（cursor 指定時はキーセットページング）"""
+        statement = select(OrderModel)
+
+        # フィルター条件
+        if user_id:
+            statement = statement.where(OrderModel.user_id == user_id)
+        if strategy_id:
+            statement = statement.where(OrderModel.strategy_id == strategy_id)
+        if exchange:
+            statement = statement.where(OrderModel.exchange == exchange)
+        if symbol:
+            statement = statement.where(OrderModel.symbol == symbol)
+        if status:
+            statement = statement.where(OrderModel.status == status)
+        if paper_trading is not None:
+            statement = statement.where(OrderModel.paper_trading == paper_trading)
+
+        # ソート（同時刻の並びを固定するためIDを第2キーにする）
+        sort_column = ORDER_SORT_COLUMNS.get(order_by)
+        if sort_column is None:
+            if cursor:
+                raise ValueError(f"keyset pagination requires order_by in {list(ORDER_SORT_COLUMNS)}")
+            return statement.offset(offset).limit(limit)
+
+        sort_attribute = getattr(OrderModel, sort_column)
+        statement = statement.order_by(desc(sort_attribute), desc(OrderModel.id))
+
+        # ページネーション
+        if cursor:
+            return _after_cursor(statement, sort_attribute, OrderModel.id, cursor).limit(limit)
+        return statement.offset(offset).limit(limit)
+
     def create_order(self, order: Order, user_id: UUID, strategy_id: str = None) -> str:
         """
         注文をデータベースに保存
@@ -36,51 +217,80 @@ class OrderService:
         Returns:
             str: 作成された注文のDB ID
         """
-        session = self.db_manager.get_session()
         try:
-            # OrderをOrderModelに変換
-            order_model = OrderModel(
-                user_id=user_id,
-                strategy_id=strategy_id,
-                strategy_name=order.strategy_name,
-                exchange=order.exchange,
-                symbol=order.symbol,
-                order_type=order.order_type.value,
-                side=order.side.value,
-                quantity=order.amount,
-                price=order.price,
-                stop_price=order.stop_price,
-                time_in_force=order.time_in_force.value if order.time_in_force else "GTC",
-                oco_take_profit_price=order.oco_take_profit_price,
-                oco_stop_loss_price=order.oco_stop_loss_price,
-                status=order.status.value,
-                filled_quantity=order.filled_amount or 0,
-                remaining_quantity=order.remaining_amount or order.amount,
-                average_fill_price=order.average_fill_price,
-                exchange_order_id=order.exchange_order_id,
-                client_order_id=order.client_order_id,
-                submitted_at=order.submitted_at,
-                filled_at=order.filled_at,
-                cancelled_at=order.cancelled_at,
-                error_message=order.error_message,
-                fee_amount=order.fee_amount,
-                fee_currency=order.fee_currency,
-                paper_trading=getattr(order, "paper_trading", False),
-                metadata=getattr(order, "metadata", None),
-            )
+            with self.db_manager.session_scope() as session:
+                order_model = self._build_order_model(order, user_id, strategy_id)
+                session.add(order_model)
+                session.flush()
+                order_id = str(order_model.id)
+
+            logger.info(f"Order created in DB: {order_id}")
+            return order_id
 
-            session.add(order_model)
-            session.commit()
+        except SQLAlchemyError as e:
+            logger.error(f"Failed to create order in DB: {e}")
+            raise
+
+    async def create_order_async(self, order: Order, user_id: UUID, strategy_id: str = None) -> str:
+        """注文をデータベースに保存（非同期版）"""
+        try:
+            async with self.db_manager.async_session_scope() as session:
+                order_model = self._build_order_model(order, user_id, strategy_id)
+                session.add(order_model)
+                await session.flush()
+                order_id = str(order_model.id)
 
-            logger.info(f"Order created in DB: {order_model.id}")
-            return str(order_model.id)
+            logger.info(f"Order created in DB: {order_id}")
+            return order_id
 
         except SQLAlchemyError as e:
-            session.rollback()
             logger.error(f"Failed to create order in DB: {e}")
             raise
-        finally:
-            session.close()
+
+    def create_orders(
+        self, orders: Sequence[Order], user_id: UUID, strategy_id: str = None, batch_size: int = DEFAULT_BATCH_SIZE
+    ) -> List[str]:
+        """
+        複数の注文を一括保存（batch_size 件ずつ executemany で挿入）
+
+        Args:
+            orders: 注文オブジェクトのリスト
+            user_id: ユーザーID
+            strategy_id: 戦略ID
+            batch_size: 1回の挿入あたりの件数
+
+        Returns:
+            List[str]: 作成された注文のDB ID（orders と同じ順序）
+        """
+        rows = [self._order_row(order, user_id, strategy_id) for order in orders]
+        try:
+            with self.db_manager.session_scope() as session:
+                for batch in _chunks(rows, batch_size):
+                    session.execute(insert(OrderModel), batch)
+
+            logger.info(f"Orders created in DB: {len(rows)}")
+            return [str(row["id"]) for row in rows]
+
+        except SQLAlchemyError as e:
+            logger.error(f"Failed to create orders in DB: {e}")
+            raise
+
+    async def create_orders_async(
+        self, orders: Sequence[Order], user_id: UUID, strategy_id: str = None, batch_size: int = DEFAULT_BATCH_SIZE
+    ) -> List[str]:
+        """複数の注文を一括保存（非同期版）"""
+        rows = [self._order_row(order, user_id, strategy_id) for order in orders]
+        try:
+            async with self.db_manager.async_session_scope() as session:
+                for batch in _chunks(rows, batch_size):
+                    await session.execute(insert(OrderModel), batch)
+
+            logger.info(f"Orders created in DB: {len(rows)}")
+            return [str(row["id"]) for row in rows]
+
+        except SQLAlchemyError as e:
+            logger.error(f"Failed to create orders in DB: {e}")
+            raise
 
     def update_order(self, order_id: str, **kwargs) -> bool:
         """
@@ -93,44 +303,40 @@ class OrderService:
         Returns:
             bool: 更新成功フラグ
         """
-        session = self.db_manager.get_session()
         try:
-            order_model = session.query(OrderModel).filter(OrderModel.id == order_id).first()
-            if not order_model:
-                logger.warning(f"Order not found for update: {order_id}")
-                return False
-
-            # 更新可能なフィールドのみ適用
-            updatable_fields = [
-                "status",
-                "filled_quantity",
-                "remaining_quantity",
-                "average_fill_price",
-                "exchange_order_id",
-                "submitted_at",
-                "filled_at",
-                "cancelled_at",
-                "error_message",
-                "error_code",
-                "fee_amount",
-                "fee_currency",
-                "metadata",
-            ]
-
-            for key, value in kwargs.items():
-                if key in updatable_fields and hasattr(order_model, key):
-                    setattr(order_model, key, value)
-
-            session.commit()
+            with self.db_manager.session_scope() as session:
+                order_model = session.execute(select(OrderModel).where(OrderModel.id == order_id)).scalar_one_or_none()
+                if not order_model:
+                    logger.warning(f"Order not found for update: {order_id}")
+                    return False
+
+                self._apply_updates(order_model, kwargs)
+
+            logger.info(f"Order updated in DB: {order_id}")
+            return True
+
+        except SQLAlchemyError as e:
+            logger.error(f"Failed to update order {order_id}: {e}")
+            return False
+
+    async def update_order_async(self, order_id: str, **kwargs) -> bool:
+        """注文を更新（非同期版）"""
+        try:
+            async with self.db_manager.async_session_scope() as session:
+                result = await session.execute(select(OrderModel).where(OrderModel.id == order_id))
+                order_model = result.scalar_one_or_none()
+                if not order_model:
+                    logger.warning(f"Order not found for update: {order_id}")
+                    return False
+
+                self._apply_updates(order_model, kwargs)
+
             logger.info(f"Order updated in DB: {order_id}")
             return True
 
         except SQLAlchemyError as e:
-            session.rollback()
             logger.error(f"Failed to update order {order_id}: {e}")
             return False
-        finally:
-            session.close()
 
     def get_order(self, order_id: str) -> Optional[Dict]:
         """
@@ -142,18 +348,26 @@ class OrderService:
         Returns:
             Optional[Dict]: 注文データ
         """
-        session = self.db_manager.get_session()
         try:
-            order_model = session.query(OrderModel).filter(OrderModel.id == order_id).first()
-            if order_model:
-                return order_model.to_dict()
+            with self.db_manager.session_scope() as session:
+                order_model = session.execute(select(OrderModel).where(OrderModel.id == order_id)).scalar_one_or_none()
+                return order_model.to_dict() if order_model else None
+
+        except SQLAlchemyError as e:
+            logger.error(f"Failed to get order {order_id}: {e}")
             return None
 
+    async def get_order_async(self, order_id: str) -> Optional[Dict]:
+        """注文を取得（非同期版）"""
+        try:
+            async with self.db_manager.async_session_scope() as session:
+                result = await session.execute(select(OrderModel).where(OrderModel.id == order_id))
+                order_model = result.scalar_one_or_none()
+                return order_model.to_dict() if order_model else None
+
         except SQLAlchemyError as e:
             logger.error(f"Failed to get order {order_id}: {e}")
             return None
-        finally:
-            session.close()
 
     def get_orders(
         self,
@@ -184,40 +398,112 @@ class OrderService:
         Returns:
             List[Dict]: 注文リスト
         """
-        session = self.db_manager.get_session()
+        statement = self._orders_statement(
+            user_id, strategy_id, exchange, symbol, status, paper_trading, limit, offset, order_by
+        )
         try:
-            query = session.query(OrderModel)
-
-            # フィルター条件
-            if user_id:
-                query = query.filter(OrderModel.user_id == user_id)
-            if strategy_id:
-                query = query.filter(OrderModel.strategy_id == strategy_id)
-            if exchange:
-                query = query.filter(OrderModel.exchange == exchange)
-            if symbol:
-                query = query.filter(OrderModel.symbol == symbol)
-            if status:
-                query = query.filter(OrderModel.status == status)
-            if paper_trading is not None:
-                query = query.filter(OrderModel.paper_trading == paper_trading)
-
-            # ソート
-            if order_by == "created_at":
-                query = query.order_by(desc(OrderModel.created_at))
-            elif order_by == "updated_at":
-                query = query.order_by(desc(OrderModel.updated_at))
-
-            # ページネーション
-            orders = query.offset(offset).limit(limit).all()
-
-            return [order.to_dict() for order in orders]
+            with self.db_manager.session_scope() as session:
+                return [order.to_dict() for order in session.execute(statement).scalars()]
 
         except SQLAlchemyError as e:
             logger.error(f"Failed to get orders: {e}")
             return []
-        finally:
-            session.close()
+
+    async def get_orders_async(
+        self,
+        user_id: UUID = None,
+        strategy_id: str = None,
+        exchange: str = None,
+        symbol: str = None,
+        status: str = None,
+        paper_trading: bool = None,
+        limit: int = 100,
+        offset: int = 0,
+        order_by: str = "created_at",
+    ) -> List[Dict]:
+        """注文リストを取得（非同期版）"""
+        statement = self._orders_statement(
+            user_id, strategy_id, exchange, symbol, status, paper_trading, limit, offset, order_by
+        )
+        try:
+            async with self.db_manager.async_session_scope() as session:
+                result = await session.execute(statement)
+                return [order.to_dict() for order in result.scalars()]
+
+        except SQLAlchemyError as e:
+            logger.error(f"Failed to get orders: {e}")
+            return []
+
+    def get_orders_page(
+        self,
+        user_id: UUID = None,
+        strategy_id: str = None,
+        exchange: str = None,
+        symbol: str = None,
+        status: str = None,
+        paper_trading: bool = None,
+        limit: int = 100,
+        cursor: str = None,
+        order_by: str = "created_at",
+    ) -> Dict:
+        """
+        注文リストをカーソル方式で取得
+
+        Args:
+            user_id: ユーザーID
+            strategy_id: 戦略ID
+            exchange: 取引所
+            symbol: シンボル
+            status: ステータス
+            paper_trading: ペーパートレーディングフラグ
+            limit: 取得件数制限
+            cursor: 前ページの next_cursor（先頭ページは None）
+            order_by: ソート順（created_at / updated_at）
+
+        Returns:
+            Dict: items（注文リスト）、next_cursor、has_more
+        """
+        if order_by not in ORDER_SORT_COLUMNS:
+            raise ValueError(f"keyset pagination requires order_by in {list(ORDER_SORT_COLUMNS)}")
+
+        statement = self._orders_statement(
+            user_id, strategy_id, exchange, symbol, status, paper_trading, limit + 1, 0, order_by, cursor
+        )
+        try:
+            with self.db_manager.session_scope() as session:
+                return _page(list(session.execute(statement).scalars()), limit, ORDER_SORT_COLUMNS[order_by])
+
+        except SQLAlchemyError as e:
+            logger.error(f"Failed to get orders page: {e}")
+            return {"items": [], "next_cursor": None, "has_more": False}
+
+    async def get_orders_page_async(
+        self,
+        user_id: UUID = None,
+        strategy_id: str = None,
+        exchange: str = None,
+        symbol: str = None,
+        status: str = None,
+        paper_trading: bool = None,
+        limit: int = 100,
+        cursor: str = None,
+        order_by: str = "created_at",
+    ) -> Dict:
+        """注文リストをカーソル方式で取得（非同期版）"""
+        if order_by not in ORDER_SORT_COLUMNS:
+            raise ValueError(f"keyset pagination requires order_by in {list(ORDER_SORT_COLUMNS)}")
+
+        statement = self._orders_statement(
+            user_id, strategy_id, exchange, symbol, status, paper_trading, limit + 1, 0, order_by, cursor
+        )
+        try:
+            async with self.db_manager.async_session_scope() as session:
+                result = await session.execute(statement)
+                return _page(list(result.scalars()), limit, ORDER_SORT_COLUMNS[order_by])
+
+        except SQLAlchemyError as e:
+            logger.error(f"Failed to get orders page: {e}")
+            return {"items": [], "next_cursor": None, "has_more": False}
 
     def get_active_orders(self, user_id: UUID = None, exchange: str = None) -> List[Dict]:
         """
@@ -234,12 +520,149 @@ class OrderService:
             user_id=user_id, exchange=exchange, status="partially_filled", limit=1000
         )
 
+    async def get_active_orders_async(self, user_id: UUID = None, exchange: str = None) -> List[Dict]:
+        """アクティブな注文を取得（非同期版）"""
+        submitted = await self.get_orders_async(user_id=user_id, exchange=exchange, status="submitted", limit=1000)
+        partially_filled = await self.get_orders_async(
+            user_id=user_id, exchange=exchange, status="partially_filled", limit=1000
+        )
+        return submitted + partially_filled
+
 
 class TradeService:
-    """取引データベースサービス"""
+    """取引データベースサービス
 
-    def __init__(self, db_manager: DatabaseManager):
+    update_rollups が有効な場合、約定の書き込みと同じ作業単位で日次ロールアップ
+    （TradingStatistics）にも加算する。
+    """
+
+    def __init__(self, db_manager: DatabaseManager, update_rollups: bool = True):
         self.db_manager = db_manager
+        self.update_rollups = update_rollups
+
+    @staticmethod
+    def _trades_statement(
+        user_id: UUID = None,
+        strategy_id: str = None,
+        exchange: str = None,
+        symbol: str = None,
+        order_id: str = None,
+        paper_trading: bool = None,
+        start_date: datetime = None,
+        end_date: datetime = None,
+        limit: int = 100,
+        offset: int = 0,
+        cursor: str = None,
+    ):
+        """取引リスト取得クエリを組み立て（cursor 指定時はキーセットページング）"""
+        statement = select(TradeModel)
+
+        # フィルター条件
+        if user_id:
+            statement = statement.where(TradeModel.user_id == user_id)
+        if strategy_id:
+            statement = statement.where(TradeModel.strategy_id == strategy_id)
+        if exchange:
+            statement = statement.where(TradeModel.exchange == exchange)
+        if symbol:
+            statement = statement.where(TradeModel.symbol == symbol)
+        if order_id:
+            statement = statement.where(TradeModel.order_id == order_id)
+        if paper_trading is not None:
+            statement = statement.where(TradeModel.paper_trading == paper_trading)
+        if start_date:
+            statement = statement.where(TradeModel.executed_at >= start_date)
+        if end_date:
+            statement = statement.where(TradeModel.executed_at <= end_date)
+
+        # ソート・ページネーション（同時刻の並びを固定するためIDを第2キーにする）
+        statement = statement.order_by(desc(TradeModel.executed_at), desc(TradeModel.id))
+        if cursor:
+            return _after_cursor(statement, TradeModel.executed_at, TradeModel.id, cursor).limit(limit)
+        return statement.offset(offset).limit(limit)
+
+    @staticmethod
+    def _position_summary_statement(user_id: UUID, paper_trading: bool):
+        """ポジション集計クエリを組み立て"""
+        net_quantity = func.sum(case((TradeModel.side == "buy", TradeModel.quantity), else_=-TradeModel.quantity))
+
+        return (
+            select(
+                TradeModel.exchange,
+                TradeModel.symbol,
+                net_quantity.label("net_quantity"),
+                func.avg(case((TradeModel.side == "buy", TradeModel.price), else_=None)).label("avg_buy_price"),
+                func.avg(case((TradeModel.side == "sell", TradeModel.price), else_=None)).label("avg_sell_price"),
+                func.sum(
+                    case(
+                        (TradeModel.side == "buy", TradeModel.quantity * TradeModel.price),
+                        else_=-TradeModel.quantity * TradeModel.price,
+                    )
+                ).label("net_value"),
+                func.count().label("trade_count"),
+                func.min(TradeModel.executed_at).label("first_trade"),
+                func.max(TradeModel.executed_at).label("last_trade"),
+            )
+            .where(and_(TradeModel.user_id == user_id, TradeModel.paper_trading == paper_trading))
+            .group_by(TradeModel.exchange, TradeModel.symbol)
+            .having(net_quantity != 0)
+        )
+
+    @staticmethod
+    def _format_position_row(row) -> Dict:
+        return {
+            "exchange": row.exchange,
+            "symbol": row.symbol,
+            "net_quantity": float(row.net_quantity) if row.net_quantity else 0,
+            "avg_buy_price": float(row.avg_buy_price) if row.avg_buy_price else None,
+            "avg_sell_price": float(row.avg_sell_price) if row.avg_sell_price else None,
+            "net_value": float(row.net_value) if row.net_value else 0,
+            "trade_count": int(row.trade_count),
+            "first_trade": row.first_trade.isoformat() if row.first_trade else None,
+            "last_trade": row.last_trade.isoformat() if row.last_trade else None,
+        }
+
+    @staticmethod
+    def _trade_row(
+        order_id: str,
+        user_id: UUID,
+        strategy_id: str,
+        exchange: str,
+        symbol: str,
+        side: str,
+        quantity: Decimal,
+        price: Decimal,
+        fee_amount: Decimal = None,
+        fee_currency: str = None,
+        exchange_trade_id: str = None,
+        exchange_order_id: str = None,
+        is_maker: bool = None,
+        paper_trading: bool = False,
+        slippage: Decimal = None,
+        metadata: Dict = None,
+        executed_at: datetime = None,
+    ) -> Dict:
+        """create_trade の引数をTradeModelの列値に変換（IDはここで採番）"""
+        return dict(
+            id=uuid4(),
+            order_id=order_id,
+            user_id=user_id,
+            strategy_id=strategy_id,
+            exchange=exchange,
+            symbol=symbol,
+            side=side,
+            quantity=quantity,
+            price=price,
+            fee_amount=fee_amount,
+            fee_currency=fee_currency,
+            exchange_trade_id=exchange_trade_id,
+            exchange_order_id=exchange_order_id,
+            is_maker=is_maker,
+            paper_trading=paper_trading,
+            slippage=slippage,
+            trade_metadata=metadata,
+            executed_at=executed_at or datetime.now(timezone.utc),
+        )
 
     def create_trade(
         self,
@@ -259,6 +682,7 @@ class TradeService:
         paper_trading: bool = False,
         slippage: Decimal = None,
         metadata: Dict = None,
+        executed_at: datetime = None,
     ) -> str:
         """
         取引をデータベースに保存
@@ -280,44 +704,146 @@ class TradeService:
             paper_trading: ペーパートレーディングフラグ
             slippage: スリッページ
             metadata: メタデータ
+            executed_at: 約定日時（省略時は現在時刻）
 
         Returns:
             str: 作成された取引のDB ID
         """
-        session = self.db_manager.get_session()
         try:
-            trade_model = TradeModel(
-                order_id=order_id,
-                user_id=user_id,
-                strategy_id=strategy_id,
-                exchange=exchange,
-                symbol=symbol,
-                side=side,
-                quantity=quantity,
-                price=price,
-                fee_amount=fee_amount,
-                fee_currency=fee_currency,
-                exchange_trade_id=exchange_trade_id,
-                exchange_order_id=exchange_order_id,
-                is_maker=is_maker,
-                paper_trading=paper_trading,
-                slippage=slippage,
-                metadata=metadata,
-                executed_at=datetime.now(timezone.utc),
-            )
+            with self.db_manager.session_scope() as session:
+                trade_model = TradeModel(
+                    **self._trade_row(
+                        order_id,
+                        user_id,
+                        strategy_id,
+                        exchange,
+                        symbol,
+                        side,
+                        quantity,
+                        price,
+                        fee_amount=fee_amount,
+                        fee_currency=fee_currency,
+                        exchange_trade_id=exchange_trade_id,
+                        exchange_order_id=exchange_order_id,
+                        is_maker=is_maker,
+                        paper_trading=paper_trading,
+                        slippage=slippage,
+                        metadata=metadata,
+                        executed_at=executed_at,
+                    )
+                )
+                session.add(trade_model)
+                session.flush()
+                trade_id = str(trade_model.id)
+                if self.update_rollups:
+                    record_trades(session, [trade_model])
+
+            logger.info(f"Trade created in DB: {trade_id}")
+            return trade_id
 
-            session.add(trade_model)
-            session.commit()
+        except SQLAlchemyError as e:
+            logger.error(f"Failed to create trade in DB: {e}")
+            raise
 
-            logger.info(f"Trade created in DB: {trade_model.id}")
-            return str(trade_model.id)
+    async def create_trade_async(
+        self,
+        order_id: str,
+        user_id: UUID,
+        strategy_id: str,
+        exchange: str,
+        symbol: str,
+        side: str,
+        quantity: Decimal,
+        price: Decimal,
+        fee_amount: Decimal = None,
+        fee_currency: str = None,
+        exchange_trade_id: str = None,
+        exchange_order_id: str = None,
+        is_maker: bool = None,
+        paper_trading: bool = False,
+        slippage: Decimal = None,
+        metadata: Dict = None,
+        executed_at: datetime = None,
+    ) -> str:
+        """取引をデータベースに保存（非同期版）"""
+        try:
+            async with self.db_manager.async_session_scope() as session:
+                trade_model = TradeModel(
+                    **self._trade_row(
+                        order_id,
+                        user_id,
+                        strategy_id,
+                        exchange,
+                        symbol,
+                        side,
+                        quantity,
+                        price,
+                        fee_amount=fee_amount,
+                        fee_currency=fee_currency,
+                        exchange_trade_id=exchange_trade_id,
+                        exchange_order_id=exchange_order_id,
+                        is_maker=is_maker,
+                        paper_trading=paper_trading,
+                        slippage=slippage,
+                        metadata=metadata,
+                        executed_at=executed_at,
+                    )
+                )
+                session.add(trade_model)
+                await session.flush()
+                trade_id = str(trade_model.id)
+                if self.update_rollups:
+                    await session.run_sync(record_trades, [trade_model])
+
+            logger.info(f"Trade created in DB: {trade_id}")
+            return trade_id
 
         except SQLAlchemyError as e:
-            session.rollback()
             logger.error(f"Failed to create trade in DB: {e}")
             raise
-        finally:
-            session.close()
+
+    def create_trades(self, trades: Sequence[Dict], batch_size: int = DEFAULT_BATCH_SIZE) -> List[str]:
+        """
+        複数の取引を一括保存（batch_size 件ずつ executemany で挿入）
+
+        Args:
+            trades: create_trade と同じキーを持つ辞書のリスト
+            batch_size: 1回の挿入あたりの件数
+
+        Returns:
+            List[str]: 作成された取引のDB ID（trades と同じ順序）
+        """
+        rows = [self._trade_row(**trade) for trade in trades]
+        try:
+            with self.db_manager.session_scope() as session:
+                for batch in _chunks(rows, batch_size):
+                    session.execute(insert(TradeModel), batch)
+                if self.update_rollups:
+                    record_trades(session, rows)
+
+            logger.info(f"Trades created in DB: {len(rows)}")
+            return [str(row["id"]) for row in rows]
+
+        except SQLAlchemyError as e:
+            logger.error(f"Failed to create trades in DB: {e}")
+            raise
+
+    async def create_trades_async(self, trades: Sequence[Dict], batch_size: int = DEFAULT_BATCH_SIZE) -> List[str]:
+        """複数の取引を一括保存（非同期版）"""
+        rows = [self._trade_row(**trade) for trade in trades]
+        try:
+            async with self.db_manager.async_session_scope() as session:
+                for batch in _chunks(rows, batch_size):
+                    await session.execute(insert(TradeModel), batch)
+                if self.update_rollups:
+                    await session.run_sync(record_trades, rows)
+
+            logger.info(f"Trades created in DB: {len(rows)}")
+            return [str(row["id"]) for row in rows]
+
+        except SQLAlchemyError as e:
+            logger.error(f"Failed to create trades in DB: {e}")
+            raise
 
     def get_trades(
         self,
@@ -350,38 +876,110 @@ class TradeService:
         Returns:
             List[Dict]: 取引リスト
         """
-        session = self.db_manager.get_session()
+        statement = self._trades_statement(
+            user_id, strategy_id, exchange, symbol, order_id, paper_trading, start_date, end_date, limit, offset
+        )
         try:
-            query = session.query(TradeModel)
-
-            # フィルター条件
-            if user_id:
-                query = query.filter(TradeModel.user_id == user_id)
-            if strategy_id:
-                query = query.filter(TradeModel.strategy_id == strategy_id)
-            if exchange:
-                query = query.filter(TradeModel.exchange == exchange)
-            if symbol:
-                query = query.filter(TradeModel.symbol == symbol)
-            if order_id:
-                query = query.filter(TradeModel.order_id == order_id)
-            if paper_trading is not None:
-                query = query.filter(TradeModel.paper_trading == paper_trading)
-            if start_date:
-                query = query.filter(TradeModel.executed_at >= start_date)
-            if end_date:
-                query = query.filter(TradeModel.executed_at <= end_date)
-
-            # ソート・ページネーション
-            trades = query.order_by(desc(TradeModel.executed_at)).offset(offset).limit(limit).all()
-
-            return [trade.to_dict() for trade in trades]
+            with self.db_manager.session_scope() as session:
+                return [trade.to_dict() for trade in session.execute(statement).scalars()]
 
         except SQLAlchemyError as e:
             logger.error(f"Failed to get trades: {e}")
             return []
-        finally:
-            session.close()
+
+    async def get_trades_async(
+        self,
+        user_id: UUID = None,
+        strategy_id: str = None,
+        exchange: str = None,
+        symbol: str = None,
+        order_id: str = None,
+        paper_trading: bool = None,
+        start_date: datetime = None,
+        end_date: datetime = None,
+        limit: int = 100,
+        offset: int = 0,
+    ) -> List[Dict]:
+        """取引リストを取得（非同期版）"""
+        statement = self._trades_statement(
+            user_id, strategy_id, exchange, symbol, order_id, paper_trading, start_date, end_date, limit, offset
+        )
+        try:
+            async with self.db_manager.async_session_scope() as session:
+                result = await session.execute(statement)
+                return [trade.to_dict() for trade in result.scalars()]
+
+        except SQLAlchemyError as e:
+            logger.error(f"Failed to get trades: {e}")
+            return []
+
+    def get_trades_page(
+        self,
+        user_id: UUID = None,
+        strategy_id: str = None,
+        exchange: str = None,
+        symbol: str = None,
+        order_id: str = None,
+        paper_trading: bool = None,
+        start_date: datetime = None,
+        end_date: datetime = None,
+        limit: int = 100,
+        cursor: str = None,
+    ) -> Dict:
+        """
+        取引リストを (executed_at, id) のカーソル方式で取得
+
+        Args:
+            user_id: ユーザーID
+            strategy_id: 戦略ID
+            exchange: 取引所
+            symbol: シンボル
+            order_id: 注文ID
+            paper_trading: ペーパートレーディングフラグ
+            start_date: 開始日時
+            end_date: 終了日時
+            limit: 取得件数制限
+            cursor: 前ページの next_cursor（先頭ページは None）
+
+        Returns:
+            Dict: items（取引リスト）、next_cursor、has_more
+        """
+        statement = self._trades_statement(
+            user_id, strategy_id, exchange, symbol, order_id, paper_trading, start_date, end_date, limit + 1, 0, cursor
+        )
+        try:
+            with self.db_manager.session_scope() as session:
+                return _page(list(session.execute(statement).scalars()), limit, "executed_at")
+
+        except SQLAlchemyError as e:
+            logger.error(f"Failed to get trades page: {e}")
+            return {"items": [], "next_cursor": None, "has_more": False}
+
+    async def get_trades_page_async(
+        self,
+        user_id: UUID = None,
+        strategy_id: str = None,
+        exchange: str = None,
+        symbol: str = None,
+        order_id: str = None,
+        paper_trading: bool = None,
+        start_date: datetime = None,
+        end_date: datetime = None,
+        limit: int = 100,
+        cursor: str = None,
+    ) -> Dict:
+        """取引リストをカーソル方式で取得（非同期版）"""
+        statement = self._trades_statement(
+            user_id, strategy_id, exchange, symbol, order_id, paper_trading, start_date, end_date, limit + 1, 0, cursor
+        )
+        try:
+            async with self.db_manager.async_session_scope() as session:
+                result = await session.execute(statement)
+                return _page(list(result.scalars()), limit, "executed_at")
+
+        except SQLAlchemyError as e:
+            logger.error(f"Failed to get trades page: {e}")
+            return {"items": [], "next_cursor": None, "has_more": False}
 
     def get_position_summary(self, user_id: UUID, paper_trading: bool = False) -> List[Dict]:
         """
@@ -394,70 +992,184 @@ class TradeService:
         Returns:
             List[Dict]: ポジション集計リスト
         """
-        session = self.db_manager.get_session()
+        statement = self._position_summary_statement(user_id, paper_trading)
         try:
-            # SQLによる集計クエリ
-            query = (
-                session.query(
-                    TradeModel.exchange,
-                    TradeModel.symbol,
-                    func.sum(
-                        func.case((TradeModel.side == "buy", TradeModel.quantity), else_=-TradeModel.quantity)
-                    ).label("net_quantity"),
-                    func.avg(func.case((TradeModel.side == "buy", TradeModel.price), else_=None)).label(
-                        "avg_buy_price"
-                    ),
-                    func.avg(func.case((TradeModel.side == "sell", TradeModel.price), else_=None)).label(
-                        "avg_sell_price"
-                    ),
-                    func.sum(
-                        func.case(
-                            (TradeModel.side == "buy", TradeModel.quantity * TradeModel.price),
-                            else_=-TradeModel.quantity * TradeModel.price,
-                        )
-                    ).label("net_value"),
-                    func.count().label("trade_count"),
-                    func.min(TradeModel.executed_at).label("first_trade"),
-                    func.max(TradeModel.executed_at).label("last_trade"),
-                )
-                .filter(and_(TradeModel.user_id == user_id, TradeModel.paper_trading == paper_trading))
-                .group_by(TradeModel.exchange, TradeModel.symbol)
-                .having(
-                    func.sum(func.case((TradeModel.side == "buy", TradeModel.quantity), else_=-TradeModel.quantity))
-                    != 0
-                )
-            )
+            with self.db_manager.session_scope() as session:
+                return [self._format_position_row(row) for row in session.execute(statement)]
 
-            results = []
-            for row in query.all():
-                results.append(
-                    {
-                        "exchange": row.exchange,
-                        "symbol": row.symbol,
-                        "net_quantity": float(row.net_quantity) if row.net_quantity else 0,
-                        "avg_buy_price": float(row.avg_buy_price) if row.avg_buy_price else None,
-                        "avg_sell_price": float(row.avg_sell_price) if row.avg_sell_price else None,
-                        "net_value": float(row.net_value) if row.net_value else 0,
-                        "trade_count": int(row.trade_count),
-                        "first_trade": row.first_trade.isoformat() if row.first_trade else None,
-                        "last_trade": row.last_trade.isoformat() if row.last_trade else None,
-                    }
-                )
+        except SQLAlchemyError as e:
+            logger.error(f"Failed to get position summary: {e}")
+            return []
 
-            return results
+    async def get_position_summary_async(self, user_id: UUID, paper_trading: bool = False) -> List[Dict]:
+        """ポジション集計を取得（非同期版）"""
+        statement = self._position_summary_statement(user_id, paper_trading)
+        try:
+            async with self.db_manager.async_session_scope() as session:
+                result = await session.execute(statement)
+                return [self._format_position_row(row) for row in result]
 
         except SQLAlchemyError as e:
             logger.error(f"Failed to get position summary: {e}")
             return []
-        finally:
-            session.close()
 
 
 class AnalyticsService:
-    """分析・統計サービス"""
+    """分析・統計サービス
 
-    def __init__(self, db_manager: DatabaseManager):
+    use_rollups が有効な場合は日次ロールアップ（TradingStatistics）を読み、
+    無効な場合は約定テーブルを集計する。
+    """
+
+    def __init__(self, db_manager: DatabaseManager, use_rollups: bool = True):
         self.db_manager = db_manager
+        self.use_rollups = use_rollups
+
+    @staticmethod
+    def _rollup_performance(aggregates: Dict) -> Tuple[SimpleNamespace, List[SimpleNamespace]]:
+        """日次ロールアップを集計クエリと同じ形の行に変換"""
+        total = DailyAggregate()
+        daily_pnl: Dict = {}
+        for (trade_date, _symbol), aggregate in aggregates.items():
+            total.merge(aggregate)
+            daily_pnl[trade_date] = daily_pnl.get(trade_date, 0) + aggregate.daily_pnl
+
+        stats = SimpleNamespace(
+            total_trades=total.trade_count,
+            total_volume=total.total_volume,
+            total_fees=total.total_fees,
+            avg_price=total.avg_price,
+            min_price=total.min_price,
+            max_price=total.max_price,
+            buy_count=total.buy_count,
+            sell_count=total.sell_count,
+        )
+        daily_rows = [
+            SimpleNamespace(trade_date=trade_date, daily_pnl=pnl) for trade_date, pnl in sorted(daily_pnl.items())
+        ]
+        return stats, daily_rows
+
+    @staticmethod
+    def _rollup_concentration(aggregates: Dict) -> List[SimpleNamespace]:
+        """日次ロールアップをシンボル別取引量の行に変換"""
+        volumes: Dict[str, Decimal] = {}
+        for (_trade_date, symbol), aggregate in aggregates.items():
+            volumes[symbol] = volumes.get(symbol, 0) + aggregate.total_volume
+
+        return [SimpleNamespace(symbol=symbol, symbol_volume=volume) for symbol, volume in sorted(volumes.items())]
+
+    @staticmethod
+    def _performance_statements(
+        user_id: UUID,
+        strategy_id: str = None,
+        start_date: datetime = None,
+        end_date: datetime = None,
+        paper_trading: bool = False,
+    ):
+        """基本統計・日次損益クエリを組み立て"""
+        # フィルター条件
+        filters = [TradeModel.user_id == user_id, TradeModel.paper_trading == paper_trading]
+
+        if strategy_id:
+            filters.append(TradeModel.strategy_id == strategy_id)
+        if start_date:
+            filters.append(TradeModel.executed_at >= start_date)
+        if end_date:
+            filters.append(TradeModel.executed_at <= end_date)
+
+        # 基本統計
+        stats_statement = select(
+            func.count().label("total_trades"),
+            func.sum(TradeModel.quantity * TradeModel.price).label("total_volume"),
+            func.sum(TradeModel.fee_amount).label("total_fees"),
+            func.avg(TradeModel.price).label("avg_price"),
+            func.min(TradeModel.price).label("min_price"),
+            func.max(TradeModel.price).label("max_price"),
+            func.count(case((TradeModel.side == "buy", 1))).label("buy_count"),
+            func.count(case((TradeModel.side == "sell", 1))).label("sell_count"),
+        ).where(and_(*filters))
+
+        # 日次損益（簡略化版）
+        fee = func.coalesce(TradeModel.fee_amount, 0)
+        daily_pnl_statement = (
+            select(
+                func.date(TradeModel.executed_at).label("trade_date"),
+                func.sum(
+                    case(
+                        (TradeModel.side == "sell", (TradeModel.quantity * TradeModel.price) - fee),
+                        else_=-(TradeModel.quantity * TradeModel.price) - fee,
+                    )
+                ).label("daily_pnl"),
+            )
+            .where(and_(*filters))
+            .group_by(func.date(TradeModel.executed_at))
+            .order_by(func.date(TradeModel.executed_at))
+        )
+
+        return stats_statement, daily_pnl_statement
+
+    @staticmethod
+    def _format_performance(stats, daily_rows) -> Dict:
+        """集計結果をパフォーマンス指標にまとめる"""
+        daily_results = [
+            {"date": _format_date(row.trade_date), "pnl": float(row.daily_pnl) if row.daily_pnl else 0}
+            for row in daily_rows
+        ]
+
+        return {
+            "total_trades": int(stats.total_trades) if stats.total_trades else 0,
+            "total_volume": float(stats.total_volume) if stats.total_volume else 0,
+            "total_fees": float(stats.total_fees) if stats.total_fees else 0,
+            "avg_price": float(stats.avg_price) if stats.avg_price else 0,
+            "min_price": float(stats.min_price) if stats.min_price else 0,
+            "max_price": float(stats.max_price) if stats.max_price else 0,
+            "buy_count": int(stats.buy_count) if stats.buy_count else 0,
+            "sell_count": int(stats.sell_count) if stats.sell_count else 0,
+            "daily_pnl": daily_results,
+            "total_pnl": sum(day["pnl"] for day in daily_results),
+        }
+
+    @staticmethod
+    def _concentration_statement(
+        user_id: UUID, start_date: datetime = None, end_date: datetime = None, paper_trading: bool = False
+    ):
+        """シンボル別取引量クエリを組み立て"""
+        filters = [TradeModel.user_id == user_id, TradeModel.paper_trading == paper_trading]
+        if start_date:
+            filters.append(TradeModel.executed_at >= start_date)
+        if end_date:
+            filters.append(TradeModel.executed_at <= end_date)
+
+        return (
+            select(TradeModel.symbol, func.sum(TradeModel.quantity * TradeModel.price).label("symbol_volume"))
+            .where(and_(*filters))
+            .group_by(TradeModel.symbol)
+        )
+
+    @staticmethod
+    def _format_risk_metrics(rows) -> Dict:
+        """シンボル別取引量から集中度リスクを計算"""
+        symbol_volumes = []
+        total_volume = 0
+        for row in rows:
+            volume = float(row.symbol_volume) if row.symbol_volume else 0
+            symbol_volumes.append({"symbol": row.symbol, "volume": volume})
+            total_volume += volume
+
+        # 集中度計算
+        concentrations = []
+        max_concentration = 0
+        for item in symbol_volumes:
+            concentration = item["volume"] / total_volume if total_volume > 0 else 0
+            concentrations.append({"symbol": item["symbol"], "concentration": concentration})
+            max_concentration = max(max_concentration, concentration)
+
+        return {
+            "total_volume": total_volume,
+            "symbol_concentrations": concentrations,
+            "max_concentration": max_concentration,
+            "diversification_ratio": 1.0 / len(concentrations) if concentrations else 0,
+        }
 
     def get_trading_performance(
         self,
@@ -480,81 +1192,50 @@ class AnalyticsService:
         Returns:
             Dict: パフォーマンス指標
         """
-        session = self.db_manager.get_session()
+        stats_statement, daily_pnl_statement = self._performance_statements(
+            user_id, strategy_id, start_date, end_date, paper_trading
+        )
         try:
-            # フィルター条件
-            filters = [TradeModel.user_id == user_id, TradeModel.paper_trading == paper_trading]
-
-            if strategy_id:
-                filters.append(TradeModel.strategy_id == strategy_id)
-            if start_date:
-                filters.append(TradeModel.executed_at >= start_date)
-            if end_date:
-                filters.append(TradeModel.executed_at <= end_date)
-
-            # 基本統計
-            stats_query = session.query(
-                func.count().label("total_trades"),
-                func.sum(TradeModel.quantity * TradeModel.price).label("total_volume"),
-                func.sum(TradeModel.fee_amount).label("total_fees"),
-                func.avg(TradeModel.price).label("avg_price"),
-                func.min(TradeModel.price).label("min_price"),
-                func.max(TradeModel.price).label("max_price"),
-                func.count(func.case((TradeModel.side == "buy", 1))).label("buy_count"),
-                func.count(func.case((TradeModel.side == "sell", 1))).label("sell_count"),
-            ).filter(and_(*filters))
-
-            stats = stats_query.first()
-
-            # 日次損益（簡略化版）
-            daily_pnl_query = (
-                session.query(
-                    func.date(TradeModel.executed_at).label("trade_date"),
-                    func.sum(
-                        func.case(
-                            (
-                                TradeModel.side == "sell",
-                                (TradeModel.quantity * TradeModel.price) - TradeModel.fee_amount,
-                            ),
-                            else_=-(TradeModel.quantity * TradeModel.price) - TradeModel.fee_amount,
-                        )
-                    ).label("daily_pnl"),
-                )
-                .filter(and_(*filters))
-                .group_by(func.date(TradeModel.executed_at))
-                .order_by(func.date(TradeModel.executed_at))
-            )
+            with self.db_manager.session_scope() as session:
+                if self.use_rollups:
+                    aggregates = load_aggregates(session, user_id, strategy_id, start_date, end_date, paper_trading)
+                    stats, daily_rows = self._rollup_performance(aggregates)
+                else:
+                    stats = session.execute(stats_statement).one()
+                    daily_rows = session.execute(daily_pnl_statement).all()
+            return self._format_performance(stats, daily_rows)
 
-            daily_results = []
-            for row in daily_pnl_query.all():
-                daily_results.append(
-                    {
-                        "date": row.trade_date.isoformat() if row.trade_date else None,
-                        "pnl": float(row.daily_pnl) if row.daily_pnl else 0,
-                    }
-                )
+        except SQLAlchemyError as e:
+            logger.error(f"Failed to get trading performance: {e}")
+            return {}
 
-            # 結果をまとめる
-            performance = {
-                "total_trades": int(stats.total_trades) if stats.total_trades else 0,
-                "total_volume": float(stats.total_volume) if stats.total_volume else 0,
-                "total_fees": float(stats.total_fees) if stats.total_fees else 0,
-                "avg_price": float(stats.avg_price) if stats.avg_price else 0,
-                "min_price": float(stats.min_price) if stats.min_price else 0,
-                "max_price": float(stats.max_price) if stats.max_price else 0,
-                "buy_count": int(stats.buy_count) if stats.buy_count else 0,
-                "sell_count": int(stats.sell_count) if stats.sell_count else 0,
-                "daily_pnl": daily_results,
-                "total_pnl": sum(day["pnl"] for day in daily_results),
-            }
-
-            return performance
+    async def get_trading_performance_async(
+        self,
+        user_id: UUID,
+        strategy_id: str = None,
+        start_date: datetime = None,
+        end_date: datetime = None,
+        paper_trading: bool = False,
+    ) -> Dict:
+        """取引パフォーマンスを取得（非同期版）"""
+        stats_statement, daily_pnl_statement = self._performance_statements(
+            user_id, strategy_id, start_date, end_date, paper_trading
+        )
+        try:
+            async with self.db_manager.async_session_scope() as session:
+                if self.use_rollups:
+                    aggregates = await session.run_sync(
+                        load_aggregates, user_id, strategy_id, start_date, end_date, paper_trading
+                    )
+                    stats, daily_rows = self._rollup_performance(aggregates)
+                else:
+                    stats = (await session.execute(stats_statement)).one()
+                    daily_rows = (await session.execute(daily_pnl_statement)).all()
+            return self._format_performance(stats, daily_rows)
 
         except SQLAlchemyError as e:
             logger.error(f"Failed to get trading performance: {e}")
             return {}
-        finally:
-            session.close()
 
     def get_risk_metrics(
         self, user_id: UUID, start_date: datetime = None, end_date: datetime = None, paper_trading: bool = False
@@ -571,59 +1252,47 @@ class AnalyticsService:
         Returns:
             Dict: リスクメトリクス
         """
-        session = self.db_manager.get_session()
+        statement = self._concentration_statement(user_id, start_date, end_date, paper_trading)
         try:
-            # 集中度リスク計算
-            concentration_query = (
-                session.query(
-                    TradeModel.symbol, func.sum(TradeModel.quantity * TradeModel.price).label("symbol_volume")
-                )
-                .filter(
-                    and_(
-                        TradeModel.user_id == user_id,
-                        TradeModel.paper_trading == paper_trading,
-                        TradeModel.executed_at >= start_date if start_date else True,
-                        TradeModel.executed_at <= end_date if end_date else True,
-                    )
-                )
-                .group_by(TradeModel.symbol)
-            )
+            with self.db_manager.session_scope() as session:
+                if self.use_rollups:
+                    aggregates = load_aggregates(session, user_id, None, start_date, end_date, paper_trading)
+                    rows = self._rollup_concentration(aggregates)
+                else:
+                    rows = session.execute(statement).all()
+            return self._format_risk_metrics(rows)
+
+        except SQLAlchemyError as e:
+            logger.error(f"Failed to get risk metrics: {e}")
+            return {}
 
-            symbol_volumes = []
-            total_volume = 0
-            for row in concentration_query.all():
-                volume = float(row.symbol_volume) if row.symbol_volume else 0
-                symbol_volumes.append({"symbol": row.symbol, "volume": volume})
-                total_volume += volume
-
-            # 集中度計算
-            concentrations = []
-            max_concentration = 0
-            for item in symbol_volumes:
-                concentration = item["volume"] / total_volume if total_volume > 0 else 0
-                concentrations.append({"symbol": item["symbol"], "concentration": concentration})
-                max_concentration = max(max_concentration, concentration)
-
-            return {
-                "total_volume": total_volume,
-                "symbol_concentrations": concentrations,
-                "max_concentration": max_concentration,
-                "diversification_ratio": 1.0 / len(concentrations) if concentrations else 0,
-            }
+    async def get_risk_metrics_async(
+        self, user_id: UUID, start_date: datetime = None, end_date: datetime = None, paper_trading: bool = False
+    ) -> Dict:
+        """リスクメトリクスを取得（非同期版）"""
+        statement = self._concentration_statement(user_id, start_date, end_date, paper_trading)
+        try:
+            async with self.db_manager.async_session_scope() as session:
+                if self.use_rollups:
+                    aggregates = await session.run_sync(
+                        load_aggregates, user_id, None, start_date, end_date, paper_trading
+                    )
+                    rows = self._rollup_concentration(aggregates)
+                else:
+                    rows = (await session.execute(statement)).all()
+            return self._format_risk_metrics(rows)
 
         except SQLAlchemyError as e:
             logger.error(f"Failed to get risk metrics: {e}")
             return {}
-        finally:
-            session.close()
 
 
 # サービスファクトリ
 class DatabaseServiceFactory:
     """データベースサービスファクトリ"""
 
-    def __init__(self, database_url: str):
-        self.db_manager = DatabaseManager(database_url)
+    def __init__(self, database_url: str, **pool_options):
+        self.db_manager = DatabaseManager(database_url, **pool_options)
         self.order_service = OrderService(self.db_manager)
         self.trade_service = TradeService(self.db_manager)
         self.analytics_service = AnalyticsService(self.db_manager)
@@ -633,6 +1302,16 @@ class DatabaseServiceFactory:
         self.db_manager.create_tables()
         logger.info("Database initialized successfully")
 
+    async def initialize_database_async(self):
+        """データベースを初期化（非同期エンジン経由）"""
+        await self.db_manager.create_tables_async()
+        logger.info("Database initialized successfully")
+
+    async def close(self):
+        """接続プールを解放"""
+        await self.db_manager.dispose_async()
+        self.db_manager.dispose()
+
     def get_order_service(self) -> OrderService:
         """注文サービスを取得"""
         return self.order_service
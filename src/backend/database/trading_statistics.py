@@ -0,0 +1,372 @@
+"""
+取引統計の日次ロールアップ
+約定の書き込みと同じ作業単位で (ユーザー, 戦略, 取引所, シンボル, 日) ごとの集計を加算し、
+パフォーマンス集計は取引履歴全体ではなく日次集計を読む
+"""
+
+import argparse
+import logging
+from collections.abc import Mapping
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import case, delete, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from .models import DatabaseManager, TradeModel, TradingStatistics
+
+logger = logging.getLogger(__name__)
+
+# (user_id, strategy_id, exchange, symbol, paper_trading, trade_date)
+# 戦略なしの strategy_id は TradingStatistics と同じく空文字
+RollupKey = Tuple[UUID, str, str, str, bool, date]
+
+# 約定から集計に必要な列
+TRADE_COLUMNS = (
+    "user_id",
+    "strategy_id",
+    "exchange",
+    "symbol",
+    "paper_trading",
+    "executed_at",
+    "side",
+    "quantity",
+    "price",
+    "fee_amount",
+)
+
+
+def _as_utc(value: datetime) -> datetime:
+    """タイムゾーンなしの日時はUTCとみなす"""
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def _day_start(day: date) -> datetime:
+    return datetime.combine(day, time.min, tzinfo=timezone.utc)
+
+
+def _get(trade: Any, name: str):
+    return trade[name] if isinstance(trade, Mapping) else getattr(trade, name)
+
+
+@dataclass
+class DailyAggregate:
+    """1キー・1日分の集計値"""
+
+    trade_count: int = 0
+    total_volume: Decimal = Decimal("0")
+    total_fees: Decimal = Decimal("0")
+    price_sum: Decimal = Decimal("0")
+    min_price: Optional[Decimal] = None
+    max_price: Optional[Decimal] = None
+    buy_count: int = 0
+    sell_count: int = 0
+    daily_pnl: Decimal = Decimal("0")
+
+    def add_trade(self, side: str, quantity: Decimal, price: Decimal, fee: Optional[Decimal]):
+        """約定1件を加算（損益は売りを入金、買いを出金とした簡略版）"""
+        quantity, price, fee = Decimal(str(quantity)), Decimal(str(price)), Decimal(str(fee or 0))
+        notional = quantity * price
+
+        self.trade_count += 1
+        self.total_volume += notional
+        self.total_fees += fee
+        self.price_sum += price
+        self.min_price = price if self.min_price is None else min(self.min_price, price)
+        self.max_price = price if self.max_price is None else max(self.max_price, price)
+        if side == "buy":
+            self.buy_count += 1
+            self.daily_pnl += -notional - fee
+        else:
+            self.sell_count += 1
+            self.daily_pnl += notional - fee
+
+    def merge(self, other: "DailyAggregate"):
+        """別の集計値を加算"""
+        self.trade_count += other.trade_count
+        self.total_volume += other.total_volume
+        self.total_fees += other.total_fees
+        self.price_sum += other.price_sum
+        if other.min_price is not None:
+            self.min_price = other.min_price if self.min_price is None else min(self.min_price, other.min_price)
+        if other.max_price is not None:
+            self.max_price = other.max_price if self.max_price is None else max(self.max_price, other.max_price)
+        self.buy_count += other.buy_count
+        self.sell_count += other.sell_count
+        self.daily_pnl += other.daily_pnl
+
+    @property
+    def avg_price(self) -> Optional[Decimal]:
+        return self.price_sum / self.trade_count if self.trade_count else None
+
+    @classmethod
+    def from_row(cls, row: TradingStatistics) -> "DailyAggregate":
+        trade_count = int(row.trade_count or 0)
+        price_sum = row.price_sum
+        if price_sum is None:
+            # price_sum 導入前の行は平均価格から復元
+            price_sum = (row.avg_price or Decimal("0")) * trade_count
+        return cls(
+            trade_count=trade_count,
+            total_volume=Decimal(row.total_volume or 0),
+            total_fees=Decimal(row.total_fees or 0),
+            price_sum=Decimal(price_sum),
+            min_price=row.min_price,
+            max_price=row.max_price,
+            buy_count=int(row.buy_count or 0),
+            sell_count=int(row.sell_count or 0),
+            daily_pnl=Decimal(row.daily_pnl or 0),
+        )
+
+
+def aggregate_trades(trades: Iterable[Any]) -> Dict[RollupKey, DailyAggregate]:
+    """約定（TradeModel または同じキーを持つ辞書）をキー・日ごとに集計"""
+    aggregates: Dict[RollupKey, DailyAggregate] = {}
+    for trade in trades:
+        executed_at = _get(trade, "executed_at") or datetime.now(timezone.utc)
+        key = (
+            _get(trade, "user_id"),
+            _get(trade, "strategy_id") or "",
+            _get(trade, "exchange"),
+            _get(trade, "symbol"),
+            bool(_get(trade, "paper_trading")),
+            _as_utc(executed_at).date(),
+        )
+        aggregate = aggregates.get(key)
+        if aggregate is None:
+            aggregate = aggregates[key] = DailyAggregate()
+        aggregate.add_trade(
+            _get(trade, "side"), _get(trade, "quantity"), _get(trade, "price"), _get(trade, "fee_amount")
+        )
+    return aggregates
+
+
+def _upsert_statement(session: Session):
+    """方言ごとの INSERT ... ON CONFLICT 文"""
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(TradingStatistics)
+    if dialect == "sqlite":
+        return sqlite.insert(TradingStatistics)
+    raise NotImplementedError(f"Trading statistics upsert is not supported on {dialect}")
+
+
+def apply_aggregates(session: Session, aggregates: Dict[RollupKey, DailyAggregate]):
+    """集計値を日次ロールアップに加算
+
+    一意キー (ユーザー, 戦略, 取引所, シンボル, ペーパー, 日) への INSERT ... ON CONFLICT DO UPDATE で
+    行の作成と加算を1文で行うため、同じキーへ同時に書き込んでも行は重複せず値も失われない。
+    """
+    if not aggregates:
+        return
+
+    stats = TradingStatistics
+    statement = _upsert_statement(session)
+    new = statement.excluded
+
+    new_count = stats.trade_count + new.trade_count
+    new_price_sum = case((stats.price_sum.is_(None), stats.avg_price * stats.trade_count), else_=stats.price_sum)
+    new_price_sum = new_price_sum + new.price_sum
+
+    statement = statement.on_conflict_do_update(
+        index_elements=[
+            stats.user_id,
+            stats.strategy_id,
+            stats.exchange,
+            stats.symbol,
+            stats.paper_trading,
+            stats.trade_date,
+        ],
+        set_={
+            "trade_count": new_count,
+            "total_volume": stats.total_volume + new.total_volume,
+            "total_fees": stats.total_fees + new.total_fees,
+            "price_sum": new_price_sum,
+            "avg_price": new_price_sum / new_count,
+            "min_price": case(
+                (stats.min_price.is_(None), new.min_price),
+                (stats.min_price > new.min_price, new.min_price),
+                else_=stats.min_price,
+            ),
+            "max_price": case(
+                (stats.max_price.is_(None), new.max_price),
+                (stats.max_price < new.max_price, new.max_price),
+                else_=stats.max_price,
+            ),
+            "buy_count": stats.buy_count + new.buy_count,
+            "sell_count": stats.sell_count + new.sell_count,
+            "daily_pnl": func.coalesce(stats.daily_pnl, 0) + new.daily_pnl,
+            "updated_at": func.now(),
+        },
+    )
+
+    rows = []
+    for (user_id, strategy_id, exchange, symbol, paper_trading, trade_date), aggregate in aggregates.items():
+        rows.append(
+            {
+                "user_id": user_id,
+                "strategy_id": strategy_id,
+                "exchange": exchange,
+                "symbol": symbol,
+                "paper_trading": paper_trading,
+                "trade_date": _day_start(trade_date),
+                "trade_count": aggregate.trade_count,
+                "total_volume": aggregate.total_volume,
+                "total_fees": aggregate.total_fees,
+                "price_sum": aggregate.price_sum,
+                "avg_price": aggregate.avg_price,
+                "min_price": aggregate.min_price,
+                "max_price": aggregate.max_price,
+                "buy_count": aggregate.buy_count,
+                "sell_count": aggregate.sell_count,
+                "daily_pnl": aggregate.daily_pnl,
+            }
+        )
+    session.execute(statement, rows)
+
+
+def record_trades(session: Session, trades: Iterable[Any]):
+    """約定を日次ロールアップに反映（約定の書き込みと同じセッションで呼ぶ）"""
+    apply_aggregates(session, aggregate_trades(trades))
+
+
+def _split_range(
+    start_date: Optional[datetime], end_date: Optional[datetime]
+) -> Tuple[Optional[date], Optional[date], List[Tuple[datetime, datetime, bool]]]:
+    """期間を「日次ロールアップで読む日」と「約定を直接読む端の区間」に分ける
+
+    Returns:
+        (ロールアップ開始日, ロールアップ終了日（含まない）, [(開始, 終了, 終了を含むか)])
+    """
+    start = _as_utc(start_date) if start_date else None
+    end = _as_utc(end_date) if end_date else None
+
+    if start and end and start.date() == end.date():
+        return start.date(), start.date(), [(start, end, True)]
+
+    raw_ranges = []
+    rollup_from = None
+    if start:
+        rollup_from = start.date()
+        if start != _day_start(rollup_from):
+            rollup_from += timedelta(days=1)
+            raw_ranges.append((start, _day_start(rollup_from), False))
+
+    rollup_to = None
+    if end:
+        # 終了日は途中までしか含まれないため約定を直接読む
+        rollup_to = end.date()
+        raw_ranges.append((_day_start(rollup_to), end, True))
+
+    return rollup_from, rollup_to, raw_ranges
+
+
+def load_aggregates(
+    session: Session,
+    user_id: UUID,
+    strategy_id: str = None,
+    start_date: datetime = None,
+    end_date: datetime = None,
+    paper_trading: bool = False,
+) -> Dict[Tuple[date, str], DailyAggregate]:
+    """期間内の (日, シンボル) ごとの集計を取得
+
+    期間内に丸ごと含まれる日は日次ロールアップから、期間の端で日の途中から・途中までの
+    区間は約定から集計するため、読み出し量は約定件数ではなく日数×シンボル数に比例する。
+    """
+    rollup_from, rollup_to, raw_ranges = _split_range(start_date, end_date)
+    result: Dict[Tuple[date, str], DailyAggregate] = {}
+
+    def add(trade_date: date, symbol: str, aggregate: DailyAggregate):
+        current = result.get((trade_date, symbol))
+        if current is None:
+            result[(trade_date, symbol)] = aggregate
+        else:
+            current.merge(aggregate)
+
+    statement = select(TradingStatistics).where(
+        TradingStatistics.user_id == user_id, TradingStatistics.paper_trading == paper_trading
+    )
+    if strategy_id:
+        statement = statement.where(TradingStatistics.strategy_id == strategy_id)
+    if rollup_from:
+        statement = statement.where(TradingStatistics.trade_date >= _day_start(rollup_from))
+    if rollup_to:
+        statement = statement.where(TradingStatistics.trade_date < _day_start(rollup_to))
+
+    if rollup_from is None or rollup_to is None or rollup_from < rollup_to:
+        for row in session.execute(statement).scalars():
+            add(_as_utc(row.trade_date).date(), row.symbol, DailyAggregate.from_row(row))
+
+    for range_start, range_end, inclusive in raw_ranges:
+        trade_statement = select(*(getattr(TradeModel, column) for column in TRADE_COLUMNS)).where(
+            TradeModel.user_id == user_id,
+            TradeModel.paper_trading == paper_trading,
+            TradeModel.executed_at >= range_start,
+            TradeModel.executed_at <= range_end if inclusive else TradeModel.executed_at < range_end,
+        )
+        if strategy_id:
+            trade_statement = trade_statement.where(TradeModel.strategy_id == strategy_id)
+
+        for key, aggregate in aggregate_trades(session.execute(trade_statement).mappings()).items():
+            add(key[5], key[3], aggregate)
+
+    return result
+
+
+def backfill(db_manager: DatabaseManager, user_id: UUID = None, batch_size: int = 5000) -> int:
+    """既存の約定から日次ロールアップを作り直す
+
+    Args:
+        db_manager: データベースマネージャー
+        user_id: 対象ユーザー（省略時は全ユーザー）
+        batch_size: 約定を読み出す単位
+
+    Returns:
+        int: 集計した約定件数
+    """
+    trade_count = 0
+    aggregates: Dict[RollupKey, DailyAggregate] = {}
+
+    with db_manager.session_scope() as session:
+        statement = select(*(getattr(TradeModel, column) for column in TRADE_COLUMNS))
+        clear_statement = delete(TradingStatistics)
+        if user_id:
+            statement = statement.where(TradeModel.user_id == user_id)
+            clear_statement = clear_statement.where(TradingStatistics.user_id == user_id)
+
+        for partition in session.execute(statement.execution_options(yield_per=batch_size)).mappings().partitions():
+            for key, aggregate in aggregate_trades(partition).items():
+                if key in aggregates:
+                    aggregates[key].merge(aggregate)
+                else:
+                    aggregates[key] = aggregate
+            trade_count += len(partition)
+
+        session.execute(clear_statement)
+        apply_aggregates(session, aggregates)
+
+    logger.info(f"Trading statistics backfilled: trades={trade_count}, rollups={len(aggregates)}")
+    return trade_count
+
+
+def main(argv: List[str] = None):
+    """日次ロールアップのバックフィルコマンド"""
+    parser = argparse.ArgumentParser(description="取引統計の日次ロールアップを約定履歴から作り直す")
+    parser.add_argument("--database-url", required=True, help="データベースURL")
+    parser.add_argument("--user-id", type=UUID, default=None, help="対象ユーザーID（省略時は全ユーザー）")
+    parser.add_argument("--batch-size", type=int, default=5000, help="約定を読み出す単位")
+    args = parser.parse_args(argv)
+
+    db_manager = DatabaseManager(args.database_url)
+    db_manager.create_tables()
+    count = backfill(db_manager, user_id=args.user_id, batch_size=args.batch_size)
+    print(f"backfilled {count} trades")
+
+
+if __name__ == "__main__":
+    main()
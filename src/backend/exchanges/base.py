@@ -101,6 +101,9 @@ class AbstractExchangeAdapter(AbstractTradingAdapter if AbstractTradingAdapter e
         self.sandbox = sandbox
         self.name = self.__class__.__name__.replace("Adapter", "").lower()
 
+        # ローカル板（OrderBookManager）が設定されていれば板照会に使用
+        self.order_book_manager = None
+
     @abstractmethod
     async def fetch_ohlcv(
         self,
@@ -152,6 +155,12 @@ class AbstractExchangeAdapter(AbstractTradingAdapter if AbstractTradingAdapter e
 
     async def get_order_book(self, symbol: str, limit: int = 20) -> Dict[str, Any]:
         """板情報を取得（デフォルト実装）"""
+        # 同期済みのローカル板があればRESTを使わずに返す
+        if self.order_book_manager is not None:
+            book = self.order_book_manager.get_book(symbol)
+            if book is not None:
+                return book.to_dict(limit)
+
         # デフォルトでは空の板情報を返す（各取引所で実装をオーバーライド）
         return {"bids": [], "asks": [], "timestamp": datetime.now().isoformat()}
 
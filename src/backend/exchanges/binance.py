@@ -1,7 +1,7 @@
 import asyncio
 import logging
 from datetime import datetime, timezone
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional
 
 import ccxt
 from tenacity import (
@@ -238,6 +238,41 @@ class BinanceAdapter(AbstractExchangeAdapter):
             logger.error(f"Error fetching ticker for {symbol}: {e}")
             raise ExchangeError(f"Unexpected error: {e}")
 
+    async def get_order_book(self, symbol: str, limit: int = 20) -> Dict[str, Any]:
+        """板情報を取得（同期済みのローカル板を優先し、なければRESTで取得）"""
+        if self.order_book_manager is not None:
+            book = self.order_book_manager.get_book(symbol)
+            if book is not None:
+                return book.to_dict(limit)
+
+        try:
+            normalized_symbol = self.normalize_symbol(symbol)
+
+            order_book = await asyncio.get_event_loop().run_in_executor(
+                None, lambda: self.exchange.fetch_order_book(normalized_symbol, limit)
+            )
+
+            timestamp = order_book.get("timestamp")
+            return {
+                "symbol": normalized_symbol,
+                "bids": [[float(price), float(size)] for price, size, *_ in order_book.get("bids", [])],
+                "asks": [[float(price), float(size)] for price, size, *_ in order_book.get("asks", [])],
+                "last_update_id": order_book.get("nonce"),
+                "timestamp": (
+                    datetime.fromtimestamp(timestamp / 1000, tz=timezone.utc)
+                    if timestamp
+                    else datetime.now(timezone.utc)
+                ).isoformat(),
+            }
+
+        except ccxt.RateLimitExceeded as e:
+            raise RateLimitError(f"Rate limit exceeded: {e}")
+        except ccxt.BaseError as e:
+            raise APIError(f"API error: {e}")
+        except Exception as e:
+            logger.error(f"Error fetching order book for {symbol}: {e}")
+            raise ExchangeError(f"Unexpected error: {e}")
+
     async def get_symbols(self) -> List[str]:
         """利用可能なシンボル一覧を取得"""
         try:
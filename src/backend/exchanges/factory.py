@@ -17,6 +17,14 @@ from .paper_trading_adapter import PaperTradingAdapter
 logger = logging.getLogger(__name__)
 
 
+def _shared_order_book_manager():
+    """ストリーマーと共有するローカル板の管理（データ収集などアダプタを作らない利用者に
+    ストリーミングパッケージを読み込ませないよう、使う時点で import する）"""
+    from src.backend.streaming.order_book import get_order_book_manager
+
+    return get_order_book_manager()
+
+
 class ExchangeFactory(AbstractAdapterFactory):
     """取引所アダプタのファクトリークラス（Paper Trading対応）"""
 
@@ -107,6 +115,8 @@ class ExchangeFactory(AbstractAdapterFactory):
             raise ValueError(f"API credentials not configured for {exchange_name}")
 
         adapter = adapter_class(api_key=api_key, secret=secret, sandbox=sandbox)
+        # ストリーマーが維持しているローカル板を板照会に使用
+        adapter.order_book_manager = _shared_order_book_manager()
         logger.info(f"Created {exchange_name} live adapter (sandbox: {sandbox})")
 
         return adapter
@@ -145,6 +155,11 @@ class ExchangeFactory(AbstractAdapterFactory):
             "fee_rates": paper_config.get("fee_rates", {"maker": 0.001, "taker": 0.001}),
             "execution_delay": paper_config.get("execution_delay", 0.1),
             "slippage_rate": paper_config.get("slippage_rate", 0.0001),
+            "order_book_manager": (
+                paper_config["order_book_manager"]
+                if "order_book_manager" in paper_config
+                else _shared_order_book_manager()
+            ),
             # セキュリティ: 実際のAPIキーは絶対に使用しない
             "mock_api_keys": True,
         }
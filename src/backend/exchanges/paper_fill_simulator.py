@@ -0,0 +1,299 @@
+"""
+Paper Trading用約定シミュレーター
+板を消化してVWAPの部分約定を生成し、指値注文の待ち行列位置と発注遅延を模擬する
+"""
+
+import random
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+@dataclass
+class SimulatedFill:
+    """1価格レベル分の約定"""
+
+    price: float
+    quantity: float
+    liquidity: str = "taker"  # taker / maker
+
+
+@dataclass
+class FillResult:
+    """1注文分のシミュレーション結果"""
+
+    side: str
+    requested: float
+    fills: List[SimulatedFill] = field(default_factory=list)
+    latency: float = 0.0
+
+    @property
+    def filled_quantity(self) -> float:
+        return sum(fill.quantity for fill in self.fills)
+
+    @property
+    def average_price(self) -> Optional[float]:
+        filled = self.filled_quantity
+        if filled <= 0:
+            return None
+        return sum(fill.price * fill.quantity for fill in self.fills) / filled
+
+    @property
+    def remaining(self) -> float:
+        return max(self.requested - self.filled_quantity, 0.0)
+
+    @property
+    def is_partial(self) -> bool:
+        return 0 < self.filled_quantity < self.requested
+
+
+class BookSnapshot:
+    """板スナップショット（最良気配から順に並んだ価格・数量の配列）
+
+    累積数量・累積約定代金を前計算しておき、複数注文のVWAPを
+    searchsorted で一括計算できるようにする。
+    """
+
+    def __init__(self, bids: Sequence[Sequence[float]], asks: Sequence[Sequence[float]]):
+        self.bids = self._build_side(bids, descending=True)
+        self.asks = self._build_side(asks, descending=False)
+
+    @staticmethod
+    def _build_side(levels: Sequence[Sequence[float]], descending: bool) -> Dict[str, np.ndarray]:
+        array = np.array([[float(price), float(size)] for price, size in levels if float(size) > 0], dtype=float)
+        if array.size == 0:
+            array = np.empty((0, 2), dtype=float)
+
+        order = np.argsort(-array[:, 0] if descending else array[:, 0], kind="stable")
+        prices, sizes = array[order, 0], array[order, 1]
+        return {
+            "prices": prices,
+            "sizes": sizes,
+            "cum_sizes": np.cumsum(sizes),
+            "cum_notional": np.cumsum(prices * sizes),
+        }
+
+    @classmethod
+    def from_order_book(cls, order_book: Any) -> "BookSnapshot":
+        """get_order_book() 形式の辞書、またはローカル板（LocalOrderBook）から生成"""
+        if hasattr(order_book, "to_dict"):
+            order_book = order_book.to_dict(limit=1000)
+        return cls(order_book.get("bids", []), order_book.get("asks", []))
+
+    @classmethod
+    def synthetic(
+        cls,
+        mid_price: float,
+        spread_rate: float = 0.0002,
+        levels: int = 20,
+        level_size: float = 1.0,
+        size_growth: float = 0.25,
+        tick_rate: float = 0.0001,
+        depth: Optional[float] = None,
+    ) -> "BookSnapshot":
+        """仲値から合成板を生成（遠い価格レベルほど厚くなる）
+
+        depth を指定すると片側の合計数量が depth 以上になるよう各レベルを拡大する
+        （実際の板がないときに、注文数量が合成板の厚みで打ち切られないようにする）
+        """
+        steps = np.arange(levels, dtype=float)
+        half_spread = mid_price * spread_rate / 2
+        offsets = half_spread + steps * mid_price * tick_rate
+        sizes = level_size * (1 + size_growth * steps)
+        if depth is not None and depth > sizes.sum():
+            # 浮動小数の丸めで全量が部分約定にならないよう僅かに余裕を持たせる
+            sizes *= depth * (1 + 1e-9) / sizes.sum()
+
+        bids = np.column_stack([mid_price - offsets, sizes])
+        asks = np.column_stack([mid_price + offsets, sizes])
+        return cls(bids.tolist(), asks.tolist())
+
+    def _taking_side(self, side: str) -> Dict[str, np.ndarray]:
+        """注文方向に対して消化される側（買いは売り板）"""
+        return self.asks if side == "buy" else self.bids
+
+    def _resting_side(self, side: str) -> Dict[str, np.ndarray]:
+        """注文方向と同じ側（買いは買い板）"""
+        return self.bids if side == "buy" else self.asks
+
+    def best_price(self, side: str) -> Optional[float]:
+        """注文方向に対する最良約定価格"""
+        prices = self._taking_side(side)["prices"]
+        return float(prices[0]) if prices.size else None
+
+    def mid_price(self) -> Optional[float]:
+        if not self.bids["prices"].size or not self.asks["prices"].size:
+            return None
+        return float(self.bids["prices"][0] + self.asks["prices"][0]) / 2
+
+    def walk(self, side: str, quantity: float, limit_price: Optional[float] = None) -> List[SimulatedFill]:
+        """板を消化して価格レベルごとの約定を返す（limit_price を超える価格は消化しない）"""
+        book = self._taking_side(side)
+        fills = []
+        remaining = quantity
+
+        for price, size in zip(book["prices"], book["sizes"]):
+            if remaining <= 0:
+                break
+            if limit_price is not None and (price > limit_price if side == "buy" else price < limit_price):
+                break
+            take = min(float(size), remaining)
+            fills.append(SimulatedFill(price=float(price), quantity=take))
+            remaining -= take
+
+        return fills
+
+    def vwap_batch(self, side: str, quantities: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """複数数量の (VWAP, 約定可能数量) を一括計算"""
+        book = self._taking_side(side)
+        quantities = np.asarray(quantities, dtype=float)
+        if not book["prices"].size:
+            return np.full(quantities.shape, np.nan), np.zeros(quantities.shape)
+
+        cum_sizes, cum_notional, prices = book["cum_sizes"], book["cum_notional"], book["prices"]
+        filled = np.minimum(quantities, cum_sizes[-1])
+
+        # 完全に消化するレベル数と、途中まで消化するレベル
+        index = np.searchsorted(cum_sizes, filled, side="left")
+        index = np.minimum(index, prices.size - 1)
+        prev_sizes = np.where(index > 0, cum_sizes[index - 1], 0.0)
+        prev_notional = np.where(index > 0, cum_notional[index - 1], 0.0)
+        notional = prev_notional + (filled - prev_sizes) * prices[index]
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            vwap = np.where(filled > 0, notional / filled, np.nan)
+        return vwap, filled
+
+    def queue_ahead(self, side: str, price: float) -> float:
+        """同じ価格で既に並んでいる数量（新規指値は列の最後尾に並ぶ）"""
+        book = self._resting_side(side)
+        matches = book["sizes"][np.isclose(book["prices"], price)]
+        return float(matches.sum())
+
+
+@dataclass
+class LimitQueue:
+    """指値注文の待ち行列状態"""
+
+    side: str
+    price: float
+    remaining: float
+    queue_ahead: float = 0.0
+
+    def on_trade(self, trade_price: float, volume: Optional[float] = None) -> float:
+        """約定ティックから自注文の約定数量を求める
+
+        指値を突き抜けた価格、または出来高不明のティックは全量約定。
+        指値ちょうどの約定は、先に並んでいる数量を消化した後の出来高だけ約定する。
+        """
+        if self.remaining <= 0:
+            return 0.0
+
+        through = trade_price < self.price if self.side == "buy" else trade_price > self.price
+        if through or volume is None:
+            filled = self.remaining
+        else:
+            consumed = min(self.queue_ahead, volume)
+            self.queue_ahead -= consumed
+            filled = min(self.remaining, volume - consumed)
+
+        self.remaining -= filled
+        return filled
+
+
+class FillSimulator:
+    """板消化・待ち行列・遅延を組み合わせた約定シミュレーター"""
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        latency_jitter: float = 0.0,
+        spread_rate: float = 0.0002,
+        synthetic_levels: int = 20,
+        synthetic_level_size: float = 1.0,
+        synthetic_level_notional: Optional[float] = None,
+        seed: Optional[int] = None,
+    ):
+        """
+        Args:
+            synthetic_level_size: 合成板の最良レベルの数量
+            synthetic_level_notional: 合成板の最良レベルの約定代金（指定時は仲値から数量を決める）
+        """
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.spread_rate = spread_rate
+        self.synthetic_levels = synthetic_levels
+        self.synthetic_level_size = synthetic_level_size
+        self.synthetic_level_notional = synthetic_level_notional
+        self._random = random.Random(seed)
+
+    def sample_latency(self) -> float:
+        """発注から約定までの遅延（秒）"""
+        if self.latency_jitter <= 0:
+            return self.latency
+        return max(self.latency + self._random.uniform(-self.latency_jitter, self.latency_jitter), 0.0)
+
+    def snapshot(
+        self, order_book: Any = None, mid_price: Optional[float] = None, quantity: Optional[float] = None
+    ) -> BookSnapshot:
+        """板から、板がなければ仲値から合成したスナップショットを作る
+
+        合成板は片側の合計数量が quantity 以上になるように作る（板がない場合に注文が打ち切られない）
+        """
+        if order_book is not None:
+            snapshot = BookSnapshot.from_order_book(order_book)
+            if snapshot.bids["prices"].size and snapshot.asks["prices"].size:
+                return snapshot
+            if mid_price is None:
+                mid_price = snapshot.mid_price()
+
+        if mid_price is None:
+            raise ValueError("order book or mid price is required")
+
+        level_size = self.synthetic_level_size
+        if self.synthetic_level_notional is not None:
+            level_size = self.synthetic_level_notional / mid_price
+
+        return BookSnapshot.synthetic(
+            mid_price,
+            spread_rate=self.spread_rate,
+            levels=self.synthetic_levels,
+            level_size=level_size,
+            depth=quantity,
+        )
+
+    def simulate_market_order(self, snapshot: BookSnapshot, side: str, quantity: float) -> FillResult:
+        """成行注文を板に当てて約定を生成"""
+        return FillResult(
+            side=side,
+            requested=quantity,
+            fills=snapshot.walk(side, quantity),
+            latency=self.sample_latency(),
+        )
+
+    def simulate_batch(
+        self, snapshot: BookSnapshot, sides: Sequence[str], quantities: Sequence[float]
+    ) -> Dict[str, np.ndarray]:
+        """同じスナップショットに対する多数の成行注文を一括シミュレーション
+
+        各注文は独立に板を消化したものとして扱う（互いの約定で板は減らない）
+        """
+        sides = np.asarray(sides)
+        quantities = np.asarray(quantities, dtype=float)
+        average_price = np.full(quantities.shape, np.nan)
+        filled = np.zeros(quantities.shape)
+
+        for side in ("buy", "sell"):
+            mask = sides == side
+            if mask.any():
+                average_price[mask], filled[mask] = snapshot.vwap_batch(side, quantities[mask])
+
+        return {"average_price": average_price, "filled": filled, "remaining": quantities - filled}
+
+    def open_limit_queue(
+        self, snapshot: Optional[BookSnapshot], side: str, price: float, quantity: float
+    ) -> LimitQueue:
+        """指値注文の待ち行列状態を作成"""
+        queue_ahead = snapshot.queue_ahead(side, price) if snapshot is not None else 0.0
+        return LimitQueue(side=side, price=price, remaining=quantity, queue_ahead=queue_ahead)
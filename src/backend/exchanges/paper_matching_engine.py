@@ -0,0 +1,166 @@
+"""
+Paper Trading用マッチングエンジン
+シンボルごとに価格順の指値注文ブックを持ち、価格ティック1回で交差した注文をまとめて約定させる
+"""
+
+import heapq
+import itertools
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..trading.orders.models import Order, OrderSide
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_symbol(symbol: str) -> str:
+    """シンボル表記を正規化（BTC/USDT と BTCUSDT を同一視）"""
+    return symbol.upper().replace("/", "")
+
+
+class LimitOrderBook:
+    """シンボル単位の指値注文ブック
+
+    買い注文は価格の高い順、売り注文は価格の安い順に最小ヒープで保持する
+    （同価格は到着順）。キャンセルは遅延削除で、ヒープ先頭に来た時点で捨てる。
+    """
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self._bids: List[Tuple[float, int, str]] = []
+        self._asks: List[Tuple[float, int, str]] = []
+        self._orders: Dict[str, Order] = {}
+        self._sequence = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._orders)
+
+    def __contains__(self, order_id: str) -> bool:
+        return order_id in self._orders
+
+    def add(self, order: Order):
+        """注文を追加"""
+        order_id = order.exchange_order_id
+        price = float(order.price)
+        self._orders[order_id] = order
+
+        if order.side == OrderSide.BUY:
+            heapq.heappush(self._bids, (-price, next(self._sequence), order_id))
+        else:
+            heapq.heappush(self._asks, (price, next(self._sequence), order_id))
+
+    def remove(self, order_id: str) -> Optional[Order]:
+        """注文を削除"""
+        return self._orders.pop(order_id, None)
+
+    def best_bid(self) -> Optional[float]:
+        self._discard_removed(self._bids)
+        return -self._bids[0][0] if self._bids else None
+
+    def best_ask(self) -> Optional[float]:
+        self._discard_removed(self._asks)
+        return self._asks[0][0] if self._asks else None
+
+    def match(self, price: float) -> List[Order]:
+        """価格と交差した注文を価格優先・時間優先で取り出す
+
+        買い指値は price <= 指値、売り指値は price >= 指値で約定対象
+        """
+        crossed = []
+
+        while True:
+            self._discard_removed(self._bids)
+            if not self._bids or -self._bids[0][0] < price:
+                break
+            _, _, order_id = heapq.heappop(self._bids)
+            crossed.append(self._orders.pop(order_id))
+
+        while True:
+            self._discard_removed(self._asks)
+            if not self._asks or self._asks[0][0] > price:
+                break
+            _, _, order_id = heapq.heappop(self._asks)
+            crossed.append(self._orders.pop(order_id))
+
+        return crossed
+
+    def _discard_removed(self, heap: List[Tuple[float, int, str]]):
+        while heap and heap[0][2] not in self._orders:
+            heapq.heappop(heap)
+
+
+class PaperMatchingEngine:
+    """複数シンボルの指値注文ブックを管理するマッチングエンジン
+
+    価格ソース（価格バスやティッカー）からの価格をシンボルごとに1回受け取り、
+    交差した注文をまとめて返す。約定処理自体は呼び出し側が行う。
+    """
+
+    def __init__(self):
+        self.books: Dict[str, LimitOrderBook] = {}
+        self._order_symbols: Dict[str, str] = {}
+        self.last_prices: Dict[str, float] = {}
+
+        self.stats = {"orders_added": 0, "orders_cancelled": 0, "orders_matched": 0, "price_updates": 0}
+
+    def add_order(self, order: Order) -> LimitOrderBook:
+        """指値注文を登録"""
+        key = normalize_symbol(order.symbol)
+        book = self.books.get(key)
+        if book is None:
+            book = self.books[key] = LimitOrderBook(key)
+
+        book.add(order)
+        self._order_symbols[order.exchange_order_id] = key
+        self.stats["orders_added"] += 1
+        return book
+
+    def cancel_order(self, order_id: str) -> Optional[Order]:
+        """指値注文を削除"""
+        key = self._order_symbols.pop(order_id, None)
+        if key is None:
+            return None
+
+        order = self.books[key].remove(order_id)
+        self._drop_empty_book(key)
+        if order is not None:
+            self.stats["orders_cancelled"] += 1
+        return order
+
+    def on_price(self, symbol: str, price: float) -> List[Order]:
+        """価格更新を受け取り、交差した注文を返す"""
+        key = normalize_symbol(symbol)
+        self.last_prices[key] = price
+        self.stats["price_updates"] += 1
+
+        book = self.books.get(key)
+        if book is None:
+            return []
+
+        crossed = book.match(price)
+        for order in crossed:
+            self._order_symbols.pop(order.exchange_order_id, None)
+        self._drop_empty_book(key)
+
+        self.stats["orders_matched"] += len(crossed)
+        return crossed
+
+    def has_orders(self, symbol: str) -> bool:
+        book = self.books.get(normalize_symbol(symbol))
+        return book is not None and len(book) > 0
+
+    def active_symbols(self) -> List[str]:
+        return list(self.books.keys())
+
+    def _drop_empty_book(self, key: str):
+        book = self.books.get(key)
+        if book is not None and len(book) == 0:
+            del self.books[key]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """統計情報を取得"""
+        return {
+            **self.stats,
+            "symbols": len(self.books),
+            "resting_orders": sum(len(book) for book in self.books.values()),
+        }
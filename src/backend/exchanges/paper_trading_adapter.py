@@ -5,18 +5,24 @@ Paper Trading Adapter
 
 import asyncio
 import logging
+import time
 from datetime import datetime, timezone
 from decimal import Decimal
-from typing import Any, Dict, List, Optional
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
 from uuid import UUID, uuid4
 
 from src.backend.core.abstract_adapter import AbstractTradingAdapter
+from src.backend.core.config import settings
 
 from ..database.models import DatabaseManager
 from ..database.paper_wallet_service import PaperWalletService
 from ..trading.orders.models import Order, OrderSide, OrderStatus, OrderType
+from ..trading.price_bus import PriceTick, price_bus
 from .base import AbstractExchangeAdapter
 from .binance import BinanceAdapter
+from .paper_fill_simulator import BookSnapshot, FillSimulator, LimitQueue
+from .paper_matching_engine import PaperMatchingEngine, normalize_symbol
 
 logger = logging.getLogger(__name__)
 
@@ -40,6 +46,13 @@ class PaperTradingAdapter(AbstractTradingAdapter):
                 - database_url: データベースURL
                 - initial_balances: 初期残高設定
                 - fee_rates: 手数料率設定
+                - order_book_manager: ローカル板管理（OrderBookManager、任意）
+                - price_bus: 指値注文の約定判定に使う価格バス（省略時はグローバル）
+                - price_poll_interval: 価格バスが無音の間のティッカー取得間隔（秒）
+                - latency_jitter: 発注遅延のゆらぎ（秒、execution_delay の前後）
+                - synthetic_level_notional: 板がないときの合成板の最良レベルの約定代金（任意）
+                - wallet_journal_path: 残高ジャーナルファイル（クラッシュ後の再生用、
+                  省略時は PAPER_WALLET_JOURNAL_DIR 配下のユーザーごとのファイル）
         """
         self.config = config
         self._exchange_name = "paper_trading"
@@ -56,7 +69,7 @@ class PaperTradingAdapter(AbstractTradingAdapter):
         # テーブルを作成（存在しない場合のみ作成される）
         self.db_manager.create_tables()
 
-        self.wallet_service = PaperWalletService(self.db_manager)
+        self.wallet_service = PaperWalletService(self.db_manager, journal_path=self._wallet_journal_path(config))
 
         # リアル取引所アダプタ（価格データ用）- モック化
         real_exchange = config.get("real_exchange", "binance")
@@ -83,14 +96,42 @@ class PaperTradingAdapter(AbstractTradingAdapter):
 
         # 約定シミュレーション設定
         self.execution_delay = config.get("execution_delay", 0.1)  # 0.1秒遅延
-        self.slippage_rate = config.get("slippage_rate", 0.0001)  # 0.01%スリッページ
+        self.slippage_rate = config.get("slippage_rate", 0.0001)  # 合成板の片側スプレッド
+        self.fill_simulator = FillSimulator(
+            latency=self.execution_delay,
+            latency_jitter=config.get("latency_jitter", 0.0),
+            spread_rate=self.slippage_rate * 2,
+            synthetic_level_notional=config.get("synthetic_level_notional"),
+        )
+
+        # ローカル板（同期済みなら板照会でRESTを使わない）
+        self.order_book_manager = config.get("order_book_manager")
 
         # 注文管理
         self.active_orders: Dict[str, Order] = {}
         self.order_history: List[Order] = []
 
+        # 指値注文のマッチング（シンボルごとに価格を1回だけ購読）
+        self.matching_engine = PaperMatchingEngine()
+        self.price_bus = config.get("price_bus") or price_bus
+        self.price_poll_interval = config.get("price_poll_interval", 1.0)
+        self._price_pollers: Dict[str, asyncio.Task] = {}
+        self._last_price_at: Dict[str, float] = {}
+        self._limit_queues: Dict[str, LimitQueue] = {}
+        self._order_locks: Dict[str, Decimal] = {}
+
         logger.info(f"PaperTradingAdapter initialized for user {self.user_id}")
 
+    def _wallet_journal_path(self, config: Dict[str, Any]) -> str:
+        """残高ジャーナルのパス（省略時はデータディレクトリ配下のユーザーごとのファイル）"""
+        journal_path = config.get("wallet_journal_path")
+        if journal_path:
+            return journal_path
+
+        journal_dir = Path(settings.PAPER_WALLET_JOURNAL_DIR)
+        journal_dir.mkdir(parents=True, exist_ok=True)
+        return str(journal_dir / f"{self.user_id}.jsonl")
+
     @property
     def exchange_name(self) -> str:
         """取引所名を返す"""
@@ -132,7 +173,7 @@ class PaperTradingAdapter(AbstractTradingAdapter):
     async def get_balance(self) -> Dict[str, Dict[str, float]]:
         """仮想残高を取得"""
         try:
-            balances = self.wallet_service.get_user_balances(UUID(self.user_id))
+            balances = await self.wallet_service.get_user_balances_async(UUID(self.user_id))
             result = {}
             for asset, info in balances.items():
                 result[asset] = {
@@ -160,19 +201,18 @@ class PaperTradingAdapter(AbstractTradingAdapter):
             }
 
     async def get_order_book(self, symbol: str, limit: int = 20) -> Dict[str, Any]:
-        """実際の取引所から板情報を取得"""
+        """板情報を取得（ローカル板を優先し、なければ実際の取引所から取得）"""
+        if self.order_book_manager is not None:
+            book = self.order_book_manager.get_book(symbol)
+            if book is not None:
+                return book.to_dict(limit)
+
         try:
             return await self.real_adapter.get_order_book(symbol, limit)
         except Exception as e:
             logger.error(f"Failed to get order book for {symbol}: {e}")
-            # フォールバック板情報
-            ticker = await self.get_ticker(symbol)
-            price = float(ticker["price"])
-            return {
-                "bids": [[price * 0.999, 1.0], [price * 0.998, 2.0]],
-                "asks": [[price * 1.001, 1.0], [price * 1.002, 2.0]],
-                "timestamp": datetime.now(timezone.utc).isoformat(),
-            }
+            # 板が取れない場合は空の板を返す（約定時は注文数量に合わせた合成板を使う）
+            return {"bids": [], "asks": [], "timestamp": datetime.now(timezone.utc).isoformat()}
 
     async def place_order(self, order: Order) -> Dict[str, Any]:
         """模擬注文を実行"""
@@ -202,8 +242,8 @@ class PaperTradingAdapter(AbstractTradingAdapter):
             else:
                 # 指値注文の場合は待機状態
                 order.status = OrderStatus.SUBMITTED
-                # バックグラウンドで約定チェックを開始
-                asyncio.create_task(self._monitor_limit_order(order))
+                await self._open_limit_queue(order)
+                self._add_resting_order(order)
 
             self.order_history.append(order)
 
@@ -221,6 +261,9 @@ class PaperTradingAdapter(AbstractTradingAdapter):
             return {"error": "Order not found"}
 
         order = self.active_orders[order_id]
+        self.matching_engine.cancel_order(order_id)
+        self._limit_queues.pop(order_id, None)
+        self._release_symbol_if_idle(order.symbol)
 
         # 残高のロックを解除
         await self._unlock_balance_for_order(order)
@@ -268,106 +311,188 @@ class PaperTradingAdapter(AbstractTradingAdapter):
         if order.side == OrderSide.BUY:
             # 買い注文: quote通貨が必要
             required_amount = float(order.amount * (order.price or Decimal("50000")))
-            balance_info = self.wallet_service.get_asset_balance(UUID(self.user_id), quote_asset)
+            balance_info = await self.wallet_service.get_asset_balance_async(UUID(self.user_id), quote_asset)
             return balance_info["available"] >= required_amount
         else:
             # 売り注文: base通貨が必要
             required_amount = float(order.amount)
-            balance_info = self.wallet_service.get_asset_balance(UUID(self.user_id), base_asset)
+            balance_info = await self.wallet_service.get_asset_balance_async(UUID(self.user_id), base_asset)
             return balance_info["available"] >= required_amount
 
-    async def _lock_balance_for_order(self, order: Order):
-        """注文に必要な残高をロック"""
-        symbol_parts = order.symbol.split("/")
-        base_asset, quote_asset = symbol_parts
+    def _lock_requirement(self, order: Order) -> Tuple[str, Decimal]:
+        """注文に必要なロック対象資産と数量"""
+        base_asset, quote_asset = order.symbol.split("/")
 
         if order.side == OrderSide.BUY:
             # 買い注文: quote通貨をロック
-            required_amount = Decimal(str(float(order.amount * (order.price or Decimal("50000")))))
-            self.wallet_service.lock_balance(UUID(self.user_id), quote_asset, required_amount, order.exchange_order_id)
-        else:
-            # 売り注文: base通貨をロック
-            required_amount = Decimal(str(float(order.amount)))
-            self.wallet_service.lock_balance(UUID(self.user_id), base_asset, required_amount, order.exchange_order_id)
+            return quote_asset, Decimal(str(float(order.amount * (order.price or Decimal("50000")))))
+        # 売り注文: base通貨をロック
+        return base_asset, Decimal(str(float(order.amount)))
 
-    async def _unlock_balance_for_order(self, order: Order):
-        """注文でロックした残高を解除"""
-        symbol_parts = order.symbol.split("/")
-        base_asset, quote_asset = symbol_parts
-
-        if order.side == OrderSide.BUY:
-            required_amount = Decimal(str(float(order.amount * (order.price or Decimal("50000")))))
-            self.wallet_service.unlock_balance(
-                UUID(self.user_id), quote_asset, required_amount, order.exchange_order_id
-            )
+    async def _lock_balance_for_order(self, order: Order):
+        """注文に必要な残高をロック"""
+        asset, amount = self._lock_requirement(order)
+        if await self.wallet_service.lock_balance_async(UUID(self.user_id), asset, amount, order.exchange_order_id):
+            self._order_locks[order.exchange_order_id] = amount
+
+    def _lock_release_amount(self, order: Order, quantity: Optional[float] = None) -> Decimal:
+        """解除するロック量（quantity 指定時はその約定数量分、未指定時は残り全部）"""
+        remaining = self._order_locks.get(order.exchange_order_id)
+        if remaining is None:
+            return Decimal("0")
+        if quantity is None:
+            return remaining
+
+        _, total = self._lock_requirement(order)
+        return min(remaining, total * Decimal(str(quantity)) / order.amount)
+
+    def _consume_order_lock(self, order: Order, amount: Decimal):
+        """解除したロック量を注文の残りロックから差し引く"""
+        remaining = self._order_locks.get(order.exchange_order_id)
+        if remaining is None:
+            return
+
+        remaining -= amount
+        if remaining > 0:
+            self._order_locks[order.exchange_order_id] = remaining
         else:
-            required_amount = Decimal(str(float(order.amount)))
-            self.wallet_service.unlock_balance(UUID(self.user_id), base_asset, required_amount, order.exchange_order_id)
+            del self._order_locks[order.exchange_order_id]
+
+    async def _unlock_balance_for_order(self, order: Order, quantity: Optional[float] = None):
+        """注文でロックした残高を解除（quantity 指定時はその約定数量分のみ）"""
+        amount = self._lock_release_amount(order, quantity)
+        if amount > 0:
+            asset, _ = self._lock_requirement(order)
+            await self.wallet_service.unlock_balance_async(UUID(self.user_id), asset, amount, order.exchange_order_id)
+        self._consume_order_lock(order, amount)
+
+    async def _get_book_snapshot(self, symbol: str, quantity: Optional[float] = None) -> BookSnapshot:
+        """約定シミュレーション用の板スナップショット（板が空なら注文数量を満たす合成板）"""
+        order_book = await self.get_order_book(symbol, limit=1000)
+        try:
+            return self.fill_simulator.snapshot(order_book, quantity=quantity)
+        except ValueError:
+            ticker = await self.get_ticker(symbol)
+            return self.fill_simulator.snapshot(mid_price=float(ticker["price"]), quantity=quantity)
 
     async def _execute_market_order(self, order: Order):
-        """成行注文を即座に約定"""
+        """成行注文を板の厚みに応じて約定（板で足りない残量は失効）"""
         try:
-            # 実行遅延をシミュレート
-            await asyncio.sleep(self.execution_delay)
-
-            # 現在の最良気配値を取得
-            order_book = await self.get_order_book(order.symbol)
-
-            if order.side == OrderSide.BUY:
-                # 買い注文: Ask価格で約定
-                execution_price = float(order_book["asks"][0][0])
-            else:
-                # 売り注文: Bid価格で約定
-                execution_price = float(order_book["bids"][0][0])
-
-            # スリッページを適用
-            if order.side == OrderSide.BUY:
-                execution_price *= 1 + self.slippage_rate
-            else:
-                execution_price *= 1 - self.slippage_rate
-
-            # 約定処理
-            await self._fill_order(order, execution_price, float(order.amount))
+            # 発注遅延をシミュレート
+            await asyncio.sleep(self.fill_simulator.sample_latency())
+
+            # 板を消化してVWAPで約定
+            snapshot = await self._get_book_snapshot(order.symbol, float(order.amount))
+            result = self.fill_simulator.simulate_market_order(snapshot, order.side.value, float(order.amount))
+
+            if result.filled_quantity <= 0:
+                raise Exception("No liquidity available in order book")
+
+            await self._fill_order(order, result.average_price, result.filled_quantity)
+
+            if result.is_partial and order.status == OrderStatus.PARTIALLY_FILLED:
+                # IOC: 板で約定しきれなかった残量は失効させる
+                await self._unlock_balance_for_order(order)
+                order.status = OrderStatus.EXPIRED
+                self.active_orders.pop(order.exchange_order_id, None)
+                logger.info(
+                    f"Paper market order partially filled: {order.symbol} "
+                    f"{result.filled_quantity}/{result.requested}, remaining expired"
+                )
 
         except Exception as e:
             logger.error(f"Error executing market order: {e}")
             order.status = OrderStatus.FAILED
             order.error_message = str(e)
 
-    async def _monitor_limit_order(self, order: Order):
-        """指値注文の約定を監視"""
+    async def _open_limit_queue(self, order: Order):
+        """板上の同価格の数量から指値注文の待ち行列位置を見積もる"""
+        snapshot = None
+        if self.order_book_manager is not None:
+            book = self.order_book_manager.get_book(order.symbol)
+            if book is not None:
+                snapshot = BookSnapshot.from_order_book(book)
+
+        self._limit_queues[order.exchange_order_id] = self.fill_simulator.open_limit_queue(
+            snapshot, order.side.value, float(order.price), float(order.amount)
+        )
+
+    def _add_resting_order(self, order: Order):
+        """指値注文をマッチングエンジンに登録し、シンボルの価格購読を開始"""
+        self.matching_engine.add_order(order)
+
+        key = normalize_symbol(order.symbol)
+        self.price_bus.subscribe(key, self._on_price_tick)
+
+        poller = self._price_pollers.get(key)
+        if poller is None or poller.done():
+            self._price_pollers[key] = asyncio.create_task(self._poll_price(key, order.symbol))
+
+    def _release_symbol_if_idle(self, symbol: str):
+        """指値注文がなくなったシンボルの価格購読を停止"""
+        if self.matching_engine.has_orders(symbol):
+            return
+
+        key = normalize_symbol(symbol)
+        self.price_bus.unsubscribe(key, self._on_price_tick)
+        self._last_price_at.pop(key, None)
+
+        poller = self._price_pollers.pop(key, None)
+        if poller is not None and not poller.done() and poller is not asyncio.current_task():
+            poller.cancel()
+
+    async def _on_price_tick(self, tick: PriceTick):
+        """価格バスからのティックで指値注文を判定"""
+        await self._match_price(tick.symbol, tick.price, tick.quantity)
+
+    async def _poll_price(self, key: str, symbol: str):
+        """価格バスが無音の間だけティッカーで価格を補完（シンボルごとに1タスク）"""
         try:
-            while order.exchange_order_id in self.active_orders:
-                # 現在価格をチェック
-                ticker = await self.get_ticker(order.symbol)
-                current_price = float(ticker["price"])
-                order_price = float(order.price)
-
-                # 約定条件チェック
-                should_fill = False
-                if order.side == OrderSide.BUY and current_price <= order_price:
-                    should_fill = True
-                elif order.side == OrderSide.SELL and current_price >= order_price:
-                    should_fill = True
-
-                if should_fill:
-                    await self._fill_order(order, order_price, float(order.amount))
-                    break
-
-                # 1秒待機
-                await asyncio.sleep(1.0)
+            while self.matching_engine.has_orders(key):
+                last = self._last_price_at.get(key)
+                if last is None or time.monotonic() - last >= self.price_poll_interval:
+                    ticker = await self.get_ticker(symbol)
+                    await self._match_price(key, float(ticker["price"]))
+
+                await asyncio.sleep(self.price_poll_interval)
 
+        except asyncio.CancelledError:
+            pass
         except Exception as e:
-            logger.error(f"Error monitoring limit order: {e}")
+            logger.error(f"Error polling price for {symbol}: {e}")
 
-    async def _fill_order(self, order: Order, fill_price: float, fill_quantity: float):
-        """注文を約定"""
+    async def _match_price(self, symbol: str, price: float, volume: Optional[float] = None):
+        """価格と交差した指値注文をまとめて約定（指値ちょうどの約定は待ち行列を考慮）"""
+        self._last_price_at[normalize_symbol(symbol)] = time.monotonic()
+
+        crossed = self.matching_engine.on_price(symbol, price)
+        for order in crossed:
+            if order.exchange_order_id not in self.active_orders:
+                continue
+
+            queue = self._limit_queues.get(order.exchange_order_id)
+            fill_quantity = queue.on_trade(price, volume) if queue else float(order.remaining_amount)
+            if fill_quantity > 0:
+                await self._fill_order(order, float(order.price), fill_quantity, liquidity="maker")
+
+            # 約定しきれなかった注文はブックに戻す
+            if order.exchange_order_id in self.active_orders:
+                self.matching_engine.add_order(order)
+
+        if crossed:
+            self._release_symbol_if_idle(symbol)
+
+    async def _fill_order(self, order: Order, fill_price: float, fill_quantity: float, liquidity: str = "taker"):
+        """注文を約定（fill_quantity が残量未満なら部分約定）"""
         try:
             symbol_parts = order.symbol.split("/")
             base_asset, quote_asset = symbol_parts
 
             # 手数料計算
-            fee_rate = self.fee_rates.get("taker", 0.001)
+            fee_rate = self.fee_rates.get(liquidity, 0.001)
+
+            # 約定分のロックは決済と同じ台帳更新で解除する（ロックは常に売却資産）
+            unlock_amount = self._lock_release_amount(order, fill_quantity)
 
             if order.side == OrderSide.BUY:
                 # 買い注文
@@ -375,7 +500,7 @@ class PaperTradingAdapter(AbstractTradingAdapter):
                 fee = fill_quantity * fee_rate  # Base通貨で手数料
 
                 # データベース上で取引実行
-                success = self.wallet_service.execute_trade(
+                success = await self.wallet_service.execute_trade_async(
                     user_id=UUID(self.user_id),
                     buy_asset=base_asset,
                     sell_asset=quote_asset,
@@ -385,11 +510,7 @@ class PaperTradingAdapter(AbstractTradingAdapter):
                     fee_amount=Decimal(str(fee)),
                     related_order_id=order.exchange_order_id,
                     description=f"Paper trading order fill: {order.symbol} {order.side.value}",
-                )
-
-                # ロック解除
-                self.wallet_service.unlock_balance(
-                    UUID(self.user_id), quote_asset, Decimal(str(cost)), order.exchange_order_id
+                    unlock_amount=unlock_amount,
                 )
 
             else:
@@ -398,7 +519,7 @@ class PaperTradingAdapter(AbstractTradingAdapter):
                 fee = proceeds * fee_rate  # Quote通貨で手数料
 
                 # データベース上で取引実行
-                success = self.wallet_service.execute_trade(
+                success = await self.wallet_service.execute_trade_async(
                     user_id=UUID(self.user_id),
                     buy_asset=quote_asset,
                     sell_asset=base_asset,
@@ -408,27 +529,22 @@ class PaperTradingAdapter(AbstractTradingAdapter):
                     fee_amount=Decimal(str(fee)),
                     related_order_id=order.exchange_order_id,
                     description=f"Paper trading order fill: {order.symbol} {order.side.value}",
-                )
-
-                # ロック解除
-                self.wallet_service.unlock_balance(
-                    UUID(self.user_id), base_asset, Decimal(str(fill_quantity)), order.exchange_order_id
+                    unlock_amount=unlock_amount,
                 )
 
             if not success:
                 raise Exception("Failed to execute trade in database")
+            self._consume_order_lock(order, unlock_amount)
 
-            # 注文ステータス更新
-            order.status = OrderStatus.FILLED
-            order.filled_amount = Decimal(str(fill_quantity))
-            order.average_fill_price = Decimal(str(fill_price))
-            order.fee_amount = Decimal(str(fee if order.side == OrderSide.BUY else fee))
+            # 注文ステータス更新（残量が0になればFILLED）
+            order.update_fill(Decimal(str(fill_quantity)), Decimal(str(fill_price)), Decimal(str(fee)))
             order.fee_currency = base_asset if order.side == OrderSide.BUY else quote_asset
-            order.filled_at = datetime.now(timezone.utc)
 
-            # アクティブ注文から削除
-            if order.exchange_order_id in self.active_orders:
-                del self.active_orders[order.exchange_order_id]
+            if order.status == OrderStatus.FILLED:
+                # 端数のロックを解除し、アクティブ注文から削除
+                await self._unlock_balance_for_order(order)
+                self.active_orders.pop(order.exchange_order_id, None)
+                self._limit_queues.pop(order.exchange_order_id, None)
 
             logger.info(f"Paper order filled: {order.symbol} {order.side.value} {fill_quantity} @ {fill_price}")
 
@@ -437,6 +553,12 @@ class PaperTradingAdapter(AbstractTradingAdapter):
             order.status = OrderStatus.FAILED
             order.error_message = str(e)
 
+            # 失敗した注文はロックを解除し、マッチングエンジンに戻さない
+            await self._unlock_balance_for_order(order)
+            self.matching_engine.cancel_order(order.exchange_order_id)
+            self.active_orders.pop(order.exchange_order_id, None)
+            self._limit_queues.pop(order.exchange_order_id, None)
+
     def _format_order_response(self, order: Order) -> Dict[str, Any]:
         """注文レスポンスを整形"""
         response = {
@@ -465,6 +587,8 @@ class PaperTradingAdapter(AbstractTradingAdapter):
     # AbstractExchangeAdapterの抽象メソッド実装
     async def connect(self) -> bool:
         """接続（Paper Tradingでは常に成功）"""
+        # 残高の書き戻しをバックグラウンドで開始
+        self.wallet_service.start_background_flush()
         logger.info("Paper Trading adapter connected")
         return True
 
@@ -473,6 +597,9 @@ class PaperTradingAdapter(AbstractTradingAdapter):
         # アクティブ注文をすべてキャンセル
         for order_id in list(self.active_orders.keys()):
             await self.cancel_order(order_id)
+
+        # 書き戻しタスクを止め、未反映の残高変更をDBに書き戻す
+        await self.wallet_service.stop_background_flush()
         logger.info("Paper Trading adapter disconnected")
 
     def is_connected(self) -> bool:
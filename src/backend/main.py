@@ -78,6 +78,9 @@ async def lifespan(app: FastAPI):
         except Exception as e:
             logger.error(f"Failed to stop price streaming: {e}")
 
+    # ポートフォリオ最適化のプロセスプールを停止
+    portfolio.close_portfolio_optimizer()
+
     logger.info("Shutting down crypto bot backend...")
 
 
@@ -0,0 +1,415 @@
+"""
+保存済み価格からの共分散推定サービス
+
+ローカルの OHLCV ストア（DataCollector が書き出す Parquet、または OHLCVResampler）から
+ユニバース・時間枠・窓長ごとに整列したリターン窓を組み立て、標本共分散・EWMA・Ledoit–Wolf 縮小推定量を返す。
+リターン窓は新しい確定足ごとにリングバッファで差分更新し、推定結果は (ユニバース, 時間枠, 窓長, 手法) ごとにキャッシュする。
+"""
+
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from src.backend.data_pipeline.resampler import OHLCVResampler
+from src.backend.exchanges.base import OHLCV
+from src.backend.utils.timeframes import timeframe_to_seconds
+
+logger = logging.getLogger(__name__)
+
+SAMPLE = "sample"
+EWMA = "ewma"
+LEDOIT_WOLF = "ledoit_wolf"
+METHODS = (SAMPLE, EWMA, LEDOIT_WOLF)
+
+# 保持するリターン窓（ユニバース × 時間枠 × 窓長）の上限
+MAX_RETURN_WINDOWS = 64
+
+SECONDS_PER_YEAR = 365 * 86400
+
+# ストアのシンボル（BTC/USDT）に補う建値通貨
+DEFAULT_QUOTE = "USDT"
+
+StateKey = Tuple[Tuple[str, ...], str, int]
+CacheKey = Tuple[Tuple[str, ...], str, int, str]
+
+
+def closes_from_bars(bars: Union[pd.DataFrame, Iterable[OHLCV]]) -> pd.Series:
+    """OHLCVリスト・DataFrame（timestamp 列または時刻インデックス）を UTC 時刻インデックスの終値に変換"""
+    if isinstance(bars, pd.DataFrame):
+        frame = bars.set_index("timestamp") if "timestamp" in bars.columns else bars
+        closes = pd.Series(frame["close"].to_numpy(dtype=float), index=frame.index)
+    else:
+        bars = list(bars)
+        closes = pd.Series([float(bar.close) for bar in bars], index=[bar.timestamp for bar in bars], dtype=float)
+
+    index = pd.DatetimeIndex(pd.to_datetime(closes.index))
+    closes.index = (index.tz_localize("UTC") if index.tz is None else index.tz_convert("UTC")).rename("timestamp")
+    return closes
+
+
+def store_symbol(name: str, quote: str = DEFAULT_QUOTE) -> str:
+    """資産名・取引所シンボルをストアのシンボルに変換（BTC / BTCUSDT / BTC/USDT → BTC/USDT）"""
+    name = name.upper()
+    if "/" in name:
+        return name
+    if name.endswith(quote) and len(name) > len(quote):
+        return f"{name[: -len(quote)]}/{quote}"
+    return f"{name}/{quote}"
+
+
+def ledoit_wolf_covariance(returns: np.ndarray) -> Tuple[np.ndarray, float]:
+    """Ledoit–Wolf 縮小推定量（等分散・無相関の行列 μI に向けて縮小）
+
+    Returns:
+        (共分散, 縮小強度)
+    """
+    n, p = returns.shape
+    centered = returns - returns.mean(axis=0)
+    empirical = centered.T @ centered / n
+    mu = np.trace(empirical) / p
+
+    # 目標からの距離 δ と、標本共分散の推定誤差 β
+    delta = np.sum((empirical - mu * np.eye(p)) ** 2) / p
+    squared_norms = np.einsum("ij,ij->i", centered, centered)
+    beta = (np.sum(squared_norms**2) / n - np.sum(empirical**2)) / (n * p)
+    beta = min(beta, delta)
+
+    shrinkage = 0.0 if delta == 0.0 else beta / delta
+    return (1.0 - shrinkage) * empirical + shrinkage * mu * np.eye(p), shrinkage
+
+
+@dataclass
+class CovarianceEstimate:
+    """共分散の推定結果（1本あたりのリターンの共分散）"""
+
+    symbols: List[str]
+    timeframe: str
+    window: int
+    method: str
+    matrix: np.ndarray
+    observations: int
+    as_of: Optional[pd.Timestamp] = None
+    shrinkage: Optional[float] = None
+
+    @property
+    def periods_per_year(self) -> float:
+        return SECONDS_PER_YEAR / timeframe_to_seconds(self.timeframe)
+
+    def to_frame(self, annualize: bool = False) -> pd.DataFrame:
+        """シンボルをラベルに持つ DataFrame（annualize=True なら年率換算）"""
+        matrix = self.matrix * self.periods_per_year if annualize else self.matrix
+        return pd.DataFrame(matrix, index=self.symbols, columns=self.symbols)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "symbols": self.symbols,
+            "timeframe": self.timeframe,
+            "window": self.window,
+            "method": self.method,
+            "covariance": self.matrix.tolist(),
+            "observations": self.observations,
+            "as_of": self.as_of.isoformat() if self.as_of is not None else None,
+            "shrinkage": self.shrinkage,
+        }
+
+
+class _ReturnWindow:
+    """ユニバースの整列済みリターン窓（リングバッファ）
+
+    全シンボルの足が揃った時刻だけを採用する（終値の内部結合 → pct_change と同じ整列）。
+    標本共分散用の和・積和と、EWMA 用の指数加重積和を足1本ごとに O(p²) で更新する。
+    """
+
+    def __init__(self, symbols: Tuple[str, ...], window: int, decay: float):
+        self.symbols = symbols
+        self.index = {symbol: i for i, symbol in enumerate(symbols)}
+        self.window = window
+        self.decay = decay
+
+        p = len(symbols)
+        self._returns = np.zeros((window, p))
+        self._head = 0  # 次に書き込む位置
+        self.count = 0
+
+        self._sum = np.zeros(p)
+        self._cross = np.zeros((p, p))
+        self._ewma = np.zeros((p, p))
+        self._updates_since_rebuild = 0
+
+        self.last_timestamp: Optional[pd.Timestamp] = None
+        self._last_closes: Optional[np.ndarray] = None
+        # シンボルごとの未整列の最新足 (時刻, 終値)
+        self._pending: Dict[str, Tuple[pd.Timestamp, float]] = {}
+
+        self.version = 0
+
+    def returns(self) -> np.ndarray:
+        """窓内のリターン（古い順）"""
+        if self.count < self.window:
+            return self._returns[: self.count].copy()
+        return np.roll(self._returns, -self._head, axis=0)
+
+    def load(self, closes: pd.DataFrame):
+        """整列済みの終値（列はシンボル順）から窓を組み立て直す"""
+        closes = closes.iloc[-(self.window + 1) :]
+        returns = closes.pct_change().iloc[1:].to_numpy(dtype=float)
+
+        self.count = len(returns)
+        self._returns[: self.count] = returns
+        self._head = self.count % self.window
+        self._rebuild_sums()
+        self._pending.clear()
+        if not closes.empty:
+            self.last_timestamp = closes.index[-1]
+            self._last_closes = closes.iloc[-1].to_numpy(dtype=float)
+        self.version += 1
+
+    def _rebuild_sums(self):
+        """窓全体から和・積和を計算し直す（差分更新の丸め誤差をリセット）"""
+        returns = self.returns()
+        self._sum = returns.sum(axis=0)
+        self._cross = returns.T @ returns
+        weights = self.decay ** np.arange(len(returns) - 1, -1, -1)
+        self._ewma = (returns * weights[:, None]).T @ returns
+        self._updates_since_rebuild = 0
+
+    def add_bar(self, symbol: str, timestamp: pd.Timestamp, close: float) -> bool:
+        """確定足を1本追加（全シンボルの足が揃ったらリターンを窓に追加）
+
+        Returns:
+            bool: 窓が更新されたか
+        """
+        if symbol not in self.index or (self.last_timestamp is not None and timestamp <= self.last_timestamp):
+            return False
+
+        self._pending[symbol] = (timestamp, close)
+        if len(self._pending) < len(self.symbols) or any(ts != timestamp for ts, _ in self._pending.values()):
+            return False
+
+        closes = np.array([self._pending[s][1] for s in self.symbols])
+        self._pending.clear()
+        if self._last_closes is not None:
+            self._push(closes / self._last_closes - 1.0)
+        self._last_closes = closes
+        self.last_timestamp = timestamp
+        return True
+
+    def _push(self, row: np.ndarray):
+        evicted = self._returns[self._head].copy() if self.count == self.window else None
+        self._returns[self._head] = row
+        self._head = (self._head + 1) % self.window
+
+        self._sum += row
+        self._cross += np.outer(row, row)
+        self._ewma = self.decay * self._ewma + np.outer(row, row)
+        if evicted is not None:
+            self._sum -= evicted
+            self._cross -= np.outer(evicted, evicted)
+            self._ewma -= self.decay**self.window * np.outer(evicted, evicted)
+        else:
+            self.count += 1
+
+        self._updates_since_rebuild += 1
+        if self._updates_since_rebuild >= self.window:
+            self._rebuild_sums()
+        self.version += 1
+
+    def estimate(self, method: str) -> Tuple[np.ndarray, Optional[float]]:
+        """窓から共分散を推定"""
+        n = self.count
+        if method == SAMPLE:
+            return (self._cross - np.outer(self._sum, self._sum) / n) / (n - 1), None
+        if method == EWMA:
+            return self._ewma * (1.0 - self.decay) / (1.0 - self.decay**n), None
+        return ledoit_wolf_covariance(self.returns())
+
+
+class CovarianceService:
+    """保存済み価格からの共分散推定サービス
+
+    初回の要求時だけストアから終値を読み込み、以降は add_bars() / update_from_results() で
+    届いた確定足からリターン窓を差分更新する。推定結果は窓が更新されるまでキャッシュを返す。
+    """
+
+    def __init__(
+        self,
+        data_dir: Optional[Path] = None,
+        resampler: Optional[OHLCVResampler] = None,
+        ewma_halflife: float = 20.0,
+        min_observations: int = 30,
+        max_windows: int = MAX_RETURN_WINDOWS,
+    ):
+        """
+        Args:
+            data_dir: DataCollector の data_dir（Parquet は data_dir / "parquet" から読む）
+            resampler: 1分足を保持するリサンプラー（保持しているシンボルは Parquet より優先）
+            ewma_halflife: EWMA の半減期（足の本数）
+            min_observations: 推定に必要な最低リターン数
+            max_windows: 保持するリターン窓の上限（超えたら最も古く使われたものから破棄）
+        """
+        self.parquet_dir = (Path(data_dir) if data_dir else Path("data")) / "parquet"
+        self.resampler = resampler
+        self.decay = 0.5 ** (1.0 / ewma_halflife)
+        self.min_observations = min_observations
+        self.max_windows = max_windows
+
+        self._windows: "OrderedDict[StateKey, _ReturnWindow]" = OrderedDict()
+        self._cache: Dict[CacheKey, Tuple[int, CovarianceEstimate]] = {}
+
+        self.stats = {"loads": 0, "load_errors": 0, "bars_applied": 0, "cache_hits": 0, "cache_misses": 0}
+
+    def get_covariance(
+        self, universe: Iterable[str], timeframe: str, window: int = 90, method: str = LEDOIT_WOLF
+    ) -> CovarianceEstimate:
+        """ユニバースの共分散を取得
+
+        Raises:
+            ValueError: 未知の手法、または整列したリターンが min_observations 本に満たない場合
+        """
+        if method not in METHODS:
+            raise ValueError(f"Unknown covariance method: {method}")
+        if window < 2:
+            raise ValueError("window must be at least 2")
+
+        symbols = tuple(sorted(set(universe)))
+        returns_window = self._window(symbols, timeframe, window)
+        if returns_window.count < max(self.min_observations, 2):
+            raise ValueError(
+                f"Not enough aligned bars for {list(symbols)} {timeframe}: "
+                f"{returns_window.count} returns (need {self.min_observations})"
+            )
+
+        key = (symbols, timeframe, window, method)
+        cached = self._cache.get(key)
+        if cached is not None and cached[0] == returns_window.version:
+            self.stats["cache_hits"] += 1
+            return cached[1]
+
+        self.stats["cache_misses"] += 1
+        matrix, shrinkage = returns_window.estimate(method)
+        estimate = CovarianceEstimate(
+            symbols=list(symbols),
+            timeframe=timeframe,
+            window=window,
+            method=method,
+            matrix=matrix,
+            observations=returns_window.count,
+            as_of=returns_window.last_timestamp,
+            shrinkage=shrinkage,
+        )
+        self._cache[key] = (returns_window.version, estimate)
+        return estimate
+
+    def get_covariance_frame(
+        self, names: Iterable[str], timeframe: str, window: int = 90, method: str = LEDOIT_WOLF
+    ) -> pd.DataFrame:
+        """呼び出し側の名前（BTC・BTCUSDT など）をラベルに持つ年率換算の共分散
+
+        Raises:
+            ValueError: get_covariance() と同じ
+        """
+        symbols = {name: store_symbol(name) for name in dict.fromkeys(names)}
+        frame = self.get_covariance(symbols.values(), timeframe, window, method).to_frame(annualize=True)
+        labels = list(symbols)
+        stored = [symbols[name] for name in labels]
+        return pd.DataFrame(frame.loc[stored, stored].to_numpy(), index=labels, columns=labels)
+
+    def add_bars(self, symbol: str, timeframe: str, bars: Union[pd.DataFrame, Iterable[OHLCV]]) -> int:
+        """確定足を取り込み、そのシンボルを含むリターン窓を差分更新
+
+        Returns:
+            int: 更新されたリターン窓の数（足1本ごとに数える）
+        """
+        windows = [w for (_, tf, _), w in self._windows.items() if tf == timeframe and symbol in w.index]
+        if not windows:
+            return 0
+
+        closes = closes_from_bars(bars).sort_index()
+        applied = 0
+        for timestamp, close in closes.items():
+            for returns_window in windows:
+                applied += returns_window.add_bar(symbol, timestamp, float(close))
+        self.stats["bars_applied"] += applied
+        return applied
+
+    def update_from_results(self, results: Dict[str, Dict[str, List[OHLCV]]]) -> int:
+        """DataCollector の収集結果（{シンボル: {時間枠: 新しい確定足}}）を取り込む"""
+        return sum(
+            self.add_bars(symbol, timeframe, bars)
+            for symbol, by_timeframe in results.items()
+            for timeframe, bars in by_timeframe.items()
+            if bars
+        )
+
+    def invalidate(self, symbol: Optional[str] = None):
+        """リターン窓とキャッシュを破棄（symbol 指定時はそのシンボルを含むもののみ）"""
+        for key in list(self._windows):
+            if symbol is None or symbol in key[0]:
+                del self._windows[key]
+        for key in list(self._cache):
+            if symbol is None or symbol in key[0]:
+                del self._cache[key]
+
+    def get_stats(self) -> Dict[str, int]:
+        """統計情報を取得"""
+        return {**self.stats, "windows": len(self._windows), "cached_estimates": len(self._cache)}
+
+    def _window(self, symbols: Tuple[str, ...], timeframe: str, window: int) -> _ReturnWindow:
+        """リターン窓を取得（未作成ならストアから読み込む）"""
+        key = (symbols, timeframe, window)
+        returns_window = self._windows.get(key)
+        if returns_window is not None:
+            self._windows.move_to_end(key)
+            return returns_window
+
+        returns_window = _ReturnWindow(symbols, window, self.decay)
+        returns_window.load(self._load_closes(symbols, timeframe, window + 1))
+        self.stats["loads"] += 1
+
+        self._windows[key] = returns_window
+        while len(self._windows) > self.max_windows:
+            evicted, _ = self._windows.popitem(last=False)
+            for method in METHODS:
+                self._cache.pop((*evicted, method), None)
+        return returns_window
+
+    def _load_closes(self, symbols: Tuple[str, ...], timeframe: str, limit: int) -> pd.DataFrame:
+        """全シンボルの足が揃った時刻の終値（直近 limit 本）"""
+        series = [self._load_symbol_closes(symbol, timeframe).rename(symbol) for symbol in symbols]
+        closes = pd.concat(series, axis=1, join="inner").dropna()
+        return closes.sort_index().iloc[-limit:]
+
+    def _load_symbol_closes(self, symbol: str, timeframe: str) -> pd.Series:
+        """シンボルの確定足の終値（リサンプラー → Parquet の順に探す）"""
+        empty = pd.Series(dtype=float, index=pd.DatetimeIndex([], tz="UTC", name="timestamp"))
+
+        if self.resampler is not None and self.resampler.has_base_bars(symbol):
+            try:
+                return self.resampler.resample(symbol, timeframe)["close"].astype(float)
+            except Exception as e:
+                logger.error(f"Error resampling {symbol} {timeframe} for covariance: {e}")
+
+        filepath = self.parquet_dir / f"{symbol.replace('/', '_')}_{timeframe}.parquet"
+        if not filepath.exists():
+            return empty
+
+        try:
+            return closes_from_bars(pd.read_parquet(filepath, columns=["timestamp", "close"]))
+        except Exception as e:
+            self.stats["load_errors"] += 1
+            logger.error(f"Error loading closes from {filepath}: {e}")
+            return empty
+
+
+# 収集ジョブ・ポートフォリオ API・リスク評価で共有するサービス
+covariance_service = CovarianceService()
+
+
+def get_covariance_service() -> CovarianceService:
+    """共有の共分散推定サービスを取得"""
+    return covariance_service
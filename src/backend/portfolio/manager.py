@@ -9,6 +9,11 @@ from datetime import datetime
 from enum import Enum
 from typing import Any, Dict, List, Optional
 
+import numpy as np
+import pandas as pd
+
+from .covariance import CovarianceService, get_covariance_service
+
 logger = logging.getLogger(__name__)
 
 
@@ -181,13 +186,17 @@ class Portfolio:
 class PortfolioManager:
     """ポートフォリオマネージャー"""
 
-    def __init__(self):
+    def __init__(self, covariance_service: Optional[CovarianceService] = None):
         self.portfolios: Dict[str, Portfolio] = {}
         self.risk_settings = {
             "max_concentration": 0.4,  # 単一資産の最大割合
             "max_volatility": 0.3,  # 最大ボラティリティ
             "min_diversification": 3,  # 最小分散数
+            "covariance_timeframe": "1h",  # ボラティリティ評価に使う共分散の時間枠
+            "covariance_window": 90,  # 共分散の窓長（足の本数）
         }
+        # 保存済み価格からの共分散（既定は共有サービス）
+        self.covariance_service = covariance_service if covariance_service is not None else get_covariance_service()
         logger.info("PortfolioManager initialized")
 
     def create_portfolio(self, name: str, initial_allocation: Optional[Dict[str, float]] = None) -> Portfolio:
@@ -239,18 +248,26 @@ class PortfolioManager:
             for symbol, price in price_data.items():
                 portfolio.update_asset_price(symbol, price)
 
-    def get_risk_assessment(self, name: str) -> Dict[str, Any]:
-        """リスク評価を取得"""
+    def get_risk_assessment(self, name: str, covariance: Optional[pd.DataFrame] = None) -> Dict[str, Any]:
+        """リスク評価を取得
+
+        Args:
+            covariance: 年率換算した資産の共分散（CovarianceService の推定結果など）。
+                指定時はポートフォリオのボラティリティからボラティリティリスクを評価する
+        """
         if name not in self.portfolios:
             return {"error": "Portfolio not found"}
 
         portfolio = self.portfolios[name]
+        volatility = self._portfolio_volatility(portfolio, covariance) if covariance is not None else None
         assessment = {
             "concentration_risk": self._assess_concentration_risk(portfolio),
             "diversification_score": self._assess_diversification(portfolio),
-            "volatility_risk": self._assess_volatility_risk(portfolio),
+            "volatility_risk": self._assess_volatility_risk(portfolio, volatility),
             "overall_risk_score": 0.0,
         }
+        if volatility is not None:
+            assessment["portfolio_volatility"] = volatility
 
         # 総合リスクスコアを計算
         assessment["overall_risk_score"] = (
@@ -261,6 +278,25 @@ class PortfolioManager:
 
         return assessment
 
+    def _estimate_covariance(self, portfolio: Portfolio) -> Optional[pd.DataFrame]:
+        """暗号資産の年率換算の共分散（ステーブル・法定通貨はボラティリティ0とみなして含めない）
+
+        保存済みの足が足りない場合は None を返し、暗号資産の比率による簡易評価に任せる。
+        """
+        symbols = [symbol for symbol, asset in portfolio.assets.items() if asset.asset_type == AssetType.CRYPTO]
+        if not symbols:
+            return None
+
+        try:
+            return self.covariance_service.get_covariance_frame(
+                symbols,
+                self.risk_settings["covariance_timeframe"],
+                window=self.risk_settings["covariance_window"],
+            )
+        except ValueError as e:
+            logger.debug(f"Covariance unavailable for {portfolio.name}: {e}")
+            return None
+
     def _assess_concentration_risk(self, portfolio: Portfolio) -> float:
         """集中リスクを評価"""
         if not portfolio.assets:
@@ -286,9 +322,26 @@ class PortfolioManager:
         else:
             return 0.0  # 高分散（低リスク）
 
-    def _assess_volatility_risk(self, portfolio: Portfolio) -> float:
+    def _portfolio_volatility(self, portfolio: Portfolio, covariance: pd.DataFrame) -> Optional[float]:
+        """共分散からポートフォリオのボラティリティを計算（共分散に含まれない資産は無視）"""
+        symbols = [symbol for symbol in portfolio.assets if symbol in covariance.index]
+        if not symbols:
+            return None
+
+        weights = np.array([portfolio.assets[symbol].actual_weight for symbol in symbols])
+        matrix = covariance.loc[symbols, symbols].to_numpy(dtype=float)
+        return float(np.sqrt(max(weights @ matrix @ weights, 0.0)))
+
+    def _assess_volatility_risk(self, portfolio: Portfolio, volatility: Optional[float] = None) -> float:
         """ボラティリティリスクを評価"""
-        # 簡単なボラティリティ評価（実際の実装では価格履歴を使用）
+        if volatility is not None:
+            if volatility > self.risk_settings["max_volatility"]:
+                return 1.0
+            elif volatility > self.risk_settings["max_volatility"] * 0.75:
+                return 0.5
+            return 0.0
+
+        # 共分散がない場合は暗号資産の比率で簡易評価
         crypto_weight = sum(
             asset.actual_weight for asset in portfolio.assets.values() if asset.asset_type == AssetType.CRYPTO
         )
@@ -321,7 +374,7 @@ class PortfolioManager:
             )
 
         # リスク軽減提案
-        risk_assessment = self.get_risk_assessment(name)
+        risk_assessment = self.get_risk_assessment(name, self._estimate_covariance(portfolio))
         if risk_assessment["overall_risk_score"] > 0.6:
             suggestions.append(
                 {
@@ -2,15 +2,29 @@
 ポートフォリオ最適化システム
 """
 
+import hashlib
 import logging
 import math
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime
 from enum import Enum
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from . import solvers
 
 logger = logging.getLogger(__name__)
 
+# 共分散行列の入力形式（{asset: {asset: cov}}、資産名ラベル付き DataFrame、assets 順の ndarray）
+CovarianceInput = Union[Dict[str, Dict[str, float]], pd.DataFrame, np.ndarray]
+
+# 効率的フロンティアのキャッシュ件数
+FRONTIER_CACHE_SIZE = 32
+
 
 class OptimizationObjective(Enum):
     """最適化目的"""
@@ -74,17 +88,27 @@ class PortfolioOptimizer:
     def __init__(self, risk_free_rate: float = 0.02):
         self.risk_free_rate = risk_free_rate
         self.optimization_history: List[OptimizationResult] = []
+        # (期待リターン, 共分散, 制約) のハッシュ → 効率的フロンティア
+        self._frontier_cache: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        # フロンティアの並列計算用プロセスプール（初回の並列計算時に作成し、以降は使い回す）
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_workers = 0
+        self.stats = {"frontier_cache_hits": 0, "frontier_cache_misses": 0, "pool_starts": 0}
         logger.info("PortfolioOptimizer initialized")
 
     def optimize(
         self,
         assets: List[str],
         expected_returns: Dict[str, float],
-        covariance_matrix: Dict[str, Dict[str, float]],
+        covariance_matrix: CovarianceInput,
         objective: OptimizationObjective = OptimizationObjective.SHARPE_RATIO,
         constraints: List[OptimizationConstraint] = None,
     ) -> OptimizationResult:
-        """ポートフォリオを最適化"""
+        """ポートフォリオを最適化
+
+        制約は資産ごとの上下限と重みの合計に変換し、ndarray ベースのソルバーで解く
+        （solvers モジュール参照）。収束状況は convergence_status に入る。
+        """
 
         start_time = datetime.now()
 
@@ -125,318 +149,278 @@ class PortfolioOptimizer:
         self,
         assets: List[str],
         expected_returns: Dict[str, float],
-        covariance_matrix: Dict[str, Dict[str, float]],
+        covariance_matrix: CovarianceInput,
         constraints: List[OptimizationConstraint],
     ) -> OptimizationResult:
         """シャープレシオを最大化"""
-
-        # 簡易最適化（実際の実装では scipy.optimize を使用）
-        best_weights = self._equal_weight_portfolio(assets)
-        best_sharpe = self._calculate_sharpe_ratio(best_weights, expected_returns, covariance_matrix)
-
-        # グリッドサーチによる近似最適化
-        for iteration in range(100):
-            # ランダムな重みを生成
-            weights = self._generate_random_weights(assets, constraints)
-
-            if weights is None:
-                continue
-
-            sharpe = self._calculate_sharpe_ratio(weights, expected_returns, covariance_matrix)
-
-            if sharpe > best_sharpe:
-                best_sharpe = sharpe
-                best_weights = weights
-
-        # 結果を作成
-        portfolio_return = self._calculate_portfolio_return(best_weights, expected_returns)
-        portfolio_volatility = self._calculate_portfolio_volatility(best_weights, covariance_matrix)
-
-        return OptimizationResult(
-            objective=OptimizationObjective.SHARPE_RATIO,
-            weights=best_weights,
-            expected_return=portfolio_return,
-            expected_volatility=portfolio_volatility,
-            sharpe_ratio=best_sharpe,
-            optimization_time=0.0,
-            constraints_satisfied=self._check_constraints(best_weights, constraints),
-            convergence_status="completed",
+        returns, covariance = self._to_arrays(assets, expected_returns, covariance_matrix)
+        lower, upper, total = self._weight_bounds(assets, constraints)
+        solution = solvers.max_sharpe(covariance, returns - self.risk_free_rate, lower, upper, total)
+        return self._build_result(
+            OptimizationObjective.SHARPE_RATIO, assets, solution, returns, covariance, constraints
         )
 
     def _optimize_min_volatility(
         self,
         assets: List[str],
         expected_returns: Dict[str, float],
-        covariance_matrix: Dict[str, Dict[str, float]],
+        covariance_matrix: CovarianceInput,
         constraints: List[OptimizationConstraint],
     ) -> OptimizationResult:
         """ボラティリティを最小化"""
-
-        best_weights = self._equal_weight_portfolio(assets)
-        best_volatility = self._calculate_portfolio_volatility(best_weights, covariance_matrix)
-
-        # グリッドサーチによる近似最適化
-        for iteration in range(100):
-            weights = self._generate_random_weights(assets, constraints)
-
-            if weights is None:
-                continue
-
-            volatility = self._calculate_portfolio_volatility(weights, covariance_matrix)
-
-            if volatility < best_volatility:
-                best_volatility = volatility
-                best_weights = weights
-
-        # 結果を作成
-        portfolio_return = self._calculate_portfolio_return(best_weights, expected_returns)
-        sharpe_ratio = self._calculate_sharpe_ratio(best_weights, expected_returns, covariance_matrix)
-
-        return OptimizationResult(
-            objective=OptimizationObjective.MIN_VOLATILITY,
-            weights=best_weights,
-            expected_return=portfolio_return,
-            expected_volatility=best_volatility,
-            sharpe_ratio=sharpe_ratio,
-            optimization_time=0.0,
-            constraints_satisfied=self._check_constraints(best_weights, constraints),
-            convergence_status="completed",
+        returns, covariance = self._to_arrays(assets, expected_returns, covariance_matrix)
+        lower, upper, total = self._weight_bounds(assets, constraints)
+        solution = solvers.min_variance(covariance, lower, upper, total)
+        return self._build_result(
+            OptimizationObjective.MIN_VOLATILITY, assets, solution, returns, covariance, constraints
         )
 
     def _optimize_max_return(
         self,
         assets: List[str],
         expected_returns: Dict[str, float],
-        covariance_matrix: Dict[str, Dict[str, float]],
+        covariance_matrix: CovarianceInput,
         constraints: List[OptimizationConstraint],
     ) -> OptimizationResult:
         """リターンを最大化"""
-
-        best_weights = self._equal_weight_portfolio(assets)
-        best_return = self._calculate_portfolio_return(best_weights, expected_returns)
-
-        # グリッドサーチによる近似最適化
-        for iteration in range(100):
-            weights = self._generate_random_weights(assets, constraints)
-
-            if weights is None:
-                continue
-
-            portfolio_return = self._calculate_portfolio_return(weights, expected_returns)
-
-            if portfolio_return > best_return:
-                best_return = portfolio_return
-                best_weights = weights
-
-        # 結果を作成
-        portfolio_volatility = self._calculate_portfolio_volatility(best_weights, covariance_matrix)
-        sharpe_ratio = self._calculate_sharpe_ratio(best_weights, expected_returns, covariance_matrix)
-
-        return OptimizationResult(
-            objective=OptimizationObjective.MAX_RETURN,
-            weights=best_weights,
-            expected_return=best_return,
-            expected_volatility=portfolio_volatility,
-            sharpe_ratio=sharpe_ratio,
-            optimization_time=0.0,
-            constraints_satisfied=self._check_constraints(best_weights, constraints),
-            convergence_status="completed",
-        )
+        returns, covariance = self._to_arrays(assets, expected_returns, covariance_matrix)
+        lower, upper, total = self._weight_bounds(assets, constraints)
+        solution = solvers.max_return(returns, lower, upper, total)
+        return self._build_result(OptimizationObjective.MAX_RETURN, assets, solution, returns, covariance, constraints)
 
     def _optimize_risk_parity(
         self,
         assets: List[str],
         expected_returns: Dict[str, float],
-        covariance_matrix: Dict[str, Dict[str, float]],
+        covariance_matrix: CovarianceInput,
         constraints: List[OptimizationConstraint],
     ) -> OptimizationResult:
-        """リスクパリティ最適化"""
-
-        # 簡易リスクパリティ（逆ボラティリティ重み）
-        asset_volatilities = {}
-        for asset in assets:
-            asset_volatilities[asset] = math.sqrt(covariance_matrix[asset][asset])
+        """リスクパリティ最適化
+
+        リスク寄与度を均等にする重みを求める（上下限は考慮せず、満たさない場合は constraints_satisfied=False）
+        """
+        returns, covariance = self._to_arrays(assets, expected_returns, covariance_matrix)
+        _, _, total = self._weight_bounds(assets, constraints)
+        solution = solvers.risk_parity(covariance, total=total)
+        return self._build_result(OptimizationObjective.RISK_PARITY, assets, solution, returns, covariance, constraints)
+
+    def _to_arrays(
+        self, assets: List[str], expected_returns: Dict[str, float], covariance_matrix: CovarianceInput
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """期待リターン・共分散を assets 順の ndarray に変換"""
+        returns = np.array([expected_returns[asset] for asset in assets], dtype=float)
+        if isinstance(covariance_matrix, pd.DataFrame):
+            covariance = covariance_matrix.loc[assets, assets].to_numpy(dtype=float)
+        elif isinstance(covariance_matrix, np.ndarray):
+            covariance = covariance_matrix.astype(float)
+        else:
+            covariance = np.array([[covariance_matrix[a][b] for b in assets] for a in assets], dtype=float)
+        return returns, covariance
 
-        # 逆ボラティリティの重みを計算
-        inverse_volatilities = {asset: 1.0 / vol for asset, vol in asset_volatilities.items()}
-        total_inverse_vol = sum(inverse_volatilities.values())
+    def _weight_bounds(
+        self, assets: List[str], constraints: List[OptimizationConstraint]
+    ) -> Tuple[np.ndarray, np.ndarray, float]:
+        """制約を (下限, 上限, 合計) に変換（下限の既定は 0）"""
+        index = {asset: i for i, asset in enumerate(assets)}
+        lower = np.zeros(len(assets))
+        upper = np.full(len(assets), np.inf)
+        total = 1.0
 
-        weights = {asset: inv_vol / total_inverse_vol for asset, inv_vol in inverse_volatilities.items()}
+        for constraint in constraints:
+            if constraint.asset == "_sum":
+                if constraint.constraint_type == "exact_weight":
+                    total = constraint.value
+                continue
+            i = index.get(constraint.asset)
+            if i is None:
+                continue
+            if constraint.constraint_type in ("min_weight", "exact_weight"):
+                lower[i] = max(lower[i], constraint.value)
+            if constraint.constraint_type in ("max_weight", "exact_weight"):
+                upper[i] = min(upper[i], constraint.value)
+
+        return lower, upper, total
+
+    def _portfolio_statistics(
+        self, weights: np.ndarray, returns: np.ndarray, covariance: np.ndarray
+    ) -> Tuple[float, float, float]:
+        """(期待リターン, ボラティリティ, シャープレシオ)"""
+        portfolio_return = float(weights @ returns)
+        portfolio_volatility = math.sqrt(max(float(weights @ covariance @ weights), 0.0))
+        if portfolio_volatility == 0:
+            return portfolio_return, portfolio_volatility, 0.0
+        return portfolio_return, portfolio_volatility, (portfolio_return - self.risk_free_rate) / portfolio_volatility
 
-        # 結果を作成
-        portfolio_return = self._calculate_portfolio_return(weights, expected_returns)
-        portfolio_volatility = self._calculate_portfolio_volatility(weights, covariance_matrix)
-        sharpe_ratio = self._calculate_sharpe_ratio(weights, expected_returns, covariance_matrix)
+    def _build_result(
+        self,
+        objective: OptimizationObjective,
+        assets: List[str],
+        solution: solvers.SolverResult,
+        returns: np.ndarray,
+        covariance: np.ndarray,
+        constraints: List[OptimizationConstraint],
+    ) -> OptimizationResult:
+        """ソルバーの解から OptimizationResult を作成"""
+        if not solution.converged:
+            logger.warning(f"{objective.value} optimization did not converge: {solution.status}")
 
+        portfolio_return, portfolio_volatility, sharpe_ratio = self._portfolio_statistics(
+            solution.weights, returns, covariance
+        )
+        weights = {asset: float(weight) for asset, weight in zip(assets, solution.weights)}
         return OptimizationResult(
-            objective=OptimizationObjective.RISK_PARITY,
+            objective=objective,
             weights=weights,
             expected_return=portfolio_return,
             expected_volatility=portfolio_volatility,
             sharpe_ratio=sharpe_ratio,
             optimization_time=0.0,
             constraints_satisfied=self._check_constraints(weights, constraints),
-            convergence_status="completed",
+            convergence_status=solution.status,
         )
 
-    def _equal_weight_portfolio(self, assets: List[str]) -> Dict[str, float]:
-        """等重みポートフォリオを作成"""
-        weight = 1.0 / len(assets)
-        return {asset: weight for asset in assets}
-
-    def _generate_random_weights(
-        self, assets: List[str], constraints: List[OptimizationConstraint]
-    ) -> Optional[Dict[str, float]]:
-        """制約を満たすランダムな重みを生成"""
-        import random
-
-        # ランダムな重みを生成
-        raw_weights = [random.random() for _ in assets]  # nosec B311
-        total_weight = sum(raw_weights)
-
-        # 正規化
-        weights = {asset: weight / total_weight for asset, weight in zip(assets, raw_weights)}
-
-        # 制約をチェック
-        if self._check_constraints(weights, constraints):
-            return weights
-
-        return None
-
     def _check_constraints(self, weights: Dict[str, float], constraints: List[OptimizationConstraint]) -> bool:
-        """制約が満たされているかチェック"""
+        """制約が満たされているかチェック（数値誤差は許容）"""
+        tolerance = solvers.FEASIBILITY_TOLERANCE
         for constraint in constraints:
             if constraint.asset == "_sum":
                 if not constraint.is_satisfied(sum(weights.values())):
                     return False
             elif constraint.asset in weights:
-                if not constraint.is_satisfied(weights[constraint.asset]):
+                weight = weights[constraint.asset]
+                if constraint.constraint_type == "min_weight":
+                    weight += tolerance
+                elif constraint.constraint_type == "max_weight":
+                    weight -= tolerance
+                if not constraint.is_satisfied(weight):
                     return False
         return True
 
-    def _calculate_portfolio_return(self, weights: Dict[str, float], expected_returns: Dict[str, float]) -> float:
-        """ポートフォリオの期待リターンを計算"""
-        return sum(weights[asset] * expected_returns[asset] for asset in weights)
-
-    def _calculate_portfolio_volatility(
-        self, weights: Dict[str, float], covariance_matrix: Dict[str, Dict[str, float]]
-    ) -> float:
-        """ポートフォリオのボラティリティを計算"""
-        variance = 0.0
-
-        for asset1 in weights:
-            for asset2 in weights:
-                variance += weights[asset1] * weights[asset2] * covariance_matrix[asset1][asset2]
-
-        return math.sqrt(variance)
-
-    def _calculate_sharpe_ratio(
-        self,
-        weights: Dict[str, float],
-        expected_returns: Dict[str, float],
-        covariance_matrix: Dict[str, Dict[str, float]],
-    ) -> float:
-        """シャープレシオを計算"""
-        portfolio_return = self._calculate_portfolio_return(weights, expected_returns)
-        portfolio_volatility = self._calculate_portfolio_volatility(weights, covariance_matrix)
-
-        if portfolio_volatility == 0:
-            return 0.0
-
-        return (portfolio_return - self.risk_free_rate) / portfolio_volatility
-
     def generate_efficient_frontier(
         self,
         assets: List[str],
         expected_returns: Dict[str, float],
-        covariance_matrix: Dict[str, Dict[str, float]],
+        covariance_matrix: CovarianceInput,
         num_portfolios: int = 50,
+        constraints: Optional[List[OptimizationConstraint]] = None,
+        max_workers: Optional[int] = None,
     ) -> List[Dict[str, Any]]:
-        """効率的フロンティアを生成"""
+        """効率的フロンティアを生成
+
+        目標リターンを昇順に解き、各点は隣の点の解から warm start する。
+        max_workers を指定すると目標リターンを連続した区間に分けてプロセスプールで並列に解く
+        （各区間の中は warm start のまま）。
+        結果は (期待リターン, 共分散, 制約, 点数) のハッシュでキャッシュし、同じ入力の再描画では再計算しない。
+        """
+        returns, covariance = self._to_arrays(assets, expected_returns, covariance_matrix)
+        lower, upper, total = self._weight_bounds(assets, constraints or [])
+
+        cache_key = self._frontier_cache_key(assets, returns, covariance, lower, upper, total, num_portfolios)
+        cached = self._frontier_cache.get(cache_key)
+        if cached is not None:
+            self._frontier_cache.move_to_end(cache_key)
+            self.stats["frontier_cache_hits"] += 1
+            return self._copy_frontier(cached)
+        self.stats["frontier_cache_misses"] += 1
+
+        # リターンの範囲を設定（制約のもとで達成できる範囲）
+        min_return, max_return = solvers.return_range(returns, lower, upper, total)
+        targets = np.linspace(min_return, max_return, num_portfolios)
+
+        solutions = self._trace_frontier(covariance, returns, lower, upper, total, targets, max_workers)
 
         frontier_portfolios = []
-
-        # リターンの範囲を設定
-        min_return = min(expected_returns.values())
-        max_return = max(expected_returns.values())
-
-        return_range = [
-            min_return + (max_return - min_return) * i / (num_portfolios - 1) for i in range(num_portfolios)
-        ]
-
-        for target_return in return_range:
-            # 目標リターンを制約として追加
-            constraints = [OptimizationConstraint("_return", "exact_weight", target_return)]
-
-            # 最小ボラティリティで最適化
-            try:
-                result = self._optimize_min_volatility_with_return_constraint(
-                    assets,
-                    expected_returns,
-                    covariance_matrix,
-                    target_return,
-                    constraints,
-                )
-
-                frontier_portfolios.append(
-                    {
-                        "expected_return": result.expected_return,
-                        "volatility": result.expected_volatility,
-                        "sharpe_ratio": result.sharpe_ratio,
-                        "weights": result.weights,
-                    }
-                )
-            except Exception as e:
-                logger.warning(f"Failed to optimize for return {target_return}: {e}")
+        for target_return, solution in zip(targets, solutions):
+            if solution.status == "infeasible":
+                logger.warning(f"Failed to optimize for return {target_return}: infeasible")
                 continue
 
-        return frontier_portfolios
-
-    def _optimize_min_volatility_with_return_constraint(
+            portfolio_return, portfolio_volatility, sharpe_ratio = self._portfolio_statistics(
+                solution.weights, returns, covariance
+            )
+            frontier_portfolios.append(
+                {
+                    "expected_return": portfolio_return,
+                    "volatility": portfolio_volatility,
+                    "sharpe_ratio": sharpe_ratio,
+                    "weights": {asset: float(weight) for asset, weight in zip(assets, solution.weights)},
+                    "convergence_status": solution.status,
+                }
+            )
+
+        self._frontier_cache[cache_key] = frontier_portfolios
+        while len(self._frontier_cache) > FRONTIER_CACHE_SIZE:
+            self._frontier_cache.popitem(last=False)
+        return self._copy_frontier(frontier_portfolios)
+
+    def _trace_frontier(
+        self,
+        covariance: np.ndarray,
+        returns: np.ndarray,
+        lower: np.ndarray,
+        upper: np.ndarray,
+        total: float,
+        targets: np.ndarray,
+        max_workers: Optional[int],
+    ) -> List[solvers.SolverResult]:
+        """目標リターン列を解く（区間ごとにプロセスプールで並列化）"""
+        if not max_workers or max_workers < 2 or len(targets) < 2 * max_workers:
+            return solvers.trace_frontier(covariance, returns, lower, upper, total, targets)
+
+        segments = np.array_split(targets, max_workers)
+        try:
+            executor = self._get_executor(max_workers)
+            futures = [
+                executor.submit(solvers.trace_frontier, covariance, returns, lower, upper, total, segment)
+                for segment in segments
+            ]
+            return [solution for future in futures for solution in future.result()]
+        except Exception as e:
+            # 壊れたプールは捨て、次回の並列計算で作り直す
+            logger.warning(f"Parallel frontier generation failed, falling back to sequential: {e}")
+            self.close()
+            return solvers.trace_frontier(covariance, returns, lower, upper, total, targets)
+
+    def _get_executor(self, max_workers: int) -> ProcessPoolExecutor:
+        """プロセスプールを取得（未作成またはワーカー数が足りない場合のみ作成）"""
+        if self._executor is None or self._executor_workers < max_workers:
+            self.close()
+            self._executor = ProcessPoolExecutor(max_workers=max_workers)
+            self._executor_workers = max_workers
+            self.stats["pool_starts"] += 1
+        return self._executor
+
+    def close(self):
+        """プロセスプールを停止"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self._executor_workers = 0
+
+    def _frontier_cache_key(
         self,
         assets: List[str],
-        expected_returns: Dict[str, float],
-        covariance_matrix: Dict[str, Dict[str, float]],
-        target_return: float,
-        constraints: List[OptimizationConstraint],
-    ) -> OptimizationResult:
-        """目標リターン制約付きの最小ボラティリティ最適化"""
-
-        best_weights = self._equal_weight_portfolio(assets)
-        best_volatility = float("inf")
-
-        # グリッドサーチによる近似最適化
-        for iteration in range(200):
-            weights = self._generate_random_weights(assets, constraints)
-
-            if weights is None:
-                continue
-
-            # リターン制約をチェック
-            portfolio_return = self._calculate_portfolio_return(weights, expected_returns)
-            if abs(portfolio_return - target_return) > 0.005:  # 0.5%の許容範囲
-                continue
-
-            volatility = self._calculate_portfolio_volatility(weights, covariance_matrix)
-
-            if volatility < best_volatility:
-                best_volatility = volatility
-                best_weights = weights
-
-        # 結果を作成
-        portfolio_return = self._calculate_portfolio_return(best_weights, expected_returns)
-        sharpe_ratio = self._calculate_sharpe_ratio(best_weights, expected_returns, covariance_matrix)
-
-        return OptimizationResult(
-            objective=OptimizationObjective.MIN_VOLATILITY,
-            weights=best_weights,
-            expected_return=portfolio_return,
-            expected_volatility=best_volatility,
-            sharpe_ratio=sharpe_ratio,
-            optimization_time=0.0,
-            constraints_satisfied=True,
-            convergence_status="completed",
-        )
+        returns: np.ndarray,
+        covariance: np.ndarray,
+        lower: np.ndarray,
+        upper: np.ndarray,
+        total: float,
+        num_portfolios: int,
+    ) -> str:
+        digest = hashlib.sha256()
+        digest.update("\x1f".join(assets).encode())
+        for array in (returns, covariance, lower, upper, np.array([total, self.risk_free_rate, num_portfolios])):
+            digest.update(np.ascontiguousarray(array, dtype=float).tobytes())
+        return digest.hexdigest()
+
+    @staticmethod
+    def _copy_frontier(frontier: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """キャッシュを呼び出し側の変更から守るためのコピー"""
+        return [dict(point, weights=dict(point["weights"])) for point in frontier]
+
+    def clear_frontier_cache(self):
+        """効率的フロンティアのキャッシュをクリア"""
+        self._frontier_cache.clear()
 
     def get_optimization_history(self) -> List[Dict[str, Any]]:
         """最適化履歴を取得"""
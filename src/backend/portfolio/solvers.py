@@ -0,0 +1,416 @@
+"""
+ポートフォリオ最適化ソルバー
+
+共分散を ndarray で受け取り、以下を解く。
+- 最小分散・目標リターン制約付き最小分散: 有効制約法（active-set）による凸二次計画
+- 最大シャープレシオ: y = κw の標準変換で凸二次計画に帰着
+- 最大リターン: 上下限・合計制約下の線形計画（貪欲法で厳密解）
+- リスクパリティ: 巡回座標降下法
+
+上下限は資産ごとの配列、合計制約は重みの総和で与える。
+"""
+
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# 収束判定の許容誤差
+DEFAULT_TOLERANCE = 1e-10
+# 上下限・合計制約の判定に使う許容誤差
+FEASIBILITY_TOLERANCE = 1e-9
+
+
+@dataclass
+class SolverResult:
+    """ソルバーの結果
+
+    status は "optimal"（収束）、"max_iterations"（反復上限で打ち切り）、
+    "infeasible"（制約を満たす解がない）、"degenerate"（入力が不正）など
+    """
+
+    weights: np.ndarray
+    status: str
+    iterations: int = 0
+
+    @property
+    def converged(self) -> bool:
+        return self.status == "optimal"
+
+
+def bounds_feasible(lower: np.ndarray, upper: np.ndarray, total: float = 1.0) -> bool:
+    """上下限と合計制約を同時に満たす重みが存在するか"""
+    return bool(
+        np.all(lower <= upper + FEASIBILITY_TOLERANCE)
+        and lower.sum() <= total + FEASIBILITY_TOLERANCE
+        and upper.sum() >= total - FEASIBILITY_TOLERANCE
+    )
+
+
+def project_to_capped_simplex(
+    values: np.ndarray, lower: np.ndarray, upper: np.ndarray, total: float = 1.0, iterations: int = 100
+) -> np.ndarray:
+    """{lower <= w <= upper, sum(w) = total} へのユークリッド射影
+
+    w = clip(values - τ, lower, upper) の合計は τ について単調なので τ を二分探索する
+    """
+    values = np.asarray(values, dtype=float)
+
+    def clipped_sum(tau: float) -> float:
+        return float(np.clip(values - tau, lower, upper).sum())
+
+    finite_lower = np.where(np.isfinite(lower), lower, values - 1.0)
+    hi = float(np.max(values - finite_lower))
+    lo = hi - 1.0
+    while clipped_sum(hi) >= total:
+        hi += 2.0 * (hi - lo)
+    while clipped_sum(lo) < total:
+        lo -= 2.0 * (hi - lo)
+
+    for _ in range(iterations):
+        mid = 0.5 * (lo + hi)
+        if clipped_sum(mid) >= total:
+            lo = mid
+        else:
+            hi = mid
+    return np.clip(values - lo, lower, upper)
+
+
+def extreme_portfolio(
+    scores: np.ndarray, lower: np.ndarray, upper: np.ndarray, total: float = 1.0, maximize: bool = True
+) -> np.ndarray:
+    """scores との内積を最大化（最小化）する端点ポートフォリオ
+
+    下限から始め、スコアの高い（低い）資産から上限まで残りの重みを割り当てる
+    """
+    weights = np.where(np.isfinite(lower), lower, 0.0).astype(float)
+    remaining = total - weights.sum()
+    order = np.argsort(-scores if maximize else scores, kind="stable")
+    for index in order:
+        if remaining <= 0:
+            break
+        amount = min(remaining, upper[index] - weights[index])
+        weights[index] += amount
+        remaining -= amount
+    return weights
+
+
+def solve_qp(
+    Q: np.ndarray,
+    c: np.ndarray,
+    A_eq: np.ndarray,
+    b_eq: np.ndarray,
+    lower: np.ndarray,
+    upper: np.ndarray,
+    x0: np.ndarray,
+    G: Optional[np.ndarray] = None,
+    h: Optional[np.ndarray] = None,
+    max_iterations: Optional[int] = None,
+    tolerance: float = DEFAULT_TOLERANCE,
+) -> SolverResult:
+    """有効制約法で凸二次計画を解く
+
+        minimize    0.5 x'Qx + c'x
+        subject to  A_eq x = b_eq,  G x <= h,  lower <= x <= upper
+
+    x0 は実行可能解であること。上下限で有効な変数は固定して自由変数だけの KKT 系を解き、
+    一般の不等式制約は作業集合の行として KKT 系に加える。
+    """
+    n = len(x0)
+    G = np.zeros((0, n)) if G is None else np.asarray(G, dtype=float)
+    h = np.zeros(0) if h is None else np.asarray(h, dtype=float)
+    A_eq = np.atleast_2d(np.asarray(A_eq, dtype=float))
+    b_eq = np.atleast_1d(np.asarray(b_eq, dtype=float))
+    max_iterations = max_iterations or 10 * (n + len(h)) + 100
+
+    x = np.clip(np.asarray(x0, dtype=float), lower, upper)
+    at_lower = np.isfinite(lower) & (x <= lower + FEASIBILITY_TOLERANCE)
+    at_upper = ~at_lower & np.isfinite(upper) & (x >= upper - FEASIBILITY_TOLERANCE)
+    x[at_lower] = lower[at_lower]
+    x[at_upper] = upper[at_upper]
+    working = [i for i in range(len(h)) if G[i] @ x >= h[i] - FEASIBILITY_TOLERANCE]
+
+    for iteration in range(1, max_iterations + 1):
+        free = ~(at_lower | at_upper)
+        rows = np.vstack([A_eq, G[working]]) if working else A_eq
+        gradient = Q @ x + c
+
+        step, multipliers = _solve_kkt(Q[np.ix_(free, free)], rows[:, free], gradient[free])
+        p = np.zeros(n)
+        p[free] = step
+
+        if np.max(np.abs(p), initial=0.0) <= tolerance * (1.0 + np.max(np.abs(x))):
+            # 作業集合上の最適点: 不等式・上下限の乗数がすべて非負なら最適
+            reduced = gradient + rows.T @ multipliers
+            bound_multipliers = np.full(n, np.inf)
+            bound_multipliers[at_lower] = reduced[at_lower]
+            bound_multipliers[at_upper] = -reduced[at_upper]
+            row_multipliers = multipliers[len(A_eq) :]
+
+            scale = tolerance * (1.0 + np.max(np.abs(gradient)))
+            worst_bound = int(np.argmin(bound_multipliers))
+            worst_row = int(np.argmin(row_multipliers)) if len(row_multipliers) else -1
+            bound_value = bound_multipliers[worst_bound]
+            row_value = row_multipliers[worst_row] if worst_row >= 0 else np.inf
+
+            if min(bound_value, row_value) >= -scale:
+                return SolverResult(x, "optimal", iteration)
+            if bound_value <= row_value:
+                at_lower[worst_bound] = at_upper[worst_bound] = False
+            else:
+                del working[worst_row]
+            continue
+
+        # 実行可能性を保つ最大ステップ
+        alpha, blocking = 1.0, None
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratios = np.where(free & (p < 0), (lower - x) / p, np.where(free & (p > 0), (upper - x) / p, np.inf))
+        index = int(np.argmin(ratios))
+        if ratios[index] < alpha:
+            alpha, blocking = max(float(ratios[index]), 0.0), ("bound", index)
+
+        if len(h):
+            direction = G @ p
+            inactive = np.ones(len(h), dtype=bool)
+            inactive[working] = False
+            candidates = np.flatnonzero(inactive & (direction > FEASIBILITY_TOLERANCE))
+            if len(candidates):
+                row_ratios = (h[candidates] - G[candidates] @ x) / direction[candidates]
+                row = int(np.argmin(row_ratios))
+                if row_ratios[row] < alpha:
+                    alpha, blocking = max(float(row_ratios[row]), 0.0), ("row", int(candidates[row]))
+
+        x = x + alpha * p
+        if blocking is not None:
+            kind, index = blocking
+            if kind == "bound":
+                if p[index] < 0:
+                    x[index], at_lower[index] = lower[index], True
+                else:
+                    x[index], at_upper[index] = upper[index], True
+            else:
+                working.append(index)
+
+    return SolverResult(x, "max_iterations", max_iterations)
+
+
+def _solve_kkt(Q: np.ndarray, rows: np.ndarray, gradient: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """等式制約付き二次計画のステップ p と乗数 λ（Qp + rows'λ = -g, rows p = 0）"""
+    n, m = Q.shape[0], rows.shape[0]
+    kkt = np.zeros((n + m, n + m))
+    kkt[:n, :n] = Q
+    kkt[:n, n:] = rows.T
+    kkt[n:, :n] = rows
+    rhs = np.concatenate([-gradient, np.zeros(m)])
+    try:
+        solution = np.linalg.solve(kkt, rhs)
+        if not np.all(np.isfinite(solution)):
+            raise np.linalg.LinAlgError
+    except np.linalg.LinAlgError:
+        # 作業集合が線形従属な場合は最小ノルム解を使う
+        solution = np.linalg.lstsq(kkt, rhs, rcond=None)[0]
+    return solution[:n], solution[n:]
+
+
+def min_variance(
+    covariance: np.ndarray,
+    lower: np.ndarray,
+    upper: np.ndarray,
+    total: float = 1.0,
+    expected_returns: Optional[np.ndarray] = None,
+    target_return: Optional[float] = None,
+    x0: Optional[np.ndarray] = None,
+) -> SolverResult:
+    """最小分散ポートフォリオ（target_return 指定時は期待リターン制約付き）
+
+    x0 には上下限・合計を満たす初期解（隣の目標リターンの解など）を渡せる。
+    目標リターン制約付きの場合は、x0 を端点ポートフォリオの方向へ目標リターンまで動かして初期解にする。
+    """
+    n = len(covariance)
+    if not bounds_feasible(lower, upper, total):
+        return SolverResult(np.full(n, total / n), "infeasible")
+
+    A_eq, b_eq = np.ones((1, n)), np.array([total])
+    if target_return is not None:
+        x0 = _target_return_start(expected_returns, target_return, lower, upper, total, x0)
+        if x0 is None:
+            return SolverResult(np.full(n, total / n), "infeasible")
+        A_eq = np.vstack([A_eq, expected_returns])
+        b_eq = np.append(b_eq, target_return)
+    elif x0 is None:
+        x0 = project_to_capped_simplex(np.full(n, total / n), lower, upper, total)
+
+    return solve_qp(covariance, np.zeros(n), A_eq, b_eq, lower, upper, x0)
+
+
+def _target_return_start(
+    expected_returns: np.ndarray,
+    target_return: float,
+    lower: np.ndarray,
+    upper: np.ndarray,
+    total: float,
+    anchor: Optional[np.ndarray] = None,
+) -> Optional[np.ndarray]:
+    """期待リターンが目標に一致する実行可能解
+
+    anchor（実行可能解）があれば、目標リターン側の端点ポートフォリオとの線形補間で目標まで動かす。
+    凸結合なので実行可能性は保たれ、anchor の有効制約の多くがそのまま残る。
+    anchor がなければ最小・最大リターンの端点を補間する。
+    """
+    lowest = extreme_portfolio(expected_returns, lower, upper, total, maximize=False)
+    highest = extreme_portfolio(expected_returns, lower, upper, total, maximize=True)
+    low_return, high_return = float(expected_returns @ lowest), float(expected_returns @ highest)
+
+    if not low_return - FEASIBILITY_TOLERANCE <= target_return <= high_return + FEASIBILITY_TOLERANCE:
+        return None
+
+    if anchor is not None:
+        anchor_return = float(expected_returns @ anchor)
+        if abs(anchor_return - target_return) <= FEASIBILITY_TOLERANCE:
+            return anchor
+        vertex, vertex_return = (highest, high_return) if target_return > anchor_return else (lowest, low_return)
+        if abs(vertex_return - anchor_return) > FEASIBILITY_TOLERANCE:
+            t = min(max((target_return - anchor_return) / (vertex_return - anchor_return), 0.0), 1.0)
+            return (1 - t) * anchor + t * vertex
+
+    if high_return - low_return <= FEASIBILITY_TOLERANCE:
+        return lowest
+    t = min(max((target_return - low_return) / (high_return - low_return), 0.0), 1.0)
+    return (1 - t) * lowest + t * highest
+
+
+def return_range(
+    expected_returns: np.ndarray, lower: np.ndarray, upper: np.ndarray, total: float = 1.0
+) -> Tuple[float, float]:
+    """上下限・合計制約のもとで達成できる期待リターンの範囲"""
+    lowest = extreme_portfolio(expected_returns, lower, upper, total, maximize=False)
+    highest = extreme_portfolio(expected_returns, lower, upper, total, maximize=True)
+    return float(expected_returns @ lowest), float(expected_returns @ highest)
+
+
+def trace_frontier(
+    covariance: np.ndarray,
+    expected_returns: np.ndarray,
+    lower: np.ndarray,
+    upper: np.ndarray,
+    total: float,
+    targets: Sequence[float],
+) -> List[SolverResult]:
+    """目標リターンを順に解き、各点を直前の解から warm start する（プロセスプールから呼べるようモジュール関数）"""
+    results: List[SolverResult] = []
+    previous = None
+    for target in targets:
+        result = min_variance(covariance, lower, upper, total, expected_returns, float(target), x0=previous)
+        results.append(result)
+        if result.status != "infeasible":
+            previous = result.weights
+    return results
+
+
+def max_sharpe(
+    covariance: np.ndarray,
+    excess_returns: np.ndarray,
+    lower: np.ndarray,
+    upper: np.ndarray,
+    total: float = 1.0,
+) -> SolverResult:
+    """最大シャープレシオポートフォリオ
+
+    y = κw（κ > 0）と置き、excess'y = 1 のもとで y'Σy を最小化する凸二次計画として解く。
+    上下限は κ·lower <= y <= κ·upper、合計は sum(y) = κ·total になる。
+    超過リターンが正になるポートフォリオがなければ最小分散に切り替える。
+    """
+    n = len(covariance)
+    if not bounds_feasible(lower, upper, total):
+        return SolverResult(np.full(n, total / n), "infeasible")
+
+    start = extreme_portfolio(excess_returns, lower, upper, total, maximize=True)
+    start_excess = float(excess_returns @ start)
+    if start_excess <= FEASIBILITY_TOLERANCE:
+        result = min_variance(covariance, lower, upper, total)
+        result.status = f"no_positive_excess_return:{result.status}"
+        return result
+
+    # 変数 z = [y, κ]
+    Q = np.zeros((n + 1, n + 1))
+    Q[:n, :n] = covariance
+    A_eq = np.zeros((2, n + 1))
+    A_eq[0, :n] = excess_returns
+    A_eq[1, :n] = 1.0
+    A_eq[1, n] = -total
+    b_eq = np.array([1.0, 0.0])
+
+    z_lower = np.full(n + 1, -np.inf)
+    z_upper = np.full(n + 1, np.inf)
+    z_lower[n] = 0.0
+    rows, limits = [], []
+    long_only = bool(np.all(lower >= 0))
+    for i in range(n):
+        if lower[i] == 0.0:
+            z_lower[i] = 0.0
+        elif np.isfinite(lower[i]):
+            row = np.zeros(n + 1)
+            row[i], row[n] = -1.0, lower[i]
+            rows.append(row)
+            limits.append(0.0)
+        # 非負制約のもとでは上限が合計以上なら効かない
+        if np.isfinite(upper[i]) and not (long_only and upper[i] >= total):
+            row = np.zeros(n + 1)
+            row[i], row[n] = 1.0, -upper[i]
+            rows.append(row)
+            limits.append(0.0)
+
+    G = np.array(rows) if rows else None
+    h = np.array(limits) if rows else None
+    z0 = np.append(start, 1.0) / start_excess
+
+    result = solve_qp(Q, np.zeros(n + 1), A_eq, b_eq, z_lower, z_upper, z0, G, h)
+    kappa = result.weights[n]
+    if kappa <= 0:
+        return SolverResult(start, "degenerate", result.iterations)
+    weights = np.clip(result.weights[:n] / kappa, lower, upper)
+    return SolverResult(weights, result.status, result.iterations)
+
+
+def max_return(expected_returns: np.ndarray, lower: np.ndarray, upper: np.ndarray, total: float = 1.0) -> SolverResult:
+    """最大リターンポートフォリオ（線形計画の厳密解）"""
+    n = len(expected_returns)
+    if not bounds_feasible(lower, upper, total):
+        return SolverResult(np.full(n, total / n), "infeasible")
+    return SolverResult(extreme_portfolio(expected_returns, lower, upper, total, maximize=True), "optimal", 1)
+
+
+def risk_parity(
+    covariance: np.ndarray,
+    budgets: Optional[np.ndarray] = None,
+    total: float = 1.0,
+    max_iterations: int = 1000,
+    tolerance: float = 1e-8,
+) -> SolverResult:
+    """リスクパリティ（リスク寄与度がリスクバジェットに一致する重み）
+
+    0.5 x'Σx - Σ b_i log(x_i) を巡回座標降下で最小化し、合計が total になるよう正規化する。
+    各座標の更新は二次方程式の正の根で閉じた形になる。
+    """
+    n = len(covariance)
+    variances = np.diag(covariance)
+    if n == 0 or np.any(variances <= 0):
+        return SolverResult(np.full(n, total / max(n, 1)), "degenerate")
+
+    budgets = np.full(n, 1.0 / n) if budgets is None else np.asarray(budgets, dtype=float) / np.sum(budgets)
+    x = 1.0 / np.sqrt(variances)
+    x /= np.sqrt(x @ covariance @ x)
+    sigma_x = covariance @ x
+
+    for iteration in range(1, max_iterations + 1):
+        for i in range(n):
+            others = sigma_x[i] - variances[i] * x[i]
+            updated = (-others + np.sqrt(others * others + 4.0 * variances[i] * budgets[i])) / (2.0 * variances[i])
+            sigma_x += covariance[:, i] * (updated - x[i])
+            x[i] = updated
+
+        contributions = x * sigma_x
+        if np.max(np.abs(contributions / contributions.sum() - budgets)) < tolerance:
+            return SolverResult(total * x / x.sum(), "optimal", iteration)
+
+    return SolverResult(total * x / x.sum(), "max_iterations", max_iterations)
@@ -5,20 +5,34 @@
 リスク管理を行うAdvancedPortfolioManager
 """
 
+import json
 import logging
-from dataclasses import dataclass, field
+import math
+from dataclasses import asdict, dataclass, field
 from datetime import datetime
 from enum import Enum
-from typing import Any, Dict, List, Optional
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
 
 import numpy as np
 import pandas as pd
 
+from ..core.config import settings
+from ..risk.correlation_tracker import STRATEGY_CORRELATION_KEY, OnlineCovarianceTracker, get_correlation_tracker
+from ..risk.position_sizing import RiskManager
+from ..risk.rolling_risk import RollingVolatilityTracker, RollingWindow, get_volatility_tracker
 from ..strategies.base import BaseStrategy, Signal
+from .covariance import CovarianceService
 from .manager import PortfolioManager
 
 logger = logging.getLogger(__name__)
 
+# メモリ上に保持する取引履歴の上限（超えた分はアーカイブへ移す）
+MAX_TRADE_HISTORY = 10000
+
+# 共有する戦略間相関トラッカーの窓長（/risk API・EnhancedRiskManager の既定値と同じ）
+STRATEGY_CORRELATION_WINDOW = 126
+
 
 class StrategyStatus(Enum):
     """戦略の状態"""
@@ -59,6 +73,84 @@ class PerformanceMetrics:
     calmar_ratio: float = 0.0
 
 
+class PerformanceAccumulator:
+    """取引損益を1件ずつ取り込むパフォーマンス集計
+
+    損益合計・勝敗数・総利益/総損失、Welford 法の平均・分散、累積リターンのピークと最大ドローダウンを保持し、
+    参照は O(1)。VaR のみ直近 var_window 件のリターン窓の分位点で求める。
+    """
+
+    def __init__(self, scale: float = 1.0, var_window: Optional[int] = None):
+        """
+        Args:
+            scale: 損益をリターンに換算する基準額（リターン = 損益 / scale）
+            var_window: VaR を求めるリターン窓の長さ（None なら VaR を計算しない）
+        """
+        self.scale = scale
+        self.count = 0
+        self.wins = 0
+        self.total_pnl = 0.0
+        self.gross_profit = 0.0
+        self.gross_loss = 0.0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.cumulative = 0.0
+        self.peak: Optional[float] = None
+        self.max_drawdown = 0.0
+        self._returns = RollingWindow(var_window) if var_window else None
+
+    def update(self, pnl: float):
+        """取引損益を1件取り込む"""
+        value = pnl / self.scale
+        self.count += 1
+        self.total_pnl += pnl
+        if pnl > 0:
+            self.wins += 1
+            self.gross_profit += value
+        elif pnl < 0:
+            self.gross_loss -= value
+
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+
+        self.cumulative += value
+        self.peak = self.cumulative if self.peak is None else max(self.peak, self.cumulative)
+        self.max_drawdown = min(self.max_drawdown, self.cumulative - self.peak)
+
+        if self._returns is not None:
+            self._returns.append(value)
+
+    @property
+    def win_rate(self) -> float:
+        return self.wins / self.count if self.count else 0.0
+
+    @property
+    def std(self) -> float:
+        """母標準偏差（np.std と同じ ddof=0）"""
+        return math.sqrt(self._m2 / self.count) if self.count else 0.0
+
+    def metrics(self) -> PerformanceMetrics:
+        """集計値からパフォーマンスメトリクスを組み立てる"""
+        if not self.count:
+            return PerformanceMetrics()
+
+        total_return = self.total_pnl / self.scale
+        volatility = self.std * np.sqrt(252)  # 年率化
+        return PerformanceMetrics(
+            total_return=total_return,
+            sharpe_ratio=self.mean / volatility if volatility > 0 else 0,
+            max_drawdown=self.max_drawdown,
+            win_rate=self.win_rate,
+            profit_factor=self.gross_profit / self.gross_loss if self.gross_loss > 0 else 0,
+            trades_count=self.count,
+            avg_trade_return=self.mean,
+            volatility=volatility,
+            var_95=self._returns.percentile(5) if self._returns is not None else 0.0,
+            calmar_ratio=total_return / abs(self.max_drawdown) if self.max_drawdown != 0 else 0,
+        )
+
+
 @dataclass
 class TradeRecord:
     """取引記録"""
@@ -75,15 +167,70 @@ class TradeRecord:
     trade_id: str = ""
 
 
+class JsonlTradeArchiver:
+    """履歴から外した取引を JSON Lines ファイルに追記するアーカイブ（trade_archiver の既定）"""
+
+    def __init__(self, path: Optional[Path] = None):
+        """
+        Args:
+            path: 追記先（省略時は PORTFOLIO_TRADE_ARCHIVE_DIR 配下の trades.jsonl）
+        """
+        self.path = Path(path) if path else Path(settings.PORTFOLIO_TRADE_ARCHIVE_DIR) / "trades.jsonl"
+
+    def __call__(self, trades: List[TradeRecord]):
+        if not trades:
+            return
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        lines = "".join(
+            json.dumps({**asdict(trade), "timestamp": trade.timestamp.isoformat()}, default=str) + "\n"
+            for trade in trades
+        )
+        with open(self.path, "a", encoding="utf-8") as archive:
+            archive.write(lines)
+            archive.flush()
+
+    def load(self) -> List[TradeRecord]:
+        """アーカイブ済みの取引を古い順に読み込む"""
+        if not self.path.exists():
+            return []
+
+        trades = []
+        with open(self.path, encoding="utf-8") as archive:
+            for line in archive:
+                if line.strip():
+                    record = json.loads(line)
+                    record["timestamp"] = datetime.fromisoformat(record["timestamp"])
+                    trades.append(TradeRecord(**record))
+        return trades
+
+
 class AdvancedPortfolioManager(PortfolioManager):
     """戦略統合ポートフォリオマネージャー"""
 
-    def __init__(self, initial_capital: float = 100000.0):
-        super().__init__()
+    def __init__(
+        self,
+        initial_capital: float = 100000.0,
+        max_trade_history: int = MAX_TRADE_HISTORY,
+        trade_archiver: Optional[Callable[[List[TradeRecord]], Any]] = None,
+        correlation_tracker: Optional[OnlineCovarianceTracker] = None,
+        risk_manager: Optional[RiskManager] = None,
+        volatility_tracker: Optional[RollingVolatilityTracker] = None,
+        covariance_service: Optional[CovarianceService] = None,
+    ):
+        """
+        Args:
+            max_trade_history: メモリ上に保持する取引履歴の上限
+            trade_archiver: 上限を超えて履歴から外した取引を受け取る保存先（未指定時はデータディレクトリの JSON Lines ファイル）
+            correlation_tracker: 戦略間相関のトラッカー（未指定時はリスク管理・/risk API と共有するトラッカー）
+            risk_manager: ポジションサイジング（未指定時は既定設定の RiskManager）
+            volatility_tracker: サイジングに使うボラティリティトラッカー（未指定時はプロセス内で共有するトラッカー）
+            covariance_service: 最適化提案に使う共分散推定サービス（未指定時は共有サービス）
+        """
+        super().__init__(covariance_service)
         self.initial_capital = initial_capital
         self.current_capital = initial_capital
         self.strategy_allocations: Dict[str, StrategyAllocation] = {}
-        self.trade_history: List[TradeRecord] = []
         self.performance_history: List[Dict[str, Any]] = []
         self.risk_limits = {
             "max_position_size": 0.1,  # 単一ポジションの最大サイズ（10%）
@@ -94,8 +241,43 @@ class AdvancedPortfolioManager(PortfolioManager):
         self.daily_pnl: Dict[str, float] = {}  # 日次損益
         self.position_sizes: Dict[str, float] = {}  # ポジションサイズ
 
+        # ポジションサイジング（戦略ごとのサイジング方式とシンボル別ボラティリティで配分資本の比率を決める）
+        self.risk_manager = risk_manager if risk_manager is not None else RiskManager({})
+        if volatility_tracker is None:
+            volatility_tracker = get_volatility_tracker()
+        self.volatility_tracker = volatility_tracker
+
+        # 戦略間相関（trade_history の未反映分だけを取り込んで逐次更新）
+        if correlation_tracker is None:
+            correlation_tracker = get_correlation_tracker(STRATEGY_CORRELATION_KEY, window=STRATEGY_CORRELATION_WINDOW)
+        self.correlation_tracker = correlation_tracker
+        self._correlation_source: Optional[List[TradeRecord]] = None
+        self._correlation_synced = 0
+
+        # パフォーマンス集計（同じく trade_history の未反映分だけを取り込む）
+        self.max_trade_history = max_trade_history
+        self.trade_archiver = trade_archiver if trade_archiver is not None else JsonlTradeArchiver()
+        self.archived_trades_count = 0
+        self._portfolio_metrics = PerformanceAccumulator(initial_capital, var_window=max_trade_history)
+        self._strategy_metrics: Dict[str, PerformanceAccumulator] = {}
+        self._metrics_source: Optional[List[TradeRecord]] = None
+        self._metrics_synced = 0
+        self._trade_history: List[TradeRecord] = []
+
         logger.info(f"AdvancedPortfolioManager initialized with capital: {initial_capital}")
 
+    @property
+    def trade_history(self) -> List[TradeRecord]:
+        """メモリ上の取引履歴（直近 max_trade_history 件）"""
+        return self._trade_history
+
+    @trade_history.setter
+    def trade_history(self, trades: List[TradeRecord]):
+        """取引履歴を差し替える（集計は次回参照時に最初から取り込み直す）"""
+        self._trade_history = trades
+        self.archived_trades_count = 0
+        self._trim_trade_history()
+
     def add_strategy(
         self,
         strategy: BaseStrategy,
@@ -149,6 +331,7 @@ class AdvancedPortfolioManager(PortfolioManager):
                 logger.warning(f"Strategy {strategy_name} has open positions")
 
             del self.strategy_allocations[strategy_name]
+            self.correlation_tracker.remove(strategy_name)
             logger.info(f"Removed strategy {strategy_name}")
             return True
 
@@ -171,10 +354,17 @@ class AdvancedPortfolioManager(PortfolioManager):
             return False
 
     def process_market_data(self, symbol: str, ohlcv_data: Dict[str, Any]) -> List[Signal]:
-        """市場データを処理して全戦略のシグナルを生成"""
+        """市場データを処理して全戦略のシグナルを生成
+
+        同じバーで発生したシグナルのポジションサイズはまとめて1回で計算する
+        """
         all_signals = []
 
         try:
+            if "close" in ohlcv_data:
+                self.volatility_tracker.update_price(symbol, ohlcv_data["close"])
+
+            fired = []
             for strategy_name, allocation in self.strategy_allocations.items():
                 if allocation.status != StrategyStatus.ACTIVE:
                     continue
@@ -189,16 +379,24 @@ class AdvancedPortfolioManager(PortfolioManager):
                 signal = strategy.update(ohlcv_data)
 
                 if signal:
-                    # ポジションサイズを計算
-                    position_size = self._calculate_position_size(strategy_name, signal)
-                    if position_size > 0:
-                        # シグナルにポジションサイズ情報を追加
-                        signal.price = ohlcv_data.get("close", signal.price)
-                        allocation.last_signal = signal
-                        allocation.last_updated = datetime.now()
-                        all_signals.append(signal)
+                    fired.append((strategy_name, allocation, signal))
+
+            if not fired:
+                return all_signals
 
-                        logger.info(f"Signal from {strategy_name}: {signal.action} {signal.symbol} @ {signal.price}")
+            # ポジションサイズを一括計算
+            position_sizes = self._calculate_position_sizes(
+                [strategy_name for strategy_name, _, _ in fired], [signal for _, _, signal in fired]
+            )
+            for (strategy_name, allocation, signal), position_size in zip(fired, position_sizes):
+                if position_size > 0:
+                    # シグナルにポジションサイズ情報を追加
+                    signal.price = ohlcv_data.get("close", signal.price)
+                    allocation.last_signal = signal
+                    allocation.last_updated = datetime.now()
+                    all_signals.append(signal)
+
+                    logger.info(f"Signal from {strategy_name}: {signal.action} {signal.symbol} @ {signal.price}")
 
             return all_signals
 
@@ -208,27 +406,48 @@ class AdvancedPortfolioManager(PortfolioManager):
 
     def _calculate_position_size(self, strategy_name: str, signal: Signal) -> float:
         """ポジションサイズを計算"""
-        try:
-            allocation = self.strategy_allocations[strategy_name]
+        return float(self._calculate_position_sizes([strategy_name], [signal])[0])
 
-            # 基本ポジションサイズ（戦略の配分資本から）
-            base_size = allocation.allocated_capital * signal.strength
+    def _calculate_position_sizes(self, strategy_names: List[str], signals: List[Signal]) -> np.ndarray:
+        """複数戦略のシグナルのポジションサイズを一括計算（未登録の戦略は 0）"""
+        position_sizes = np.zeros(len(signals))
+        try:
+            known = [i for i, name in enumerate(strategy_names) if name in self.strategy_allocations]
+            if len(known) < len(strategy_names):
+                missing = [name for name in strategy_names if name not in self.strategy_allocations]
+                logger.error(f"Error calculating position size: unknown strategies {missing}")
+            if not known:
+                return position_sizes
+
+            allocations = [self.strategy_allocations[strategy_names[i]] for i in known]
+
+            # 配分資本に対する比率（戦略のサイジング方式・シンボル別ボラティリティで一括計算）
+            fractions = self.risk_manager.calculate_position_sizes(
+                [strategy_names[i] for i in known],
+                capital=self.current_capital,
+                signal_strength=np.array([signals[i].strength for i in known], dtype=float),
+                volatility=self.volatility_tracker.volatilities(signals[i].symbol for i in known),
+            )
+            allocated_capital = np.array([allocation.allocated_capital for allocation in allocations], dtype=float)
+            base_size = allocated_capital * fractions
 
             # リスク制限を適用
             max_position = self.current_capital * self.risk_limits["max_position_size"]
-            position_size = min(base_size, max_position)
-
-            # 既存ポジションを考慮
-            strategy = allocation.strategy_instance
-            if strategy.state.is_long or strategy.state.is_short:
-                # 既にポジションがある場合は調整
-                position_size *= 0.5
-
-            return position_size
+            sizes = np.minimum(base_size, max_position)
+
+            # 既存ポジションを考慮（既にポジションがある場合は調整）
+            holding = np.array(
+                [
+                    bool(allocation.strategy_instance.state.is_long or allocation.strategy_instance.state.is_short)
+                    for allocation in allocations
+                ]
+            )
+            position_sizes[known] = np.where(holding, sizes * 0.5, sizes)
+            return position_sizes
 
         except Exception as e:
             logger.error(f"Error calculating position size: {e}")
-            return 0.0
+            return np.zeros(len(signals))
 
     def execute_signal(self, signal: Signal, position_size: float) -> bool:
         """シグナルを実行"""
@@ -250,7 +469,7 @@ class AdvancedPortfolioManager(PortfolioManager):
                 trade_id=f"{signal.symbol}_{signal.timestamp.strftime('%Y%m%d_%H%M%S')}",
             )
 
-            self.trade_history.append(trade_record)
+            self.record_trade(trade_record)
 
             # ポジションサイズを更新
             position_key = f"{signal.symbol}_{signal.action}"
@@ -265,6 +484,13 @@ class AdvancedPortfolioManager(PortfolioManager):
             logger.error(f"Error executing signal: {e}")
             return False
 
+    def record_trade(self, trade_record: TradeRecord):
+        """取引を履歴に追加し、パフォーマンス集計・戦略間相関に反映"""
+        self.trade_history.append(trade_record)
+        self._sync_trade_metrics()
+        self._sync_correlation_tracker()
+        self._trim_trade_history()
+
     def _check_risk_limits(self, signal: Signal, position_size: float) -> bool:
         """リスク制限をチェック"""
         try:
@@ -287,110 +513,88 @@ class AdvancedPortfolioManager(PortfolioManager):
             logger.error(f"Error checking risk limits: {e}")
             return False
 
-    def calculate_portfolio_performance(self) -> PerformanceMetrics:
-        """ポートフォリオパフォーマンスを計算"""
-        try:
-            if not self.trade_history:
-                return PerformanceMetrics()
-
-            # 取引から収益を計算
-            returns = []
-            winning_trades = 0
-            losing_trades = 0
-            total_pnl = 0.0
-
-            for trade in self.trade_history:
-                if trade.pnl is not None:
-                    returns.append(trade.pnl / self.initial_capital)
-                    total_pnl += trade.pnl
+    def _sync_trade_metrics(self):
+        """trade_history のうち未反映の取引損益をパフォーマンス集計に取り込む"""
+        if self.trade_history is not self._metrics_source or len(self.trade_history) < self._metrics_synced:
+            # 履歴が差し替えられた場合は最初から取り込み直す
+            self._portfolio_metrics = PerformanceAccumulator(self.initial_capital, var_window=self.max_trade_history)
+            self._strategy_metrics = {}
+            self._metrics_source = self.trade_history
+            self._metrics_synced = 0
+
+        for trade in self.trade_history[self._metrics_synced :]:
+            if trade.pnl is not None:
+                self._portfolio_metrics.update(trade.pnl)
+                accumulator = self._strategy_metrics.get(trade.strategy_name)
+                if accumulator is None:
+                    accumulator = self._strategy_metrics[trade.strategy_name] = PerformanceAccumulator()
+                accumulator.update(trade.pnl)
+        self._metrics_synced = len(self.trade_history)
+
+    def _trim_trade_history(self):
+        """上限を超えた古い取引を集計に反映してから履歴から外し、アーカイブへ渡す"""
+        excess = len(self.trade_history) - self.max_trade_history
+        if excess <= 0:
+            return
+
+        self._sync_trade_metrics()
+        self._sync_correlation_tracker()
+        archived = self.trade_history[:excess]
+        del self.trade_history[:excess]
+        self._metrics_synced -= excess
+        self._correlation_synced -= excess
+        self.archived_trades_count += excess
 
-                    if trade.pnl > 0:
-                        winning_trades += 1
-                    else:
-                        losing_trades += 1
-
-            if not returns:
-                return PerformanceMetrics()
-
-            returns_array = np.array(returns)
-
-            # 基本メトリクス
-            total_return = total_pnl / self.initial_capital
-            win_rate = winning_trades / len(returns) if returns else 0
-            avg_return = np.mean(returns_array)
-            volatility = np.std(returns_array) * np.sqrt(252)  # 年率化
-
-            # シャープレシオ（リスクフリーレート0と仮定）
-            sharpe_ratio = avg_return / volatility if volatility > 0 else 0
-
-            # 最大ドローダウン
-            cumulative_returns = np.cumsum(returns_array)
-            running_max = np.maximum.accumulate(cumulative_returns)
-            drawdowns = cumulative_returns - running_max
-            max_drawdown = np.min(drawdowns) if len(drawdowns) > 0 else 0
-
-            # カルマー・レシオ
-            calmar_ratio = total_return / abs(max_drawdown) if max_drawdown != 0 else 0
-
-            # 95% VaR
-            var_95 = np.percentile(returns_array, 5) if len(returns_array) > 0 else 0
-
-            # プロフィット・ファクター
-            gross_profit = sum(r for r in returns_array if r > 0)
-            gross_loss = abs(sum(r for r in returns_array if r < 0))
-            profit_factor = gross_profit / gross_loss if gross_loss > 0 else 0
+        try:
+            self.trade_archiver(archived)
+        except Exception as e:
+            logger.error(f"Error archiving {len(archived)} trades: {e}")
 
-            return PerformanceMetrics(
-                total_return=total_return,
-                sharpe_ratio=sharpe_ratio,
-                max_drawdown=max_drawdown,
-                win_rate=win_rate,
-                profit_factor=profit_factor,
-                trades_count=len(returns),
-                avg_trade_return=avg_return,
-                volatility=volatility,
-                var_95=var_95,
-                calmar_ratio=calmar_ratio,
-            )
+    def calculate_portfolio_performance(self) -> PerformanceMetrics:
+        """ポートフォリオパフォーマンスを計算（アーカイブ済みの取引を含む）"""
+        try:
+            self._sync_trade_metrics()
+            return self._portfolio_metrics.metrics()
 
         except Exception as e:
             logger.error(f"Error calculating portfolio performance: {e}")
             return PerformanceMetrics()
 
     def calculate_strategy_performance(self, strategy_name: str) -> PerformanceMetrics:
-        """戦略別パフォーマンスを計算"""
+        """戦略別パフォーマンスを計算（リターンは損益額のまま集計）"""
         try:
-            strategy_trades = [t for t in self.trade_history if t.strategy_name == strategy_name]
-
-            if not strategy_trades:
-                return PerformanceMetrics()
-
-            # 戦略固有の取引データから計算
-            # (ポートフォリオパフォーマンス計算と同様のロジック)
-            returns = []
-            for trade in strategy_trades:
-                if trade.pnl is not None:
-                    returns.append(trade.pnl)
-
-            if not returns:
+            self._sync_trade_metrics()
+            accumulator = self._strategy_metrics.get(strategy_name)
+            if accumulator is None:
                 return PerformanceMetrics()
 
-            # 基本統計
-            total_return = sum(returns)
-            win_rate = len([r for r in returns if r > 0]) / len(returns)
-            avg_return = np.mean(returns)
-
             return PerformanceMetrics(
-                total_return=total_return,
-                win_rate=win_rate,
-                trades_count=len(returns),
-                avg_trade_return=avg_return,
+                total_return=accumulator.total_pnl,
+                win_rate=accumulator.win_rate,
+                trades_count=accumulator.count,
+                avg_trade_return=accumulator.mean,
             )
 
         except Exception as e:
             logger.error(f"Error calculating strategy performance: {e}")
             return PerformanceMetrics()
 
+    def _sync_correlation_tracker(self):
+        """trade_history のうち未反映の取引損益を相関トラッカーに取り込む"""
+        if self.trade_history is not self._correlation_source or len(self.trade_history) < self._correlation_synced:
+            # 履歴が差し替えられた場合は最初から取り込み直す（共有トラッカーのため自分の戦略の系列だけを破棄）
+            if self._correlation_source is not None:
+                for strategy_name in self.strategy_allocations:
+                    self.correlation_tracker.remove(strategy_name)
+            self._correlation_source = self.trade_history
+            self._correlation_synced = 0
+
+        for trade in self.trade_history[self._correlation_synced :]:
+            if trade.pnl is not None and trade.strategy_name in self.strategy_allocations:
+                # 戦略ごとの n 番目の取引同士を1観測として整列させる
+                self.correlation_tracker.observe(trade.strategy_name, trade.pnl)
+        self._correlation_synced = len(self.trade_history)
+
     def get_strategy_correlation_matrix(self) -> pd.DataFrame:
         """戦略間の相関行列を取得"""
         try:
@@ -398,24 +602,8 @@ class AdvancedPortfolioManager(PortfolioManager):
             if len(strategy_names) < 2:
                 return pd.DataFrame()
 
-            # 各戦略のリターン系列を取得
-            strategy_returns = {}
-            for strategy_name in strategy_names:
-                strategy_trades = [t for t in self.trade_history if t.strategy_name == strategy_name]
-                returns = [t.pnl for t in strategy_trades if t.pnl is not None]
-                if returns:
-                    strategy_returns[strategy_name] = returns
-
-            if len(strategy_returns) < 2:
-                return pd.DataFrame()
-
-            # データ長を揃える
-            min_length = min(len(returns) for returns in strategy_returns.values())
-            aligned_returns = {name: returns[-min_length:] for name, returns in strategy_returns.items()}
-
-            # 相関行列を計算
-            df = pd.DataFrame(aligned_returns)
-            return df.corr()
+            self._sync_correlation_tracker()
+            return self.correlation_tracker.correlation_matrix(strategy_names)
 
         except Exception as e:
             logger.error(f"Error calculating correlation matrix: {e}")
@@ -517,7 +705,7 @@ class AdvancedPortfolioManager(PortfolioManager):
                     "max_daily_loss": self.risk_limits["max_daily_loss"],
                 },
                 "trade_summary": {
-                    "total_trades": len(self.trade_history),
+                    "total_trades": self.archived_trades_count + len(self.trade_history),
                     "recent_trades": [
                         {
                             "strategy": trade.strategy_name,
@@ -599,6 +787,29 @@ class AdvancedPortfolioManager(PortfolioManager):
             logger.error(f"Error generating risk report: {e}")
             return {"error": str(e)}
 
+    def _allocation_volatility(self) -> Optional[float]:
+        """稼働中の戦略の目標配分をシンボル別に合算し、年率換算の共分散からボラティリティを計算"""
+        exposures: Dict[str, float] = {}
+        for allocation in self.strategy_allocations.values():
+            if allocation.status == StrategyStatus.ACTIVE:
+                symbol = allocation.strategy_instance.symbol
+                exposures[symbol] = exposures.get(symbol, 0.0) + allocation.target_weight
+        if not exposures:
+            return None
+
+        try:
+            covariance = self.covariance_service.get_covariance_frame(
+                exposures,
+                self.risk_settings["covariance_timeframe"],
+                window=self.risk_settings["covariance_window"],
+            )
+        except ValueError as e:
+            logger.debug(f"Covariance unavailable for strategy symbols: {e}")
+            return None
+
+        weights = np.array([exposures[symbol] for symbol in covariance.index])
+        return float(np.sqrt(max(weights @ covariance.to_numpy() @ weights, 0.0)))
+
     def optimize_portfolio(self) -> Dict[str, Any]:
         """ポートフォリオ最適化の提案"""
         try:
@@ -637,6 +848,19 @@ class AdvancedPortfolioManager(PortfolioManager):
                         }
                     )
 
+            # シンボル別の目標配分と保存済み価格の共分散から見たボラティリティ
+            volatility = self._allocation_volatility()
+            if volatility is not None:
+                optimization_suggestions["portfolio_volatility"] = volatility
+                if volatility > self.risk_settings["max_volatility"]:
+                    optimization_suggestions["risk_reduction"].append(
+                        {
+                            "type": "volatility_risk",
+                            "description": f"Annualized portfolio volatility {volatility:.1%} exceeds {self.risk_settings['max_volatility']:.1%}",
+                            "suggestion": "Shift allocation toward less volatile or less correlated symbols",
+                        }
+                    )
+
             # パフォーマンス改善提案
             for strategy_name, allocation in self.strategy_allocations.items():
                 strategy_perf = self.calculate_strategy_performance(strategy_name)
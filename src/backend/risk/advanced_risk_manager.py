@@ -9,41 +9,42 @@ import logging
 from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
+from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
 
+from .correlation_tracker import OnlineCovarianceTracker
 from .position_sizing import RiskManager
+from .rolling_risk import (
+    RollingVaREngine,
+    norm_pdf,  # noqa: F401 - 後方互換のため再公開
+    norm_ppf,  # noqa: F401
+    parametric_var_es,
+    percentile_sorted,
+    tail_mean_sorted,
+)
+from .stress_engine import (
+    DEFAULT_HISTORICAL_HORIZONS,
+    ScenarioSet,
+    StressDistribution,
+    StressTestEngine,
+    historical_scenarios,
+    load_close_prices,
+    stored_symbols,
+)
 
 logger = logging.getLogger(__name__)
 
-
-def norm_ppf(p: float) -> float:
-    """標準正規分布のパーセンタイル点関数（scipy.stats.norm.ppfの代替）"""
-    # Beasley-Springer-Moro algorithm の簡易版
-    if p <= 0 or p >= 1:
-        raise ValueError("p must be between 0 and 1")
-
-    if p == 0.5:
-        return 0.0
-
-    # より正確な近似を使用
-    if p < 0.5:
-        # 下側
-        q = np.sqrt(-2 * np.log(p))
-        result = -(((2.30753 + q * 0.27061) / (1 + q * (0.99229 + q * 0.04481))) - q)
-    else:
-        # 上側
-        q = np.sqrt(-2 * np.log(1 - p))
-        result = ((2.30753 + q * 0.27061) / (1 + q * (0.99229 + q * 0.04481))) - q
-
-    return result
-
-
-def norm_pdf(x: float) -> float:
-    """標準正規分布の確率密度関数（scipy.stats.norm.pdfの代替）"""
-    return (1 / np.sqrt(2 * np.pi)) * np.exp(-0.5 * x**2)
+# 名前付きストレスシナリオの回復予想時間（日数）と発生確率（簡略化）
+STRESS_RECOVERY_DAYS = {"flash_crash": 1, "market_crash": 30, "liquidity_crisis": 7}
+STRESS_PROBABILITIES = {
+    "market_crash": 0.05,  # 5%
+    "flash_crash": 0.10,  # 10%
+    "liquidity_crisis": 0.08,  # 8%
+    "regulatory_shock": 0.15,  # 15%
+}
 
 
 class RiskLevel(Enum):
@@ -127,7 +128,17 @@ class RiskMetrics:
 class AdvancedRiskManager(RiskManager):
     """高度なリスク管理システム"""
 
-    def __init__(self, config: Dict[str, Any]):
+    def __init__(
+        self,
+        config: Dict[str, Any],
+        correlation_tracker: Optional[OnlineCovarianceTracker] = None,
+        symbol_correlation_tracker: Optional[OnlineCovarianceTracker] = None,
+    ):
+        """
+        Args:
+            correlation_tracker: 戦略リターンの相関トラッカー（共有する場合に指定）
+            symbol_correlation_tracker: シンボルリターンの相関トラッカー（共有する場合に指定）
+        """
         super().__init__(config)
         self.risk_limits = {
             "max_portfolio_var_95": config.get("max_portfolio_var_95", 0.05),  # 5%
@@ -141,15 +152,43 @@ class AdvancedRiskManager(RiskManager):
             "min_liquidity_ratio": config.get("min_liquidity_ratio", 0.05),  # 5%
         }
 
-        self.returns_history: List[float] = []
-        self.price_history: Dict[str, List[float]] = {}
-        self.risk_alerts: List[RiskAlert] = []
-        self.stress_test_scenarios = self._initialize_stress_scenarios()
-
         # リスク計算パラメータ
         self.var_window = config.get("var_window", 252)  # 1年間
         self.correlation_window = config.get("correlation_window", 126)  # 6ヶ月
 
+        # ポートフォリオリターンのローリング窓（VaR/ESを逐次更新）
+        self.rolling_var = RollingVaREngine(
+            window=self.var_window,
+            bootstrap_samples=config.get("var_bootstrap_samples", 1000),
+            seed=config.get("var_seed"),
+            # 監視ティックごとに窓が進むため、信頼区間のブートストラップはこの件数ごとに再計算
+            interval_recompute=config.get("var_interval_recompute", 20),
+        )
+        # calculate_var の信頼区間キャッシュ（同じリターン列での再計算を避ける）
+        self._interval_cache: Optional[Tuple[int, Tuple[float, float]]] = None
+
+        # 戦略間・シンボル間の相関（リターン到着ごとに逐次更新）
+        # 観測前のトラッカーは len() が 0 で偽になるため None と比較する
+        correlation_shrinkage = config.get("correlation_shrinkage", 0.0)
+        if correlation_tracker is None:
+            correlation_tracker = OnlineCovarianceTracker(
+                window=self.correlation_window, shrinkage=correlation_shrinkage
+            )
+        if symbol_correlation_tracker is None:
+            symbol_correlation_tracker = OnlineCovarianceTracker(
+                window=self.correlation_window, shrinkage=correlation_shrinkage
+            )
+        self.correlation_tracker = correlation_tracker
+        self.symbol_correlation_tracker = symbol_correlation_tracker
+
+        self.price_history: Dict[str, List[float]] = {}
+        self.risk_alerts: List[RiskAlert] = []
+        self.stress_test_scenarios = self._initialize_stress_scenarios()
+        self.stress_engine = StressTestEngine(base_assets=config.get("symbol_base_assets"))
+        # ローカルの OHLCV ストアから作成した過去変動シナリオ（起動時に読み込む）
+        self.historical_scenarios = ScenarioSet.empty()
+        self._load_configured_historical_scenarios(config.get("historical_scenarios", {}))
+
         logger.info("AdvancedRiskManager initialized")
 
     def _initialize_stress_scenarios(self) -> Dict[str, Dict[str, float]]:
@@ -192,14 +231,40 @@ class AdvancedRiskManager(RiskManager):
         if len(self.price_history[symbol]) > max_history:
             self.price_history[symbol] = self.price_history[symbol][-max_history:]
 
+    @property
+    def returns_history(self) -> List[float]:
+        """ポートフォリオリターン履歴（直近 var_window 件）"""
+        return self.rolling_var.window.tolist()
+
+    @returns_history.setter
+    def returns_history(self, returns: List[float]):
+        self.rolling_var.reset(returns)
+
     def update_portfolio_returns(self, portfolio_return: float):
-        """ポートフォリオリターンを更新"""
-        self.returns_history.append(portfolio_return)
+        """ポートフォリオリターンを更新（VaR/ES の窓も逐次更新される）"""
+        self.rolling_var.update(portfolio_return)
 
-        # 履歴長制限
-        max_history = self.var_window * 2
-        if len(self.returns_history) > max_history:
-            self.returns_history = self.returns_history[-max_history:]
+    def get_streaming_var(self, method: str = "historical") -> VaRResult:
+        """ローリング窓の VaR/ES を取得（窓の再計算なし、信頼区間はキャッシュ）"""
+        observations = len(self.rolling_var)
+        if observations < 30:
+            return VaRResult(0, 0, 0, 0, (0, 0), method, observations)
+
+        try:
+            var_95, es_95 = self.rolling_var.var_es(5, method)
+            var_99, es_99 = self.rolling_var.var_es(1, method)
+            return VaRResult(
+                var_95=var_95,
+                var_99=var_99,
+                expected_shortfall_95=es_95,
+                expected_shortfall_99=es_99,
+                confidence_interval=self.rolling_var.confidence_interval(),
+                methodology=method,
+                observation_period=observations,
+            )
+        except Exception as e:
+            logger.error(f"Error calculating streaming VaR: {e}")
+            return VaRResult(0, 0, 0, 0, (0, 0), method, observations)
 
     def calculate_var(
         self,
@@ -212,57 +277,42 @@ class AdvancedRiskManager(RiskManager):
             if len(returns) < 30:
                 return VaRResult(0, 0, 0, 0, (0, 0), method, len(returns))
 
-            returns_array = np.array(returns)
+            returns_array = np.asarray(returns, dtype=float)
 
             if method == "historical":
-                # 履歴シミュレーション法
-                var_95 = -np.percentile(returns_array, 5)
-                var_99 = -np.percentile(returns_array, 1)
+                # 履歴シミュレーション法（1回のソートで分位点と裾平均を求める）
+                sorted_returns = np.sort(returns_array)
+                var_95 = -percentile_sorted(sorted_returns, 5)
+                var_99 = -percentile_sorted(sorted_returns, 1)
 
                 # Expected Shortfall (Conditional VaR)
-                es_95 = -np.mean(returns_array[returns_array <= -var_95])
-                es_99 = -np.mean(returns_array[returns_array <= -var_99])
+                es_95 = -tail_mean_sorted(sorted_returns, -var_95)
+                es_99 = -tail_mean_sorted(sorted_returns, -var_99)
 
             elif method == "parametric":
                 # パラメトリック法（正規分布仮定）
                 mean_return = np.mean(returns_array)
                 std_return = np.std(returns_array)
 
-                var_95 = -(mean_return + norm_ppf(0.05) * std_return)
-                var_99 = -(mean_return + norm_ppf(0.01) * std_return)
-
-                # Expected Shortfall
-                es_95 = -(mean_return + std_return * norm_pdf(norm_ppf(0.05)) / 0.05)
-                es_99 = -(mean_return + std_return * norm_pdf(norm_ppf(0.01)) / 0.01)
+                var_95, es_95 = parametric_var_es(mean_return, std_return, 5)
+                var_99, es_99 = parametric_var_es(mean_return, std_return, 1)
 
             elif method == "monte_carlo":
-                # モンテカルロシミュレーション
+                # モンテカルロシミュレーション（生成済みの標準正規乱数を平均・標準偏差でスケーリング）
                 mean_return = np.mean(returns_array)
                 std_return = np.std(returns_array)
 
-                # 10,000回のシミュレーション
-                simulated_returns = np.random.normal(mean_return, std_return, 10000)
-
-                var_95 = -np.percentile(simulated_returns, 5)
-                var_99 = -np.percentile(simulated_returns, 1)
-
-                es_95 = -np.mean(simulated_returns[simulated_returns <= -var_95])
-                es_99 = -np.mean(simulated_returns[simulated_returns <= -var_99])
+                var_95, es_95 = self.rolling_var.normal_draws.var_es(mean_return, std_return, 5)
+                var_99, es_99 = self.rolling_var.normal_draws.var_es(mean_return, std_return, 1)
 
             else:
                 raise ValueError(f"Unknown VaR method: {method}")
 
-            # 信頼区間計算（ブートストラップ）
-            bootstrap_vars = []
-            for _ in range(1000):
-                bootstrap_sample = np.random.choice(returns_array, size=len(returns_array), replace=True)
-                bootstrap_var = -np.percentile(bootstrap_sample, 5)
-                bootstrap_vars.append(bootstrap_var)
-
-            confidence_interval = (
-                np.percentile(bootstrap_vars, 2.5),
-                np.percentile(bootstrap_vars, 97.5),
-            )
+            # 信頼区間計算（(B × N) の一括ブートストラップ、同じリターン列ならキャッシュを再利用）
+            key = hash(returns_array.tobytes())
+            if self._interval_cache is None or self._interval_cache[0] != key:
+                self._interval_cache = (key, self.rolling_var.bootstrap.percentile_interval(returns_array, 5.0))
+            confidence_interval = self._interval_cache[1]
 
             return VaRResult(
                 var_95=var_95,
@@ -278,6 +328,79 @@ class AdvancedRiskManager(RiskManager):
             logger.error(f"Error calculating VaR: {e}")
             return VaRResult(0, 0, 0, 0, (0, 0), method, len(returns))
 
+    def load_historical_scenarios(
+        self,
+        closes: pd.DataFrame,
+        bar_timeframe: str = "1h",
+        horizons: Tuple[str, ...] = DEFAULT_HISTORICAL_HORIZONS,
+        worst: Optional[int] = None,
+    ) -> int:
+        """シンボル別終値から過去変動シナリオを作成
+
+        Returns:
+            int: 作成したシナリオ数
+        """
+        self.historical_scenarios = historical_scenarios(closes, bar_timeframe, horizons, worst)
+        return len(self.historical_scenarios)
+
+    def load_historical_scenarios_from_store(
+        self, parquet_dir: Path, symbols: List[str], timeframe: str = "1h", **kwargs
+    ) -> int:
+        """DataCollector が保存した Parquet から過去変動シナリオを作成"""
+        return self.load_historical_scenarios(load_close_prices(parquet_dir, symbols, timeframe), timeframe, **kwargs)
+
+    def _load_configured_historical_scenarios(self, scenario_config: Dict[str, Any]):
+        """設定に従い、DataCollector の保存先から過去変動シナリオを読み込む（失敗しても起動は続ける）"""
+        if not scenario_config.get("enabled", True):
+            return
+
+        try:
+            timeframe = scenario_config.get("timeframe", "1h")
+            parquet_dir = Path(scenario_config.get("data_dir", "data")) / "parquet"
+            symbols = scenario_config.get("symbols") or stored_symbols(parquet_dir, timeframe)
+            if not symbols:
+                return
+
+            count = self.load_historical_scenarios_from_store(
+                parquet_dir,
+                symbols,
+                timeframe,
+                horizons=tuple(scenario_config.get("horizons", DEFAULT_HISTORICAL_HORIZONS)),
+                worst=scenario_config.get("worst", 500),
+            )
+            logger.info(f"Loaded {count} historical stress scenarios from {parquet_dir}")
+
+        except Exception as e:
+            logger.error(f"Error loading historical stress scenarios: {e}")
+
+    def run_stress_scenarios(
+        self,
+        portfolio_positions: Dict[str, float],
+        scenarios: Optional[ScenarioSet] = None,
+        include_historical: bool = True,
+    ) -> StressDistribution:
+        """全シナリオの損益分布を計算（省略時は名前付きシナリオ + 過去変動シナリオ）"""
+        if scenarios is None:
+            scenarios = ScenarioSet.from_config(self.stress_test_scenarios)
+            if include_historical and len(self.historical_scenarios):
+                scenarios = scenarios + self.historical_scenarios
+        return self.stress_engine.run(portfolio_positions, scenarios)
+
+    def _named_stress_results(self, distribution: StressDistribution) -> Dict[str, StressTestResult]:
+        """分布から名前付きシナリオの結果を取り出す"""
+        return {name: self._stress_test_result(distribution, name) for name in self.stress_test_scenarios}
+
+    def _stress_test_result(self, distribution: StressDistribution, scenario_name: str) -> StressTestResult:
+        strategy_impacts = distribution.position_impacts(distribution.index_of(scenario_name))
+        return StressTestResult(
+            scenario_name=scenario_name,
+            portfolio_impact=float(distribution.portfolio_pnl[distribution.index_of(scenario_name)]),
+            strategy_impacts=strategy_impacts,
+            max_loss=abs(min(strategy_impacts.values())) if strategy_impacts else 0,
+            probability=STRESS_PROBABILITIES.get(scenario_name, 0.10),
+            recovery_time_estimate=STRESS_RECOVERY_DAYS.get(scenario_name, 14),  # 既定は2週間
+        )
+
     def perform_stress_test(
         self, portfolio_positions: Dict[str, float], scenario_name: str = "market_crash"
     ) -> StressTestResult:
@@ -286,59 +409,34 @@ class AdvancedRiskManager(RiskManager):
             if scenario_name not in self.stress_test_scenarios:
                 raise ValueError(f"Unknown stress test scenario: {scenario_name}")
 
-            scenario = self.stress_test_scenarios[scenario_name]
-            strategy_impacts = {}
-            total_impact = 0.0
-
-            for strategy, position_size in portfolio_positions.items():
-                # 戦略別の影響を計算（簡略化）
-                if "btc" in strategy.lower():
-                    impact = scenario.get("btc_drop", -0.20) * position_size
-                elif "eth" in strategy.lower():
-                    impact = scenario.get("eth_drop", -0.25) * position_size
-                else:
-                    impact = scenario.get("general_drop", -0.15) * position_size
-
-                strategy_impacts[strategy] = impact
-                total_impact += impact
-
-            # 最大損失計算
-            max_loss = abs(min(strategy_impacts.values())) if strategy_impacts else 0
-
-            # 回復時間推定（シナリオによる）
-            if scenario_name == "flash_crash":
-                recovery_time = 1  # 1日
-            elif scenario_name == "market_crash":
-                recovery_time = 30  # 30日
-            elif scenario_name == "liquidity_crisis":
-                recovery_time = 7  # 7日
-            else:
-                recovery_time = 14  # 2週間
-
-            # 発生確率（簡略化）
-            probability_map = {
-                "market_crash": 0.05,  # 5%
-                "flash_crash": 0.10,  # 10%
-                "liquidity_crisis": 0.08,  # 8%
-                "regulatory_shock": 0.15,  # 15%
-            }
-
-            return StressTestResult(
-                scenario_name=scenario_name,
-                portfolio_impact=total_impact,
-                strategy_impacts=strategy_impacts,
-                max_loss=max_loss,
-                probability=probability_map.get(scenario_name, 0.10),
-                recovery_time_estimate=recovery_time,
-            )
+            scenarios = ScenarioSet.from_config({scenario_name: self.stress_test_scenarios[scenario_name]})
+            distribution = self.stress_engine.run(portfolio_positions, scenarios)
+            return self._stress_test_result(distribution, scenario_name)
 
         except Exception as e:
             logger.error(f"Error performing stress test: {e}")
             return StressTestResult(scenario_name, 0, {}, 0, 0, 0)
 
-    def calculate_correlation_matrix(self, strategy_returns: Dict[str, List[float]]) -> pd.DataFrame:
-        """戦略間相関行列を計算"""
+    def perform_all_stress_tests(self, portfolio_positions: Dict[str, float]) -> Dict[str, StressTestResult]:
+        """名前付きシナリオをまとめて実行（1回の行列積）"""
+        try:
+            distribution = self.run_stress_scenarios(portfolio_positions, include_historical=False)
+            return self._named_stress_results(distribution)
+
+        except Exception as e:
+            logger.error(f"Error performing stress tests: {e}")
+            return {name: StressTestResult(name, 0, {}, 0, 0, 0) for name in self.stress_test_scenarios}
+
+    def calculate_correlation_matrix(self, strategy_returns: Optional[Dict[str, List[float]]] = None) -> pd.DataFrame:
+        """戦略間相関行列を計算
+
+        Args:
+            strategy_returns: 戦略別リターン系列（省略時は相関トラッカーの現在値を返す）
+        """
         try:
+            if strategy_returns is None:
+                return self.correlation_tracker.correlation_matrix()
+
             if len(strategy_returns) < 2:
                 return pd.DataFrame()
 
@@ -363,14 +461,22 @@ class AdvancedRiskManager(RiskManager):
         portfolio_returns: List[float],
         strategy_returns: Dict[str, List[float]],
         portfolio_positions: Dict[str, float],
+        var_result: Optional[VaRResult] = None,
+        correlation_matrix: Optional[pd.DataFrame] = None,
     ) -> RiskMetrics:
-        """包括的なリスクメトリクスを計算"""
+        """包括的なリスクメトリクスを計算
+
+        Args:
+            var_result: 計算済みの VaR（省略時は portfolio_returns から計算）
+            correlation_matrix: 計算済みの相関行列（省略時は strategy_returns から計算）
+        """
         try:
             # VaR計算
-            var_result = self.calculate_var(portfolio_returns)
+            if var_result is None:
+                var_result = self.calculate_var(portfolio_returns)
 
             # 基本統計
-            returns_array = np.array(portfolio_returns) if portfolio_returns else np.array([0])
+            returns_array = np.asarray(portfolio_returns, dtype=float) if len(portfolio_returns) else np.array([0.0])
 
             volatility = np.std(returns_array) * np.sqrt(252) if len(returns_array) > 1 else 0
             mean_return = np.mean(returns_array) * 252 if len(returns_array) > 0 else 0
@@ -401,11 +507,12 @@ class AdvancedRiskManager(RiskManager):
                 concentration_risk = 0
 
             # 相関リスク
-            correlation_matrix = self.calculate_correlation_matrix(strategy_returns)
+            if correlation_matrix is None:
+                correlation_matrix = self.calculate_correlation_matrix(strategy_returns)
             if not correlation_matrix.empty:
                 correlations = correlation_matrix.values
-                # 対角成分を除外して最大相関を取得
-                mask = ~np.eye(correlations.shape[0], dtype=bool)
+                # 対角成分と観測不足（NaN）のペアを除外して最大相関を取得
+                mask = ~np.eye(correlations.shape[0], dtype=bool) & np.isfinite(correlations)
                 correlation_risk = np.max(np.abs(correlations[mask])) if mask.any() else 0
             else:
                 correlation_risk = 0
@@ -438,6 +545,16 @@ class AdvancedRiskManager(RiskManager):
             logger.error(f"Error calculating risk metrics: {e}")
             return RiskMetrics(0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0)
 
+    def calculate_streaming_risk_metrics(self, portfolio_positions: Dict[str, float]) -> RiskMetrics:
+        """ローリング窓のリターンと相関トラッカーからリスクメトリクスを計算（ティックごとの監視用）"""
+        return self.calculate_portfolio_risk_metrics(
+            self.rolling_var.window.values(),
+            {},
+            portfolio_positions,
+            var_result=self.get_streaming_var(),
+            correlation_matrix=self.correlation_tracker.correlation_matrix(),
+        )
+
     def check_risk_limits(self, risk_metrics: RiskMetrics, portfolio_positions: Dict[str, float]) -> List[RiskAlert]:
         """リスク制限をチェックしてアラートを生成"""
         alerts = []
@@ -544,10 +661,9 @@ class AdvancedRiskManager(RiskManager):
             # リスクアラート確認
             current_alerts = self.check_risk_limits(risk_metrics, portfolio_positions)
 
-            # ストレステスト実行
-            stress_tests = {}
-            for scenario in self.stress_test_scenarios.keys():
-                stress_tests[scenario] = self.perform_stress_test(portfolio_positions, scenario)
+            # ストレステスト実行（名前付き + 過去変動シナリオを1回で評価し、名前付きの結果も同じ分布から取り出す）
+            stress_distribution = self.run_stress_scenarios(portfolio_positions)
+            stress_tests = self._named_stress_results(stress_distribution)
 
             # VaR詳細計算
             var_results = {}
@@ -607,6 +723,7 @@ class AdvancedRiskManager(RiskManager):
                     }
                     for scenario, result in stress_tests.items()
                 },
+                "stress_distribution": stress_distribution.summary(),
                 "correlation_analysis": {
                     "matrix": correlation_matrix.to_dict() if not correlation_matrix.empty else {},
                     "max_correlation": float(correlation_matrix.abs().max().max())
@@ -0,0 +1,362 @@
+"""
+オンライン共分散・相関トラッカー
+
+戦略・シンボルのリターンベクトルを1件ずつ取り込み、共分散・相関を逐次更新する。
+更新は Welford 法（任意でローリング窓）または EWMA で O(k²)、行列の参照は更新後の初回のみ組み立てて以降はキャッシュを返す。
+観測が欠けた系列はペアごとの観測（pandas の .corr() と同じ pairwise complete）で扱う。
+"""
+
+import logging
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+WELFORD = "welford"
+EWMA = "ewma"
+
+
+class OnlineCovarianceTracker:
+    """オンライン共分散・相関トラッカー
+
+    ペア (i, j) ごとに観測数・平均・偏差積和を保持する:
+        _count[i, j]: i と j が同時に観測された回数
+        _mean[i, j]:  その観測における i の平均
+        _co[i, j]:    i と j の偏差積和（EWMA では指数加重共分散）
+        _sq[i, j]:    その観測における i の偏差平方和
+    """
+
+    def __init__(
+        self,
+        names: Optional[Iterable[str]] = None,
+        method: str = WELFORD,
+        window: Optional[int] = None,
+        halflife: float = 20.0,
+        min_observations: int = 30,
+        shrinkage: float = 0.0,
+        max_pending: int = 1000,
+    ):
+        """
+        Args:
+            method: "welford"（標本共分散）または "ewma"（指数加重）
+            window: Welford 法のローリング窓長（None なら全期間）
+            halflife: EWMA の半減期（観測数）
+            min_observations: 相関・共分散を返す最低観測数（未満のペアは NaN）
+            shrinkage: 対角への縮小強度（0〜1）
+            max_pending: observe() で整列待ちにできる系列あたりの最大件数
+        """
+        if method not in (WELFORD, EWMA):
+            raise ValueError(f"Unknown covariance method: {method}")
+        if not 0.0 <= shrinkage <= 1.0:
+            raise ValueError("shrinkage must be between 0 and 1")
+
+        self.method = method
+        self.window = window if method == WELFORD else None
+        self.alpha = 1.0 - 0.5 ** (1.0 / halflife)
+        self.min_observations = min_observations
+        self.shrinkage = shrinkage
+        self.max_pending = max_pending
+
+        self._names: List[str] = []
+        self._index: Dict[str, int] = {}
+        self._count = np.zeros((0, 0))
+        self._mean = np.zeros((0, 0))
+        self._co = np.zeros((0, 0))
+        self._sq = np.zeros((0, 0))
+
+        # ローリング窓用の観測履歴 (値, 観測マスク)
+        self._rows: Deque[Tuple[np.ndarray, np.ndarray]] = deque()
+        self._updates_since_rebuild = 0
+
+        # observe() で系列ごとに届いた値を整列させる待ち行列
+        self._pending: Dict[str, Deque[float]] = {}
+
+        # 参照用キャッシュ（version が変わったら組み立て直す）
+        self.version = 0
+        self._cache: Dict[Tuple[str, float], Tuple[int, pd.DataFrame]] = {}
+
+        self.stats = {"updates": 0, "evictions": 0, "rebuilds": 0, "matrix_builds": 0, "cache_hits": 0}
+
+        for name in names or []:
+            self._ensure(name)
+
+    @property
+    def names(self) -> List[str]:
+        return list(self._names)
+
+    def __len__(self) -> int:
+        """取り込んだ観測ベクトル数"""
+        return self.stats["updates"]
+
+    def _ensure(self, name: str) -> int:
+        """系列を追加（既存ならインデックスを返す）"""
+        index = self._index.get(name)
+        if index is not None:
+            return index
+
+        size = len(self._names)
+        for attr in ("_count", "_mean", "_co", "_sq"):
+            grown = np.zeros((size + 1, size + 1))
+            grown[:size, :size] = getattr(self, attr)
+            setattr(self, attr, grown)
+        self._rows = deque((np.append(values, 0.0), np.append(mask, False)) for values, mask in self._rows)
+
+        self._names.append(name)
+        self._index[name] = size
+        return size
+
+    def remove(self, name: str):
+        """系列を削除"""
+        index = self._index.get(name)
+        if index is None:
+            return
+
+        for attr in ("_count", "_mean", "_co", "_sq"):
+            matrix = getattr(self, attr)
+            setattr(self, attr, np.delete(np.delete(matrix, index, axis=0), index, axis=1))
+        self._rows = deque((np.delete(values, index), np.delete(mask, index)) for values, mask in self._rows)
+
+        self._names.pop(index)
+        self._index = {n: i for i, n in enumerate(self._names)}
+        self._pending.pop(name, None)
+        self.version += 1
+
+    def reset(self):
+        """統計をすべて破棄（系列名は保持）"""
+        size = len(self._names)
+        self._count = np.zeros((size, size))
+        self._mean = np.zeros((size, size))
+        self._co = np.zeros((size, size))
+        self._sq = np.zeros((size, size))
+        self._rows.clear()
+        self._pending.clear()
+        self._updates_since_rebuild = 0
+        self.stats["updates"] = 0
+        self.version += 1
+
+    def update(self, returns: Dict[str, float]):
+        """同時刻のリターンベクトルを取り込む（含まれない系列は欠測として扱う）"""
+        indices = [self._ensure(name) for name in returns]
+        values = np.zeros(len(self._names))
+        mask = np.zeros(len(self._names), dtype=bool)
+        for index, value in zip(indices, returns.values()):
+            if value is not None and np.isfinite(value):
+                values[index] = float(value)
+                mask[index] = True
+
+        if not mask.any():
+            return
+
+        if self.method == EWMA:
+            self._add_ewma(values, mask)
+        else:
+            self._add(values, mask)
+            if self.window is not None:
+                self._rows.append((values, mask))
+                if len(self._rows) > self.window:
+                    self._remove(*self._rows.popleft())
+                    self.stats["evictions"] += 1
+
+                # 加減算の丸め誤差が蓄積しないよう、窓1周ごとに窓から再計算
+                self._updates_since_rebuild += 1
+                if self._updates_since_rebuild >= self.window:
+                    self._rebuild()
+
+        self.stats["updates"] += 1
+        self.version += 1
+
+    def observe(self, name: str, value: float):
+        """系列ごとに届く値を整列させて取り込む
+
+        2系列以上あり、全系列に未処理の値が揃うたびに、各系列の最も古い値を1ベクトルとして update() する。
+        """
+        self._ensure(name)
+        self._pending.setdefault(name, deque(maxlen=self.max_pending)).append(float(value))
+
+        while len(self._names) > 1 and all(self._pending.get(n) for n in self._names):
+            self.update({n: self._pending[n].popleft() for n in self._names})
+
+    def _add(self, values: np.ndarray, mask: np.ndarray):
+        """Welford 法で1観測を追加"""
+        pair = np.outer(mask, mask)
+        x = values[:, None]
+        count = self._count + pair
+        delta = np.where(pair, x - self._mean, 0.0)
+        mean = self._mean + np.divide(delta, count, out=np.zeros_like(delta), where=pair)
+
+        # _co[i, j] += (x_i - 旧平均_ij) * (x_j - 新平均_ji)
+        self._co += np.where(pair, delta * (values[None, :] - mean.T), 0.0)
+        self._sq += np.where(pair, delta * (x - mean), 0.0)
+        self._count = count
+        self._mean = mean
+
+    def _remove(self, values: np.ndarray, mask: np.ndarray):
+        """Welford 法で1観測を取り除く（_add の逆操作）"""
+        pair = np.outer(mask, mask)
+        x = values[:, None]
+        count = self._count - pair
+        remaining = pair & (count > 0)
+        mean = np.where(
+            remaining,
+            np.divide(self._count * self._mean - x, count, out=np.zeros_like(count), where=remaining),
+            self._mean,
+        )
+
+        delta = x - mean
+        self._co -= np.where(remaining, delta * (values[None, :] - self._mean.T), 0.0)
+        self._sq -= np.where(remaining, delta * (x - self._mean), 0.0)
+
+        emptied = pair & (count <= 0)
+        for matrix in (self._co, self._sq):
+            matrix[emptied] = 0.0
+        mean[emptied] = 0.0
+        self._count = np.maximum(count, 0.0)
+        self._mean = mean
+
+    def _add_ewma(self, values: np.ndarray, mask: np.ndarray):
+        """指数加重で1観測を追加"""
+        pair = np.outer(mask, mask)
+        first = pair & (self._count == 0)
+        x = values[:, None]
+        alpha = self.alpha
+
+        delta = np.where(pair, x - self._mean, 0.0)
+        self._co = np.where(pair, (1 - alpha) * (self._co + alpha * delta * delta.T), self._co)
+        self._sq = np.where(pair, (1 - alpha) * (self._sq + alpha * delta * delta), self._sq)
+        self._mean = np.where(pair, self._mean + alpha * delta, self._mean)
+
+        # 初回観測のペアは平均をその値で初期化
+        self._mean = np.where(first, x * np.ones_like(self._mean), self._mean)
+        self._co[first] = 0.0
+        self._sq[first] = 0.0
+        self._count = self._count + pair
+
+    def _rebuild(self):
+        """窓内の観測から統計を再計算"""
+        size = len(self._names)
+        self._count = np.zeros((size, size))
+        self._mean = np.zeros((size, size))
+        self._co = np.zeros((size, size))
+        self._sq = np.zeros((size, size))
+        for values, mask in self._rows:
+            self._add(values, mask)
+        self._updates_since_rebuild = 0
+        self.stats["rebuilds"] += 1
+
+    def _covariance_array(self) -> np.ndarray:
+        if self.method == EWMA:
+            covariance = self._co.copy()
+        else:
+            covariance = np.divide(self._co, self._count - 1, out=np.full_like(self._co, np.nan), where=self._count > 1)
+        covariance[self._count < max(self.min_observations, 2)] = np.nan
+        return covariance
+
+    def _correlation_array(self) -> np.ndarray:
+        denominator = np.sqrt(self._sq * self._sq.T)
+        correlation = np.divide(self._co, denominator, out=np.full_like(self._co, np.nan), where=denominator > 0)
+        correlation = np.clip(correlation, -1.0, 1.0)
+        correlation[self._count < max(self.min_observations, 2)] = np.nan
+        np.fill_diagonal(correlation, np.where(np.diag(self._count) >= max(self.min_observations, 2), 1.0, np.nan))
+        return correlation
+
+    def _cached(self, kind: str, shrinkage: Optional[float]) -> pd.DataFrame:
+        intensity = self.shrinkage if shrinkage is None else shrinkage
+        key = (kind, intensity)
+        cached = self._cache.get(key)
+        if cached is not None and cached[0] == self.version:
+            self.stats["cache_hits"] += 1
+            return cached[1]
+
+        matrix = self._covariance_array() if kind == "covariance" else self._correlation_array()
+        if intensity > 0:
+            # 対角成分は残し、非対角成分だけを 0 に向けて縮小
+            off_diagonal = ~np.eye(len(self._names), dtype=bool)
+            matrix[off_diagonal] *= 1.0 - intensity
+
+        frame = pd.DataFrame(matrix, index=self._names, columns=self._names)
+        self._cache = {k: v for k, v in self._cache.items() if v[0] == self.version}
+        self._cache[key] = (self.version, frame)
+        self.stats["matrix_builds"] += 1
+        return frame
+
+    def covariance(self, shrinkage: Optional[float] = None) -> pd.DataFrame:
+        """現在の共分散行列（観測不足のペアは NaN）"""
+        return self._cached("covariance", shrinkage)
+
+    def correlation(self, shrinkage: Optional[float] = None) -> pd.DataFrame:
+        """現在の相関行列（観測不足のペアは NaN）"""
+        return self._cached("correlation", shrinkage)
+
+    def correlation_matrix(self, names: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """十分な観測がある系列に絞った相関行列（2系列未満なら空）"""
+        frame = self.correlation()
+        if names is not None:
+            selected = [n for n in names if n in self._index]
+            frame = frame.loc[selected, selected]
+
+        values = frame.to_numpy()
+        paired = (np.isfinite(values) & ~np.eye(len(values), dtype=bool)).any(axis=1)
+        if paired.sum() < 2:
+            return pd.DataFrame()
+        return frame.loc[paired, paired]
+
+    def covariance_dict(self, names: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, float]]:
+        """PortfolioOptimizer 形式の共分散（{asset: {asset: cov}}）"""
+        frame = self.covariance()
+        selected = [n for n in (names or self._names) if n in self._index]
+        return {a: {b: float(frame.at[a, b]) for b in selected} for a in selected}
+
+    def pair_correlation(self, a: str, b: str) -> Optional[float]:
+        """2系列間の相関（観測不足なら None）"""
+        i, j = self._index.get(a), self._index.get(b)
+        if i is None or j is None:
+            return None
+        if i == j:
+            return 1.0
+
+        if self._count[i, j] < max(self.min_observations, 2):
+            return None
+        denominator = np.sqrt(self._sq[i, j] * self._sq[j, i])
+        if denominator <= 0:
+            return None
+        correlation = float(np.clip(self._co[i, j] / denominator, -1.0, 1.0))
+        return correlation * (1.0 - self.shrinkage)
+
+    def max_abs_correlation(self) -> float:
+        """非対角成分の最大絶対相関（観測不足なら 0）"""
+        correlation = self.correlation().to_numpy()
+        if correlation.shape[0] < 2:
+            return 0.0
+        off_diagonal = np.abs(correlation[~np.eye(correlation.shape[0], dtype=bool)])
+        off_diagonal = off_diagonal[np.isfinite(off_diagonal)]
+        return float(off_diagonal.max()) if off_diagonal.size else 0.0
+
+    def get_stats(self) -> Dict[str, float]:
+        """統計情報を取得"""
+        return {
+            **self.stats,
+            "series": len(self._names),
+            "method": self.method,
+            "window": self.window,
+            "pending": sum(len(values) for values in self._pending.values()),
+        }
+
+
+# 共有トラッカーのキー
+STRATEGY_CORRELATION_KEY = "strategies"
+SYMBOL_CORRELATION_KEY = "symbols"
+
+# プロセス内で共有するトラッカー（リスクチェック・最適化・API が同じ状態を参照する）
+_trackers: Dict[str, OnlineCovarianceTracker] = {}
+
+
+def get_correlation_tracker(key: str, **kwargs) -> OnlineCovarianceTracker:
+    """共有トラッカーを取得（初回のみ kwargs で生成）"""
+    tracker = _trackers.get(key)
+    if tracker is None:
+        tracker = OnlineCovarianceTracker(**kwargs)
+        _trackers[key] = tracker
+    return tracker
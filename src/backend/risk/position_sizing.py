@@ -1,9 +1,19 @@
 import logging
 from abc import ABC, abstractmethod
-from typing import Any, Dict
+from typing import Any, Dict, Sequence, Union
+
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
+# スカラー（全シグナル共通）またはシグナルごとの配列
+ArrayLike = Union[float, Sequence[float], np.ndarray]
+
+
+def _as_array(values: ArrayLike, size: int) -> np.ndarray:
+    """スカラー・配列をシグナル数の float 配列にそろえる"""
+    return np.broadcast_to(np.asarray(values, dtype=float), (size,))
+
 
 class PositionSizer(ABC):
     """ポジションサイジングの基底クラス"""
@@ -21,6 +31,24 @@ class PositionSizer(ABC):
         """ポジションサイズを計算"""
         pass
 
+    def calculate_sizes(
+        self,
+        capital: float,
+        signal_strength: np.ndarray,
+        volatility: np.ndarray,
+        win_rate: np.ndarray,
+        avg_win: np.ndarray,
+        avg_loss: np.ndarray,
+    ) -> np.ndarray:
+        """複数シグナルのポジションサイズを一括計算（既定はシグナルごとに calculate_size を呼ぶ）"""
+        return np.array(
+            [
+                self.calculate_size(capital, s, v, w, aw, al)
+                for s, v, w, aw, al in zip(signal_strength, volatility, win_rate, avg_win, avg_loss)
+            ],
+            dtype=float,
+        )
+
 
 class FixedRiskSizer(PositionSizer):
     """固定リスク比率によるポジションサイジング"""
@@ -43,6 +71,12 @@ class FixedRiskSizer(PositionSizer):
         position_size = risk_amount / (volatility * capital)
         return min(position_size, 0.2)  # 最大20%に制限
 
+    def calculate_sizes(self, capital, signal_strength, volatility, win_rate, avg_win, avg_loss) -> np.ndarray:
+        """固定リスク比率で一括計算（ボラティリティが 0 以下のシグナルは 0）"""
+        safe_volatility = np.where(volatility > 0, volatility, 1.0)
+        sizes = np.minimum(self.risk_pct / safe_volatility, 0.2)
+        return np.where(volatility > 0, sizes, 0.0)
+
 
 class KellyCriterionSizer(PositionSizer):
     """Kelly基準によるポジションサイジング"""
@@ -83,6 +117,15 @@ class KellyCriterionSizer(PositionSizer):
         logger.debug(f"Kelly fraction: {kelly_fraction:.4f}")
         return kelly_fraction
 
+    def calculate_sizes(self, capital, signal_strength, volatility, win_rate, avg_win, avg_loss) -> np.ndarray:
+        """Kelly基準で一括計算（平均損失・勝ちの倍率が 0 以下のシグナルは 0）"""
+        valid = (avg_loss > 0) & (avg_win > 0)
+        b = np.where(valid, avg_win, 1.0) / np.where(valid, avg_loss, 1.0)
+        kelly_fraction = (b * win_rate - (1 - win_rate)) / b * signal_strength
+        kelly_fraction = np.clip(kelly_fraction, 0.0, None)
+        kelly_fraction = np.minimum(kelly_fraction, max(self.max_fraction, 0.0))
+        return np.where(valid, kelly_fraction, 0.0)
+
 
 class VolatilityAdjustedSizer(PositionSizer):
     """ボラティリティ調整によるポジションサイジング"""
@@ -109,6 +152,12 @@ class VolatilityAdjustedSizer(PositionSizer):
         # 最大20%に制限
         return min(size, 0.2)
 
+    def calculate_sizes(self, capital, signal_strength, volatility, win_rate, avg_win, avg_loss) -> np.ndarray:
+        """ボラティリティ調整で一括計算"""
+        safe_volatility = np.where(volatility > 0, volatility, 1.0)
+        sizes = np.minimum(self.target_volatility / safe_volatility * signal_strength, 0.2)
+        return np.where(volatility > 0, sizes, 0.0)
+
 
 class RiskManager:
     """リスク管理クラス"""
@@ -132,16 +181,7 @@ class RiskManager:
         avg_loss: float = 0.01,
     ) -> float:
         """戦略に基づいてポジションサイズを計算"""
-
-        # 戦略固有の設定を取得
-        strategy_config = self.config.get("strategies", {}).get(strategy_name, {})
-        sizing_method = strategy_config.get("position_sizing", "fixed")
-
-        if sizing_method not in self.position_sizers:
-            logger.warning(f"Unknown position sizing method: {sizing_method}, using fixed")
-            sizing_method = "fixed"
-
-        sizer = self.position_sizers[sizing_method]
+        sizer = self.position_sizers[self._sizing_method(strategy_name)]
         position_size = sizer.calculate_size(
             capital=capital,
             signal_strength=signal_strength,
@@ -158,6 +198,53 @@ class RiskManager:
         logger.info(f"Position size calculated: {position_size:.4f} for {strategy_name}")
         return position_size
 
+    def calculate_position_sizes(
+        self,
+        strategy_names: Sequence[str],
+        capital: float,
+        signal_strength: ArrayLike,
+        volatility: ArrayLike,
+        win_rate: ArrayLike = 0.5,
+        avg_win: ArrayLike = 0.01,
+        avg_loss: ArrayLike = 0.01,
+    ) -> np.ndarray:
+        """同じバーで発生した複数シグナルのポジションサイズを一括計算
+
+        シグナルをサイジング方式ごとにまとめ、方式ごとに1回のベクトル演算で計算する。
+        strategy_names 以外の引数はスカラー（全シグナル共通）かシグナルごとの配列。
+        """
+        size = len(strategy_names)
+        strength = _as_array(signal_strength, size)
+        volatilities = _as_array(volatility, size)
+        win_rates = _as_array(win_rate, size)
+        avg_wins = _as_array(avg_win, size)
+        avg_losses = _as_array(avg_loss, size)
+
+        methods = np.array([self._sizing_method(name) for name in strategy_names], dtype=object)
+        position_sizes = np.zeros(size)
+        for method in set(methods.tolist()):
+            mask = methods == method
+            position_sizes[mask] = self.position_sizers[method].calculate_sizes(
+                capital, strength[mask], volatilities[mask], win_rates[mask], avg_wins[mask], avg_losses[mask]
+            )
+
+        # 最大ポジションサイズ制限
+        max_position_size = self.config.get("max_position_size_pct", 0.1)
+        position_sizes = np.minimum(position_sizes, max_position_size)
+
+        logger.debug(f"Position sizes calculated for {size} signals")
+        return position_sizes
+
+    def _sizing_method(self, strategy_name: str) -> str:
+        """戦略固有の設定からサイジング方式を取得"""
+        strategy_config = self.config.get("strategies", {}).get(strategy_name, {})
+        sizing_method = strategy_config.get("position_sizing", "fixed")
+
+        if sizing_method not in self.position_sizers:
+            logger.warning(f"Unknown position sizing method: {sizing_method}, using fixed")
+            sizing_method = "fixed"
+        return sizing_method
+
     def check_drawdown_limit(self, current_equity: float, peak_equity: float) -> bool:
         """ドローダウン制限をチェック"""
         if peak_equity <= 0:
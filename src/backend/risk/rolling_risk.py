@@ -0,0 +1,346 @@
+"""
+ストリーミング型のローリングVaR/ES計算
+
+リングバッファのリターン窓と、挿入・削除で維持するソート済み窓により、
+リターン1件ごとの更新で VaR / Expected Shortfall を再計算せずに参照できるようにする
+"""
+
+import bisect
+import math
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# 信頼区間ブートストラップの既定リサンプル数
+DEFAULT_BOOTSTRAP_SAMPLES = 1000
+# モンテカルロ法の既定シミュレーション数
+DEFAULT_MONTE_CARLO_SAMPLES = 10000
+
+
+def norm_ppf(p: float) -> float:
+    """標準正規分布のパーセンタイル点関数（scipy.stats.norm.ppfの代替）"""
+    # Beasley-Springer-Moro algorithm の簡易版
+    if p <= 0 or p >= 1:
+        raise ValueError("p must be between 0 and 1")
+
+    if p == 0.5:
+        return 0.0
+
+    # より正確な近似を使用
+    if p < 0.5:
+        # 下側
+        q = np.sqrt(-2 * np.log(p))
+        result = -(((2.30753 + q * 0.27061) / (1 + q * (0.99229 + q * 0.04481))) - q)
+    else:
+        # 上側
+        q = np.sqrt(-2 * np.log(1 - p))
+        result = ((2.30753 + q * 0.27061) / (1 + q * (0.99229 + q * 0.04481))) - q
+
+    return result
+
+
+def norm_pdf(x: float) -> float:
+    """標準正規分布の確率密度関数（scipy.stats.norm.pdfの代替）"""
+    return (1 / np.sqrt(2 * np.pi)) * np.exp(-0.5 * x**2)
+
+
+def percentile_sorted(sorted_values, q: float) -> float:
+    """ソート済み配列のパーセンタイル（np.percentile の線形補間と同じ定義）"""
+    n = len(sorted_values)
+    position = (n - 1) * q / 100.0
+    lower = int(math.floor(position))
+    upper = min(lower + 1, n - 1)
+    fraction = position - lower
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * fraction
+
+
+def tail_mean_sorted(sorted_values, threshold: float) -> float:
+    """ソート済み配列のうち threshold 以下の値の平均（Expected Shortfall 用）"""
+    if isinstance(sorted_values, np.ndarray):
+        count = int(np.searchsorted(sorted_values, threshold, side="right"))
+    else:
+        count = bisect.bisect_right(sorted_values, threshold)
+    if count == 0:
+        return float("nan")
+    return float(np.mean(sorted_values[:count]))
+
+
+class RollingWindow:
+    """固定長のリターン窓
+
+    - 時系列順のリングバッファ（numpy 配列）
+    - 挿入・削除で維持するソート済みリスト（分位点・裾平均を O(log N) で参照）
+    - 平均・分散用の累積和
+    """
+
+    def __init__(self, capacity: int):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self._buffer = np.zeros(capacity)
+        self._start = 0
+        self._size = 0
+        self._sorted: List[float] = []
+        self._sum = 0.0
+        self._sum_sq = 0.0
+        self._updates_since_resum = 0
+        # 窓の内容が変わるたびに増える（キャッシュの無効化に使う）
+        self.version = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, value: float) -> Optional[float]:
+        """値を追加し、窓からあふれた値を返す"""
+        value = float(value)
+        evicted = None
+
+        if self._size == self.capacity:
+            evicted = float(self._buffer[self._start])
+            self._buffer[self._start] = value
+            self._start = (self._start + 1) % self.capacity
+            del self._sorted[bisect.bisect_left(self._sorted, evicted)]
+            self._sum -= evicted
+            self._sum_sq -= evicted * evicted
+        else:
+            self._buffer[(self._start + self._size) % self.capacity] = value
+            self._size += 1
+
+        bisect.insort(self._sorted, value)
+        self._sum += value
+        self._sum_sq += value * value
+        self.version += 1
+
+        # 累積和の丸め誤差が蓄積しないよう、窓1周ごとに再計算
+        self._updates_since_resum += 1
+        if self._updates_since_resum >= self.capacity:
+            values = self.values()
+            self._sum = float(values.sum())
+            self._sum_sq = float(np.dot(values, values))
+            self._updates_since_resum = 0
+
+        return evicted
+
+    def extend(self, values: Iterable[float]):
+        for value in values:
+            self.append(value)
+
+    def clear(self):
+        self._start = 0
+        self._size = 0
+        self._sorted = []
+        self._sum = 0.0
+        self._sum_sq = 0.0
+        self._updates_since_resum = 0
+        self.version += 1
+
+    def values(self) -> np.ndarray:
+        """時系列順の値"""
+        if self._start + self._size <= self.capacity:
+            return self._buffer[self._start : self._start + self._size].copy()
+        return np.concatenate([self._buffer[self._start :], self._buffer[: (self._start + self._size) % self.capacity]])
+
+    def tolist(self) -> List[float]:
+        return self.values().tolist()
+
+    @property
+    def sorted_values(self) -> List[float]:
+        return self._sorted
+
+    @property
+    def mean(self) -> float:
+        return self._sum / self._size if self._size else 0.0
+
+    @property
+    def std(self) -> float:
+        """母標準偏差（np.std と同じ ddof=0）"""
+        if self._size == 0:
+            return 0.0
+        mean = self.mean
+        return math.sqrt(max(0.0, self._sum_sq / self._size - mean * mean))
+
+    def percentile(self, q: float) -> float:
+        return percentile_sorted(self._sorted, q)
+
+    def tail_mean(self, threshold: float) -> float:
+        return tail_mean_sorted(self._sorted, threshold)
+
+
+class BootstrapCache:
+    """ブートストラップ用の (B × N) 添字行列を窓長ごとにキャッシュ"""
+
+    def __init__(self, samples: int = DEFAULT_BOOTSTRAP_SAMPLES, seed: Optional[int] = None):
+        self.samples = samples
+        self._rng = np.random.default_rng(seed)
+        self._indices: Dict[int, np.ndarray] = {}
+
+    def indices(self, n: int) -> np.ndarray:
+        indices = self._indices.get(n)
+        if indices is None:
+            indices = self._rng.integers(0, n, size=(self.samples, n))
+            # 窓長は通常1〜2種類なので直近のものだけ保持
+            self._indices = {n: indices}
+        return indices
+
+    def percentile_interval(self, values: np.ndarray, q: float = 5.0) -> Tuple[float, float]:
+        """-percentile(q) のブートストラップ 95% 信頼区間"""
+        resampled = np.take(values, self.indices(len(values)))
+        bootstrap_vars = -np.percentile(resampled, q, axis=1)
+        low, high = np.percentile(bootstrap_vars, [2.5, 97.5])
+        return float(low), float(high)
+
+
+class StandardNormalDraws:
+    """モンテカルロ法用の標準正規乱数（一度だけ生成し、平均・標準偏差でスケーリングして使う）"""
+
+    def __init__(self, samples: int = DEFAULT_MONTE_CARLO_SAMPLES, seed: Optional[int] = None):
+        self.samples = samples
+        self._seed = seed
+        self._sorted: Optional[np.ndarray] = None
+
+    @property
+    def sorted(self) -> np.ndarray:
+        if self._sorted is None:
+            self._sorted = np.sort(np.random.default_rng(self._seed).standard_normal(self.samples))
+        return self._sorted
+
+    def var_es(self, mean: float, std: float, q: float) -> Tuple[float, float]:
+        """mean + std * Z の -percentile(q) と、それ以下の平均の符号反転"""
+        z = self.sorted
+        z_quantile = percentile_sorted(z, q)
+        var = -(mean + std * z_quantile)
+        es = -(mean + std * tail_mean_sorted(z, z_quantile))
+        return var, es
+
+
+class RollingVaREngine:
+    """ローリングVaR/ESエンジン
+
+    リターンを1件ずつ update() し、var_es() / confidence_interval() で直近窓の推定値を参照する。
+    信頼区間のブートストラップは (裾の確率, ホライズン) ごとにキャッシュし、窓の更新が
+    interval_recompute 件たまるまで再計算しない（ティックごとに更新しても毎回リサンプルしない）。
+    """
+
+    def __init__(
+        self,
+        window: int = 252,
+        bootstrap_samples: int = DEFAULT_BOOTSTRAP_SAMPLES,
+        monte_carlo_samples: int = DEFAULT_MONTE_CARLO_SAMPLES,
+        seed: Optional[int] = None,
+        interval_recompute: int = 1,
+    ):
+        self.window = RollingWindow(window)
+        self.bootstrap = BootstrapCache(bootstrap_samples, seed)
+        self.normal_draws = StandardNormalDraws(monte_carlo_samples, seed)
+        self.interval_recompute = max(int(interval_recompute), 1)
+        # (q, horizon) -> (計算時の窓バージョン, 信頼区間)
+        self._interval_cache: Dict[Tuple[float, int], Tuple[int, Tuple[float, float]]] = {}
+
+    def __len__(self) -> int:
+        return len(self.window)
+
+    def update(self, value: float) -> Optional[float]:
+        """リターンを追加（窓からあふれたリターンを返す）"""
+        return self.window.append(value)
+
+    def reset(self, values: Iterable[float] = ()):
+        self.window.clear()
+        self.window.extend(values)
+        self._interval_cache.clear()
+
+    def var_es(self, q: float, method: str = "historical") -> Tuple[float, float]:
+        """(VaR, ES) を損失を正とする値で返す
+
+        Args:
+            q: 裾の確率（%）。95% VaR なら 5
+        """
+        if method == "historical":
+            var = -self.window.percentile(q)
+            return var, -self.window.tail_mean(-var)
+
+        mean, std = self.window.mean, self.window.std
+        if method == "parametric":
+            return parametric_var_es(mean, std, q)
+        if method == "monte_carlo":
+            return self.normal_draws.var_es(mean, std, q)
+        raise ValueError(f"Unknown VaR method: {method}")
+
+    def confidence_interval(self, q: float = 5.0, horizon: int = 1) -> Tuple[float, float]:
+        """VaR のブートストラップ 95% 信頼区間
+
+        Args:
+            q: 裾の確率（%）。95% VaR なら 5
+            horizon: 保有期間（本数）。1本あたりの区間を √horizon でスケーリングする
+        """
+        key = (q, horizon)
+        version = self.window.version
+        cached = self._interval_cache.get(key)
+        if cached is None or version - cached[0] >= self.interval_recompute:
+            low, high = self.bootstrap.percentile_interval(self.window.values(), q)
+            scale = math.sqrt(horizon)
+            cached = self._interval_cache[key] = (version, (low * scale, high * scale))
+        return cached[1]
+
+
+def parametric_var_es(mean: float, std: float, q: float) -> Tuple[float, float]:
+    """正規分布を仮定した (VaR, ES)"""
+    p = q / 100.0
+    z = norm_ppf(p)
+    return -(mean + z * std), -(mean + std * norm_pdf(z) / p)
+
+
+class RollingVolatilityTracker:
+    """シンボル別のローリングボラティリティ
+
+    価格を1本ずつ update_price() し、直前価格からの単純リターンをシンボルごとの RollingWindow に蓄積する。
+    観測が min_observations 未満のシンボルは default_volatility を返す。
+    """
+
+    def __init__(self, window: int = 20, min_observations: int = 5, default_volatility: float = 0.02):
+        self.window = window
+        self.min_observations = min_observations
+        self.default_volatility = default_volatility
+        self._windows: Dict[str, RollingWindow] = {}
+        self._last_prices: Dict[str, float] = {}
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._windows
+
+    def update_price(self, symbol: str, price: float):
+        """価格を追加（前回価格があればリターンを窓に追加）"""
+        price = float(price)
+        last_price = self._last_prices.get(symbol)
+        self._last_prices[symbol] = price
+        if last_price is not None and last_price > 0:
+            self.update_return(symbol, price / last_price - 1.0)
+
+    def update_return(self, symbol: str, value: float):
+        """リターンを直接追加"""
+        window = self._windows.get(symbol)
+        if window is None:
+            window = self._windows[symbol] = RollingWindow(self.window)
+        window.append(value)
+
+    def volatility(self, symbol: str) -> float:
+        """直近窓のリターンの標準偏差（1本あたり）"""
+        window = self._windows.get(symbol)
+        if window is None or len(window) < self.min_observations:
+            return self.default_volatility
+        return window.std
+
+    def volatilities(self, symbols: Iterable[str]) -> np.ndarray:
+        """複数シンボルのボラティリティ（一括サイジング用の配列）"""
+        return np.array([self.volatility(symbol) for symbol in symbols], dtype=float)
+
+    def reset(self):
+        self._windows.clear()
+        self._last_prices.clear()
+
+
+# プロセス内で共有するボラティリティトラッカー（ライブのポジションサイジングが同じ状態を参照する）
+volatility_tracker = RollingVolatilityTracker()
+
+
+def get_volatility_tracker() -> RollingVolatilityTracker:
+    """共有ボラティリティトラッカーを取得"""
+    return volatility_tracker
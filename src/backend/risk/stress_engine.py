@@ -0,0 +1,315 @@
+"""
+ベクトル化ストレステスト
+
+ポジションをファクターへのエクスポージャーベクトル、シナリオをファクターショックの行列として表し、
+数千シナリオの損益を1回の行列積で評価する。
+シナリオは設定済みの名前付きシナリオ、ショック水準のグリッド、ローカルの OHLCV ストアから
+切り出した過去の変動（最悪の 1h / 24h 変動など）から作成できる。
+"""
+
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.backend.utils.timeframes import timeframe_to_seconds
+
+logger = logging.getLogger(__name__)
+
+# ファクター（BTC・ETH・その他のアルト）
+FACTORS = ("btc", "eth", "alt")
+
+# 名前付きシナリオでショックが未設定の場合の既定値
+DEFAULT_FACTOR_SHOCKS = {"btc": -0.20, "eth": -0.25, "alt": -0.15}
+
+# 過去変動シナリオの既定の期間
+DEFAULT_HISTORICAL_HORIZONS = ("1h", "24h")
+
+# ベース通貨 → ファクター（ラップトークン等も同じファクターとして扱う。ここにない通貨は alt）
+FACTOR_BASE_ASSETS = {
+    "BTC": "btc",
+    "WBTC": "btc",
+    "BTCB": "btc",
+    "ETH": "eth",
+    "WETH": "eth",
+    "STETH": "eth",
+    "WSTETH": "eth",
+}
+
+# 区切りのないシンボル（BTCUSDT）からベース通貨を切り出すためのクォート通貨（接尾辞が重なるものは長い方を先に置く）
+QUOTE_ASSETS = ("FDUSD", "USDT", "USDC", "BUSD", "TUSD", "DAI", "USD", "EUR", "JPY", "BTC", "ETH", "BNB")
+
+
+def base_asset(name: str) -> str:
+    """シンボル（BTC/USDT, BTC/USDT:USDT, BTCUSDT）または「ベース通貨_戦略名」形式の名前からベース通貨を取得"""
+    symbol = name.upper().split(":")[0]
+    if "/" in symbol:
+        return symbol.split("/")[0]
+    for separator in ("_", "-", " "):
+        if separator in symbol:
+            return base_asset(symbol.split(separator)[0])
+    for quote in QUOTE_ASSETS:
+        if symbol.endswith(quote) and len(symbol) > len(quote):
+            return symbol[: -len(quote)]
+    return symbol
+
+
+def classify_exposure(name: str, base_assets: Optional[Dict[str, str]] = None) -> str:
+    """シンボルのベース通貨からファクターを判定
+
+    Args:
+        base_assets: シンボル → ベース通貨（取引所のマーケット情報など。未登録の名前は表記から判定）
+    """
+    base = (base_assets or {}).get(name) or base_asset(name)
+    return FACTOR_BASE_ASSETS.get(base.upper(), "alt")
+
+
+def named_scenario_shocks(scenario: Dict[str, float]) -> Dict[str, float]:
+    """設定のシナリオ（btc_drop, eth_drop, general_drop）をファクターショックに変換"""
+    return {
+        "btc": scenario.get("btc_drop", DEFAULT_FACTOR_SHOCKS["btc"]),
+        "eth": scenario.get("eth_drop", DEFAULT_FACTOR_SHOCKS["eth"]),
+        "alt": scenario.get("general_drop", DEFAULT_FACTOR_SHOCKS["alt"]),
+    }
+
+
+@dataclass
+class ScenarioSet:
+    """シナリオ集合（行: シナリオ、列: ファクター）"""
+
+    names: List[str]
+    shocks: np.ndarray
+    factors: Tuple[str, ...] = FACTORS
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __add__(self, other: "ScenarioSet") -> "ScenarioSet":
+        if tuple(other.factors) != tuple(self.factors):
+            raise ValueError("Scenario sets must share the same factors")
+        return ScenarioSet(self.names + other.names, np.vstack([self.shocks, other.shocks]), self.factors)
+
+    @classmethod
+    def empty(cls, factors: Sequence[str] = FACTORS) -> "ScenarioSet":
+        return cls([], np.zeros((0, len(factors))), tuple(factors))
+
+    @classmethod
+    def from_config(cls, scenarios: Dict[str, Dict[str, float]]) -> "ScenarioSet":
+        """stress_test_scenarios 形式の設定から作成"""
+        names = list(scenarios)
+        shocks = np.array([[named_scenario_shocks(scenarios[name])[f] for f in FACTORS] for name in names])
+        return cls(names, shocks.reshape(len(names), len(FACTORS)))
+
+    @classmethod
+    def grid(cls, levels: Dict[str, Iterable[float]]) -> "ScenarioSet":
+        """ファクターごとのショック水準の全組み合わせ（未指定のファクターは 0）"""
+        axes = [np.asarray(list(levels.get(factor, [0.0])), dtype=float) for factor in FACTORS]
+        mesh = np.meshgrid(*axes, indexing="ij")
+        shocks = np.stack([m.ravel() for m in mesh], axis=1)
+        names = ["grid_" + "_".join(f"{f}{s:+.2f}" for f, s in zip(FACTORS, row)) for row in shocks]
+        return cls(names, shocks)
+
+
+def factor_returns(closes: pd.DataFrame, proxies: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+    """シンボル別終値（列: シンボル）をファクター別の価格指数に変換
+
+    btc / eth はシンボル名から判定した代表銘柄、alt はそれ以外の銘柄の等ウェイト指数を使う。
+    該当する銘柄がないファクターは全銘柄の等ウェイト指数で代用する。
+    """
+    closes = closes.sort_index().ffill().dropna(how="all")
+    normalized = closes / closes.bfill().iloc[0]
+
+    groups: Dict[str, List[str]] = {factor: [] for factor in FACTORS}
+    for column in closes.columns:
+        groups[classify_exposure(str(column))].append(column)
+    if proxies:
+        for factor, symbol in proxies.items():
+            if symbol in closes.columns:
+                groups[factor] = [symbol]
+
+    market = normalized.mean(axis=1)
+    return pd.DataFrame(
+        {factor: normalized[columns].mean(axis=1) if columns else market for factor, columns in groups.items()}
+    )
+
+
+def historical_scenarios(
+    closes: pd.DataFrame,
+    bar_timeframe: str = "1h",
+    horizons: Sequence[str] = DEFAULT_HISTORICAL_HORIZONS,
+    worst: Optional[int] = None,
+    proxies: Optional[Dict[str, str]] = None,
+) -> ScenarioSet:
+    """過去の価格変動からシナリオを作成
+
+    各時点の horizon 期間リターン（全ファクター同時点）を1シナリオとする。
+
+    Args:
+        closes: シンボル別終値（時刻インデックス、列: シンボル）
+        bar_timeframe: closes の足の時間枠
+        worst: 期間ごとに、ファクター平均リターンの小さい順にこの件数だけ残す
+    """
+    if closes.empty:
+        return ScenarioSet.empty()
+
+    index = factor_returns(closes, proxies)
+    bar_seconds = timeframe_to_seconds(bar_timeframe)
+
+    names: List[str] = []
+    blocks: List[np.ndarray] = []
+    for horizon in horizons:
+        bars = timeframe_to_seconds(horizon) // bar_seconds
+        if bars <= 0 or bars >= len(index):
+            continue
+
+        moves = (index / index.shift(bars) - 1).dropna()
+        values = moves[list(FACTORS)].to_numpy()
+        if worst is not None and len(values) > worst:
+            selected = np.sort(np.argpartition(values.mean(axis=1), worst - 1)[:worst])
+            values, timestamps = values[selected], moves.index[selected]
+        else:
+            timestamps = moves.index
+
+        names.extend(f"hist_{horizon}_{pd.Timestamp(ts).isoformat()}" for ts in timestamps)
+        blocks.append(values)
+
+    if not blocks:
+        return ScenarioSet.empty()
+    return ScenarioSet(names, np.vstack(blocks))
+
+
+def stored_symbols(parquet_dir: Path, timeframe: str = "1h") -> List[str]:
+    """ローカルの OHLCV ストアに保存されているシンボル（BTC_USDT_1h.parquet → BTC/USDT）"""
+    suffix = f"_{timeframe}.parquet"
+    return sorted(
+        path.name[: -len(suffix)].replace("_", "/") for path in Path(parquet_dir).glob(f"*{suffix}") if path.is_file()
+    )
+
+
+def load_close_prices(parquet_dir: Path, symbols: Iterable[str], timeframe: str = "1h") -> pd.DataFrame:
+    """ローカルの OHLCV ストア（DataCollector が保存した Parquet）から終値を読み込む"""
+    closes = {}
+    for symbol in symbols:
+        filepath = Path(parquet_dir) / f"{symbol.replace('/', '_')}_{timeframe}.parquet"
+        if not filepath.exists():
+            continue
+        try:
+            df = pd.read_parquet(filepath, columns=["timestamp", "close"])
+            closes[symbol] = df.set_index(pd.to_datetime(df["timestamp"], utc=True))["close"].astype(float)
+        except Exception as e:
+            logger.error(f"Error loading close prices from {filepath}: {e}")
+
+    if not closes:
+        return pd.DataFrame()
+    return pd.DataFrame(closes).sort_index()
+
+
+@dataclass
+class StressDistribution:
+    """シナリオごとの損益分布"""
+
+    scenario_names: List[str]
+    position_names: List[str]
+    portfolio_pnl: np.ndarray  # (シナリオ数,)
+    shocks: np.ndarray  # (シナリオ数, ファクター数)
+    loadings: np.ndarray  # (ポジション数, ファクター数)
+    sizes: np.ndarray  # (ポジション数,)
+
+    def __len__(self) -> int:
+        return len(self.scenario_names)
+
+    @property
+    def losses(self) -> np.ndarray:
+        """損失（正の値が損失）"""
+        return -self.portfolio_pnl
+
+    def position_pnl(self, scenario_indices: Optional[Sequence[int]] = None) -> np.ndarray:
+        """ポジション別損益（シナリオ数 × ポジション数）。必要なシナリオだけ計算する"""
+        shocks = self.shocks if scenario_indices is None else self.shocks[np.asarray(scenario_indices)]
+        return (shocks @ self.loadings.T) * self.sizes
+
+    def position_impacts(self, scenario_index: int) -> Dict[str, float]:
+        return dict(zip(self.position_names, self.position_pnl([scenario_index])[0].tolist()))
+
+    def index_of(self, scenario_name: str) -> int:
+        return self.scenario_names.index(scenario_name)
+
+    def worst(self, count: int = 10) -> List[Tuple[str, float]]:
+        """損失の大きい順のシナリオ"""
+        count = min(count, len(self))
+        if count == 0:
+            return []
+        candidates = np.argpartition(self.portfolio_pnl, count - 1)[:count]
+        ordered = candidates[np.argsort(self.portfolio_pnl[candidates])]
+        return [(self.scenario_names[i], float(self.portfolio_pnl[i])) for i in ordered]
+
+    def loss_quantile(self, q: float = 0.99) -> float:
+        """損失分布の分位点"""
+        return float(np.quantile(self.losses, q)) if len(self) else 0.0
+
+    def expected_shortfall(self, q: float = 0.99) -> float:
+        """分位点以上の損失の平均"""
+        if not len(self):
+            return 0.0
+        losses = self.losses
+        return float(losses[losses >= np.quantile(losses, q)].mean())
+
+    def summary(self, top: int = 5) -> Dict[str, object]:
+        return {
+            "scenarios": len(self),
+            "worst_scenarios": [{"scenario": name, "pnl": pnl} for name, pnl in self.worst(top)],
+            "max_loss": float(self.losses.max()) if len(self) else 0.0,
+            "mean_pnl": float(self.portfolio_pnl.mean()) if len(self) else 0.0,
+            "loss_95": self.loss_quantile(0.95),
+            "loss_99": self.loss_quantile(0.99),
+            "expected_shortfall_99": self.expected_shortfall(0.99),
+        }
+
+
+class StressTestEngine:
+    """ファクターショック行列によるストレステストエンジン"""
+
+    def __init__(self, classifier: Optional[Callable[[str], str]] = None, base_assets: Optional[Dict[str, str]] = None):
+        """
+        Args:
+            classifier: ポジション名 → ファクターの判定関数（省略時はベース通貨で判定）
+            base_assets: シンボル → ベース通貨（取引所のマーケット情報など）
+        """
+        self.classifier = classifier or (lambda name: classify_exposure(name, base_assets))
+        self._factor_index = {factor: i for i, factor in enumerate(FACTORS)}
+        # ポジション名 → ファクターの判定結果キャッシュ
+        self._classified: Dict[str, int] = {}
+
+    def exposures(self, positions: Dict[str, float]) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        """(ポジション名, ローディング行列, サイズ) を作成"""
+        names = list(positions)
+        loadings = np.zeros((len(names), len(FACTORS)))
+        for row, name in enumerate(names):
+            column = self._classified.get(name)
+            if column is None:
+                column = self._factor_index[self.classifier(name)]
+                self._classified[name] = column
+            loadings[row, column] = 1.0
+        sizes = np.fromiter((positions[name] for name in names), dtype=float, count=len(names))
+        return names, loadings, sizes
+
+    def exposure_vector(self, positions: Dict[str, float]) -> np.ndarray:
+        """ファクター別エクスポージャー"""
+        _, loadings, sizes = self.exposures(positions)
+        return loadings.T @ sizes
+
+    def run(self, positions: Dict[str, float], scenarios: ScenarioSet) -> StressDistribution:
+        """全シナリオの損益を1回の行列積で評価"""
+        names, loadings, sizes = self.exposures(positions)
+        portfolio_pnl = scenarios.shocks @ (loadings.T @ sizes)
+        return StressDistribution(
+            scenario_names=scenarios.names,
+            position_names=names,
+            portfolio_pnl=portfolio_pnl,
+            shocks=scenarios.shocks,
+            loadings=loadings,
+            sizes=sizes,
+        )
@@ -3,6 +3,14 @@
 価格配信、取引データ配信、ニュース配信などを管理
 """
 
+from .candle_aggregator import Candle, CandleAggregator, timeframe_to_seconds
+from .order_book import (
+    LocalOrderBook,
+    OrderBookManager,
+    OrderBookSequenceError,
+    get_order_book_manager,
+    order_book_manager,
+)
 from .price_streamer import (
     BinanceWebSocketStreamer,
     PriceData,
@@ -18,5 +26,13 @@ __all__ = [
     "BinanceWebSocketStreamer",
     "PriceData",
     "TradeData",
+    "Candle",
+    "CandleAggregator",
+    "timeframe_to_seconds",
+    "LocalOrderBook",
+    "OrderBookManager",
+    "OrderBookSequenceError",
+    "order_book_manager",
+    "get_order_book_manager",
     "router",
 ]
@@ -0,0 +1,432 @@
+"""
+リアルタイム足生成システム
+トレードストリームから1秒足・1分足を生成し、上位時間枠を1分足から派生させる
+"""
+
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+from src.backend.core.supabase_db import get_supabase_client
+from src.backend.utils.timeframes import timeframe_to_seconds
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Candle:
+    """足データ構造（時刻はミリ秒のUNIX時間）"""
+
+    symbol: str
+    timeframe: str
+    open_time: int
+    close_time: int
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float
+    trade_count: int = 0
+    is_closed: bool = False
+
+    @property
+    def timestamp(self) -> datetime:
+        """足の開始時刻"""
+        return datetime.fromtimestamp(self.open_time / 1000, timezone.utc)
+
+    def merge(self, other: "Candle"):
+        """下位足を取り込んで更新"""
+        self.high = max(self.high, other.high)
+        self.low = min(self.low, other.low)
+        self.close = other.close
+        self.volume += other.volume
+        self.trade_count += other.trade_count
+
+    def to_ohlcv(self) -> Dict[str, Any]:
+        """BaseStrategy.update() に渡せる形式に変換"""
+        return {
+            "timestamp": self.timestamp,
+            "open": self.open,
+            "high": self.high,
+            "low": self.low,
+            "close": self.close,
+            "volume": self.volume,
+        }
+
+    def to_dict(self) -> dict:
+        return {
+            "symbol": self.symbol,
+            "timeframe": self.timeframe,
+            "timestamp": self.timestamp.isoformat(),
+            "open_time": self.open_time,
+            "close_time": self.close_time,
+            "open": self.open,
+            "high": self.high,
+            "low": self.low,
+            "close": self.close,
+            "volume": self.volume,
+            "trade_count": self.trade_count,
+            "is_closed": self.is_closed,
+        }
+
+
+class CandleAggregator:
+    """トレードストリームからOHLCV足を集約するクラス
+
+    - 基本足（1秒足・1分足）はトレードから直接生成する
+    - 上位足（5m, 15m, 1h ...）は確定した1分足から派生させる
+    - 確定足はリングバッファ・戦略・リスナーに配信し、バッチで永続化する
+    """
+
+    def __init__(
+        self,
+        base_timeframes: Iterable[str] = ("1s", "1m"),
+        derived_timeframes: Iterable[str] = ("5m", "15m", "1h", "4h", "1d"),
+        history_size: int = 500,
+        persist_timeframes: Iterable[str] = ("1m", "5m", "15m", "1h", "4h", "1d"),
+        persist_batch_size: int = 500,
+        exchange_name: str = "binance",
+        persister: Optional[Callable[[List[Candle]], Any]] = None,
+    ):
+        self.base_timeframes = list(base_timeframes)
+        if "1m" not in self.base_timeframes:
+            raise ValueError("base_timeframes must include '1m' to derive higher timeframes")
+
+        self.derived_timeframes = list(derived_timeframes)
+        for timeframe in self.derived_timeframes:
+            if timeframe_to_seconds(timeframe) % 60 != 0:
+                raise ValueError(f"Derived timeframe must be a multiple of 1m: {timeframe}")
+
+        self.intervals_ms: Dict[str, int] = {
+            timeframe: timeframe_to_seconds(timeframe) * 1000
+            for timeframe in self.base_timeframes + self.derived_timeframes
+        }
+
+        self.history_size = history_size
+        self.persist_timeframes = set(persist_timeframes)
+        self.persist_batch_size = persist_batch_size
+        self.exchange_name = exchange_name
+        self.persister = persister or self._persist_to_supabase
+
+        # 形成中の足 / 確定足のリングバッファ
+        self.current_candles: Dict[Tuple[str, str], Candle] = {}
+        self.history: Dict[Tuple[str, str], Deque[Candle]] = {}
+        # 確定済みの最新足の open_time（遅延トレードで確定済みの足を作り直さないため）
+        self.last_closed_open_time: Dict[Tuple[str, str], int] = {}
+
+        # 配信先
+        self.listeners: List[Callable] = []
+        self.strategies: Dict[Tuple[str, str], List[Any]] = {}
+
+        # イベントハンドラー
+        self.on_strategy_signal: Optional[Callable] = None
+
+        # 永続化待ちの確定足
+        self.pending_persist: List[Candle] = []
+
+        # 統計
+        self.stats = {
+            "trades_processed": 0,
+            "candles_closed": 0,
+            "candles_persisted": 0,
+            "late_trades": 0,
+            "persist_errors": 0,
+        }
+
+    # ------------------------------------------------------------------
+    # 配信先の登録
+    # ------------------------------------------------------------------
+
+    def add_listener(self, callback: Callable):
+        """確定足リスナーを追加（同期・非同期どちらも可）"""
+        if callback not in self.listeners:
+            self.listeners.append(callback)
+
+    def remove_listener(self, callback: Callable):
+        """確定足リスナーを削除"""
+        if callback in self.listeners:
+            self.listeners.remove(callback)
+
+    def register_strategy(self, strategy, symbol: Optional[str] = None, timeframe: Optional[str] = None):
+        """戦略を登録（戦略のsymbol/timeframeの確定足で update() を呼ぶ）"""
+        symbol = self._normalize_symbol(symbol or strategy.symbol)
+        timeframe = timeframe or strategy.timeframe
+
+        if timeframe not in self.intervals_ms:
+            raise ValueError(f"Timeframe {timeframe} is not aggregated")
+
+        strategies = self.strategies.setdefault((symbol, timeframe), [])
+        if strategy not in strategies:
+            strategies.append(strategy)
+
+    def unregister_strategy(self, strategy):
+        """戦略の登録を解除"""
+        for strategies in self.strategies.values():
+            if strategy in strategies:
+                strategies.remove(strategy)
+
+    # ------------------------------------------------------------------
+    # 集約処理
+    # ------------------------------------------------------------------
+
+    def add_trade(self, symbol: str, price: float, quantity: float, timestamp_ms: int) -> List[Candle]:
+        """トレードを取り込み、確定した足を返す"""
+        symbol = self._normalize_symbol(symbol)
+        closed: List[Candle] = []
+        self.stats["trades_processed"] += 1
+
+        # 先に時間経過で確定する足を閉じる
+        closed.extend(self._close_expired_for_symbol(symbol, timestamp_ms))
+
+        for timeframe in self.base_timeframes:
+            key = (symbol, timeframe)
+            interval = self.intervals_ms[timeframe]
+            open_time = timestamp_ms - timestamp_ms % interval
+            candle = self.current_candles.get(key)
+
+            last_closed = self.last_closed_open_time.get(key)
+            if (candle is not None and open_time < candle.open_time) or (
+                last_closed is not None and open_time <= last_closed
+            ):
+                # 確定済みの足に属する遅延トレードは破棄
+                self.stats["late_trades"] += 1
+                continue
+
+            if candle is None:
+                self.current_candles[key] = Candle(
+                    symbol=symbol,
+                    timeframe=timeframe,
+                    open_time=open_time,
+                    close_time=open_time + interval - 1,
+                    open=price,
+                    high=price,
+                    low=price,
+                    close=price,
+                    volume=quantity,
+                    trade_count=1,
+                )
+            else:
+                candle.high = max(candle.high, price)
+                candle.low = min(candle.low, price)
+                candle.close = price
+                candle.volume += quantity
+                candle.trade_count += 1
+
+        return closed
+
+    def close_expired(self, now_ms: Optional[int] = None) -> List[Candle]:
+        """トレードが来なくても時間経過した足を確定させる"""
+        if now_ms is None:
+            now_ms = int(datetime.now(timezone.utc).timestamp() * 1000)
+
+        closed: List[Candle] = []
+        for symbol in {symbol for symbol, _ in self.current_candles}:
+            closed.extend(self._close_expired_for_symbol(symbol, now_ms))
+        return closed
+
+    def _close_expired_for_symbol(self, symbol: str, now_ms: int) -> List[Candle]:
+        """指定シンボルの期限切れ足を確定させる"""
+        closed: List[Candle] = []
+
+        for timeframe in self.base_timeframes:
+            key = (symbol, timeframe)
+            candle = self.current_candles.get(key)
+            if candle is None or now_ms <= candle.close_time:
+                continue
+
+            del self.current_candles[key]
+            closed.append(self._finalize(candle))
+
+            if timeframe == "1m":
+                closed.extend(self._roll_up(candle))
+
+        # 残りの1分足が来ないまま期限を迎えた上位足
+        minute_candle = self.current_candles.get((symbol, "1m"))
+        for timeframe in self.derived_timeframes:
+            key = (symbol, timeframe)
+            candle = self.current_candles.get(key)
+            if candle is None or now_ms <= candle.close_time:
+                continue
+            if minute_candle is not None and minute_candle.open_time <= candle.close_time:
+                continue
+
+            del self.current_candles[key]
+            closed.append(self._finalize(candle))
+
+        return closed
+
+    def _roll_up(self, minute_candle: Candle) -> List[Candle]:
+        """確定1分足を上位足に反映し、確定した上位足を返す"""
+        closed: List[Candle] = []
+
+        for timeframe in self.derived_timeframes:
+            key = (minute_candle.symbol, timeframe)
+            interval = self.intervals_ms[timeframe]
+            open_time = minute_candle.open_time - minute_candle.open_time % interval
+            candle = self.current_candles.get(key)
+
+            if candle is not None and candle.open_time != open_time:
+                del self.current_candles[key]
+                closed.append(self._finalize(candle))
+                candle = None
+
+            if candle is None:
+                candle = Candle(
+                    symbol=minute_candle.symbol,
+                    timeframe=timeframe,
+                    open_time=open_time,
+                    close_time=open_time + interval - 1,
+                    open=minute_candle.open,
+                    high=minute_candle.high,
+                    low=minute_candle.low,
+                    close=minute_candle.close,
+                    volume=minute_candle.volume,
+                    trade_count=minute_candle.trade_count,
+                )
+                self.current_candles[key] = candle
+            else:
+                candle.merge(minute_candle)
+
+            # 上位足の最後の1分足なら即座に確定
+            if minute_candle.close_time >= candle.close_time:
+                del self.current_candles[key]
+                closed.append(self._finalize(candle))
+
+        return closed
+
+    def _finalize(self, candle: Candle) -> Candle:
+        """足を確定させてリングバッファと永続化キューに追加"""
+        candle.is_closed = True
+        key = (candle.symbol, candle.timeframe)
+
+        if key not in self.history:
+            self.history[key] = deque(maxlen=self.history_size)
+        self.history[key].append(candle)
+        self.last_closed_open_time[key] = max(self.last_closed_open_time.get(key, candle.open_time), candle.open_time)
+
+        if candle.timeframe in self.persist_timeframes:
+            self.pending_persist.append(candle)
+
+        self.stats["candles_closed"] += 1
+        return candle
+
+    # ------------------------------------------------------------------
+    # 配信・永続化
+    # ------------------------------------------------------------------
+
+    async def process_trade(self, symbol: str, price: float, quantity: float, timestamp_ms: int) -> List[Candle]:
+        """トレードを取り込み、確定足を配信する"""
+        closed = self.add_trade(symbol, price, quantity, timestamp_ms)
+        if closed:
+            await self.dispatch(closed)
+        return closed
+
+    async def process_expired(self, now_ms: Optional[int] = None) -> List[Candle]:
+        """時間経過で確定した足を配信する"""
+        closed = self.close_expired(now_ms)
+        if closed:
+            await self.dispatch(closed)
+        return closed
+
+    async def dispatch(self, candles: List[Candle]):
+        """確定足をリスナー・戦略に配信し、必要ならバッチ永続化する"""
+        for candle in candles:
+            for callback in list(self.listeners):
+                try:
+                    if asyncio.iscoroutinefunction(callback):
+                        await callback(candle)
+                    else:
+                        callback(candle)
+                except Exception as e:
+                    logger.error(f"Candle listener error: {e}")
+
+            for strategy in list(self.strategies.get((candle.symbol, candle.timeframe), [])):
+                try:
+                    signal = strategy.update(candle.to_ohlcv())
+                    if signal and self.on_strategy_signal:
+                        self.on_strategy_signal(strategy, signal)
+                except Exception as e:
+                    logger.error(f"Strategy {getattr(strategy, 'name', strategy)} update error: {e}")
+
+        if len(self.pending_persist) >= self.persist_batch_size:
+            await self.flush()
+
+    async def flush(self) -> int:
+        """永続化待ちの確定足を保存"""
+        if not self.pending_persist:
+            return 0
+
+        batch = self.pending_persist
+        self.pending_persist = []
+
+        try:
+            if asyncio.iscoroutinefunction(self.persister):
+                await self.persister(batch)
+            else:
+                # 同期の保存（supabase-py の upsert など）はイベントループを塞がないようスレッドで実行
+                await asyncio.to_thread(self.persister, batch)
+            self.stats["candles_persisted"] += len(batch)
+            return len(batch)
+
+        except Exception as e:
+            logger.error(f"Error persisting {len(batch)} candles: {e}")
+            self.stats["persist_errors"] += 1
+            # 次回のフラッシュで再試行（上限を超えた古い足は破棄）
+            self.pending_persist = (batch + self.pending_persist)[-self.persist_batch_size * 10 :]
+            return 0
+
+    def _persist_to_supabase(self, candles: List[Candle]):
+        """確定足を Supabase の price_data テーブルに保存"""
+        supabase = get_supabase_client()
+
+        records = [
+            {
+                "exchange": self.exchange_name,
+                "symbol": candle.symbol,
+                "timeframe": candle.timeframe,
+                "timestamp": candle.timestamp.isoformat(),
+                "open_price": float(candle.open),
+                "high_price": float(candle.high),
+                "low_price": float(candle.low),
+                "close_price": float(candle.close),
+                "volume": float(candle.volume),
+            }
+            for candle in candles
+        ]
+
+        supabase.table("price_data").upsert(records, on_conflict="exchange,symbol,timeframe,timestamp").execute()
+        logger.debug(f"Saved {len(records)} candles to Supabase")
+
+    # ------------------------------------------------------------------
+    # 参照
+    # ------------------------------------------------------------------
+
+    def get_recent_candles(self, symbol: str, timeframe: str, limit: Optional[int] = None) -> List[Candle]:
+        """確定足を古い順に取得"""
+        history = self.history.get((self._normalize_symbol(symbol), timeframe))
+        if not history:
+            return []
+
+        candles = list(history)
+        return candles[-limit:] if limit else candles
+
+    def get_current_candle(self, symbol: str, timeframe: str) -> Optional[Candle]:
+        """形成中の足を取得"""
+        return self.current_candles.get((self._normalize_symbol(symbol), timeframe))
+
+    def get_stats(self) -> dict:
+        """統計情報を取得"""
+        return {
+            **self.stats,
+            "open_candles": len(self.current_candles),
+            "pending_persist": len(self.pending_persist),
+            "timeframes": list(self.intervals_ms.keys()),
+            "registered_strategies": sum(len(s) for s in self.strategies.values()),
+        }
+
+    @staticmethod
+    def _normalize_symbol(symbol: str) -> str:
+        return symbol.upper().replace("/", "")
@@ -0,0 +1,339 @@
+"""
+ローカル板情報（L2）管理システム
+RESTスナップショットと差分ストリームから板を維持し、高速な気配・深さ照会を提供する
+"""
+
+import asyncio
+import logging
+from bisect import bisect_left
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+
+class OrderBookSequenceError(Exception):
+    """差分更新のシーケンス不整合エラー"""
+
+    pass
+
+
+class BookSide:
+    """板の片側（価格レベルをソート済み配列で保持）
+
+    先頭が最良気配になるよう、買い板は価格を負にしたキーで昇順に並べる
+    """
+
+    def __init__(self, is_bid: bool):
+        self.is_bid = is_bid
+        self._keys: List[float] = []
+        self._sizes: List[float] = []
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _key(self, price: float) -> float:
+        return -price if self.is_bid else price
+
+    def _price(self, key: float) -> float:
+        return -key if self.is_bid else key
+
+    def clear(self):
+        self._keys.clear()
+        self._sizes.clear()
+
+    def load(self, levels: Sequence[Sequence[Any]]):
+        """スナップショットで置き換え"""
+        merged = {}
+        for price, size in levels:
+            if float(size) > 0:
+                merged[self._key(float(price))] = float(size)
+
+        self._keys = sorted(merged)
+        self._sizes = [merged[key] for key in self._keys]
+
+    def update(self, price: float, size: float):
+        """価格レベルを更新（数量0で削除）"""
+        key = self._key(price)
+        index = bisect_left(self._keys, key)
+        exists = index < len(self._keys) and self._keys[index] == key
+
+        if size <= 0:
+            if exists:
+                del self._keys[index]
+                del self._sizes[index]
+        elif exists:
+            self._sizes[index] = size
+        else:
+            self._keys.insert(index, key)
+            self._sizes.insert(index, size)
+
+    def best(self) -> Optional[Tuple[float, float]]:
+        """最良気配 (価格, 数量)"""
+        if not self._keys:
+            return None
+        return self._price(self._keys[0]), self._sizes[0]
+
+    def levels(self, depth: Optional[int] = None) -> List[List[float]]:
+        """上位N件の [価格, 数量]"""
+        count = len(self._keys) if depth is None else min(depth, len(self._keys))
+        return [[self._price(self._keys[i]), self._sizes[i]] for i in range(count)]
+
+    def total_size(self, depth: int) -> float:
+        """上位N件の合計数量"""
+        return sum(self._sizes[:depth])
+
+    def walk(self, quantity: float) -> Tuple[float, float]:
+        """指定数量を消化したときの (出来高加重平均価格, 約定可能数量)"""
+        remaining = quantity
+        notional = 0.0
+
+        for key, size in zip(self._keys, self._sizes):
+            if remaining <= 0:
+                break
+            take = min(size, remaining)
+            notional += take * self._price(key)
+            remaining -= take
+
+        filled = quantity - remaining
+        if filled <= 0:
+            return 0.0, 0.0
+        return notional / filled, filled
+
+
+class LocalOrderBook:
+    """シンボル単位のローカル板"""
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self.bids = BookSide(is_bid=True)
+        self.asks = BookSide(is_bid=False)
+        self.last_update_id: Optional[int] = None
+        self.updated_at: Optional[datetime] = None
+        self.is_synced = False
+
+    def apply_snapshot(self, last_update_id: int, bids: Sequence, asks: Sequence):
+        """RESTスナップショットで板を初期化"""
+        self.bids.load(bids)
+        self.asks.load(asks)
+        self.last_update_id = int(last_update_id)
+        self.updated_at = datetime.now(timezone.utc)
+        self.is_synced = True
+
+    def apply_diff(self, first_update_id: int, final_update_id: int, bids: Sequence = (), asks: Sequence = ()) -> bool:
+        """差分更新を適用
+
+        Returns:
+            bool: 適用した場合True、スナップショットより古く破棄した場合False
+
+        Raises:
+            OrderBookSequenceError: 更新IDに欠落がある場合
+        """
+        if self.last_update_id is None:
+            raise OrderBookSequenceError(f"{self.symbol}: snapshot not loaded")
+
+        if final_update_id <= self.last_update_id:
+            return False
+
+        if first_update_id > self.last_update_id + 1:
+            self.is_synced = False
+            raise OrderBookSequenceError(
+                f"{self.symbol}: update gap (expected {self.last_update_id + 1}, got {first_update_id})"
+            )
+
+        for price, size in bids:
+            self.bids.update(float(price), float(size))
+        for price, size in asks:
+            self.asks.update(float(price), float(size))
+
+        self.last_update_id = int(final_update_id)
+        self.updated_at = datetime.now(timezone.utc)
+        return True
+
+    def best_bid(self) -> Optional[Tuple[float, float]]:
+        return self.bids.best()
+
+    def best_ask(self) -> Optional[Tuple[float, float]]:
+        return self.asks.best()
+
+    def mid_price(self) -> Optional[float]:
+        """仲値"""
+        bid, ask = self.bids.best(), self.asks.best()
+        if bid is None or ask is None:
+            return None
+        return (bid[0] + ask[0]) / 2
+
+    def spread(self) -> Optional[float]:
+        """スプレッド"""
+        bid, ask = self.bids.best(), self.asks.best()
+        if bid is None or ask is None:
+            return None
+        return ask[0] - bid[0]
+
+    def get_depth(self, side: str, levels: int = 10) -> float:
+        """上位N件の合計数量（side: "bid" または "ask"）"""
+        book_side = self.bids if side == "bid" else self.asks
+        return book_side.total_size(levels)
+
+    def vwap(self, side: str, quantity: float) -> Tuple[float, float]:
+        """成行で数量を約定させた場合の (VWAP, 約定可能数量)
+
+        side は注文方向（"buy" は売り板、"sell" は買い板を消化する）
+        """
+        book_side = self.asks if side == "buy" else self.bids
+        return book_side.walk(quantity)
+
+    def estimate_slippage(self, side: str, quantity: float) -> Optional[float]:
+        """最良気配に対する推定スリッページ率"""
+        best = self.asks.best() if side == "buy" else self.bids.best()
+        if best is None:
+            return None
+
+        vwap, filled = self.vwap(side, quantity)
+        if filled <= 0:
+            return None
+        return abs(vwap - best[0]) / best[0]
+
+    def to_dict(self, limit: int = 20) -> Dict[str, Any]:
+        """get_order_book() と同じ形式に変換"""
+        return {
+            "symbol": self.symbol,
+            "bids": self.bids.levels(limit),
+            "asks": self.asks.levels(limit),
+            "last_update_id": self.last_update_id,
+            "timestamp": (self.updated_at or datetime.now(timezone.utc)).isoformat(),
+        }
+
+
+SnapshotFetcher = Callable[[str, int], Awaitable[Dict[str, Any]]]
+
+
+class OrderBookManager:
+    """複数シンボルのローカル板を同期・管理するクラス
+
+    差分イベントはスナップショット取得中もバッファし、取得後に再生する。
+    シーケンス欠落を検出した場合はスナップショットから再同期する。
+    """
+
+    def __init__(self, snapshot_fetcher: Optional[SnapshotFetcher] = None, snapshot_limit: int = 1000):
+        self.snapshot_fetcher = snapshot_fetcher or self._fetch_binance_snapshot
+        self.snapshot_limit = snapshot_limit
+        self.max_buffered_events = 1000
+
+        self.books: Dict[str, LocalOrderBook] = {}
+        self._buffers: Dict[str, List[Dict[str, Any]]] = {}
+        self._sync_tasks: Dict[str, asyncio.Task] = {}
+
+        self.stats = {"snapshots": 0, "updates_applied": 0, "resyncs": 0, "sync_errors": 0}
+
+    def get_book(self, symbol: str) -> Optional[LocalOrderBook]:
+        """同期済みの板を取得（未同期ならNone）"""
+        book = self.books.get(self._normalize_symbol(symbol))
+        if book is None or not book.is_synced:
+            return None
+        return book
+
+    async def handle_depth_event(self, data: Dict[str, Any]):
+        """差分ストリームのイベントを処理（Binance depthUpdate形式）"""
+        symbol = self._normalize_symbol(data["s"])
+        book = self.books.get(symbol)
+
+        if book is None or not book.is_synced:
+            self._buffer_event(symbol, data)
+            self._ensure_sync(symbol)
+            return
+
+        try:
+            if book.apply_diff(data["U"], data["u"], data.get("b", []), data.get("a", [])):
+                self.stats["updates_applied"] += 1
+        except OrderBookSequenceError as e:
+            logger.warning(f"Order book out of sync, resyncing: {e}")
+            self.stats["resyncs"] += 1
+            self._buffer_event(symbol, data)
+            self._ensure_sync(symbol)
+
+    async def sync(self, symbol: str):
+        """スナップショットを取得し、バッファ済みの差分を再生する"""
+        symbol = self._normalize_symbol(symbol)
+        book = self.books.setdefault(symbol, LocalOrderBook(symbol))
+        book.is_synced = False
+
+        snapshot = await self.snapshot_fetcher(symbol, self.snapshot_limit)
+        book.apply_snapshot(snapshot["lastUpdateId"], snapshot.get("bids", []), snapshot.get("asks", []))
+        self.stats["snapshots"] += 1
+
+        buffered = self._buffers.pop(symbol, [])
+        try:
+            for event in buffered:
+                if book.apply_diff(event["U"], event["u"], event.get("b", []), event.get("a", [])):
+                    self.stats["updates_applied"] += 1
+        except OrderBookSequenceError:
+            # スナップショットがバッファより古い場合は再取得が必要
+            book.is_synced = False
+            self.stats["sync_errors"] += 1
+            raise
+
+        logger.info(f"Order book synced for {symbol} at update {book.last_update_id}")
+
+    def remove_symbol(self, symbol: str):
+        """シンボルの板を破棄"""
+        symbol = self._normalize_symbol(symbol)
+        self.books.pop(symbol, None)
+        self._buffers.pop(symbol, None)
+        task = self._sync_tasks.pop(symbol, None)
+        if task and not task.done():
+            task.cancel()
+
+    def _buffer_event(self, symbol: str, data: Dict[str, Any]):
+        buffer = self._buffers.setdefault(symbol, [])
+        buffer.append(data)
+        if len(buffer) > self.max_buffered_events:
+            del buffer[: len(buffer) - self.max_buffered_events]
+
+    def _ensure_sync(self, symbol: str):
+        """再同期タスクが動いていなければ開始"""
+        task = self._sync_tasks.get(symbol)
+        if task is None or task.done():
+            self._sync_tasks[symbol] = asyncio.create_task(self._sync_with_retry(symbol))
+
+    async def _sync_with_retry(self, symbol: str, max_attempts: int = 5):
+        for attempt in range(1, max_attempts + 1):
+            try:
+                await self.sync(symbol)
+                return
+            except Exception as e:
+                logger.error(f"Order book sync failed for {symbol} (attempt {attempt}): {e}")
+                await asyncio.sleep(min(attempt, 5))
+
+    async def _fetch_binance_snapshot(self, symbol: str, limit: int) -> Dict[str, Any]:
+        """BinanceのREST APIから板スナップショットを取得"""
+        url = "https://api.binance.com/api/v3/depth"
+
+        async with aiohttp.ClientSession() as session:
+            async with session.get(url, params={"symbol": symbol, "limit": limit}) as response:
+                if response.status != 200:
+                    raise RuntimeError(f"Failed to fetch depth snapshot for {symbol}: {response.status}")
+                return await response.json()
+
+    def get_stats(self) -> dict:
+        """統計情報を取得"""
+        return {
+            **self.stats,
+            "books": len(self.books),
+            "synced_books": sum(1 for book in self.books.values() if book.is_synced),
+        }
+
+    @staticmethod
+    def _normalize_symbol(symbol: str) -> str:
+        return symbol.upper().replace("/", "")
+
+
+# グローバル板管理インスタンス
+order_book_manager = OrderBookManager()
+
+
+def get_order_book_manager() -> OrderBookManager:
+    """ストリーマーが維持している共有の板管理インスタンスを取得"""
+    return order_book_manager
@@ -13,6 +13,9 @@ from typing import Dict, List, Set
 import aiohttp
 import websockets
 
+from src.backend.streaming.candle_aggregator import Candle, CandleAggregator
+from src.backend.streaming.order_book import order_book_manager
+from src.backend.trading.price_bus import price_bus
 from src.backend.websocket.manager import (
     ChannelType,
     MessageType,
@@ -81,6 +84,15 @@ class BinanceWebSocketStreamer:
         self.price_cache: Dict[str, PriceData] = {}
         self.is_running = False
 
+        # トレードストリームからの足生成
+        self.candle_aggregator = CandleAggregator()
+        self.candle_aggregator.add_listener(self._broadcast_candle_close)
+        self.candle_close_interval = 0.2  # 秒
+
+        # 差分板ストリームからのローカル板
+        self.order_book_manager = order_book_manager
+        self.enable_depth_streams = True
+
         # デフォルト監視シンボル
         self.default_symbols = [
             "BTCUSDT",
@@ -110,6 +122,9 @@ class BinanceWebSocketStreamer:
         # 24時間統計データを定期取得
         asyncio.create_task(self._fetch_24h_stats_periodically())
 
+        # トレードが途切れても足を確定させる
+        asyncio.create_task(self._close_candles_periodically())
+
         logger.info(f"Binance streamer started with {len(self.default_symbols)} symbols")
 
     async def stop(self):
@@ -123,6 +138,9 @@ class BinanceWebSocketStreamer:
         self.connections.clear()
         self.subscribed_symbols.clear()
 
+        # 未保存の確定足を書き出す
+        await self.candle_aggregator.flush()
+
         logger.info("Binance WebSocket streamer stopped")
 
     async def subscribe_symbols(self, symbols: List[str]):
@@ -138,6 +156,9 @@ class BinanceWebSocketStreamer:
                 await self._create_ticker_stream(symbol)
                 # 個別トレードストリーム
                 await self._create_trade_stream(symbol)
+                # 差分板ストリーム
+                if self.enable_depth_streams:
+                    await self._create_depth_stream(symbol)
 
                 self.subscribed_symbols.add(symbol)
                 logger.info(f"Subscribed to {symbol}")
@@ -162,6 +183,12 @@ class BinanceWebSocketStreamer:
                 await self.connections[trade_key].close()
                 del self.connections[trade_key]
 
+            depth_key = f"{symbol}_depth"
+            if depth_key in self.connections:
+                await self.connections[depth_key].close()
+                del self.connections[depth_key]
+            self.order_book_manager.remove_symbol(symbol)
+
             self.subscribed_symbols.remove(symbol)
 
             if symbol in self.price_cache:
@@ -227,6 +254,36 @@ class BinanceWebSocketStreamer:
 
         asyncio.create_task(trade_handler())
 
+    async def _create_depth_stream(self, symbol: str):
+        """差分板ストリームを作成"""
+        stream_name = f"{symbol.lower()}@depth@100ms"
+        url = f"{self.base_url}/{stream_name}"
+
+        async def depth_handler():
+            try:
+                async with websockets.connect(url) as websocket:
+                    self.connections[f"{symbol}_depth"] = websocket
+
+                    async for message in websocket:
+                        if not self.is_running:
+                            break
+
+                        try:
+                            data = json.loads(message)
+                            await self.order_book_manager.handle_depth_event(data)
+                        except Exception as e:
+                            logger.error(f"Error processing depth data for {symbol}: {e}")
+
+            except Exception as e:
+                logger.error(f"Depth stream error for {symbol}: {e}")
+                # 再接続を試行（再接続後はスナップショットから再同期される）
+                if self.is_running:
+                    self.order_book_manager.remove_symbol(symbol)
+                    await asyncio.sleep(5)
+                    await self._create_depth_stream(symbol)
+
+        asyncio.create_task(depth_handler())
+
     async def _handle_ticker_data(self, data: dict):
         """ティッカーデータを処理"""
         try:
@@ -264,9 +321,23 @@ class BinanceWebSocketStreamer:
                 trade_id=str(data["t"]),
             )
 
+            # 価格バスに配信（エンジン・リスク管理が購読）
+            await price_bus.publish(
+                trade_data.symbol,
+                trade_data.price,
+                timestamp=datetime.fromtimestamp(data["T"] / 1000, timezone.utc),
+                source="binance_trade",
+                quantity=trade_data.quantity,
+            )
+
             # WebSocketクライアントに配信
             await self._broadcast_trade_update(trade_data)
 
+            # 足に集約（確定足はリスナーに配信される）
+            await self.candle_aggregator.process_trade(
+                trade_data.symbol, trade_data.price, trade_data.quantity, int(data["T"])
+            )
+
         except Exception as e:
             logger.error(f"Error handling trade data: {e}")
 
@@ -300,6 +371,30 @@ class BinanceWebSocketStreamer:
         symbol_channel = f"{ChannelType.TRADES.value}:{trade_data.symbol}"
         await websocket_manager.broadcast_to_channel(symbol_channel, message)
 
+    async def _broadcast_candle_close(self, candle: Candle):
+        """確定足をブロードキャスト"""
+        message = WebSocketMessage(
+            type=MessageType.CANDLE_CLOSE,
+            channel=ChannelType.PRICES,
+            data=candle.to_dict(),
+        )
+
+        # 全体配信
+        await websocket_manager.broadcast_to_channel(ChannelType.PRICES.value, message)
+
+        # シンボル固有チャンネル配信
+        symbol_channel = f"{ChannelType.PRICES.value}:{candle.symbol}"
+        await websocket_manager.broadcast_to_channel(symbol_channel, message)
+
+    async def _close_candles_periodically(self):
+        """期限切れの足を定期的に確定"""
+        while self.is_running:
+            try:
+                await self.candle_aggregator.process_expired()
+            except Exception as e:
+                logger.error(f"Error closing candles: {e}")
+            await asyncio.sleep(self.candle_close_interval)
+
     async def _fetch_24h_stats_periodically(self):
         """24時間統計を定期取得"""
         while self.is_running:
@@ -353,6 +448,8 @@ class BinanceWebSocketStreamer:
             "subscribed_symbols": len(self.subscribed_symbols),
             "active_connections": len(self.connections),
             "cached_prices": len(self.price_cache),
+            "candles": self.candle_aggregator.get_stats(),
+            "order_books": self.order_book_manager.get_stats(),
         }
 
 
@@ -412,6 +509,15 @@ class PriceStreamManager:
         """全価格データ取得"""
         return self.binance_streamer.get_price_cache()
 
+    def get_candles(self, symbol: str, timeframe: str, limit: int = 100) -> List[dict]:
+        """確定足を取得"""
+        candles = self.binance_streamer.candle_aggregator.get_recent_candles(symbol, timeframe, limit)
+        return [candle.to_dict() for candle in candles]
+
+    def register_strategy(self, strategy):
+        """確定足で更新する戦略を登録"""
+        self.binance_streamer.candle_aggregator.register_strategy(strategy)
+
 
 # グローバル価格配信マネージャー
 price_stream_manager = PriceStreamManager()
@@ -151,6 +151,33 @@ async def get_symbol_price(symbol: str, current_user: dict = Depends(get_current
         raise HTTPException(status_code=500, detail=f"価格データ取得に失敗しました: {e}")
 
 
+@router.get("/candles/{symbol}")
+async def get_symbol_candles(
+    symbol: str,
+    timeframe: str = "1m",
+    limit: int = 100,
+    current_user: dict = Depends(get_current_user),
+):
+    """
+    トレードストリームから生成した確定足を取得
+    """
+    try:
+        symbol = symbol.upper()
+        candles = price_stream_manager.get_candles(symbol, timeframe, limit)
+
+        return {
+            "status": "success",
+            "symbol": symbol,
+            "timeframe": timeframe,
+            "count": len(candles),
+            "candles": candles,
+        }
+
+    except Exception as e:
+        logger.error(f"Failed to get candles for {symbol}: {e}")
+        raise HTTPException(status_code=500, detail=f"足データ取得に失敗しました: {e}")
+
+
 @router.post("/subscribe", response_model=SymbolSubscriptionResponse)
 async def subscribe_symbols(request: SymbolSubscriptionRequest, current_user: dict = Depends(get_current_user)):
     """
@@ -1,4 +1,5 @@
 from .engine import Order, OrderSide, OrderStatus, OrderType, Position, TradingEngine
+from .price_bus import PriceBus, PriceTick, price_bus
 
 __all__ = [
     "TradingEngine",
@@ -7,4 +8,7 @@ __all__ = [
     "OrderType",
     "OrderStatus",
     "OrderSide",
+    "PriceBus",
+    "PriceTick",
+    "price_bus",
 ]
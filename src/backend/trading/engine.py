@@ -5,10 +5,14 @@
 import asyncio
 import logging
 from dataclasses import dataclass, field
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from enum import Enum
 from typing import Any, Callable, Dict, List, Optional
 
+from .order_scheduler import OrderTimeoutScheduler
+from .price_bus import PriceBus, PriceTick
+from .price_bus import price_bus as global_price_bus
+
 logger = logging.getLogger(__name__)
 
 
@@ -54,6 +58,8 @@ class Order:
     created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
     updated_at: Optional[datetime] = None
     strategy_name: Optional[str] = None
+    exchange: Optional[str] = None
+    expires_at: Optional[datetime] = None  # GTD注文の有効期限
 
     def is_filled(self) -> bool:
         """注文が完全に約定したかチェック"""
@@ -113,12 +119,10 @@ class Position:
 class TradingEngine:
     """ライブトレーディングエンジン（リファクタリング版）"""
 
-    def __init__(self, config: Dict = None):
+    def __init__(self, config: Dict = None, price_bus: Optional[PriceBus] = None):
         self.config = config or {
             "max_concurrent_orders": 10,
             "order_timeout": 300,  # 5分
-            "price_update_interval": 1.0,  # 1秒
-            "position_check_interval": 5.0,  # 5秒
             "enable_dry_run": True,  # デモモード
             "risk_limits": {
                 "max_position_size": 10000.0,
@@ -142,6 +146,13 @@ class TradingEngine:
         self.strategies = {}
         self.price_data = {}
 
+        # 価格バス（稼働中はポジションを持つシンボルのみ購読）
+        self.price_bus = price_bus if price_bus is not None else global_price_bus
+        self._subscribed_symbols = set()
+
+        # 注文タイムアウト（期限ヒープ）
+        self.order_scheduler = OrderTimeoutScheduler(on_expire=self._on_order_expired)
+
         # イベントハンドラー
         self.on_order_filled: Optional[Callable] = None
         self.on_position_opened: Optional[Callable] = None
@@ -160,12 +171,17 @@ class TradingEngine:
         """イベントハンドラーを設定"""
         # 注文管理のイベント
         self.order_manager.on_order_filled = self._on_order_filled
+        self.order_manager.on_order_cancelled = self._on_order_cancelled
         self.order_manager.on_error = self._on_error
 
         # ポジション管理のイベント
         self.position_manager.on_position_opened = self._on_position_opened
         self.position_manager.on_position_closed = self._on_position_closed
 
+        # 注文前チェック用スナップショットをポジションの変化に追従させる
+        self.risk_manager.bind_positions(self.position_manager.positions)
+        self.position_manager.on_position_refreshed = self.risk_manager.update_position_snapshot
+
         # リスク管理のイベント
         self.risk_manager.on_risk_violation = self._on_risk_violation
         self.risk_manager.on_emergency_stop = self._on_emergency_stop
@@ -189,8 +205,9 @@ class TradingEngine:
         amount: float,
         price: Optional[float] = None,
         strategy_name: Optional[str] = None,
+        expires_at: Optional[datetime] = None,
     ) -> Order:
-        """注文を作成"""
+        """注文を作成（expires_at 指定時はGTD注文として期限で失効）"""
 
         # リスクチェック
         temp_order = Order(
@@ -213,15 +230,21 @@ class TradingEngine:
             return temp_order
 
         # 注文管理クラスに委譲
-        return self.order_manager.create_order(
+        order = self.order_manager.create_order(
             symbol=symbol,
             side=side,
             order_type=order_type,
             amount=amount,
             price=price,
             strategy_name=strategy_name,
+            expires_at=expires_at,
         )
 
+        if order.is_active():
+            self._schedule_order_timeout(order)
+
+        return order
+
     def cancel_order(self, order_id: str) -> bool:
         """注文をキャンセル"""
         return self.order_manager.cancel_order(order_id)
@@ -247,7 +270,7 @@ class TradingEngine:
         return self.position_manager.close_position(symbol) is not None
 
     def update_price(self, symbol: str, price: float):
-        """価格を更新"""
+        """価格を更新（当該シンボルのポジションのみ再評価）"""
         self.price_data[symbol] = {
             "price": price,
             "timestamp": datetime.now(timezone.utc),
@@ -256,22 +279,51 @@ class TradingEngine:
         # ポジション管理クラスに委譲
         self.position_manager.update_price(symbol, price)
 
+        position = self.position_manager.get_position(symbol)
+        if position is None:
+            return
+
+        current_pnl = self.position_manager.stats["total_pnl"]
+
         # リスクチェック
-        self.risk_manager.check_position_risk(
-            self.position_manager.get_all_positions(),
-            self.position_manager.stats["total_pnl"],
-        )
+        self.risk_manager.check_symbol_risk(position, self.position_manager.total_exposure, current_pnl)
 
         # 緊急停止チェック
-        if self.risk_manager.should_emergency_stop(
-            self.position_manager.get_all_positions(),
-            self.position_manager.stats["total_pnl"],
-        ):
+        if self.risk_manager.should_emergency_stop({symbol: position}, current_pnl):
             logger.critical("Emergency stop triggered, stopping engine")
             asyncio.create_task(self.stop())
+            return
+
+        # ポジション単位の損失制限
+        if position.unrealized_pnl < -self.config["risk_limits"]["max_daily_loss"]:
+            logger.warning(f"Position {symbol} exceeds daily loss limit")
+            self.close_position(symbol)
+
+    def _on_price_tick(self, tick: PriceTick):
+        """価格バスからのティックを処理"""
+        try:
+            self.update_price(tick.symbol, tick.price)
+        except Exception as e:
+            logger.error(f"Price update error: {e}")
+            if self.on_error:
+                self.on_error(f"Price update error: {e}")
+
+    def _subscribe_symbol(self, symbol: str):
+        """シンボルの価格を購読"""
+        if self.is_running and symbol not in self._subscribed_symbols:
+            self.price_bus.subscribe(symbol, self._on_price_tick)
+            self._subscribed_symbols.add(symbol)
+
+    def _unsubscribe_symbol(self, symbol: str):
+        """シンボルの価格購読を解除"""
+        if symbol in self._subscribed_symbols:
+            self.price_bus.unsubscribe(symbol, self._on_price_tick)
+            self._subscribed_symbols.discard(symbol)
 
     def _on_order_filled(self, order: Order):
         """注文約定時の処理"""
+        self.order_scheduler.remove(order.id)
+
         # ポジションを更新
         self.position_manager.update_position(order)
 
@@ -279,13 +331,21 @@ class TradingEngine:
         if self.on_order_filled:
             self.on_order_filled(order)
 
+    def _on_order_cancelled(self, order: Order):
+        """注文キャンセル時の処理"""
+        self.order_scheduler.remove(order.id)
+
     def _on_position_opened(self, position: Position):
         """ポジション開始時の処理"""
+        self._subscribe_symbol(position.symbol)
+
         if self.on_position_opened:
             self.on_position_opened(position)
 
     def _on_position_closed(self, symbol: str, realized_pnl: float):
         """ポジション終了時の処理"""
+        self._unsubscribe_symbol(symbol)
+
         if self.on_position_closed:
             self.on_position_closed(symbol, realized_pnl)
 
@@ -481,12 +541,15 @@ class TradingEngine:
 
         logger.info("TradingEngine started")
 
-        # バックグラウンドタスクを開始
-        await asyncio.gather(
-            self._price_update_loop(),
-            self._position_check_loop(),
-            self._order_timeout_loop(),
-        )
+        # 価格はポーリングせず、価格バスからポジションのあるシンボルのティックを受け取る
+        for symbol in self.position_manager.get_all_positions():
+            self._subscribe_symbol(symbol)
+
+        # 注文タイムアウトは期限ヒープで各注文の期限ちょうどに処理する
+        for order in self.get_active_orders():
+            self._schedule_order_timeout(order)
+
+        await self.order_scheduler.run()
 
     async def stop(self):
         """エンジンを停止"""
@@ -495,6 +558,11 @@ class TradingEngine:
             return
 
         self.is_running = False
+        self.order_scheduler.stop()
+
+        # 価格バスの購読を解除
+        for symbol in list(self._subscribed_symbols):
+            self._unsubscribe_symbol(symbol)
 
         # すべてのアクティブな注文をキャンセル
         active_orders = self.get_active_orders()
@@ -503,60 +571,28 @@ class TradingEngine:
 
         logger.info("TradingEngine stopped")
 
-    async def _price_update_loop(self):
-        """価格更新ループ"""
-        while self.is_running:
-            try:
-                # 価格データを更新
-                for symbol in self.positions.keys():
-                    if symbol in self.price_data:
-                        # 実際の実装では取引所から価格を取得
-                        pass
-
-                await asyncio.sleep(self.config["price_update_interval"])
-
-            except Exception as e:
-                logger.error(f"Price update error: {e}")
-                if self.on_error:
-                    self.on_error(f"Price update error: {e}")
-
-    async def _position_check_loop(self):
-        """ポジションチェックループ"""
-        while self.is_running:
-            try:
-                # ポジションをチェック
-                for position in self.positions.values():
-                    # リスク制限チェック
-                    if position.unrealized_pnl < -self.config["risk_limits"]["max_daily_loss"]:
-                        logger.warning(f"Position {position.symbol} exceeds daily loss limit")
-                        self.close_position(position.symbol)
-
-                await asyncio.sleep(self.config["position_check_interval"])
-
-            except Exception as e:
-                logger.error(f"Position check error: {e}")
-                if self.on_error:
-                    self.on_error(f"Position check error: {e}")
-
-    async def _order_timeout_loop(self):
-        """注文タイムアウトループ"""
-        while self.is_running:
-            try:
-                current_time = datetime.now(timezone.utc)
-
-                for order in self.get_active_orders():
-                    time_diff = (current_time - order.created_at).total_seconds()
-
-                    if time_diff > self.config["order_timeout"]:
-                        logger.warning(f"Order timeout: {order.id}")
-                        self.cancel_order(order.id)
-
-                await asyncio.sleep(60)  # 1分間隔でチェック
-
-            except Exception as e:
-                logger.error(f"Order timeout check error: {e}")
-                if self.on_error:
-                    self.on_error(f"Order timeout check error: {e}")
+    def _schedule_order_timeout(self, order: Order):
+        """注文の期限を登録（GTD期限、なければ order_timeout 後）"""
+        deadline = order.expires_at
+        if deadline is None:
+            timeout = self.config.get("order_timeout")
+            if not timeout:
+                return
+            deadline = order.created_at + timedelta(seconds=timeout)
+
+        self.order_scheduler.schedule(order.id, deadline)
+
+    def _on_order_expired(self, order_id: str):
+        """注文期限到来時の処理"""
+        order = self.get_order(order_id)
+        if order is None or not order.is_active():
+            return
+
+        logger.warning(f"Order timeout: {order_id}")
+        if not self.cancel_order(order_id):
+            logger.error(f"Failed to cancel expired order: {order_id}")
+            if self.on_error:
+                self.on_error(f"Failed to cancel expired order: {order_id}")
 
     def get_statistics(self) -> Dict[str, Any]:
         """統計情報を取得"""
@@ -573,6 +609,8 @@ class TradingEngine:
                 "is_running": self.is_running,
                 "uptime": self.stats["uptime"],
                 "start_time": self.stats["start_time"].isoformat() if self.stats["start_time"] else None,
+                "subscribed_symbols": sorted(self._subscribed_symbols),
+                "order_timeouts": self.order_scheduler.get_stats(),
             },
             "orders": order_stats,
             "positions": position_stats,
@@ -3,16 +3,23 @@
 AdvancedRiskManager、CircuitBreaker、PositionManagerを統合
 """
 
-import asyncio
 import logging
+import time
 from datetime import datetime, timezone
 from decimal import Decimal
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from src.backend.risk.advanced_risk_manager import AdvancedRiskManager, RiskAlert, RiskLevel, RiskMetrics
 from src.backend.risk.circuit_breaker import CircuitBreaker, TripReason
+from src.backend.risk.correlation_tracker import (
+    STRATEGY_CORRELATION_KEY,
+    SYMBOL_CORRELATION_KEY,
+    get_correlation_tracker,
+)
 from src.backend.trading.orders.models import Order
+from src.backend.trading.price_bus import PriceTick, price_bus
 from src.backend.trading.risk_manager import RiskManager
+from src.backend.trading.risk_snapshot import LatencyHistogram, RiskSnapshot
 
 
 # Position型のための仮の定義（後で適切なクラスに置き換え）
@@ -39,6 +46,11 @@ class Position:
 
 logger = logging.getLogger(__name__)
 
+# 注文1件で増えるとみなす集中度（簡略化した見積もり）
+ORDER_CONCENTRATION_INCREMENT = 0.05
+# 1シンボルの集中度上限
+MAX_SYMBOL_CONCENTRATION = 0.30
+
 
 class PositionManager:
     """
@@ -53,6 +65,9 @@ class PositionManager:
         self._peak_equity = Decimal("0.0")
         self._trading_engine = None  # 後で注入
 
+        # ポジションの追加・更新・削除時に (symbol, position or None) で呼ばれる
+        self.on_position_changed: Optional[Callable] = None
+
         # 設定
         self.max_position_count = self.config.get("max_position_count", 10)
         self.auto_rebalance_threshold = self.config.get("auto_rebalance_threshold", 0.05)  # 5%
@@ -68,12 +83,16 @@ class PositionManager:
         """ポジションを更新"""
         self._positions[position.symbol] = position
         logger.debug(f"Position updated: {position.symbol}")
+        if self.on_position_changed:
+            self.on_position_changed(position.symbol, position)
 
     def remove_position(self, symbol: str):
         """ポジションを削除"""
         if symbol in self._positions:
             del self._positions[symbol]
             logger.info(f"Position removed: {symbol}")
+            if self.on_position_changed:
+                self.on_position_changed(symbol, None)
 
     def get_all_positions(self) -> Dict[str, Position]:
         """全ポジションを取得"""
@@ -177,11 +196,22 @@ class EnhancedRiskManager:
         """
         self.config = config or {}
 
+        # 相関トラッカー（プロセス内で共有し、/risk API や最適化と同じ状態を参照する）
+        advanced_config = self.config.get("advanced_risk", {})
+        correlation_window = advanced_config.get("correlation_window", 126)
+        symbol_tracker = get_correlation_tracker(SYMBOL_CORRELATION_KEY, window=correlation_window)
+        strategy_tracker = get_correlation_tracker(STRATEGY_CORRELATION_KEY, window=correlation_window)
+
         # 基本RiskManagerを継承
-        self.basic_risk_manager = RiskManager(self.config.get("basic_risk", {}))
+        self.basic_risk_manager = RiskManager(self.config.get("basic_risk", {}), correlation_tracker=symbol_tracker)
 
         # 高度なリスク管理機能
-        self.advanced_manager = AdvancedRiskManager(self.config.get("advanced_risk", {}))
+        self.advanced_manager = AdvancedRiskManager(
+            advanced_config,
+            correlation_tracker=strategy_tracker,
+            symbol_correlation_tracker=symbol_tracker,
+        )
+        self._last_prices: Dict[str, Decimal] = {}
 
         # サーキットブレーカー
         self.circuit_breaker = CircuitBreaker(self.config.get("circuit_breaker", {}))
@@ -189,13 +219,20 @@ class EnhancedRiskManager:
         # ポジション管理
         self.position_manager = PositionManager(self.config.get("position_manager", {}))
 
+        # 注文前チェック用スナップショット（ポジション変化は差分で、価格変化は監視ティックごとに反映）
+        self.order_snapshot = RiskSnapshot(symbol_tracker)
+        self.order_snapshot.bound = True
+        self.check_latency = LatencyHistogram()
+
         # 統合設定
         self.realtime_monitoring_enabled = self.config.get("realtime_monitoring", True)
         self.auto_response_enabled = self.config.get("auto_response", True)
-        self.monitoring_interval = self.config.get("monitoring_interval", 10)  # 10秒
+        # 保有シンボルの価格ティックごとにリスクを更新する
+        self.price_bus = self.config.get("price_bus") or price_bus
 
         # 状態管理
-        self._monitoring_task: Optional[asyncio.Task] = None
+        self._monitoring_active = False
+        self._risk_update_running = False
         self._last_risk_check = datetime.now(timezone.utc)
 
         # コールバック設定
@@ -216,6 +253,9 @@ class EnhancedRiskManager:
         self.basic_risk_manager.on_risk_violation = self._on_risk_violation
         self.basic_risk_manager.on_emergency_stop = self._on_emergency_stop
 
+        # ポジション管理の変化をスナップショットに反映
+        self.position_manager.on_position_changed = self.order_snapshot.update_position
+
     async def check_order_risk(
         self, order: Order, request_context: Dict = None, portfolio_value: Optional[Decimal] = None
     ) -> Tuple[bool, Optional[str]]:
@@ -230,6 +270,16 @@ class EnhancedRiskManager:
         Returns:
             Tuple[bool, Optional[str]]: (許可フラグ, エラーメッセージ)
         """
+        start = time.perf_counter()
+        try:
+            return self._check_order_against_snapshot(order, portfolio_value)
+        finally:
+            self.check_latency.record(time.perf_counter() - start)
+
+    def _check_order_against_snapshot(
+        self, order: Order, portfolio_value: Optional[Decimal]
+    ) -> Tuple[bool, Optional[str]]:
+        """スナップショットに対する定数回の比較で注文を判定（await を挟まない）"""
         try:
             # 1. サーキットブレーカーチェック
             if not self.circuit_breaker.is_trading_allowed:
@@ -245,16 +295,16 @@ class EnhancedRiskManager:
 
             # 3. 高度なリスクチェック（ポートフォリオレベル）
             if portfolio_value:
-                # 注文後のポートフォリオシミュレーション
-                simulated_risk = await self._simulate_order_impact(order, portfolio_value)
+                # 注文後のポートフォリオへの影響（注文額 / ポートフォリオ総額）
+                simulated_risk = self._order_impact(order, portfolio_value)
                 if simulated_risk > self.advanced_manager.risk_limits["max_portfolio_var_95"]:
                     return False, f"Order would exceed portfolio VaR limit: {simulated_risk:.2%}"
 
             # 4. 集中度リスクチェック
-            concentrations = self.position_manager.get_position_concentrations()
-            if order.symbol in concentrations:
-                new_concentration = await self._calculate_new_concentration(order, concentrations)
-                if new_concentration > 0.30:  # 30%制限
+            concentration = self.order_snapshot.concentration(order.symbol)
+            if concentration is not None:
+                new_concentration = concentration + ORDER_CONCENTRATION_INCREMENT
+                if new_concentration > MAX_SYMBOL_CONCENTRATION:
                     return False, f"Order would exceed concentration limit: {new_concentration:.2%}"
 
             return True, None
@@ -272,17 +322,18 @@ class EnhancedRiskManager:
             positions = self.position_manager.get_all_positions()
             portfolio_value = self.position_manager.get_total_value()
 
-            # 資産履歴更新
+            # ポジションの価格はその場で更新されるため、注文前チェック用スナップショットを作り直す
+            self.order_snapshot.rebuild(positions)
+
+            # 資産履歴更新（前回からのリターンをローリングVaR窓・相関トラッカーに追加）
+            self._record_portfolio_return(portfolio_value)
+            self._record_symbol_returns(positions)
             self.position_manager.update_equity_history(portfolio_value)
 
-            # 2. 高度なリスクメトリクス計算
-            portfolio_returns = self._get_portfolio_returns()
-            strategy_returns = self._get_strategy_returns()
+            # 2. 高度なリスクメトリクス計算（ローリング窓と、取引記録ごとに更新される戦略間相関を参照する）
             position_dict = {pos.symbol: float(pos.get_market_value()) for pos in positions.values()}
 
-            risk_metrics = self.advanced_manager.calculate_portfolio_risk_metrics(
-                portfolio_returns, strategy_returns, position_dict
-            )
+            risk_metrics = self.advanced_manager.calculate_streaming_risk_metrics(position_dict)
 
             # 3. リスク制限チェック
             alerts = self.advanced_manager.check_risk_limits(risk_metrics, position_dict)
@@ -391,38 +442,56 @@ class EnhancedRiskManager:
             )
 
     async def start_monitoring(self):
-        """リアルタイム監視を開始"""
+        """リアルタイム監視を開始（価格バスを購読し、保有シンボルのティックごとに更新）"""
         if not self.realtime_monitoring_enabled:
             logger.info("Realtime monitoring is disabled")
             return
 
-        if self._monitoring_task and not self._monitoring_task.done():
-            logger.warning("Monitoring task already running")
+        if self._monitoring_active:
+            logger.warning("Realtime risk monitoring already running")
             return
 
-        logger.info(f"Starting realtime risk monitoring (interval: {self.monitoring_interval}s)")
-        self._monitoring_task = asyncio.create_task(self._monitoring_loop())
+        self.price_bus.subscribe_all(self._on_price_tick)
+        self._monitoring_active = True
+        logger.info("Starting realtime risk monitoring on price ticks")
 
     async def stop_monitoring(self):
         """リアルタイム監視を停止"""
-        if self._monitoring_task:
-            self._monitoring_task.cancel()
-            try:
-                await self._monitoring_task
-            except asyncio.CancelledError:
-                pass
+        if self._monitoring_active:
+            self.price_bus.unsubscribe_all(self._on_price_tick)
+            self._monitoring_active = False
             logger.info("Realtime risk monitoring stopped")
 
-    async def _monitoring_loop(self):
-        """監視ループ"""
+    async def _on_price_tick(self, tick: PriceTick):
+        """価格ティックを保有ポジションに反映してリスクを更新"""
+        key = self._normalize_symbol(tick.symbol)
+        positions = [
+            pos
+            for pos in self.position_manager.get_all_positions().values()
+            if self._normalize_symbol(pos.symbol) == key
+        ]
+        if not positions:
+            return
+
+        price = Decimal(str(tick.price))
+        for pos in positions:
+            pos.current_price = price
+            direction = Decimal("1") if pos.side == "long" else Decimal("-1")
+            pos.unrealized_pnl = (price - Decimal(str(pos.entry_price))) * Decimal(str(pos.quantity)) * direction
+
+        # 更新中に届いたティックは価格だけ反映し、次のティックでまとめて評価する
+        if self._risk_update_running:
+            return
+
+        self._risk_update_running = True
         try:
-            while True:
-                await self.update_realtime_risk()
-                await asyncio.sleep(self.monitoring_interval)
-        except asyncio.CancelledError:
-            logger.info("Monitoring loop cancelled")
-        except Exception as e:
-            logger.error(f"Error in monitoring loop: {e}")
+            await self.update_realtime_risk()
+        finally:
+            self._risk_update_running = False
+
+    @staticmethod
+    def _normalize_symbol(symbol: str) -> str:
+        return symbol.upper().replace("/", "")
 
     def on_trade_result(self, success: bool, order: Order, metadata: Dict[str, Any] = None):
         """取引結果を受信"""
@@ -456,43 +525,39 @@ class EnhancedRiskManager:
         # 実際の通知システム（Slack、Email等）との連携を実装
 
     # ヘルパーメソッド
-    async def _simulate_order_impact(self, order: Order, portfolio_value: Decimal) -> float:
-        """注文のポートフォリオ影響をシミュレーション"""
-        # 簡略化された実装
-        # 新しいorders/models.pyのOrderクラスはすでにDecimal型
-        order_amount = order.amount
-        order_price = order.price if order.price else Decimal("50000")
-        order_value = order_amount * order_price
-        impact_ratio = order_value / portfolio_value
-        return float(impact_ratio)
-
-    async def _calculate_new_concentration(self, order: Order, current_concentrations: Dict[str, float]) -> float:
-        """注文後の集中度を計算"""
+    def _order_impact(self, order: Order, portfolio_value: Decimal) -> float:
+        """注文のポートフォリオ影響（注文額 / ポートフォリオ総額）"""
         # 簡略化された実装
-        current_concentration = current_concentrations.get(order.symbol, 0.0)
-        # 実際の計算はより複雑になる
-        return current_concentration + 0.05  # 仮の増加
+        order_price = float(order.price) if order.price else 50000.0
+        return float(order.amount) * order_price / float(portfolio_value)
+
+    def _record_portfolio_return(self, portfolio_value: Decimal):
+        """直前の資産額からのリターンをローリングVaR窓に追加"""
+        equity_history = self.position_manager._equity_history
+        if not equity_history:
+            return
+
+        prev_equity = equity_history[-1][1]
+        if prev_equity > Decimal("0"):
+            ret = float((Decimal(str(portfolio_value)) - prev_equity) / prev_equity)
+            self.advanced_manager.update_portfolio_returns(ret)
+
+    def _record_symbol_returns(self, positions: Dict[str, Position]):
+        """保有シンボルの前回からの価格リターンを1ベクトルとして相関トラッカーに追加"""
+        returns = {}
+        for pos in positions.values():
+            price = Decimal(str(pos.current_price))
+            prev_price = self._last_prices.get(pos.symbol)
+            if prev_price is not None and prev_price > Decimal("0") and price > Decimal("0"):
+                returns[pos.symbol] = float((price - prev_price) / prev_price)
+            self._last_prices[pos.symbol] = price
+
+        if returns:
+            self.advanced_manager.symbol_correlation_tracker.update(returns)
 
     def _get_portfolio_returns(self) -> List[float]:
-        """ポートフォリオリターン履歴を取得"""
-        # 実装は資産履歴から計算
-        if len(self.position_manager._equity_history) < 2:
-            return [0.0]
-
-        returns = []
-        for i in range(1, len(self.position_manager._equity_history)):
-            prev_equity = self.position_manager._equity_history[i - 1][1]
-            curr_equity = self.position_manager._equity_history[i][1]
-            if prev_equity > Decimal("0"):
-                ret = float((curr_equity - prev_equity) / prev_equity)
-                returns.append(ret)
-
-        return returns[-252:] if returns else [0.0]  # 直近1年
-
-    def _get_strategy_returns(self) -> Dict[str, List[float]]:
-        """戦略別リターンを取得（実装予定）"""
-        # 戦略別のリターン履歴を管理する必要がある
-        return {}
+        """ポートフォリオリターン履歴を取得（直近 var_window 件）"""
+        return self.advanced_manager.returns_history or [0.0]
 
     # API用メソッド
     def get_comprehensive_status(self) -> Dict[str, Any]:
@@ -508,10 +573,14 @@ class EnhancedRiskManager:
                 "concentrations": self.position_manager.get_position_concentrations(),
             },
             "basic_risk": self.basic_risk_manager.get_statistics(),
+            "order_check": {
+                "snapshot": self.order_snapshot.get_stats(),
+                "latency": self.check_latency.summary(),
+            },
             "monitoring": {
                 "enabled": self.realtime_monitoring_enabled,
                 "last_check": self._last_risk_check.isoformat(),
-                "monitoring_active": self._monitoring_task is not None and not self._monitoring_task.done(),
+                "monitoring_active": self._monitoring_active,
             },
         }
 
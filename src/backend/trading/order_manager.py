@@ -7,6 +7,7 @@ from datetime import datetime, timedelta, timezone
 from typing import Any, Callable, Dict, List, Optional
 
 from .engine import Order, OrderSide, OrderStatus, OrderType
+from .order_store import OrderStore
 
 logger = logging.getLogger(__name__)
 
@@ -15,7 +16,7 @@ class OrderManager:
     """注文管理クラス"""
 
     def __init__(self, config: Dict = None):
-        self.orders: Dict[str, Order] = {}
+        self.orders = OrderStore()
         self.order_counter = 0
         self.config = config or {}
         self.exchange_adapters = {}
@@ -50,6 +51,8 @@ class OrderManager:
         amount: float,
         price: Optional[float] = None,
         strategy_name: Optional[str] = None,
+        exchange: Optional[str] = None,
+        expires_at: Optional[datetime] = None,
     ) -> Order:
         """注文を作成"""
 
@@ -66,6 +69,8 @@ class OrderManager:
             amount=amount,
             price=price,
             strategy_name=strategy_name,
+            exchange=exchange or self.config.get("default_exchange", "binance"),
+            expires_at=expires_at,
         )
 
         # バリデーション
@@ -75,7 +80,7 @@ class OrderManager:
             return order
 
         # 注文を保存
-        self.orders[order_id] = order
+        self.orders.add(order)
 
         # 注文を実行
         if self.config.get("enable_dry_run", True):
@@ -105,7 +110,7 @@ class OrderManager:
             if not success:
                 return False
 
-        order.update_status(OrderStatus.CANCELLED)
+        self.orders.update_status(order, OrderStatus.CANCELLED)
         self.stats["cancelled_orders"] += 1
 
         if self.on_order_cancelled:
@@ -120,37 +125,33 @@ class OrderManager:
 
     def get_active_orders(self) -> List[Order]:
         """アクティブな注文を取得"""
-        return [order for order in self.orders.values() if order.is_active()]
+        return self.orders.active()
 
-    def get_orders_by_symbol(self, symbol: str) -> List[Order]:
+    def get_orders_by_status(self, *statuses: OrderStatus) -> List[Order]:
+        """状態別の注文を取得"""
+        return self.orders.by_status(*statuses)
+
+    def get_orders_by_symbol(self, symbol: str, active_only: bool = False) -> List[Order]:
         """シンボル別の注文を取得"""
-        return [order for order in self.orders.values() if order.symbol == symbol]
+        return self.orders.by_symbol(symbol, active_only)
 
-    def get_orders_by_strategy(self, strategy_name: str) -> List[Order]:
+    def get_orders_by_strategy(self, strategy_name: str, active_only: bool = False) -> List[Order]:
         """戦略別の注文を取得"""
-        return [order for order in self.orders.values() if order.strategy_name == strategy_name]
+        return self.orders.by_strategy(strategy_name, active_only)
+
+    def get_orders_by_exchange(self, exchange: str, active_only: bool = False) -> List[Order]:
+        """取引所別の注文を取得"""
+        return self.orders.by_exchange(exchange, active_only)
 
     def cancel_orders_by_symbol(self, symbol: str) -> int:
         """シンボル別の注文をキャンセル"""
-        orders = self.get_orders_by_symbol(symbol)
-        cancelled_count = 0
-
-        for order in orders:
-            if order.is_active() and self.cancel_order(order.id):
-                cancelled_count += 1
-
-        return cancelled_count
+        orders = self.get_orders_by_symbol(symbol, active_only=True)
+        return sum(1 for order in orders if self.cancel_order(order.id))
 
     def cancel_orders_by_strategy(self, strategy_name: str) -> int:
         """戦略別の注文をキャンセル"""
-        orders = self.get_orders_by_strategy(strategy_name)
-        cancelled_count = 0
-
-        for order in orders:
-            if order.is_active() and self.cancel_order(order.id):
-                cancelled_count += 1
-
-        return cancelled_count
+        orders = self.get_orders_by_strategy(strategy_name, active_only=True)
+        return sum(1 for order in orders if self.cancel_order(order.id))
 
     def cancel_all_orders(self) -> int:
         """すべての注文をキャンセル"""
@@ -168,13 +169,8 @@ class OrderManager:
         cutoff_date = datetime.now(timezone.utc) - timedelta(days=days)
         cleaned_count = 0
 
-        orders_to_remove = []
-        for order_id, order in self.orders.items():
-            if order.created_at < cutoff_date and not order.is_active():
-                orders_to_remove.append(order_id)
-
-        for order_id in orders_to_remove:
-            del self.orders[order_id]
+        for order in self.orders.inactive_created_before(cutoff_date):
+            self.orders.remove(order.id)
             cleaned_count += 1
 
         logger.info(f"Cleaned up {cleaned_count} old orders")
@@ -201,7 +197,7 @@ class OrderManager:
 
         # 同時注文数チェック
         max_concurrent_orders = self.config.get("max_concurrent_orders", 10)
-        active_orders = len(self.get_active_orders())
+        active_orders = self.orders.active_count()
         if active_orders >= max_concurrent_orders:
             logger.error(f"Too many active orders: {active_orders}")
             return False
@@ -212,11 +208,11 @@ class OrderManager:
         """注文を実行"""
         try:
             # 取引所アダプタを使用して注文を実行
-            exchange_name = "binance"  # デフォルト
+            exchange_name = order.exchange or "binance"
 
             if exchange_name not in self.exchange_adapters:
                 logger.error(f"Exchange adapter not found: {exchange_name}")
-                order.update_status(OrderStatus.REJECTED)
+                self.orders.update_status(order, OrderStatus.REJECTED)
                 self._handle_order_rejected(order)
                 return
 
@@ -232,16 +228,16 @@ class OrderManager:
             )
 
             if result.get("success"):
-                order.update_status(OrderStatus.FILLED, order.amount, result.get("price"))
+                self.orders.update_status(order, OrderStatus.FILLED, order.amount, result.get("price"))
                 self._handle_order_filled(order)
             else:
-                order.update_status(OrderStatus.REJECTED)
+                self.orders.update_status(order, OrderStatus.REJECTED)
                 self._handle_order_rejected(order)
                 logger.error(f"Order execution failed: {result.get('error')}")
 
         except Exception as e:
             logger.error(f"Order execution error: {e}")
-            order.update_status(OrderStatus.REJECTED)
+            self.orders.update_status(order, OrderStatus.REJECTED)
             self._handle_order_rejected(order)
 
             if self.on_error:
@@ -251,7 +247,7 @@ class OrderManager:
         """注文約定をシミュレート"""
         # デモモードでは即座に約定
         fill_price = order.price or 50000.0  # デフォルト価格
-        order.update_status(OrderStatus.FILLED, order.amount, fill_price)
+        self.orders.update_status(order, OrderStatus.FILLED, order.amount, fill_price)
         self._handle_order_filled(order)
 
     def _handle_order_filled(self, order: Order):
@@ -276,7 +272,7 @@ class OrderManager:
     def _cancel_order_on_exchange(self, order: Order) -> bool:
         """取引所で注文をキャンセル"""
         try:
-            exchange_name = "binance"  # デフォルト
+            exchange_name = order.exchange or "binance"
 
             if exchange_name not in self.exchange_adapters:
                 logger.error(f"Exchange adapter not found: {exchange_name}")
@@ -300,5 +296,5 @@ class OrderManager:
             "rejected_orders": self.stats["rejected_orders"],
             "fill_rate": self.stats["filled_orders"] / max(self.stats["total_orders"], 1),
             "total_volume": self.stats["total_volume"],
-            "active_orders": len(self.get_active_orders()),
+            "active_orders": self.orders.active_count(),
         }
@@ -0,0 +1,177 @@
+"""
+注文タイムアウトスケジューラー
+期限をキーとした最小ヒープで、各注文を期限ちょうどに失効させる
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class OrderTimeoutScheduler:
+    """期限ヒープによる注文タイムアウト管理
+
+    ヒープ内の位置を注文IDごとに保持する索引付き二分ヒープで、
+    登録・削除・期限変更はいずれも O(log n)。
+    run() は次の期限までだけスリープし、期限到来時に on_expire(order_id) を呼ぶ。
+    """
+
+    def __init__(self, on_expire: Optional[Callable] = None):
+        self.on_expire = on_expire
+
+        self._heap: List[Tuple[datetime, str]] = []
+        self._positions: Dict[str, int] = {}
+        # イベントはループに結び付くため run() 内で生成する
+        self._wakeup: Optional[asyncio.Event] = None
+        self.is_running = False
+
+        self.stats = {"scheduled": 0, "removed": 0, "expired": 0}
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def __contains__(self, order_id: str) -> bool:
+        return order_id in self._positions
+
+    def schedule(self, order_id: str, deadline: datetime):
+        """注文の期限を登録（登録済みなら期限を更新）"""
+        if deadline.tzinfo is None:
+            deadline = deadline.replace(tzinfo=timezone.utc)
+
+        if order_id in self._positions:
+            index = self._positions[order_id]
+            self._heap[index] = (deadline, order_id)
+            self._sift_up(index)
+            self._sift_down(self._positions[order_id])
+        else:
+            self._heap.append((deadline, order_id))
+            self._positions[order_id] = len(self._heap) - 1
+            self._sift_up(len(self._heap) - 1)
+            self.stats["scheduled"] += 1
+
+        # 最短期限が変わった場合はスリープ中のループを起こす
+        if self._heap[0][1] == order_id and self._wakeup is not None:
+            self._wakeup.set()
+
+    def remove(self, order_id: str) -> bool:
+        """注文の期限を削除（約定・キャンセル時）"""
+        if not self._discard(order_id):
+            return False
+
+        self.stats["removed"] += 1
+        return True
+
+    def _discard(self, order_id: str) -> bool:
+        index = self._positions.pop(order_id, None)
+        if index is None:
+            return False
+
+        last = self._heap.pop()
+        if index < len(self._heap):
+            self._heap[index] = last
+            self._positions[last[1]] = index
+            self._sift_up(index)
+            self._sift_down(self._positions[last[1]])
+        return True
+
+    def get_deadline(self, order_id: str) -> Optional[datetime]:
+        index = self._positions.get(order_id)
+        return self._heap[index][0] if index is not None else None
+
+    def next_deadline(self) -> Optional[datetime]:
+        """最短の期限"""
+        return self._heap[0][0] if self._heap else None
+
+    def pop_expired(self, now: Optional[datetime] = None) -> List[str]:
+        """期限到来済みの注文IDを取り出す"""
+        now = now or datetime.now(timezone.utc)
+        expired = []
+
+        while self._heap and self._heap[0][0] <= now:
+            order_id = self._heap[0][1]
+            self._discard(order_id)
+            expired.append(order_id)
+
+        self.stats["expired"] += len(expired)
+        return expired
+
+    async def run(self):
+        """期限到来ごとに on_expire を呼ぶループ"""
+        self.is_running = True
+        self._wakeup = asyncio.Event()
+
+        while self.is_running:
+            try:
+                deadline = self.next_deadline()
+                timeout = None
+                if deadline is not None:
+                    timeout = max((deadline - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+
+                for order_id in self.pop_expired():
+                    await self._dispatch(order_id)
+
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Order timeout scheduler error: {e}")
+
+    def stop(self):
+        """ループを停止"""
+        self.is_running = False
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _dispatch(self, order_id: str):
+        if not self.on_expire:
+            return
+
+        try:
+            if asyncio.iscoroutinefunction(self.on_expire):
+                await self.on_expire(order_id)
+            else:
+                self.on_expire(order_id)
+        except Exception as e:
+            logger.error(f"Order expiry handler error for {order_id}: {e}")
+
+    def _swap(self, i: int, j: int):
+        self._heap[i], self._heap[j] = self._heap[j], self._heap[i]
+        self._positions[self._heap[i][1]] = i
+        self._positions[self._heap[j][1]] = j
+
+    def _sift_up(self, index: int):
+        while index > 0:
+            parent = (index - 1) // 2
+            if self._heap[index][0] >= self._heap[parent][0]:
+                break
+            self._swap(index, parent)
+            index = parent
+
+    def _sift_down(self, index: int):
+        size = len(self._heap)
+        while True:
+            smallest = index
+            for child in (2 * index + 1, 2 * index + 2):
+                if child < size and self._heap[child][0] < self._heap[smallest][0]:
+                    smallest = child
+            if smallest == index:
+                break
+            self._swap(index, smallest)
+            index = smallest
+
+    def get_stats(self) -> dict:
+        """統計情報を取得"""
+        next_deadline = self.next_deadline()
+        return {
+            **self.stats,
+            "pending": len(self._heap),
+            "next_deadline": next_deadline.isoformat() if next_deadline else None,
+        }
@@ -0,0 +1,167 @@
+"""
+インデックス付き注文ストア
+状態・シンボル・戦略・取引所ごとの二次インデックスを状態遷移のたびに維持する
+"""
+
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+from .engine import Order, OrderStatus
+
+ACTIVE_STATUSES = (OrderStatus.PENDING, OrderStatus.PARTIALLY_FILLED)
+INDEXED_ATTRIBUTES = ("symbol", "strategy_name", "exchange")
+
+
+class OrderStore:
+    """注文の一次ストアと二次インデックス
+
+    各インデックスは {キー: {注文ID: 注文}} の辞書で、挿入順（作成順）を保つ。
+    照会・一括キャンセルは結果件数に比例し、履歴全体の件数には依存しない。
+    状態変更は必ず update_status() を経由させること。
+    """
+
+    def __init__(self):
+        self._orders: Dict[str, Order] = {}
+        self._by_status: Dict[OrderStatus, Dict[str, Order]] = {}
+        self._active: Dict[str, Order] = {}
+
+        # 属性インデックス（全注文 / アクティブ注文のみ）
+        self._by_attr: Dict[str, Dict[str, Dict[str, Order]]] = {attr: {} for attr in INDEXED_ATTRIBUTES}
+        self._active_by_attr: Dict[str, Dict[str, Dict[str, Order]]] = {attr: {} for attr in INDEXED_ATTRIBUTES}
+
+    # 辞書互換インターフェース
+    def __len__(self) -> int:
+        return len(self._orders)
+
+    def __contains__(self, order_id: str) -> bool:
+        return order_id in self._orders
+
+    def __getitem__(self, order_id: str) -> Order:
+        return self._orders[order_id]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._orders)
+
+    def get(self, order_id: str, default: Optional[Order] = None) -> Optional[Order]:
+        return self._orders.get(order_id, default)
+
+    def values(self):
+        return self._orders.values()
+
+    def items(self):
+        return self._orders.items()
+
+    def add(self, order: Order):
+        """注文を登録"""
+        if order.id in self._orders:
+            self.remove(order.id)
+
+        self._orders[order.id] = order
+        self._index(self._by_status, order.status, order)
+        for attr in INDEXED_ATTRIBUTES:
+            self._index(self._by_attr[attr], getattr(order, attr), order)
+        if order.status in ACTIVE_STATUSES:
+            self._activate(order)
+
+    def remove(self, order_id: str) -> Optional[Order]:
+        """注文を削除"""
+        order = self._orders.pop(order_id, None)
+        if order is None:
+            return None
+
+        self._unindex(self._by_status, order.status, order.id)
+        for attr in INDEXED_ATTRIBUTES:
+            self._unindex(self._by_attr[attr], getattr(order, attr), order.id)
+        self._deactivate(order)
+        return order
+
+    def update_status(
+        self,
+        order: Order,
+        status: OrderStatus,
+        filled_amount: float = None,
+        filled_price: float = None,
+    ):
+        """注文状態を更新し、インデックスを付け替える"""
+        previous = order.status
+        order.update_status(status, filled_amount, filled_price)
+
+        if order.id not in self._orders or previous == status:
+            return
+
+        self._unindex(self._by_status, previous, order.id)
+        self._index(self._by_status, status, order)
+        if status in ACTIVE_STATUSES:
+            self._activate(order)
+        else:
+            self._deactivate(order)
+
+    # 照会
+    def active(self) -> List[Order]:
+        """アクティブな注文"""
+        return list(self._active.values())
+
+    def active_count(self) -> int:
+        return len(self._active)
+
+    def by_status(self, *statuses: OrderStatus) -> List[Order]:
+        """状態別の注文"""
+        result: List[Order] = []
+        for status in statuses:
+            result.extend(self._by_status.get(status, {}).values())
+        return result
+
+    def by_symbol(self, symbol: str, active_only: bool = False) -> List[Order]:
+        """シンボル別の注文"""
+        return self._lookup("symbol", symbol, active_only)
+
+    def by_strategy(self, strategy_name: str, active_only: bool = False) -> List[Order]:
+        """戦略別の注文"""
+        return self._lookup("strategy_name", strategy_name, active_only)
+
+    def by_exchange(self, exchange: str, active_only: bool = False) -> List[Order]:
+        """取引所別の注文"""
+        return self._lookup("exchange", exchange, active_only)
+
+    def inactive_created_before(self, cutoff: datetime) -> List[Order]:
+        """cutoffより前に作成された非アクティブ注文
+
+        一次ストアは作成順なので、cutoff以降の注文に達した時点で走査を打ち切る
+        """
+        result = []
+        for order in self._orders.values():
+            if order.created_at >= cutoff:
+                break
+            if order.id not in self._active:
+                result.append(order)
+        return result
+
+    def _lookup(self, attr: str, key: str, active_only: bool) -> List[Order]:
+        index = self._active_by_attr[attr] if active_only else self._by_attr[attr]
+        return list(index.get(key, {}).values())
+
+    def _activate(self, order: Order):
+        self._active[order.id] = order
+        for attr in INDEXED_ATTRIBUTES:
+            self._index(self._active_by_attr[attr], getattr(order, attr), order)
+
+    def _deactivate(self, order: Order):
+        if self._active.pop(order.id, None) is None:
+            return
+        for attr in INDEXED_ATTRIBUTES:
+            self._unindex(self._active_by_attr[attr], getattr(order, attr), order.id)
+
+    @staticmethod
+    def _index(index: Dict, key, order: Order):
+        if key is None:
+            return
+        index.setdefault(key, {})[order.id] = order
+
+    @staticmethod
+    def _unindex(index: Dict, key, order_id: str):
+        bucket = index.get(key)
+        if bucket is None:
+            return
+        bucket.pop(order_id, None)
+        if not bucket:
+            del index[key]
@@ -106,11 +106,14 @@ class OrderCommandFactory:
             try:
                 # 取引所アダプタを取得
                 adapter = self._get_exchange_adapter(exchange, sandbox)
+                # ストリーミングパッケージは板を使う時点で読み込む
+                from src.backend.streaming.order_book import get_order_book_manager
 
                 # TODO: account_serviceを実装後に統合
                 validator = OrderValidator(
                     exchange_adapter=adapter,
                     account_service=None,  # 後で実装
+                    order_book_manager=get_order_book_manager(),
                 )
 
                 # 取引所固有のルールを読み込み
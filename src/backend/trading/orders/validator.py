@@ -25,14 +25,16 @@ class OrderValidator:
     Chain of Responsibilityパターンでバリデーションを実行
     """
 
-    def __init__(self, exchange_adapter=None, account_service=None):
+    def __init__(self, exchange_adapter=None, account_service=None, order_book_manager=None):
         """
         Args:
             exchange_adapter: 取引所アダプタ
             account_service: アカウントサービス（残高取得用）
+            order_book_manager: ローカル板管理（価格検証用、任意）
         """
         self.exchange_adapter = exchange_adapter
         self.account_service = account_service
+        self.order_book_manager = order_book_manager
         self.exchange_rules: Dict = {}
 
         # デフォルトのバリデーションルール
@@ -146,6 +148,12 @@ class OrderValidator:
         if order.price is None and order.order_type != OrderType.MARKET:
             return
 
+        # 同期済みのローカル板があれば仲値で検証（REST不要）
+        local_price = self._get_local_mid_price(order.symbol)
+        if local_price is not None:
+            self._check_price_deviation(order, local_price)
+            return
+
         if not self.exchange_adapter:
             logger.warning("Exchange adapter not available for price validation")
             return
@@ -155,15 +163,7 @@ class OrderValidator:
             ticker = await self.exchange_adapter.fetch_ticker(order.symbol)
             current_price = Decimal(str(ticker.last))
 
-            if order.price:
-                price_deviation = abs(order.price - current_price) / current_price
-                max_deviation = self.default_rules["max_price_deviation"]
-
-                if price_deviation > max_deviation:
-                    raise ValidationError(
-                        f"Price ${order.price} deviates {price_deviation:.2%} from market price ${current_price} "
-                        f"(max allowed: {max_deviation:.2%})"
-                    )
+            self._check_price_deviation(order, current_price)
 
         except ValidationError:
             # ValidationErrorは再度raiseしてバリデーション失敗として扱う
@@ -172,6 +172,29 @@ class OrderValidator:
             logger.warning(f"Could not validate price for {order.symbol}: {e}")
             # その他のエラーは警告のみ（取引所接続エラーの可能性）
 
+    def _get_local_mid_price(self, symbol: str) -> Optional[Decimal]:
+        """ローカル板の仲値を取得"""
+        if not self.order_book_manager:
+            return None
+
+        book = self.order_book_manager.get_book(symbol)
+        mid_price = book.mid_price() if book else None
+        return Decimal(str(mid_price)) if mid_price else None
+
+    def _check_price_deviation(self, order: Order, current_price: Decimal):
+        """市場価格からの乖離をチェック"""
+        if not order.price:
+            return
+
+        price_deviation = abs(order.price - current_price) / current_price
+        max_deviation = self.default_rules["max_price_deviation"]
+
+        if price_deviation > max_deviation:
+            raise ValidationError(
+                f"Price ${order.price} deviates {price_deviation:.2%} from market price ${current_price} "
+                f"(max allowed: {max_deviation:.2%})"
+            )
+
     async def _validate_precision(self, order: Order):
         """数量・価格の精度検証"""
         # 数量精度チェック
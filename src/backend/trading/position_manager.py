@@ -19,11 +19,18 @@ class PositionManager:
         self.config = config or {}
         self.price_data = {}
 
+        # シンボル別の評価額・未実現損益（ティック毎に全ポジションを走査しないため差分で維持）
+        self._market_values: Dict[str, float] = {}
+        self._unrealized_pnls: Dict[str, float] = {}
+        self.total_exposure = 0.0
+
         # イベントハンドラー
         self.on_position_opened: Optional[Callable] = None
         self.on_position_closed: Optional[Callable] = None
         self.on_position_updated: Optional[Callable] = None
         self.on_risk_limit_exceeded: Optional[Callable] = None
+        # シンボルのポジション・評価額が変わるたびに (symbol, position or None) で呼ばれる
+        self.on_position_refreshed: Optional[Callable] = None
 
         # 統計
         self.stats = {
@@ -58,6 +65,7 @@ class PositionManager:
 
             self.positions[symbol] = position
             self.stats["positions_opened"] += 1
+            self._refresh_symbol_totals(symbol)
 
             if self.on_position_opened:
                 self.on_position_opened(position)
@@ -78,6 +86,7 @@ class PositionManager:
                 position.amount = total_amount
                 position.current_price = order.filled_price
                 position.updated_at = datetime.now(timezone.utc)
+                self._refresh_symbol_totals(symbol)
 
                 if self.on_position_updated:
                     self.on_position_updated(position)
@@ -94,6 +103,7 @@ class PositionManager:
 
                     del self.positions[symbol]
                     self.stats["positions_closed"] += 1
+                    self._refresh_symbol_totals(symbol)
 
                     if realized_pnl > 0:
                         self.stats["winning_positions"] += 1
@@ -113,6 +123,7 @@ class PositionManager:
 
                     position.amount -= order.amount
                     position.updated_at = datetime.now(timezone.utc)
+                    self._refresh_symbol_totals(symbol)
 
                     if self.on_position_updated:
                         self.on_position_updated(position)
@@ -137,6 +148,7 @@ class PositionManager:
 
         del self.positions[symbol]
         self.stats["positions_closed"] += 1
+        self._refresh_symbol_totals(symbol)
 
         if realized_pnl > 0:
             self.stats["winning_positions"] += 1
@@ -161,8 +173,8 @@ class PositionManager:
             position = self.positions[symbol]
             position.update_price(price)
 
-            # 未実現損益の統計を更新
-            self._update_unrealized_pnl_stats()
+            # 未実現損益の統計を更新（当該シンボルの差分のみ）
+            self._refresh_symbol_totals(symbol)
 
             # リスク制限チェック
             self._check_risk_limits(position)
@@ -259,6 +271,22 @@ class PositionManager:
             current_drawdown = abs(realized_pnl) / max(self.stats["total_pnl"], 1000.0)
             self.stats["max_drawdown"] = max(self.stats["max_drawdown"], current_drawdown)
 
+    def _refresh_symbol_totals(self, symbol: str):
+        """シンボルの評価額・未実現損益の変化分を合計に反映"""
+        position = self.positions.get(symbol)
+        market_value = float(position.get_market_value()) if position else 0.0
+        unrealized_pnl = float(position.unrealized_pnl) if position else 0.0
+
+        self.total_exposure += market_value - self._market_values.pop(symbol, 0.0)
+        self.stats["unrealized_pnl"] += unrealized_pnl - self._unrealized_pnls.pop(symbol, 0.0)
+
+        if position:
+            self._market_values[symbol] = market_value
+            self._unrealized_pnls[symbol] = unrealized_pnl
+
+        if self.on_position_refreshed:
+            self.on_position_refreshed(symbol, position)
+
     def _update_unrealized_pnl_stats(self):
         """未実現損益統計を更新"""
         self.stats["unrealized_pnl"] = self.get_total_unrealized_pnl()
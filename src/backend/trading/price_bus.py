@@ -0,0 +1,175 @@
+"""
+価格イベントバス
+ストリーマー・データ収集器から価格を受け取り、シンボル単位の購読者に即時配信する
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PriceTick:
+    """価格ティック"""
+
+    symbol: str
+    price: float
+    timestamp: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    source: Optional[str] = None
+    quantity: Optional[float] = None  # 約定ティックの出来高（不明ならNone）
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "symbol": self.symbol,
+            "price": self.price,
+            "timestamp": self.timestamp.isoformat(),
+            "source": self.source,
+            "quantity": self.quantity,
+        }
+
+
+class PriceBus:
+    """asyncioベースの価格Pub/Subバス
+
+    購読はシンボル単位（subscribe）または全シンボル（subscribe_all）で行う。
+    購読者は同期関数・コルーチン関数のどちらでもよい。
+    既に配信済みのティックより古いティックは破棄する。
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[str, List[Callable]] = {}
+        self._wildcard_subscribers: List[Callable] = []
+        self.latest: Dict[str, PriceTick] = {}
+
+        self.stats = {"published": 0, "stale_dropped": 0, "delivered": 0, "handler_errors": 0}
+
+    def subscribe(self, symbol: str, callback: Callable):
+        """シンボルの価格を購読"""
+        subscribers = self._subscribers.setdefault(symbol, [])
+        if callback not in subscribers:
+            subscribers.append(callback)
+
+    def unsubscribe(self, symbol: str, callback: Callable):
+        """シンボルの購読を解除"""
+        subscribers = self._subscribers.get(symbol)
+        if subscribers and callback in subscribers:
+            subscribers.remove(callback)
+            if not subscribers:
+                del self._subscribers[symbol]
+
+    def subscribe_all(self, callback: Callable):
+        """全シンボルの価格を購読"""
+        if callback not in self._wildcard_subscribers:
+            self._wildcard_subscribers.append(callback)
+
+    def unsubscribe_all(self, callback: Callable):
+        """全シンボル購読および個別購読をすべて解除"""
+        if callback in self._wildcard_subscribers:
+            self._wildcard_subscribers.remove(callback)
+
+        for symbol in list(self._subscribers.keys()):
+            self.unsubscribe(symbol, callback)
+
+    def has_subscribers(self, symbol: str) -> bool:
+        return bool(self._subscribers.get(symbol)) or bool(self._wildcard_subscribers)
+
+    async def publish(
+        self,
+        symbol: str,
+        price: float,
+        timestamp: Optional[datetime] = None,
+        source: Optional[str] = None,
+        quantity: Optional[float] = None,
+    ) -> Optional[PriceTick]:
+        """価格を配信（古いティックの場合はNoneを返す）"""
+        tick = self._accept(symbol, price, timestamp, source, quantity)
+        if tick is None:
+            return None
+
+        for callback in self._targets(symbol):
+            try:
+                if asyncio.iscoroutinefunction(callback):
+                    await callback(tick)
+                else:
+                    callback(tick)
+                self.stats["delivered"] += 1
+            except Exception as e:
+                self.stats["handler_errors"] += 1
+                logger.error(f"Price bus handler error for {symbol}: {e}")
+
+        return tick
+
+    def publish_nowait(
+        self,
+        symbol: str,
+        price: float,
+        timestamp: Optional[datetime] = None,
+        source: Optional[str] = None,
+        quantity: Optional[float] = None,
+    ) -> Optional[PriceTick]:
+        """同期コンテキストから配信（コルーチン購読者はタスクとして実行）"""
+        tick = self._accept(symbol, price, timestamp, source, quantity)
+        if tick is None:
+            return None
+
+        for callback in self._targets(symbol):
+            try:
+                if asyncio.iscoroutinefunction(callback):
+                    asyncio.get_running_loop().create_task(callback(tick))
+                else:
+                    callback(tick)
+                self.stats["delivered"] += 1
+            except Exception as e:
+                self.stats["handler_errors"] += 1
+                logger.error(f"Price bus handler error for {symbol}: {e}")
+
+        return tick
+
+    def _accept(
+        self,
+        symbol: str,
+        price: float,
+        timestamp: Optional[datetime],
+        source: Optional[str],
+        quantity: Optional[float] = None,
+    ) -> Optional[PriceTick]:
+        """ティックを生成し、最新価格を更新"""
+        timestamp = timestamp or datetime.now(timezone.utc)
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=timezone.utc)
+
+        tick = PriceTick(symbol=symbol, price=float(price), timestamp=timestamp, source=source, quantity=quantity)
+
+        previous = self.latest.get(symbol)
+        if previous is not None and tick.timestamp < previous.timestamp:
+            self.stats["stale_dropped"] += 1
+            return None
+
+        self.latest[symbol] = tick
+        self.stats["published"] += 1
+        return tick
+
+    def _targets(self, symbol: str) -> List[Callable]:
+        return list(self._subscribers.get(symbol, ())) + list(self._wildcard_subscribers)
+
+    def get_latest_price(self, symbol: str) -> Optional[float]:
+        """最新価格を取得"""
+        tick = self.latest.get(symbol)
+        return tick.price if tick else None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """統計情報を取得"""
+        return {
+            **self.stats,
+            "symbols": len(self.latest),
+            "subscribed_symbols": len(self._subscribers),
+            "wildcard_subscribers": len(self._wildcard_subscribers),
+        }
+
+
+# グローバル価格バス
+price_bus = PriceBus()
@@ -3,11 +3,14 @@
 """
 
 import logging
+import time
 from datetime import datetime, timezone
 from decimal import Decimal
 from typing import Any, Callable, Dict, List, Optional
 
+from ..risk.correlation_tracker import OnlineCovarianceTracker
 from .engine import Order, Position
+from .risk_snapshot import MAX_CORRELATED_POSITIONS, LatencyHistogram, RiskSnapshot, is_correlated
 
 logger = logging.getLogger(__name__)
 
@@ -15,7 +18,11 @@ logger = logging.getLogger(__name__)
 class RiskManager:
     """リスク管理クラス"""
 
-    def __init__(self, config: Dict = None):
+    def __init__(self, config: Dict = None, correlation_tracker: Optional[OnlineCovarianceTracker] = None):
+        """
+        Args:
+            correlation_tracker: シンボルリターンの相関トラッカー（未指定時はクォート通貨による簡易判定のみ）
+        """
         self.config = config or {}
         self.is_enabled = self.config.get("enable_risk_management", True)
 
@@ -47,31 +54,78 @@ class RiskManager:
             "last_risk_check": datetime.now(timezone.utc),
         }
 
+        # 注文前チェック用のスナップショットと所要時間
+        self.snapshot = RiskSnapshot(correlation_tracker)
+        self.check_latency = LatencyHistogram()
+
         logger.info("RiskManager initialized")
 
+    @property
+    def correlation_tracker(self) -> Optional[OnlineCovarianceTracker]:
+        return self.snapshot.correlation_tracker
+
+    @correlation_tracker.setter
+    def correlation_tracker(self, tracker: Optional[OnlineCovarianceTracker]):
+        self.snapshot.correlation_tracker = tracker
+
+    def bind_positions(self, positions: Dict[str, Position]):
+        """スナップショットを初期化し、以降は update_position_snapshot() の差分更新に切り替える"""
+        self.snapshot.rebuild(positions)
+        self.snapshot.bound = True
+
+    def update_position_snapshot(self, symbol: str, position: Optional[Position]):
+        """ポジション・価格の変化をスナップショットに反映（PositionManager から呼ばれる）"""
+        self.snapshot.update_position(symbol, position)
+
     def check_order_risk(self, order: Order, current_positions: Dict[str, Position], current_pnl: float) -> bool:
-        """注文リスクをチェック"""
+        """注文リスクをチェック
+
+        スナップショットに対する定数回の比較で判定する。
+        差分更新を受けていない場合は current_positions からスナップショットを作り直す。
+        """
         if not self.is_enabled:
             return True
 
-        # ポジションサイズ制限
-        if not self._check_position_size_limit(order, current_positions):
+        start = time.perf_counter()
+        try:
+            if not self.snapshot.bound:
+                self.snapshot.rebuild(current_positions)
+            return self._check_order_against_snapshot(order, current_pnl)
+        finally:
+            self.check_latency.record(time.perf_counter() - start)
+
+    def _check_order_against_snapshot(self, order: Order, current_pnl: float) -> bool:
+        snapshot = self.snapshot
+        order_value = float(order.amount) * float(order.price or 50000.0)
+
+        # ポジションサイズ制限（同方向の既存ポジションと合算）
+        max_position_size = self.risk_limits["max_position_size"]
+        if order_value > snapshot.position_cap(order.symbol, order.side, max_position_size):
+            existing_value = max_position_size - snapshot.position_cap(order.symbol, order.side, max_position_size)
+            logger.warning(f"Position size limit exceeded: {order_value + existing_value}")
             return False
 
         # 日次損失制限
         if not self._check_daily_loss_limit(current_pnl):
             return False
 
-        # レバレッジ制限
-        if not self._check_leverage_limit(order, current_positions):
+        # レバレッジ制限（仮の資本金、_check_leverage_limit と同じ）
+        leverage = (snapshot.total_exposure + order_value) / 100000.0
+        if leverage > self.risk_limits.get("max_leverage", 1.0):
+            logger.warning(f"Leverage limit exceeded: {leverage}")
             return False
 
         # 相関制限
-        if not self._check_correlation_limit(order, current_positions):
+        max_correlation = self.risk_limits.get("max_correlation", 0.7)
+        if snapshot.correlated_count(order.symbol, max_correlation) > MAX_CORRELATED_POSITIONS:
+            logger.warning("Correlation limit exceeded: too many correlated positions")
+            self.stats["correlation_violations"] += 1
             return False
 
         # ポートフォリオヒート
-        if not self._check_portfolio_heat(order, current_positions):
+        heat = snapshot.total_heat + self.risk_limits.get("position_size_limit_pct", 0.1)
+        if heat > self.risk_limits.get("max_portfolio_heat", 0.02):
+            logger.warning(f"Portfolio heat limit exceeded: {heat}")
             return False
 
         return True
@@ -113,6 +167,47 @@ class RiskManager:
 
         return violations
 
+    def check_symbol_risk(self, position: Position, total_exposure: float, current_pnl: float) -> List[str]:
+        """ティックを受けたシンボルのポジションのみリスクをチェック
+
+        check_position_risk() と同じ基準を、全ポジションを走査せずに
+        当該ポジションと事前集計済みの総エクスポージャーで評価する
+        """
+        if not self.is_enabled:
+            return []
+
+        violations = []
+        position_value = float(position.get_market_value())
+
+        # 個別ポジションサイズ
+        if position_value > self.risk_limits["max_position_size"]:
+            violations.append(f"Position size limit exceeded: {position.symbol}")
+            self.stats["position_size_violations"] += 1
+
+        # 日次損失制限
+        if current_pnl < -self.risk_limits["max_daily_loss"]:
+            violations.append(f"Daily loss limit exceeded: {current_pnl}")
+
+        # 最大ドローダウン
+        current_drawdown = self._calculate_current_drawdown(current_pnl)
+        if current_drawdown > self.risk_limits["max_drawdown"]:
+            violations.append(f"Max drawdown exceeded: {current_drawdown}")
+            self.stats["drawdown_violations"] += 1
+
+        # ポートフォリオ集中度
+        concentration = position_value / total_exposure if total_exposure > 0 else 0
+        if concentration > self.risk_limits["position_size_limit_pct"]:
+            violations.append(f"Portfolio concentration risk: {position.symbol} ({concentration:.2%})")
+
+        self.stats["last_risk_check"] = datetime.now(timezone.utc)
+
+        if violations:
+            self.stats["risk_violations"] += len(violations)
+            if self.on_risk_violation:
+                self.on_risk_violation(violations)
+
+        return violations
+
     def should_emergency_stop(self, positions: Dict[str, Position], current_pnl: float) -> bool:
         """緊急停止が必要かチェック"""
         if not self.is_enabled:
@@ -216,19 +311,22 @@ class RiskManager:
         return True
 
     def _check_correlation_limit(self, order: Order, current_positions: Dict[str, Position]) -> bool:
-        """相関制限をチェック"""
-        # 簡単な実装（実際の相関計算は複雑）
-        # 同じ市場での過度の集中を防ぐ
-
-        if order.symbol.endswith("USDT") or order.symbol.endswith("BTC"):
-            similar_positions = [
-                pos for pos in current_positions.values() if pos.symbol.endswith("USDT") or pos.symbol.endswith("BTC")
-            ]
-
-            if len(similar_positions) > 3:  # 3つ以上の類似ポジション
-                logger.warning("Correlation limit exceeded: too many similar positions")
-                self.stats["correlation_violations"] += 1
-                return False
+        """相関制限をチェック
+
+        相関トラッカーに十分な観測があるペアは実測相関（max_correlation 超）で、
+        ないペアは同じ市場（USDT/BTC建て）かどうかで相関ありとみなし、過度の集中を防ぐ
+        """
+        max_correlation = self.risk_limits.get("max_correlation", 0.7)
+        correlated_positions = [
+            pos
+            for pos in current_positions.values()
+            if is_correlated(self.correlation_tracker, order.symbol, pos.symbol, max_correlation)
+        ]
+
+        if len(correlated_positions) > MAX_CORRELATED_POSITIONS:
+            logger.warning("Correlation limit exceeded: too many correlated positions")
+            self.stats["correlation_violations"] += 1
+            return False
 
         return True
 
@@ -303,6 +401,7 @@ class RiskManager:
             "risk_violations": self.stats["risk_violations"],
             "emergency_stops": self.stats["emergency_stops"],
             "last_risk_check": self.stats["last_risk_check"].isoformat(),
+            "order_check_latency": self.check_latency.summary(),
         }
 
     def get_statistics(self) -> Dict[str, Any]:
@@ -315,4 +414,5 @@ class RiskManager:
             "correlation_violations": self.stats["correlation_violations"],
             "last_risk_check": self.stats["last_risk_check"].isoformat(),
             "is_enabled": self.is_enabled,
+            "order_check_latency": self.check_latency.summary(),
         }
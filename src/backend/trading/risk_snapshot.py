@@ -0,0 +1,190 @@
+"""
+事前計算済みリスクスナップショット
+
+ポジション・価格の変化時にシンボル単位の差分でエクスポージャー・ポートフォリオヒート・集中度を更新し、
+注文前チェックを数回の O(1) 比較で済ませる。
+チェックの所要時間は LatencyHistogram に記録し、p50 / p99 で予算内に収まっているかを確認できる。
+"""
+
+import bisect
+import math
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from ..risk.correlation_tracker import OnlineCovarianceTracker
+
+# 相関ポジション数の上限（これを超えると相関制限違反）
+MAX_CORRELATED_POSITIONS = 3
+
+
+def is_same_market(symbol: str) -> bool:
+    """USDT / BTC 建ての同じ市場のシンボルか"""
+    return symbol.endswith("USDT") or symbol.endswith("BTC")
+
+
+def is_correlated(tracker: Optional[OnlineCovarianceTracker], symbol: str, other: str, max_correlation: float) -> bool:
+    """2シンボルを相関ありとみなすか
+
+    相関トラッカーに十分な観測があれば実測相関で、なければ同じ市場かどうかで判定する
+    """
+    correlation = tracker.pair_correlation(symbol, other) if tracker is not None else None
+    if correlation is not None:
+        return abs(correlation) > max_correlation
+    return is_same_market(symbol) and is_same_market(other)
+
+
+class LatencyHistogram:
+    """対数ビンのレイテンシヒストグラム（記録 O(log B)、メモリは固定）"""
+
+    def __init__(self, min_seconds: float = 1e-7, max_seconds: float = 10.0, bins_per_decade: int = 20):
+        decades = math.log10(max_seconds / min_seconds)
+        count = int(math.ceil(decades * bins_per_decade))
+        self._edges = [min_seconds * 10 ** (i / bins_per_decade) for i in range(count + 1)]
+        self._counts = [0] * (len(self._edges) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        self._counts[bisect.bisect_left(self._edges, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q: float) -> float:
+        """q パーセンタイル（秒、ビンの上端で近似）"""
+        if self.count == 0:
+            return 0.0
+        target = self.count * q / 100.0
+        cumulative = 0
+        for index, bin_count in enumerate(self._counts):
+            cumulative += bin_count
+            if cumulative >= target and bin_count:
+                return min(self._edges[min(index, len(self._edges) - 1)], self.max)
+        return self.max
+
+    def reset(self):
+        self._counts = [0] * len(self._counts)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def summary(self) -> Dict[str, float]:
+        """マイクロ秒単位の要約"""
+        return {
+            "count": self.count,
+            "p50_us": self.percentile(50) * 1e6,
+            "p99_us": self.percentile(99) * 1e6,
+            "max_us": self.max * 1e6,
+            "mean_us": self.total / self.count * 1e6 if self.count else 0.0,
+        }
+
+
+def timed(histogram: LatencyHistogram, func: Callable[[], Any]) -> Any:
+    """func の実行時間をヒストグラムに記録して結果を返す"""
+    start = time.perf_counter()
+    try:
+        return func()
+    finally:
+        histogram.record(time.perf_counter() - start)
+
+
+class RiskSnapshot:
+    """注文前チェック用のリスクスナップショット
+
+    シンボルごとに (方向, 評価額, ヒート寄与) を保持し、合計は差分で更新する。
+    相関ポジション数は注文シンボルごとにキャッシュし、保有シンボルの構成か相関トラッカーが変わったら破棄する。
+    """
+
+    def __init__(self, correlation_tracker: Optional[OnlineCovarianceTracker] = None):
+        self.correlation_tracker = correlation_tracker
+        self._entries: Dict[str, Tuple[Any, float, float]] = {}
+        self.total_exposure = 0.0
+        self.total_heat = 0.0
+        # 保有シンボルの構成が変わるたびに増える
+        self.composition_version = 0
+        self.version = 0
+        self._correlated_counts: Dict[str, int] = {}
+        self._correlated_key: Optional[Tuple[int, int, float]] = None
+        # ポジション供給元からの差分更新を受けているか（False なら check 時に再構築が必要）
+        self.bound = False
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._entries
+
+    def update_position(self, symbol: str, position: Optional[Any]):
+        """シンボルのポジション（None なら決済済み）を反映"""
+        old = self._entries.pop(symbol, None)
+        if old is not None:
+            self.total_exposure -= old[1]
+            self.total_heat -= old[2]
+
+        if position is not None:
+            market_value = float(position.get_market_value())
+            pnl = float(position.unrealized_pnl)
+            heat = abs(pnl) / market_value if pnl < 0 and market_value > 0 else 0.0
+            self._entries[symbol] = (position.side, market_value, heat)
+            self.total_exposure += market_value
+            self.total_heat += heat
+
+        if (old is None) != (position is None):
+            self.composition_version += 1
+        self.version += 1
+
+    def rebuild(self, positions: Dict[str, Any]):
+        """ポジション全体から再構築"""
+        for symbol in [s for s in self._entries if s not in positions]:
+            self.update_position(symbol, None)
+        for symbol, position in positions.items():
+            self.update_position(symbol, position)
+
+    def side(self, symbol: str) -> Any:
+        entry = self._entries.get(symbol)
+        return entry[0] if entry else None
+
+    def market_value(self, symbol: str) -> float:
+        entry = self._entries.get(symbol)
+        return entry[1] if entry else 0.0
+
+    def concentration(self, symbol: str) -> Optional[float]:
+        """シンボルの集中度（未保有なら None）"""
+        entry = self._entries.get(symbol)
+        if entry is None or self.total_exposure <= 0:
+            return None
+        return entry[1] / self.total_exposure
+
+    def position_cap(self, symbol: str, side: Any, max_position_size: float) -> float:
+        """同方向の既存ポジションを差し引いた、注文可能な評価額の上限"""
+        entry = self._entries.get(symbol)
+        if entry is not None and entry[0] == side:
+            return max_position_size - entry[1]
+        return max_position_size
+
+    def correlated_count(self, symbol: str, max_correlation: float) -> int:
+        """symbol と相関ありとみなす保有ポジション数"""
+        tracker_version = self.correlation_tracker.version if self.correlation_tracker is not None else 0
+        key = (self.composition_version, tracker_version, max_correlation)
+        if key != self._correlated_key:
+            self._correlated_counts = {}
+            self._correlated_key = key
+
+        count = self._correlated_counts.get(symbol)
+        if count is None:
+            count = sum(
+                1 for other in self._entries if is_correlated(self.correlation_tracker, symbol, other, max_correlation)
+            )
+            self._correlated_counts[symbol] = count
+        return count
+
+    def get_stats(self) -> Dict[str, float]:
+        return {
+            "positions": len(self._entries),
+            "total_exposure": self.total_exposure,
+            "total_heat": self.total_heat,
+            "version": self.version,
+            "bound": self.bound,
+        }
@@ -0,0 +1,19 @@
+"""
+時間枠文字列のユーティリティ
+
+データ収集・バックテスト・リスク・ポートフォリオの各モジュールから使うため、
+ストリーミングなど他のパッケージには依存しない。
+"""
+
+_TIMEFRAME_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def timeframe_to_seconds(timeframe: str) -> int:
+    """時間枠文字列（"1s", "15m", "4h", "1d" など）を秒数に変換"""
+    if len(timeframe) < 2 or timeframe[-1] not in _TIMEFRAME_UNITS or not timeframe[:-1].isdigit():
+        raise ValueError(f"Unsupported timeframe: {timeframe}")
+
+    seconds = int(timeframe[:-1]) * _TIMEFRAME_UNITS[timeframe[-1]]
+    if seconds <= 0:
+        raise ValueError(f"Unsupported timeframe: {timeframe}")
+    return seconds
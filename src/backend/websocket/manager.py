@@ -23,6 +23,7 @@ class MessageType(Enum):
     """WebSocketメッセージタイプ"""
 
     PRICE_UPDATE = "price_update"
+    CANDLE_CLOSE = "candle_close"
     TRADE_EXECUTION = "trade_execution"
     ORDER_UPDATE = "order_update"
     MARKET_NEWS = "market_news"
@@ -5,6 +5,7 @@ PyTest設定ファイル
 
 import os
 import sys
+import tempfile
 from datetime import timedelta
 from typing import Any, Dict, List, Optional
 from unittest.mock import MagicMock
@@ -20,6 +21,8 @@ os.environ["SUPABASE_URL"] = "https://test.supabase.co"
 os.environ["SUPABASE_KEY"] = "test_key"
 os.environ["JWT_SECRET"] = "test_secret_key_for_jwt_testing_environment_32_characters_long"
 os.environ["REDIS_URL"] = "redis://localhost:6379/0"
+os.environ["PAPER_WALLET_JOURNAL_DIR"] = tempfile.mkdtemp(prefix="paper_wallet_journal_")
+os.environ["PORTFOLIO_TRADE_ARCHIVE_DIR"] = tempfile.mkdtemp(prefix="portfolio_trade_archive_")
 
 # CI環境の場合、特別な設定を追加
 if os.environ.get("CI") == "true":
@@ -14,6 +14,7 @@ from src.backend.risk.advanced_risk_manager import (
     StressTestResult,
     VaRResult,
 )
+from src.backend.risk.rolling_risk import RollingVaREngine, RollingWindow
 
 
 class TestAdvancedRiskManager:
@@ -469,6 +470,83 @@ class TestAdvancedRiskManager:
         assert "correlation" in recommendation_text or "volatility" in recommendation_text
 
 
+class TestRollingVaR:
+    """ローリングVaR/ESエンジンのテスト"""
+
+    def test_rolling_window_matches_numpy_after_eviction(self):
+        """窓からあふれた後も np.percentile / np.mean と一致する"""
+        np.random.seed(7)
+        returns = np.random.normal(0.0, 0.02, 300)
+        window = RollingWindow(100)
+        window.extend(returns)
+
+        expected = returns[-100:]
+        assert len(window) == 100
+        np.testing.assert_allclose(window.values(), expected)
+        assert window.percentile(5) == pytest.approx(np.percentile(expected, 5))
+        assert window.mean == pytest.approx(np.mean(expected))
+        assert window.std == pytest.approx(np.std(expected))
+
+    def test_engine_historical_var_es(self):
+        """ヒストリカル VaR/ES が一括計算と一致する"""
+        np.random.seed(11)
+        returns = np.random.normal(0.001, 0.02, 400)
+        engine = RollingVaREngine(window=252, seed=0)
+        for value in returns:
+            engine.update(value)
+
+        expected = returns[-252:]
+        var_95 = -np.percentile(expected, 5)
+        es_95 = -np.mean(expected[expected <= -var_95])
+        var, es = engine.var_es(5, "historical")
+        assert var == pytest.approx(var_95)
+        assert es == pytest.approx(es_95)
+
+    def test_confidence_interval_cached_until_update(self):
+        """信頼区間は窓が更新されるまで再計算されない"""
+        np.random.seed(3)
+        engine = RollingVaREngine(window=50, bootstrap_samples=200, seed=0)
+        engine.reset(np.random.normal(0.0, 0.02, 50))
+
+        first = engine.confidence_interval()
+        assert engine.confidence_interval() is first
+        assert first[0] <= first[1]
+
+        engine.update(-0.05)
+        assert engine.confidence_interval() is not first
+
+    def test_confidence_interval_recomputed_every_n_updates(self):
+        """ティックごとの更新では interval_recompute 件ごとにだけ再計算し、ホライズン別に保持する"""
+        np.random.seed(4)
+        engine = RollingVaREngine(window=50, bootstrap_samples=200, seed=0, interval_recompute=5)
+        engine.reset(np.random.normal(0.0, 0.02, 50))
+
+        first = engine.confidence_interval()
+        four_bar = engine.confidence_interval(horizon=4)
+        assert four_bar == pytest.approx((first[0] * 2, first[1] * 2))
+
+        for value in np.random.normal(0.0, 0.02, 4):
+            engine.update(value)
+        assert engine.confidence_interval() is first
+
+        engine.update(-0.05)
+        assert engine.confidence_interval() is not first
+
+    def test_streaming_var_uses_window(self):
+        """get_streaming_var は直近 var_window 件のみを使う"""
+        risk_manager = AdvancedRiskManager({"var_window": 60, "var_seed": 0})
+        np.random.seed(5)
+        returns = np.random.normal(0.0, 0.02, 200)
+        for value in returns:
+            risk_manager.update_portfolio_returns(float(value))
+
+        assert len(risk_manager.returns_history) == 60
+        streaming = risk_manager.get_streaming_var("historical")
+        batch = risk_manager.calculate_var(returns[-60:].tolist(), "historical")
+        assert streaming.var_95 == pytest.approx(batch.var_95)
+        assert streaming.expected_shortfall_95 == pytest.approx(batch.expected_shortfall_95)
+
+
 class TestAdvancedRiskManagerIntegration:
     """高度なリスク管理システムの統合テスト"""
 
@@ -0,0 +1,172 @@
+"""トレードストリームからの足生成のテスト"""
+
+import threading
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from src.backend.streaming.candle_aggregator import CandleAggregator, timeframe_to_seconds
+
+MINUTE_MS = 60_000
+BASE_MS = 1_700_000_000_000 - 1_700_000_000_000 % (3600 * 1000)  # 1時間境界
+
+
+class TestCandleAggregator:
+    """CandleAggregatorのテスト"""
+
+    @pytest.fixture
+    def persisted(self):
+        return []
+
+    @pytest.fixture
+    def aggregator(self, persisted):
+        return CandleAggregator(
+            derived_timeframes=("5m", "1h"),
+            persist_timeframes=("1m", "5m"),
+            persist_batch_size=3,
+            persister=persisted.extend,
+        )
+
+    def test_timeframe_to_seconds(self):
+        """時間枠の変換"""
+        assert timeframe_to_seconds("1s") == 1
+        assert timeframe_to_seconds("15m") == 900
+        assert timeframe_to_seconds("4h") == 14400
+        assert timeframe_to_seconds("1d") == 86400
+
+        with pytest.raises(ValueError):
+            timeframe_to_seconds("1M")
+
+    def test_minute_candle_aggregation(self, aggregator):
+        """1分足のOHLCV集約"""
+        aggregator.add_trade("BTC/USDT", 100.0, 1.0, BASE_MS + 1_000)
+        aggregator.add_trade("BTCUSDT", 105.0, 0.5, BASE_MS + 20_000)
+        aggregator.add_trade("BTCUSDT", 95.0, 2.0, BASE_MS + 40_000)
+        aggregator.add_trade("BTCUSDT", 101.0, 0.5, BASE_MS + 59_000)
+
+        candle = aggregator.get_current_candle("BTCUSDT", "1m")
+        assert candle.open == 100.0
+        assert candle.high == 105.0
+        assert candle.low == 95.0
+        assert candle.close == 101.0
+        assert candle.volume == pytest.approx(4.0)
+        assert candle.trade_count == 4
+
+        # 次の分のトレードで確定
+        closed = aggregator.add_trade("BTCUSDT", 102.0, 1.0, BASE_MS + MINUTE_MS + 500)
+        closed_minutes = [c for c in closed if c.timeframe == "1m"]
+        assert len(closed_minutes) == 1
+        assert closed_minutes[0].is_closed
+        assert closed_minutes[0].open_time == BASE_MS
+        assert aggregator.get_recent_candles("BTCUSDT", "1m")[-1].close == 101.0
+
+    def test_derived_timeframe_closes_on_last_minute(self, aggregator):
+        """上位足は最後の1分足の確定と同時に確定する"""
+        for minute in range(5):
+            aggregator.add_trade("ETHUSDT", 10.0 + minute, 1.0, BASE_MS + minute * MINUTE_MS)
+
+        closed = aggregator.add_trade("ETHUSDT", 20.0, 1.0, BASE_MS + 5 * MINUTE_MS)
+        five_minute = [c for c in closed if c.timeframe == "5m"]
+
+        assert len(five_minute) == 1
+        assert five_minute[0].open == 10.0
+        assert five_minute[0].high == 14.0
+        assert five_minute[0].close == 14.0
+        assert five_minute[0].volume == pytest.approx(5.0)
+        assert aggregator.get_current_candle("ETHUSDT", "1h").open == 10.0
+
+    def test_close_expired_without_trades(self, aggregator):
+        """トレードがなくても時間経過で確定する"""
+        aggregator.add_trade("BTCUSDT", 100.0, 1.0, BASE_MS + 1_000)
+
+        closed = aggregator.close_expired(BASE_MS + 10 * MINUTE_MS)
+        timeframes = {c.timeframe for c in closed}
+
+        assert {"1s", "1m", "5m"} <= timeframes
+        assert "1h" not in timeframes
+        assert aggregator.get_current_candle("BTCUSDT", "1m") is None
+
+    def test_late_trade_is_ignored(self, aggregator):
+        """確定済みの足に属する遅延トレードは破棄される"""
+        aggregator.add_trade("BTCUSDT", 100.0, 1.0, BASE_MS + MINUTE_MS)
+        aggregator.add_trade("BTCUSDT", 999.0, 1.0, BASE_MS + 1_000)
+
+        assert aggregator.get_current_candle("BTCUSDT", "1m").high == 100.0
+        assert aggregator.stats["late_trades"] >= 1
+
+    def test_late_trade_after_close_expired_is_ignored(self, aggregator):
+        """時間経過で確定した足が遅延トレードで作り直されない"""
+        aggregator.add_trade("BTCUSDT", 100.0, 1.0, BASE_MS + 1_000)
+        aggregator.close_expired(BASE_MS + MINUTE_MS + 50)
+        late_trades = aggregator.stats["late_trades"]
+
+        closed = aggregator.add_trade("BTCUSDT", 999.0, 1.0, BASE_MS + MINUTE_MS - 20)
+
+        assert closed == []
+        assert aggregator.get_current_candle("BTCUSDT", "1m") is None
+        assert aggregator.stats["late_trades"] > late_trades
+        minutes = [c for c in aggregator.pending_persist if c.timeframe == "1m"]
+        assert [c.open_time for c in minutes] == [BASE_MS]
+        assert minutes[0].high == 100.0
+
+    @pytest.mark.asyncio
+    async def test_dispatch_to_listeners_strategies_and_persistence(self, aggregator, persisted):
+        """確定足がリスナー・戦略・永続化に配信される"""
+        listener = Mock()
+        aggregator.add_listener(listener)
+
+        strategy = Mock()
+        strategy.symbol = "BTCUSDT"
+        strategy.timeframe = "1m"
+        strategy.update.return_value = "signal"
+        aggregator.register_strategy(strategy)
+
+        on_signal = Mock()
+        aggregator.on_strategy_signal = on_signal
+
+        for minute in range(4):
+            await aggregator.process_trade("BTCUSDT", 100.0 + minute, 1.0, BASE_MS + minute * MINUTE_MS)
+
+        assert strategy.update.call_count == 3
+        assert strategy.update.call_args[0][0]["close"] == 102.0
+        on_signal.assert_called_with(strategy, "signal")
+        assert listener.call_count == aggregator.stats["candles_closed"]
+
+        # バッチサイズに達した時点で永続化される
+        assert len(persisted) >= 3
+        assert all(c.timeframe in ("1m", "5m") for c in persisted)
+
+        await aggregator.flush()
+        assert aggregator.get_stats()["pending_persist"] == 0
+
+    @pytest.mark.asyncio
+    async def test_failed_persist_is_retried(self):
+        """永続化失敗時は次回フラッシュで再試行する"""
+        persister = Mock(side_effect=[Exception("db down"), None])
+        aggregator = CandleAggregator(derived_timeframes=(), persist_batch_size=100, persister=persister)
+
+        aggregator.add_trade("BTCUSDT", 100.0, 1.0, BASE_MS)
+        aggregator.close_expired(BASE_MS + MINUTE_MS)
+
+        assert await aggregator.flush() == 0
+        assert aggregator.stats["persist_errors"] == 1
+        assert await aggregator.flush() == 1
+
+    @pytest.mark.asyncio
+    async def test_sync_persister_runs_off_event_loop(self):
+        """同期の保存処理はスレッドで実行し、コルーチン関数はそのまま await する"""
+        threads = []
+        aggregator = CandleAggregator(
+            derived_timeframes=(), persist_batch_size=100, persister=lambda batch: threads.append(threading.get_ident())
+        )
+        aggregator.add_trade("BTCUSDT", 100.0, 1.0, BASE_MS)
+        aggregator.close_expired(BASE_MS + MINUTE_MS)
+
+        assert await aggregator.flush() == 1
+        assert threads and threads[0] != threading.get_ident()
+
+        aggregator.persister = AsyncMock()
+        aggregator.add_trade("BTCUSDT", 100.0, 1.0, BASE_MS + MINUTE_MS)
+        aggregator.close_expired(BASE_MS + 2 * MINUTE_MS)
+        assert await aggregator.flush() == 1
+        aggregator.persister.assert_awaited_once()
@@ -0,0 +1,243 @@
+"""オンライン共分散・相関トラッカーのテスト"""
+
+from datetime import datetime, timedelta
+from unittest.mock import Mock
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.backend.portfolio.strategy_portfolio_manager import AdvancedPortfolioManager, TradeRecord
+from src.backend.risk.advanced_risk_manager import AdvancedRiskManager
+from src.backend.risk.correlation_tracker import (
+    STRATEGY_CORRELATION_KEY,
+    OnlineCovarianceTracker,
+    get_correlation_tracker,
+)
+from src.backend.trading.engine import Order, OrderSide, OrderType, Position
+from src.backend.trading.risk_manager import RiskManager
+
+
+@pytest.fixture
+def returns_frame():
+    """相関のある3系列（一部欠測あり）"""
+    rng = np.random.default_rng(0)
+    values = rng.normal(0.0, 0.02, size=(300, 3))
+    values[:, 1] += 0.8 * values[:, 0]
+    frame = pd.DataFrame(values, columns=["BTC", "ETH", "SOL"])
+    frame.iloc[5:20, 2] = np.nan
+    return frame
+
+
+def feed(tracker, frame):
+    for row in frame.to_dict("records"):
+        tracker.update(row)
+
+
+class TestOnlineCovarianceTracker:
+    """OnlineCovarianceTrackerのテスト"""
+
+    def test_matches_pandas_pairwise(self, returns_frame):
+        """全期間の Welford 推定が pandas の pairwise 計算と一致する"""
+        tracker = OnlineCovarianceTracker(min_observations=2)
+        feed(tracker, returns_frame)
+
+        np.testing.assert_allclose(tracker.correlation().to_numpy(), returns_frame.corr().to_numpy(), atol=1e-12)
+        np.testing.assert_allclose(tracker.covariance().to_numpy(), returns_frame.cov().to_numpy(), atol=1e-12)
+
+    def test_rolling_window(self, returns_frame):
+        """ローリング窓では直近 window 件だけを反映する"""
+        tracker = OnlineCovarianceTracker(window=100, min_observations=2)
+        feed(tracker, returns_frame.iloc[:150])
+
+        expected = returns_frame.iloc[50:150]
+        np.testing.assert_allclose(tracker.covariance().to_numpy(), expected.cov().to_numpy(), atol=1e-12)
+        assert tracker.stats["evictions"] == 50
+
+    def test_reads_are_cached_until_update(self, returns_frame):
+        """更新がなければ同じ行列を返す"""
+        tracker = OnlineCovarianceTracker(min_observations=2)
+        feed(tracker, returns_frame.iloc[:50])
+
+        first = tracker.correlation()
+        assert tracker.correlation() is first
+        assert tracker.stats["cache_hits"] == 1
+
+        tracker.update({"BTC": 0.01, "ETH": 0.012, "SOL": -0.004})
+        assert tracker.correlation() is not first
+
+    def test_min_observations_and_shrinkage(self, returns_frame):
+        """観測不足のペアは NaN、縮小は非対角成分だけに効く"""
+        tracker = OnlineCovarianceTracker(min_observations=30)
+        feed(tracker, returns_frame.iloc[:25])
+        assert tracker.pair_correlation("BTC", "ETH") is None
+        assert tracker.correlation_matrix().empty
+
+        feed(tracker, returns_frame.iloc[25:])
+        raw = tracker.correlation()
+        shrunk = tracker.correlation(shrinkage=0.5)
+        assert shrunk.loc["BTC", "BTC"] == 1.0
+        assert shrunk.loc["BTC", "ETH"] == pytest.approx(raw.loc["BTC", "ETH"] * 0.5)
+        assert tracker.pair_correlation("BTC", "ETH") == pytest.approx(raw.loc["BTC", "ETH"])
+
+    def test_ewma_tracks_recent_regime(self):
+        """EWMA は直近の相関の変化に追従する"""
+        rng = np.random.default_rng(1)
+        tracker = OnlineCovarianceTracker(method="ewma", halflife=10, min_observations=2)
+        for _ in range(200):
+            x = rng.normal()
+            tracker.update({"a": x, "b": -x + rng.normal(0, 0.1)})
+        assert tracker.pair_correlation("a", "b") < -0.9
+
+        for _ in range(200):
+            x = rng.normal()
+            tracker.update({"a": x, "b": x + rng.normal(0, 0.1)})
+        assert tracker.pair_correlation("a", "b") > 0.9
+
+    def test_observe_aligns_series(self):
+        """系列ごとに届く値を n 番目同士で整列させる"""
+        tracker = OnlineCovarianceTracker(min_observations=2)
+        for value in [1.0, 2.0, 3.0, 4.0]:
+            tracker.observe("a", value)
+        assert len(tracker) == 0
+
+        for value in [2.0, 4.0, 6.0, 8.0]:
+            tracker.observe("b", value)
+        assert len(tracker) == 4
+        assert tracker.pair_correlation("a", "b") == pytest.approx(1.0)
+
+        tracker.remove("b")
+        assert tracker.names == ["a"]
+
+
+class TestCorrelationConsumers:
+    """相関トラッカーを参照するコンポーネントのテスト"""
+
+    def test_advanced_risk_manager_uses_tracker(self, returns_frame):
+        """戦略リターンの逐次更新が相関行列・リスクメトリクスに反映される"""
+        risk_manager = AdvancedRiskManager({})
+        for row in returns_frame.to_dict("records"):
+            risk_manager.correlation_tracker.update(row)
+            risk_manager.update_portfolio_returns(row["BTC"])
+
+        correlation_matrix = risk_manager.calculate_correlation_matrix()
+        expected = returns_frame.iloc[-126:].corr()
+        assert correlation_matrix.loc["BTC", "ETH"] == pytest.approx(expected.loc["BTC", "ETH"])
+
+        metrics = risk_manager.calculate_streaming_risk_metrics({"BTC": 0.6, "ETH": 0.4})
+        assert metrics.correlation_risk == pytest.approx(expected.abs().where(~np.eye(3, dtype=bool)).max().max())
+
+    def test_risk_manager_correlation_limit(self):
+        """実測相関があるペアはクォート通貨に関係なく相関で判定する"""
+        tracker = OnlineCovarianceTracker(min_observations=2)
+        rng = np.random.default_rng(2)
+        for _ in range(50):
+            x = rng.normal()
+            tracker.update({"BTCUSDT": x, "ETHUSDT": x, "SOLUSDT": x, "XRPUSDT": x, "ADAUSDT": rng.normal()})
+
+        risk_manager = RiskManager(correlation_tracker=tracker)
+        positions = {
+            symbol: Position(symbol=symbol, side=OrderSide.BUY, amount=1.0, entry_price=100.0, current_price=100.0)
+            for symbol in ["ETHUSDT", "SOLUSDT", "XRPUSDT", "DOGEUSDT"]
+        }
+        order = Order(
+            id="o1", symbol="BTCUSDT", side=OrderSide.BUY, order_type=OrderType.MARKET, amount=0.1, price=100.0
+        )
+
+        # 相関の高い3銘柄 + 観測のない同一市場1銘柄 = 4 > 3
+        assert not risk_manager._check_correlation_limit(order, positions)
+
+        # 観測のない銘柄を無相関の銘柄に入れ替えると 3 件になり許可される
+        del positions["DOGEUSDT"]
+        positions["ADAUSDT"] = Position(
+            symbol="ADAUSDT", side=OrderSide.BUY, amount=1.0, entry_price=1.0, current_price=1.0
+        )
+        assert risk_manager._check_correlation_limit(order, positions)
+
+    def test_portfolio_manager_syncs_incrementally(self, mock_strategies):
+        """trade_history の追加分だけが相関トラッカーに取り込まれる"""
+        manager = AdvancedPortfolioManager(correlation_tracker=OnlineCovarianceTracker(min_observations=2))
+        for strategy in mock_strategies:
+            manager.add_strategy(strategy, 0.3)
+
+        rng = np.random.default_rng(3)
+        now = datetime.now()
+
+        def trade(name, pnl, i):
+            return TradeRecord(
+                strategy_name=name,
+                symbol="BTCUSDT",
+                action="exit_long",
+                quantity=0.1,
+                price=45000,
+                timestamp=now - timedelta(hours=i),
+                signal_strength=0.5,
+                pnl=pnl,
+            )
+
+        for i in range(10):
+            pnl = rng.normal(100, 50)
+            manager.trade_history.append(trade("S1", pnl, i))
+            manager.trade_history.append(trade("S2", pnl * 2 + 1, i))
+
+        matrix = manager.get_strategy_correlation_matrix()
+        assert matrix.loc["S1", "S2"] == pytest.approx(1.0)
+        assert len(manager.correlation_tracker) == 10
+
+        manager.trade_history.append(trade("S1", 50.0, 11))
+        manager.trade_history.append(trade("S2", -500.0, 11))
+        manager.get_strategy_correlation_matrix()
+        assert len(manager.correlation_tracker) == 11
+
+    def test_portfolio_manager_feeds_shared_tracker(self, mock_strategies):
+        """既定では共有トラッカーを使い、record_trade の時点で戦略損益を取り込む"""
+        shared = get_correlation_tracker(STRATEGY_CORRELATION_KEY)
+        # 他のテストで作られたマネージャーの系列を外す（残っていると observe() の整列が揃わない）
+        for name in shared.names:
+            shared.remove(name)
+        manager = AdvancedPortfolioManager()
+        assert manager.correlation_tracker is shared
+
+        # 観測前（len() が 0）のトラッカーも渡したものがそのまま使われる
+        empty = OnlineCovarianceTracker()
+        assert AdvancedPortfolioManager(correlation_tracker=empty).correlation_tracker is empty
+        assert AdvancedRiskManager({}, correlation_tracker=empty).correlation_tracker is empty
+
+        for strategy in mock_strategies:
+            manager.add_strategy(strategy, 0.3)
+
+        updates = len(shared)
+        now = datetime.now()
+        for name, pnl in [("S1", 10.0), ("S2", 20.0)]:
+            manager.record_trade(
+                TradeRecord(
+                    strategy_name=name,
+                    symbol="BTCUSDT",
+                    action="exit_long",
+                    quantity=0.1,
+                    price=45000,
+                    timestamp=now,
+                    signal_strength=0.5,
+                    pnl=pnl,
+                )
+            )
+        assert len(shared) == updates + 1
+
+        # 別のマネージャーを作っても共有トラッカーの系列は消えない
+        AdvancedPortfolioManager().get_strategy_correlation_matrix()
+        assert {"S1", "S2"} <= set(shared.names)
+
+        for strategy in mock_strategies:
+            manager.remove_strategy(strategy.name)
+        assert not {"S1", "S2"} & set(shared.names)
+
+
+@pytest.fixture
+def mock_strategies():
+    """名前だけを持つ戦略のモック"""
+    strategies = []
+    for name in ["S1", "S2"]:
+        strategy = Mock()
+        strategy.name = name
+        strategies.append(strategy)
+    return strategies
@@ -0,0 +1,208 @@
+"""保存済み価格からの共分散推定サービスのテスト"""
+
+from dataclasses import asdict
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.backend.data_pipeline.resampler import OHLCVResampler
+from src.backend.exchanges.base import OHLCV
+from src.backend.portfolio.covariance import (
+    EWMA,
+    LEDOIT_WOLF,
+    SAMPLE,
+    CovarianceService,
+    ledoit_wolf_covariance,
+    store_symbol,
+)
+from src.backend.portfolio.manager import Asset, AssetType, PortfolioManager
+from src.backend.portfolio.strategy_portfolio_manager import AdvancedPortfolioManager
+from src.backend.strategies.base import BaseStrategy
+
+SYMBOLS = ["BTC/USDT", "ETH/USDT", "SOL/USDT"]
+
+
+def make_bars(n, seed=0):
+    """相関のある3シンボルの1時間足"""
+    rng = np.random.default_rng(seed)
+    timestamps = pd.date_range("2024-01-01", periods=n, freq="1h", tz="UTC")
+    market = rng.normal(0, 0.01, n)
+    bars = {}
+    for i, symbol in enumerate(SYMBOLS):
+        closes = 100.0 * (i + 1) * np.cumprod(1 + market * (0.5 + 0.5 * i) + rng.normal(0, 0.005, n))
+        bars[symbol] = [OHLCV(ts.to_pydatetime(), c, c, c, c, 1.0) for ts, c in zip(timestamps, closes)]
+    return bars
+
+
+def write_parquet(data_dir, bars):
+    parquet_dir = data_dir / "parquet"
+    parquet_dir.mkdir(parents=True, exist_ok=True)
+    for symbol, symbol_bars in bars.items():
+        df = pd.DataFrame([asdict(bar) for bar in symbol_bars])
+        df.to_parquet(parquet_dir / f"{symbol.replace('/', '_')}_1h.parquet", index=False)
+
+
+def make_resampler(bars):
+    """1時間足を基本足として保持するリサンプラー"""
+    resampler = OHLCVResampler(base_timeframe="1h")
+    for symbol, symbol_bars in bars.items():
+        resampler.add_base_bars(symbol, symbol_bars)
+    return resampler
+
+
+def aligned_returns(bars, window):
+    closes = pd.concat(
+        [pd.Series([bar.close for bar in b], index=[bar.timestamp for bar in b], name=s) for s, b in bars.items()],
+        axis=1,
+        join="inner",
+    )
+    return closes[sorted(bars)].pct_change().iloc[1:].to_numpy()[-window:]
+
+
+def test_ledoit_wolf_shrinkage_intensity():
+    """真の共分散が σ²I なら強く縮小し、観測が十分な相関データではほとんど縮小しない"""
+    rng = np.random.default_rng(1)
+    covariance, shrinkage = ledoit_wolf_covariance(rng.normal(0, 0.01, size=(20, 30)))
+    assert shrinkage > 0.8
+    assert np.linalg.eigvalsh(covariance).min() > 0
+
+    factor = rng.normal(0, 0.02, size=(2000, 1))
+    _, shrinkage = ledoit_wolf_covariance(factor + rng.normal(0, 0.002, size=(2000, 5)))
+    assert shrinkage < 0.05
+
+
+class TestCovarianceService:
+    """CovarianceServiceのテスト"""
+
+    def test_loads_aligned_returns_from_parquet(self, tmp_path):
+        """保存済みの足を内部結合で整列し、窓内の標本共分散を返す"""
+        pytest.importorskip("pyarrow")
+        bars = make_bars(80)
+        del bars["ETH/USDT"][40]
+        write_parquet(tmp_path, bars)
+        service = CovarianceService(data_dir=tmp_path, min_observations=10)
+
+        estimate = service.get_covariance(SYMBOLS, "1h", window=50, method=SAMPLE)
+
+        assert estimate.symbols == sorted(SYMBOLS)
+        assert estimate.observations == 50
+        assert estimate.as_of == pd.Timestamp(bars["BTC/USDT"][-1].timestamp)
+        np.testing.assert_allclose(estimate.matrix, np.cov(aligned_returns(bars, 50), rowvar=False), rtol=1e-10)
+        assert estimate.to_frame(annualize=True).loc["BTC/USDT", "BTC/USDT"] == pytest.approx(
+            estimate.matrix[0, 0] * 365 * 24
+        )
+
+    def test_incremental_updates_match_fresh_load(self, tmp_path):
+        """確定足の差分更新が、全期間を読み込み直した推定と一致する"""
+        bars = make_bars(150, seed=2)
+        initial = make_resampler({symbol: b[:60] for symbol, b in bars.items()})
+
+        service = CovarianceService(data_dir=tmp_path, resampler=initial, min_observations=10, ewma_halflife=10)
+        for method in (SAMPLE, EWMA, LEDOIT_WOLF):
+            service.get_covariance(SYMBOLS, "1h", window=40, method=method)
+
+        for i in range(60, 150):
+            # シンボルごとに届く順序が前後しても同じ時刻の足が揃ってから反映する
+            for symbol in reversed(SYMBOLS) if i % 2 else SYMBOLS:
+                service.update_from_results({symbol: {"1h": [bars[symbol][i]]}})
+
+        fresh = CovarianceService(
+            data_dir=tmp_path, resampler=make_resampler(bars), min_observations=10, ewma_halflife=10
+        )
+        returns = aligned_returns(bars, 40)
+        weights = 0.5 ** (np.arange(39, -1, -1) / 10)
+        expected = {
+            SAMPLE: np.cov(returns, rowvar=False),
+            EWMA: (returns * weights[:, None]).T @ returns / weights.sum(),
+            LEDOIT_WOLF: ledoit_wolf_covariance(returns)[0],
+        }
+        for method, matrix in expected.items():
+            incremental = service.get_covariance(SYMBOLS, "1h", window=40, method=method)
+            np.testing.assert_allclose(incremental.matrix, matrix, rtol=1e-8, atol=1e-14)
+            np.testing.assert_allclose(
+                fresh.get_covariance(SYMBOLS, "1h", window=40, method=method).matrix, matrix, rtol=1e-10
+            )
+        assert service.stats["loads"] == 1
+
+    def test_cache_and_errors(self, tmp_path):
+        service = CovarianceService(data_dir=tmp_path, resampler=make_resampler(make_bars(30)), min_observations=10)
+
+        first = service.get_covariance(SYMBOLS, "1h", window=20)
+        assert service.get_covariance(reversed(SYMBOLS), "1h", window=20) is first
+        assert service.stats["cache_hits"] == 1
+
+        with pytest.raises(ValueError):
+            service.get_covariance(SYMBOLS, "1h", window=20, method="shrunk")
+        with pytest.raises(ValueError):
+            service.get_covariance(SYMBOLS + ["DOGE/USDT"], "1h", window=20)
+
+    def test_covariance_frame_keeps_caller_names(self, tmp_path):
+        """資産名・取引所シンボルをストアのシンボルに変換し、呼び出し側の名前で年率換算の共分散を返す"""
+        assert [store_symbol(name) for name in ("BTC", "ethusdt", "SOL/USDT")] == SYMBOLS
+        service = CovarianceService(data_dir=tmp_path, resampler=make_resampler(make_bars(30)), min_observations=10)
+
+        frame = service.get_covariance_frame(["SOLUSDT", "BTC"], "1h", window=20)
+        estimate = service.get_covariance(SYMBOLS[::2], "1h", window=20)
+
+        assert list(frame.index) == list(frame.columns) == ["SOLUSDT", "BTC"]
+        assert frame.loc["SOLUSDT", "BTC"] == pytest.approx(
+            estimate.to_frame(annualize=True).loc["SOL/USDT", "BTC/USDT"]
+        )
+
+
+def test_risk_assessment_uses_covariance():
+    """共分散を渡すとポートフォリオのボラティリティでボラティリティリスクを評価する"""
+    manager = PortfolioManager()
+    portfolio = manager.create_portfolio("Test Portfolio")
+    portfolio.add_asset(Asset("BTC", AssetType.CRYPTO, current_price=100.0, balance=6.0))
+    portfolio.add_asset(Asset("USDT", AssetType.STABLE, current_price=1.0, balance=400.0))
+    covariance = pd.DataFrame([[0.16, 0.0], [0.0, 0.0]], index=["BTC", "USDT"], columns=["BTC", "USDT"])
+
+    assessment = manager.get_risk_assessment("Test Portfolio", covariance)
+
+    assert assessment["portfolio_volatility"] == pytest.approx(0.6 * 0.4)
+    assert assessment["volatility_risk"] == 0.5
+    assert "portfolio_volatility" not in manager.get_risk_assessment("Test Portfolio")
+
+
+class HoldStrategy(BaseStrategy):
+    """シグナルを出さないテスト用戦略"""
+
+    def calculate_indicators(self, data):
+        return data
+
+    def generate_signals(self, data):
+        return []
+
+
+def test_suggestions_use_stored_covariance(tmp_path):
+    """最適化提案のリスク評価・戦略ポートフォリオの最適化は保存済み価格の共分散を使う"""
+    service = CovarianceService(data_dir=tmp_path, resampler=make_resampler(make_bars(100)), min_observations=10)
+
+    manager = PortfolioManager(covariance_service=service)
+    manager.risk_settings["max_volatility"] = 0.01
+    portfolio = manager.create_portfolio("Test Portfolio")
+    # 暗号資産の比率（50%）だけでは低ボラティリティと評価される配分
+    for symbol, balance in (("BTC", 1.0), ("ETH", 1.0), ("SOL", 1.0), ("USDT", 3.0)):
+        portfolio.add_asset(Asset(symbol, manager._get_asset_type(symbol), current_price=1.0, balance=balance))
+    covariance = manager._estimate_covariance(portfolio)
+    assert list(covariance.index) == ["BTC", "ETH", "SOL"]
+    assert manager.get_risk_assessment("Test Portfolio", covariance)["volatility_risk"] == 1.0
+    assert manager.get_optimization_suggestions("Test Portfolio")[0]["type"] == "risk_reduction"
+
+    advanced = AdvancedPortfolioManager(covariance_service=service)
+    advanced.risk_settings["max_volatility"] = 0.01
+    advanced.add_strategy(HoldStrategy("BTC", "BTCUSDT", "1h"), 0.3)
+    advanced.add_strategy(HoldStrategy("ETH", "ETHUSDT", "1h"), 0.3)
+    optimization = advanced.optimize_portfolio()
+    frame = service.get_covariance_frame(["BTCUSDT", "ETHUSDT"], "1h", window=90)
+    # optimize_portfolio() のリバランスで目標配分は 0.5 ずつに正規化される
+    assert optimization["portfolio_volatility"] == pytest.approx(np.sqrt(0.25 * frame.to_numpy().sum()))
+    assert "volatility_risk" in [item["type"] for item in optimization["risk_reduction"]]
+
+    # 足が足りなければ共分散なしで評価する
+    assert (
+        PortfolioManager(covariance_service=CovarianceService(data_dir=tmp_path))._estimate_covariance(portfolio)
+        is None
+    )
@@ -1,13 +1,18 @@
 """データパイプライン機能の単体テスト"""
 
-from datetime import datetime, timezone
+import asyncio
+from datetime import datetime, timedelta, timezone
 from decimal import Decimal
 from unittest.mock import AsyncMock, Mock, patch
 
+import numpy as np
+import pandas as pd
 import pytest
 
-from src.backend.data_pipeline.collector import DataCollector
-from src.backend.exchanges.base import OHLCV, TimeFrame
+from src.backend.data_pipeline.collector import DataCollector, DataCollectorManager
+from src.backend.data_pipeline.rate_limiter import TokenBucket, get_rate_limiter
+from src.backend.data_pipeline.resampler import OHLCV_AGGREGATION, OHLCVResampler, bucket_starts, resample_ohlcv
+from src.backend.exchanges.base import OHLCV, FundingRate, TimeFrame
 from src.backend.models.price_data import PriceData, PriceDataSchema
 
 
@@ -132,6 +137,231 @@ class TestDataCollector:
 
         # エラーログが出力されるが、メソッド自体は正常終了する
 
+    @pytest.mark.asyncio
+    @patch("src.backend.data_pipeline.collector.get_db")
+    async def test_collect_funding_rates_concurrent_batched(self, mock_get_db):
+        """資金調達率はレート予算内で並列取得し、1回の一括挿入で保存する"""
+        collector = DataCollector("binance", rate_limiter=TokenBucket(rate=1000, capacity=2))
+        collector.adapter = AsyncMock()
+        in_flight, peak = 0, 0
+
+        async def fetch_funding_rate(symbol):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            if symbol == "XRP/USDT":
+                raise Exception("API Error")
+            return FundingRate(datetime(2025, 1, 19, tzinfo=timezone.utc), symbol, 0.0001, None)
+
+        collector.adapter.fetch_funding_rate.side_effect = fetch_funding_rate
+
+        result = await collector.collect_funding_rates(collector.symbols)
+
+        assert peak > 1
+        assert result["XRP/USDT"] == {"error": "API Error"}
+        assert result["BTC/USDT"]["funding_rate"] == 0.0001
+
+        db = mock_get_db.return_value
+        # テーブル作成は1回、挿入は1バッチ
+        assert db.execute.call_count == 2
+        db.executemany.assert_called_once()
+        assert len(db.executemany.call_args[0][1]) == 7
+
+        metrics = collector.get_stats()["last_cycle"]["funding_rates"]
+        assert metrics["symbols"] == 8
+        assert metrics["failed"] == 1
+        assert metrics["db_rows"] == 7
+        assert collector.rate_limiter.stats["acquired"] == 8
+
+        await collector.collect_open_interest([])
+        assert db.execute.call_count == 2
+        assert collector.stats["open_interests"]["cycles"] == 1
+
+    @pytest.mark.asyncio
+    async def test_token_bucket_limits_rate(self):
+        """容量を超える取得は補充されるまで待機する"""
+        bucket = TokenBucket(rate=100, capacity=2)
+
+        waits = [await bucket.acquire() for _ in range(4)]
+
+        assert waits[:2] == [0.0, 0.0]
+        assert all(wait > 0 for wait in waits[2:])
+        assert bucket.stats["waits"] == 2
+        assert get_rate_limiter("binance") is get_rate_limiter("binance")
+
+    @pytest.mark.asyncio
+    @patch.object(DataCollector, "_save_ohlcv_to_parquet", new_callable=AsyncMock)
+    @patch("src.backend.data_pipeline.collector.get_supabase_client")
+    async def test_incremental_collection_fetches_only_new_closed_bars(self, mock_supabase, mock_parquet, tmp_path):
+        """高水位マークより新しい確定足だけを取得・保存し、マークは再起動後も引き継がれる"""
+        now = datetime(2025, 1, 19, 12, 7, tzinfo=timezone.utc)
+
+        def fetch_ohlcv(symbol, timeframe, since=None, limit=1000):
+            # since 以降、現在時刻までの15分足（最後の1本は未確定）
+            bars, timestamp = [], since
+            while timestamp <= now:
+                bars.append(OHLCV(timestamp, 100.0, 101.0, 99.0, 100.5, 1.0))
+                timestamp += timedelta(minutes=15)
+            return bars[:limit]
+
+        collector = DataCollector("binance", rate_limiter=TokenBucket(rate=1000), data_dir=tmp_path)
+        collector.adapter = AsyncMock()
+        collector.adapter.fetch_ohlcv.side_effect = fetch_ohlcv
+
+        first = await collector.collect_incremental_ohlcv(["BTC/USDT"], [TimeFrame.MINUTE_15], now=now)
+        # 初回は1日分を遡り、未確定の12:00足は保存しない
+        assert len(first["BTC/USDT"]["15m"]) == 96
+        assert first["BTC/USDT"]["15m"][-1].timestamp == datetime(2025, 1, 19, 11, 45, tzinfo=timezone.utc)
+
+        # 同じ足の中では取引所に問い合わせない
+        second = await collector.collect_incremental_ohlcv(["BTC/USDT"], [TimeFrame.MINUTE_15], now=now)
+        assert second["BTC/USDT"]["15m"] == []
+        assert collector.adapter.fetch_ohlcv.call_count == 1
+        assert collector.stats["ohlcv"]["skipped"] == 1
+
+        # 再起動後も高水位マークから再開し、新しく確定した1本だけを取得
+        restarted = DataCollector("binance", rate_limiter=TokenBucket(rate=1000), data_dir=tmp_path)
+        restarted.adapter = collector.adapter
+        now += timedelta(minutes=15)
+        third = await restarted.collect_incremental_ohlcv(["BTC/USDT"], [TimeFrame.MINUTE_15], now=now)
+        assert [bar.timestamp for bar in third["BTC/USDT"]["15m"]] == [datetime(2025, 1, 19, 12, tzinfo=timezone.utc)]
+        assert collector.adapter.fetch_ohlcv.call_args.kwargs["since"] == datetime(2025, 1, 19, 12, tzinfo=timezone.utc)
+
+        upserted = [len(call.args[0]) for call in mock_supabase.return_value.table.return_value.upsert.call_args_list]
+        assert upserted == [96, 1]
+
+    @pytest.mark.asyncio
+    async def test_manager_schedules_timeframes_on_bar_close(self):
+        """時間枠ごとに足の確定時刻で収集を予定する"""
+        manager = DataCollectorManager()
+        manager.collection_interval = 3600
+        collector = Mock(timeframes=[TimeFrame.MINUTE_15, TimeFrame.HOUR_1])
+        collector.run_scheduled_collection = AsyncMock()
+        manager.collectors["binance"] = collector
+
+        now = datetime(2025, 1, 19, 12, 7, tzinfo=timezone.utc)
+        await manager.run_due_collections(now)
+        collector.run_scheduled_collection.assert_awaited_once_with(
+            timeframes=[TimeFrame.MINUTE_15, TimeFrame.HOUR_1], include_derivatives=True
+        )
+        assert manager._seconds_until_next_run(now) == 8 * 60 + manager.bar_close_delay
+
+        # 12:15 の確定後は15分足だけを収集する
+        now = datetime(2025, 1, 19, 12, 15, 5, tzinfo=timezone.utc)
+        await manager.run_due_collections(now)
+        collector.run_scheduled_collection.assert_awaited_with(
+            timeframes=[TimeFrame.MINUTE_15], include_derivatives=False
+        )
+
+    @pytest.mark.asyncio
+    @patch.object(DataCollector, "_save_ohlcv_to_parquet", new_callable=AsyncMock)
+    @patch("src.backend.data_pipeline.collector.get_supabase_client")
+    async def test_resampled_collection_fetches_only_base_timeframe(self, mock_supabase, mock_parquet, tmp_path):
+        """取引所からは1分足だけを取得し、確定した上位足を集約して保存する"""
+        now = datetime(2025, 1, 19, 12, 30, 5, tzinfo=timezone.utc)
+
+        def fetch_ohlcv(symbol, timeframe, since=None, limit=1000):
+            bars, timestamp = [], since
+            while timestamp <= now and len(bars) < limit:
+                bars.append(OHLCV(timestamp, 100.0, 101.0, 99.0, 100.5, 1.0))
+                timestamp += timedelta(minutes=1)
+            return bars
+
+        collector = DataCollector("binance", rate_limiter=TokenBucket(rate=1000), data_dir=tmp_path)
+        collector.initial_lookback = timedelta(minutes=45)
+        collector.adapter = AsyncMock()
+        collector.adapter.fetch_ohlcv.side_effect = fetch_ohlcv
+
+        results = await collector.collect_resampled_ohlcv(
+            ["BTC/USDT"], [TimeFrame.MINUTE_15, TimeFrame.HOUR_1], now=now
+        )
+
+        assert {call.kwargs["timeframe"] for call in collector.adapter.fetch_ohlcv.call_args_list} == {
+            TimeFrame.MINUTE_1
+        }
+        assert [bar.timestamp.minute for bar in results["BTC/USDT"]["15m"]] == [45, 0, 15]
+        assert results["BTC/USDT"]["15m"][0].volume == 15.0
+        # 12:00 の1時間足はまだ確定していない
+        assert results["BTC/USDT"]["1h"] == []
+
+    @pytest.mark.asyncio
+    async def test_scheduled_collection_updates_covariance(self, tmp_path):
+        """収集した確定足を共分散推定サービスに渡す"""
+        covariance_service = Mock()
+        collector = DataCollector(
+            "binance", rate_limiter=TokenBucket(rate=1000), data_dir=tmp_path, covariance_service=covariance_service
+        )
+        results = {"BTC/USDT": {"1h": [OHLCV(datetime(2025, 1, 19, tzinfo=timezone.utc), 1.0, 1.0, 1.0, 1.0, 1.0)]}}
+        collector.collect_resampled_ohlcv = AsyncMock(return_value=results)
+
+        collected = await collector.run_scheduled_collection(include_derivatives=False)
+
+        assert collected["ohlcv"] is results
+        covariance_service.update_from_results.assert_called_once_with(results)
+
+
+class TestOHLCVResampler:
+    """1分足からのリサンプリングのテスト"""
+
+    @pytest.fixture
+    def minute_bars(self):
+        index = pd.date_range("2024-01-01", periods=60 * 24 * 8, freq="1min", tz="UTC")
+        close = 100 + np.random.default_rng(0).standard_normal(len(index)).cumsum()
+        return pd.DataFrame(
+            {"open": close - 0.5, "high": close + 1, "low": close - 1, "close": close, "volume": 1.0}, index=index
+        )
+
+    def test_exchange_aligned_buckets(self, minute_bars):
+        """任意の時間枠を取引所と同じ区切りで集約する"""
+        for timeframe, freq in [("15m", "15min"), ("2h", "2h"), ("3d", "72h")]:
+            expected = minute_bars.resample(freq, origin="epoch").agg(OHLCV_AGGREGATION)
+            pd.testing.assert_frame_equal(
+                resample_ohlcv(minute_bars, timeframe), expected, check_names=False, check_freq=False
+            )
+
+        timestamps = pd.DatetimeIndex(["2024-01-03 12:00", "2024-03-17 08:00"], tz="UTC")
+        assert list(bucket_starts(timestamps, "1w")) == [
+            pd.Timestamp("2024-01-01", tz="UTC"),
+            pd.Timestamp("2024-03-11", tz="UTC"),
+        ]
+        assert list(bucket_starts(timestamps, "1M")) == [
+            pd.Timestamp("2024-01-01", tz="UTC"),
+            pd.Timestamp("2024-03-01", tz="UTC"),
+        ]
+
+    def test_incremental_updates_match_full_resample(self, minute_bars):
+        """1分足の追加ごとに差分更新したキャッシュが一括集約と一致する"""
+        resampler = OHLCVResampler()
+        resampler.add_base_bars("BTCUSDT", minute_bars.iloc[:1000])
+        resampler.resample("BTCUSDT", "4h")
+
+        for i in range(1000, len(minute_bars), 7):
+            resampler.add_base_bars("BTCUSDT", minute_bars.iloc[i : i + 7])
+
+        pd.testing.assert_frame_equal(
+            resampler.resample("BTCUSDT", "4h", include_partial=True),
+            resample_ohlcv(minute_bars, "4h"),
+        )
+        assert resampler.stats["cache_misses"] == 1
+        assert resampler.stats["incremental_updates"] > 0
+
+        # 形成中の足は除外する
+        resampler.add_base_bars("BTCUSDT", minute_bars.iloc[-1:].shift(1, freq="1min"))
+        assert resampler.resample("BTCUSDT", "4h").index[-1] == minute_bars.index[-1].floor("4h")
+        assert resampler.to_ohlcv("BTCUSDT", "1d")[-1].volume == 1440.0
+
+    def test_trimmed_base_bars_drop_partial_leading_bucket(self, minute_bars):
+        """保持上限で古い基本足を捨てたら、基本足が欠けた先頭の足は確定足に含めない"""
+        resampler = OHLCVResampler(max_base_bars=90)
+        resampler.add_base_bars("X", minute_bars.iloc[:120])
+
+        bars = resampler.resample("X", "1h")
+
+        assert list(bars.index) == [minute_bars.index[60]]
+        assert bars["volume"].iloc[0] == 60.0
+
 
 class TestPriceDataModel:
     """PriceDataモデルのテスト"""
@@ -0,0 +1,304 @@
+"""データベースサービス（同期・非同期セッション）のテスト"""
+
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from unittest.mock import MagicMock
+from uuid import uuid4
+
+import pandas as pd
+import pytest
+
+from src.backend.backtesting.engine import BacktestEngine
+from src.backend.core.supabase_db import batch_write
+from src.backend.database.models import DatabaseManager, OrderModel, to_async_database_url
+from src.backend.database.paper_wallet_service import PaperWalletService
+from src.backend.database.services import DatabaseServiceFactory
+from src.backend.trading.orders.models import Order, OrderSide, OrderType
+
+
+def make_order(symbol: str = "BTC/USDT") -> Order:
+    return Order(
+        exchange="binance",
+        symbol=symbol,
+        order_type=OrderType.LIMIT,
+        side=OrderSide.BUY,
+        amount=Decimal("0.5"),
+        price=Decimal("50000"),
+    )
+
+
+class TestDatabaseManager:
+    """DatabaseManagerのテスト"""
+
+    def setup_method(self):
+        self.temp_db = tempfile.NamedTemporaryFile(delete=False, suffix=".db")
+        self.temp_db.close()
+        self.db_manager = DatabaseManager(f"sqlite:///{self.temp_db.name}")
+        self.db_manager.create_tables()
+
+    def teardown_method(self):
+        self.db_manager.dispose()
+        try:
+            os.unlink(self.temp_db.name)
+        except Exception:
+            pass
+
+    def test_async_url_conversion(self):
+        """同期ドライバURLを非同期ドライバURLに変換する"""
+        assert to_async_database_url("sqlite:///tmp/a.db") == "sqlite+aiosqlite:///tmp/a.db"
+        assert to_async_database_url("postgresql://u:p@h/db") == "postgresql+asyncpg://u:p@h/db"
+        assert to_async_database_url("postgresql+psycopg2://u:p@h/db") == "postgresql+asyncpg://u:p@h/db"
+        assert to_async_database_url("mysql://u:p@h/db") == "mysql://u:p@h/db"
+
+    def test_session_scope_rolls_back_on_error(self):
+        """作業単位の途中で例外が起きた場合はロールバックされる"""
+        user_id = uuid4()
+        with pytest.raises(RuntimeError):
+            with self.db_manager.session_scope() as session:
+                session.add(
+                    OrderModel(
+                        user_id=user_id,
+                        exchange="binance",
+                        symbol="BTC/USDT",
+                        order_type="market",
+                        side="buy",
+                        quantity=1,
+                    )
+                )
+                session.flush()
+                raise RuntimeError("boom")
+
+        with self.db_manager.session_scope() as session:
+            assert session.query(OrderModel).count() == 0
+
+
+class TestDatabaseServices:
+    """注文・取引・分析サービスのテスト"""
+
+    def setup_method(self):
+        self.temp_db = tempfile.NamedTemporaryFile(delete=False, suffix=".db")
+        self.temp_db.close()
+        self.factory = DatabaseServiceFactory(f"sqlite:///{self.temp_db.name}")
+        self.factory.initialize_database()
+        self.user_id = uuid4()
+
+    def teardown_method(self):
+        self.factory.db_manager.dispose()
+        try:
+            os.unlink(self.temp_db.name)
+        except Exception:
+            pass
+
+    def test_sync_services_round_trip(self):
+        """同期版で注文・取引を保存して集計できる"""
+        order_service = self.factory.get_order_service()
+        trade_service = self.factory.get_trade_service()
+
+        order_id = order_service.create_order(make_order(), self.user_id, "strategy-1")
+        assert order_service.update_order(order_id, status="submitted", metadata={"note": "x"})
+        assert order_service.get_order(order_id)["metadata"] == {"note": "x"}
+        assert [order["id"] for order in order_service.get_active_orders(user_id=self.user_id)] == [order_id]
+
+        trade_service.create_trade(
+            order_id,
+            self.user_id,
+            "strategy-1",
+            "binance",
+            "BTC/USDT",
+            "buy",
+            Decimal("0.5"),
+            Decimal("50000"),
+            fee_amount=Decimal("1"),
+        )
+        positions = trade_service.get_position_summary(self.user_id)
+        assert positions[0]["net_quantity"] == pytest.approx(0.5)
+
+        performance = self.factory.get_analytics_service().get_trading_performance(self.user_id)
+        assert performance["total_trades"] == 1
+        assert performance["buy_count"] == 1
+        assert performance["total_pnl"] == pytest.approx(-25001.0)
+
+    @pytest.mark.asyncio
+    async def test_async_services_match_sync(self):
+        """非同期版は非同期エンジン経由で同期版と同じ結果を返す"""
+        order_service = self.factory.get_order_service()
+        trade_service = self.factory.get_trade_service()
+        analytics_service = self.factory.get_analytics_service()
+
+        order_id = await order_service.create_order_async(make_order(), self.user_id, "strategy-1")
+        assert await order_service.update_order_async(order_id, status="submitted")
+        assert (await order_service.get_order_async(order_id))["status"] == "submitted"
+
+        await trade_service.create_trade_async(
+            order_id, self.user_id, "strategy-1", "binance", "BTC/USDT", "buy", Decimal("0.5"), Decimal("50000")
+        )
+        trades = await trade_service.get_trades_async(user_id=self.user_id)
+        assert len(trades) == 1
+        assert trades == trade_service.get_trades(user_id=self.user_id)
+
+        assert await analytics_service.get_trading_performance_async(
+            self.user_id
+        ) == analytics_service.get_trading_performance(self.user_id)
+        risk = await analytics_service.get_risk_metrics_async(self.user_id)
+        assert risk["max_concentration"] == pytest.approx(1.0)
+
+        assert await order_service.get_active_orders_async(user_id=self.user_id) == order_service.get_active_orders(
+            user_id=self.user_id
+        )
+        await self.factory.close()
+
+    def test_bulk_create_returns_ids_in_input_order(self):
+        """一括保存は分割挿入し、入力順のIDを返す"""
+        order_service = self.factory.get_order_service()
+        trade_service = self.factory.get_trade_service()
+
+        orders = [make_order(symbol) for symbol in ("BTC/USDT", "ETH/USDT", "SOL/USDT")]
+        order_ids = order_service.create_orders(orders, self.user_id, "strategy-1", batch_size=2)
+        assert [order_service.get_order(order_id)["symbol"] for order_id in order_ids] == [
+            "BTC/USDT",
+            "ETH/USDT",
+            "SOL/USDT",
+        ]
+
+        executed_at = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        trade_ids = trade_service.create_trades(
+            [
+                {
+                    "order_id": order_id,
+                    "user_id": self.user_id,
+                    "strategy_id": "strategy-1",
+                    "exchange": "binance",
+                    "symbol": order.symbol,
+                    "side": "buy",
+                    "quantity": Decimal("0.5"),
+                    "price": Decimal(str(100 + i)),
+                    "executed_at": executed_at,
+                }
+                for i, (order_id, order) in enumerate(zip(order_ids, orders))
+            ],
+            batch_size=2,
+        )
+        trades = {trade["id"]: trade for trade in trade_service.get_trades(user_id=self.user_id)}
+        assert [trades[trade_id]["price"] for trade_id in trade_ids] == [100.0, 101.0, 102.0]
+        assert trades[trade_ids[0]]["executed_at"].startswith("2024-01-01")
+
+    @pytest.mark.asyncio
+    async def test_bulk_create_async(self):
+        """一括保存（非同期版）"""
+        order_service = self.factory.get_order_service()
+        order_ids = await order_service.create_orders_async([make_order(), make_order()], self.user_id)
+
+        assert len(order_ids) == 2
+        assert len(await order_service.get_orders_async(user_id=self.user_id)) == 2
+        await self.factory.close()
+
+    def test_keyset_pagination_walks_all_pages(self):
+        """カーソルで同時刻の取引を含む全件を重複・欠落なく辿れる"""
+        order_service = self.factory.get_order_service()
+        trade_service = self.factory.get_trade_service()
+        order_id = order_service.create_order(make_order(), self.user_id)
+
+        base = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        trade_ids = trade_service.create_trades(
+            [
+                {
+                    "order_id": order_id,
+                    "user_id": self.user_id,
+                    "strategy_id": "strategy-1",
+                    "exchange": "binance",
+                    "symbol": "BTC/USDT",
+                    "side": "buy",
+                    "quantity": Decimal("0.1"),
+                    "price": Decimal("100"),
+                    # 2件ずつ同じ約定時刻にする
+                    "executed_at": base + timedelta(minutes=i // 2),
+                }
+                for i in range(7)
+            ]
+        )
+
+        seen, cursor, pages = [], None, 0
+        while True:
+            page = trade_service.get_trades_page(user_id=self.user_id, limit=3, cursor=cursor)
+            seen.extend(trade["id"] for trade in page["items"])
+            pages += 1
+            if not page["has_more"]:
+                break
+            cursor = page["next_cursor"]
+
+        assert pages == 3
+        assert sorted(seen) == sorted(trade_ids)
+        assert len(set(seen)) == 7
+        assert seen == [trade["id"] for trade in trade_service.get_trades(user_id=self.user_id)]
+
+        orders_page = order_service.get_orders_page(user_id=self.user_id, limit=1)
+        assert orders_page["items"][0]["id"] == order_id
+        assert orders_page["next_cursor"] is None
+
+        with pytest.raises(ValueError):
+            trade_service.get_trades_page(user_id=self.user_id, cursor="not-a-cursor")
+
+    @pytest.mark.asyncio
+    async def test_keyset_pagination_async(self):
+        """カーソル方式の取得（非同期版）"""
+        order_service = self.factory.get_order_service()
+        order_ids = order_service.create_orders([make_order() for _ in range(3)], self.user_id)
+
+        first = await order_service.get_orders_page_async(user_id=self.user_id, limit=2)
+        second = await order_service.get_orders_page_async(user_id=self.user_id, limit=2, cursor=first["next_cursor"])
+
+        assert sorted(item["id"] for item in first["items"] + second["items"]) == sorted(order_ids)
+        assert not second["has_more"]
+        await self.factory.close()
+
+    @pytest.mark.asyncio
+    async def test_paper_wallet_async_methods(self):
+        """Paper Tradingウォレットの非同期版"""
+        wallet_service = PaperWalletService(self.factory.db_manager)
+        assert wallet_service.initialize_user_wallet(self.user_id, "beginner")
+
+        assert await wallet_service.lock_balance_async(self.user_id, "USDT", Decimal("100"), "order-1")
+        balance = await wallet_service.get_asset_balance_async(self.user_id, "USDT")
+        assert balance["locked"] == pytest.approx(100.0)
+
+        history = await wallet_service.get_transaction_history_async(self.user_id, transaction_type="lock")
+        assert len(history) == 1
+        await self.factory.close()
+
+
+class TestSupabaseBatchWrite:
+    """Supabase一括書き込みのテスト"""
+
+    def test_batch_write_chunks_and_upserts(self):
+        """batch_size 件ずつ分割し、on_conflict 指定時はupsertする"""
+        client = MagicMock()
+        table = client.table.return_value
+        table.upsert.return_value.execute.side_effect = lambda: MagicMock(data=[{"id": 1}])
+
+        records = [{"value": i} for i in range(5)]
+        written = batch_write(client, "price_data", records, batch_size=2, on_conflict="value")
+
+        assert [len(call.args[0]) for call in table.upsert.call_args_list] == [2, 2, 1]
+        assert len(written) == 3
+        table.insert.assert_not_called()
+
+        batch_write(client, "price_data", records, batch_size=5, returning=False)
+        assert table.insert.call_args.kwargs["returning"] == "minimal"
+
+    def test_equity_curve_records(self):
+        """資産曲線のレコード変換"""
+        equity_curve = pd.DataFrame(
+            {"timestamp": pd.date_range("2024-01-01", periods=2, freq="h", tz="UTC"), "equity": [100, 101]}
+        )
+
+        records = BacktestEngine._equity_curve_records("bt-1", equity_curve)
+
+        assert records[1] == {
+            "backtest_id": "bt-1",
+            "timestamp": "2024-01-01T01:00:00+00:00",
+            "equity": 101.0,
+            "cash": 0.0,
+            "unrealized_pnl": 0.0,
+        }
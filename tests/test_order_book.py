@@ -0,0 +1,180 @@
+"""ローカル板情報（L2）管理のテスト"""
+
+import asyncio
+from decimal import Decimal
+from unittest.mock import AsyncMock, Mock
+from uuid import uuid4
+
+import pytest
+
+from src.backend.exchanges.binance import BinanceAdapter
+from src.backend.exchanges.factory import ExchangeFactory
+from src.backend.streaming.order_book import (
+    LocalOrderBook,
+    OrderBookManager,
+    OrderBookSequenceError,
+    get_order_book_manager,
+)
+from src.backend.trading.orders.models import Order, OrderSide, OrderType
+from src.backend.trading.orders.validator import OrderValidator
+
+
+def make_snapshot(last_update_id=100):
+    return {
+        "lastUpdateId": last_update_id,
+        "bids": [["100.0", "1.0"], ["99.0", "2.0"], ["98.0", "3.0"]],
+        "asks": [["101.0", "1.5"], ["102.0", "2.5"], ["103.0", "4.0"]],
+    }
+
+
+def make_event(first_id, final_id, bids=None, asks=None, symbol="BTCUSDT"):
+    return {"e": "depthUpdate", "s": symbol, "U": first_id, "u": final_id, "b": bids or [], "a": asks or []}
+
+
+class TestLocalOrderBook:
+    """LocalOrderBookのテスト"""
+
+    @pytest.fixture
+    def book(self):
+        book = LocalOrderBook("BTCUSDT")
+        snapshot = make_snapshot()
+        book.apply_snapshot(snapshot["lastUpdateId"], snapshot["bids"], snapshot["asks"])
+        return book
+
+    def test_best_prices_and_spread(self, book):
+        """最良気配・仲値・スプレッド"""
+        assert book.best_bid() == (100.0, 1.0)
+        assert book.best_ask() == (101.0, 1.5)
+        assert book.mid_price() == 100.5
+        assert book.spread() == 1.0
+
+    def test_apply_diff_updates_levels(self, book):
+        """差分更新で価格レベルが追加・更新・削除される"""
+        assert book.apply_diff(101, 102, bids=[["100.5", "0.7"], ["100.0", "0"]], asks=[["101.0", "3.0"]])
+
+        assert book.best_bid() == (100.5, 0.7)
+        assert book.bids.levels(2) == [[100.5, 0.7], [99.0, 2.0]]
+        assert book.best_ask() == (101.0, 3.0)
+        assert book.last_update_id == 102
+
+    def test_stale_diff_is_ignored(self, book):
+        """スナップショットより古い差分は破棄される"""
+        assert book.apply_diff(90, 100, bids=[["150.0", "1.0"]]) is False
+        assert book.best_bid() == (100.0, 1.0)
+
+    def test_sequence_gap_raises(self, book):
+        """更新IDの欠落を検出する"""
+        with pytest.raises(OrderBookSequenceError):
+            book.apply_diff(105, 106)
+        assert book.is_synced is False
+
+    def test_depth_and_vwap(self, book):
+        """深さとVWAP"""
+        assert book.get_depth("bid", 2) == pytest.approx(3.0)
+        assert book.get_depth("ask", 10) == pytest.approx(8.0)
+
+        vwap, filled = book.vwap("buy", 3.0)
+        assert filled == pytest.approx(3.0)
+        assert vwap == pytest.approx((1.5 * 101.0 + 1.5 * 102.0) / 3.0)
+
+        # 板の厚みを超える数量は約定可能分のみ
+        _, filled = book.vwap("sell", 10.0)
+        assert filled == pytest.approx(6.0)
+
+        assert book.estimate_slippage("buy", 1.0) == 0.0
+        assert book.estimate_slippage("buy", 3.0) > 0
+
+
+class TestOrderBookManager:
+    """OrderBookManagerのテスト"""
+
+    @pytest.mark.asyncio
+    async def test_buffered_events_are_replayed_after_snapshot(self):
+        """スナップショット取得前の差分はバッファされ、取得後に再生される"""
+        fetcher = AsyncMock(return_value=make_snapshot(100))
+        manager = OrderBookManager(snapshot_fetcher=fetcher)
+
+        await manager.handle_depth_event(make_event(95, 99, bids=[["150.0", "1.0"]]))
+        await manager.handle_depth_event(make_event(100, 101, asks=[["100.8", "0.5"]]))
+        assert manager.get_book("BTCUSDT") is None
+
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+
+        book = manager.get_book("BTC/USDT")
+        assert book is not None
+        assert book.best_bid() == (100.0, 1.0)
+        assert book.best_ask() == (100.8, 0.5)
+        fetcher.assert_awaited_once_with("BTCUSDT", manager.snapshot_limit)
+
+    @pytest.mark.asyncio
+    async def test_gap_triggers_resync(self):
+        """欠落検出時にスナップショットから再同期する"""
+        fetcher = AsyncMock(side_effect=[make_snapshot(100), make_snapshot(200)])
+        manager = OrderBookManager(snapshot_fetcher=fetcher)
+        await manager.sync("BTCUSDT")
+
+        await manager.handle_depth_event(make_event(150, 201, bids=[["100.2", "1.0"]]))
+        assert manager.get_book("BTCUSDT") is None
+        assert manager.stats["resyncs"] == 1
+
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+
+        book = manager.get_book("BTCUSDT")
+        assert book.last_update_id == 201
+        assert book.best_bid() == (100.2, 1.0)
+
+    @pytest.mark.asyncio
+    async def test_validator_uses_local_book(self):
+        """注文バリデーターがローカル板の仲値で価格乖離を検証する"""
+        manager = OrderBookManager(snapshot_fetcher=AsyncMock(return_value=make_snapshot()))
+        await manager.sync("BTCUSDT")
+
+        validator = OrderValidator(order_book_manager=manager)
+        order = Order(
+            exchange="binance",
+            symbol="BTC/USDT",
+            side=OrderSide.BUY,
+            order_type=OrderType.LIMIT,
+            amount=Decimal("1"),
+            price=Decimal("150"),
+        )
+
+        is_valid, error = await validator.validate(order)
+
+        assert is_valid is False
+        assert "deviates" in error
+
+
+class TestOrderBookInjection:
+    """共有の板管理がアダプタに注入されることのテスト"""
+
+    @pytest.mark.asyncio
+    async def test_binance_adapter_prefers_local_book(self):
+        """同期済みのローカル板があればRESTを呼ばず、なければRESTの板を返す"""
+        adapter = BinanceAdapter(api_key="key", secret="secret")
+        adapter.exchange = Mock()
+        adapter.exchange.fetch_order_book.return_value = {
+            "bids": [[100.0, 1.0]],
+            "asks": [[101.0, 2.0]],
+            "timestamp": 1_700_000_000_000,
+            "nonce": 42,
+        }
+
+        rest_book = await adapter.get_order_book("BTC/USDT", limit=5)
+        assert rest_book["asks"] == [[101.0, 2.0]]
+        assert rest_book["last_update_id"] == 42
+        adapter.exchange.fetch_order_book.assert_called_once_with("BTCUSDT", 5)
+
+        manager = OrderBookManager(snapshot_fetcher=AsyncMock(return_value=make_snapshot()))
+        await manager.sync("BTCUSDT")
+        adapter.order_book_manager = manager
+
+        local_book = await adapter.get_order_book("BTC/USDT", limit=2)
+        assert local_book["bids"] == [[100.0, 1.0], [99.0, 2.0]]
+        assert adapter.exchange.fetch_order_book.call_count == 1
+
+    def test_paper_adapter_gets_shared_manager(self):
+        adapter = ExchangeFactory().create_adapter("binance", trading_mode="paper", user_id=str(uuid4()))
+        assert adapter.order_book_manager is get_order_book_manager()
@@ -0,0 +1,128 @@
+"""注文タイムアウトスケジューラーのテスト"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src.backend.trading.engine import OrderSide, OrderStatus, OrderType, TradingEngine
+from src.backend.trading.order_scheduler import OrderTimeoutScheduler
+from src.backend.trading.price_bus import PriceBus
+
+
+class TestOrderTimeoutScheduler:
+    """OrderTimeoutSchedulerのテスト"""
+
+    def test_pop_expired_in_deadline_order(self):
+        """期限順に取り出され、削除済みの注文は失効しない"""
+        scheduler = OrderTimeoutScheduler()
+        now = datetime.now(timezone.utc)
+        for i, offset in enumerate([30, 10, 20, 40, 5]):
+            scheduler.schedule(f"o{i}", now + timedelta(seconds=offset))
+
+        assert scheduler.remove("o2")
+        assert not scheduler.remove("missing")
+        assert scheduler.next_deadline() == now + timedelta(seconds=5)
+
+        assert scheduler.pop_expired(now + timedelta(seconds=35)) == ["o4", "o1", "o0"]
+        assert len(scheduler) == 1
+        assert "o3" in scheduler
+
+    def test_reschedule_updates_deadline(self):
+        """再登録で期限が更新される"""
+        scheduler = OrderTimeoutScheduler()
+        now = datetime.now(timezone.utc)
+        scheduler.schedule("a", now + timedelta(seconds=10))
+        scheduler.schedule("b", now + timedelta(seconds=20))
+        scheduler.schedule("b", now + timedelta(seconds=1))
+
+        assert len(scheduler) == 2
+        assert scheduler.pop_expired(now + timedelta(seconds=2)) == ["b"]
+
+    @pytest.mark.asyncio
+    async def test_run_fires_at_deadline(self):
+        """ループは次の期限で起床して失効を通知する"""
+        expired = []
+        scheduler = OrderTimeoutScheduler(on_expire=expired.append)
+        task = asyncio.create_task(scheduler.run())
+
+        await asyncio.sleep(0)
+        scheduler.schedule("late", datetime.now(timezone.utc) + timedelta(seconds=5))
+        scheduler.schedule("soon", datetime.now(timezone.utc) + timedelta(milliseconds=50))
+        await asyncio.sleep(0.2)
+
+        scheduler.stop()
+        await asyncio.wait_for(task, timeout=1)
+        assert expired == ["soon"]
+        assert "late" in scheduler
+
+    def test_run_on_loop_started_after_construction(self):
+        """ループ外で生成・登録したスケジューラーを後から起動したループで動かせる"""
+        expired = []
+        scheduler = OrderTimeoutScheduler(on_expire=expired.append)
+        scheduler.schedule("order", datetime.now(timezone.utc) + timedelta(milliseconds=20))
+
+        async def main():
+            task = asyncio.create_task(scheduler.run())
+            await asyncio.sleep(0.1)
+            scheduler.schedule("late", datetime.now(timezone.utc) + timedelta(seconds=5))
+            scheduler.stop()
+            await asyncio.wait_for(task, timeout=1)
+
+        asyncio.run(main())
+        assert expired == ["order"]
+        assert "late" in scheduler
+
+
+class TestTradingEngineOrderTimeout:
+    """TradingEngineの注文タイムアウトテスト"""
+
+    @pytest.fixture
+    def engine(self):
+        engine = TradingEngine(
+            {
+                "max_concurrent_orders": 10,
+                "order_timeout": 300,
+                "enable_dry_run": True,
+                "risk_limits": {
+                    "max_position_size": 100000.0,
+                    "max_daily_loss": 1000.0,
+                    "max_drawdown": 0.1,
+                    "max_leverage": 1.0,
+                    "max_correlation": 0.7,
+                    "max_portfolio_heat": 0.5,
+                    "position_size_limit_pct": 0.1,
+                },
+            },
+            price_bus=PriceBus(),
+        )
+        # 指値注文を約定させずに残す
+        engine.order_manager._simulate_order_fill = lambda order: None
+        return engine
+
+    @pytest.mark.asyncio
+    async def test_gtd_order_cancelled_at_deadline(self, engine):
+        """GTD注文は期限到来時にキャンセルされる"""
+        task = asyncio.create_task(engine.start())
+        await asyncio.sleep(0)
+
+        expires_at = datetime.now(timezone.utc) + timedelta(milliseconds=50)
+        order = engine.create_order(
+            "BTCUSDT", OrderSide.BUY, OrderType.LIMIT, 0.1, price=50000.0, expires_at=expires_at
+        )
+        assert engine.order_scheduler.get_deadline(order.id) == expires_at
+
+        await asyncio.sleep(0.2)
+        assert order.status == OrderStatus.CANCELLED
+        assert order.id not in engine.order_scheduler
+
+        await engine.stop()
+        await asyncio.wait_for(task, timeout=1)
+
+    def test_cancel_removes_deadline(self, engine):
+        """キャンセルで期限が削除される"""
+        order = engine.create_order("BTCUSDT", OrderSide.BUY, OrderType.LIMIT, 0.1, price=50000.0)
+        assert engine.order_scheduler.get_deadline(order.id) == order.created_at + timedelta(seconds=300)
+
+        engine.cancel_order(order.id)
+        assert order.id not in engine.order_scheduler
@@ -0,0 +1,107 @@
+"""インデックス付き注文ストアとOrderManagerのテスト"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src.backend.trading.engine import Order, OrderSide, OrderStatus, OrderType
+from src.backend.trading.order_manager import OrderManager
+from src.backend.trading.order_store import OrderStore
+
+
+def make_order(order_id, symbol="BTCUSDT", strategy_name="ema", exchange="binance", **kwargs):
+    return Order(
+        id=order_id,
+        symbol=symbol,
+        side=OrderSide.BUY,
+        order_type=OrderType.LIMIT,
+        amount=0.1,
+        price=50000.0,
+        strategy_name=strategy_name,
+        exchange=exchange,
+        **kwargs,
+    )
+
+
+class TestOrderStore:
+    """OrderStoreのテスト"""
+
+    def test_indexes_follow_status_transitions(self):
+        """状態遷移でアクティブインデックスが更新される"""
+        store = OrderStore()
+        first = make_order("o1")
+        second = make_order("o2", symbol="ETHUSDT", strategy_name="rsi", exchange="bybit")
+        store.add(first)
+        store.add(second)
+
+        assert store.by_symbol("BTCUSDT", active_only=True) == [first]
+        assert store.by_exchange("bybit") == [second]
+
+        store.update_status(first, OrderStatus.FILLED, 0.1, 50000.0)
+
+        assert first.status == OrderStatus.FILLED
+        assert store.by_symbol("BTCUSDT", active_only=True) == []
+        assert store.by_symbol("BTCUSDT") == [first]
+        assert store.by_status(OrderStatus.FILLED) == [first]
+        assert store.active() == [second]
+
+    def test_remove_clears_all_indexes(self):
+        """削除でインデックスからも除去される"""
+        store = OrderStore()
+        order = make_order("o1")
+        store.add(order)
+        store.remove("o1")
+
+        assert "o1" not in store
+        assert store.by_strategy("ema") == []
+        assert store.by_status(OrderStatus.PENDING) == []
+        assert store.active_count() == 0
+
+    def test_inactive_created_before_stops_at_cutoff(self):
+        """cutoff以前の非アクティブ注文のみ返す"""
+        store = OrderStore()
+        now = datetime.now(timezone.utc)
+        old_done = make_order("o1", created_at=now - timedelta(days=40), status=OrderStatus.CANCELLED)
+        old_active = make_order("o2", created_at=now - timedelta(days=35))
+        recent_done = make_order("o3", created_at=now, status=OrderStatus.FILLED)
+        for order in (old_done, old_active, recent_done):
+            store.add(order)
+
+        assert store.inactive_created_before(now - timedelta(days=30)) == [old_done]
+
+
+class TestOrderManagerIndexes:
+    """OrderManagerのインデックス利用テスト"""
+
+    @pytest.fixture
+    def manager(self):
+        manager = OrderManager({"enable_dry_run": True, "max_concurrent_orders": 100})
+        # 指値注文を約定させずに残す
+        manager._simulate_order_fill = lambda order: None
+        return manager
+
+    def test_cancel_orders_by_strategy(self, manager):
+        """戦略別一括キャンセルはアクティブ注文のみ対象"""
+        ema_orders = [
+            manager.create_order("BTCUSDT", OrderSide.BUY, OrderType.LIMIT, 0.1, 50000.0, strategy_name="ema")
+            for _ in range(3)
+        ]
+        rsi_order = manager.create_order("BTCUSDT", OrderSide.BUY, OrderType.LIMIT, 0.1, 50000.0, strategy_name="rsi")
+        manager.cancel_order(ema_orders[0].id)
+
+        assert manager.cancel_orders_by_strategy("ema") == 2
+        assert manager.get_orders_by_strategy("ema", active_only=True) == []
+        assert manager.get_active_orders() == [rsi_order]
+        assert manager.get_statistics()["active_orders"] == 1
+
+    def test_cancel_orders_by_symbol_and_cleanup(self, manager):
+        """シンボル別キャンセル後、古い注文をクリーンアップできる"""
+        manager.create_order("BTCUSDT", OrderSide.BUY, OrderType.LIMIT, 0.1, 50000.0)
+        eth_order = manager.create_order("ETHUSDT", OrderSide.SELL, OrderType.LIMIT, 1.0, 3000.0)
+
+        assert manager.cancel_orders_by_symbol("BTCUSDT") == 1
+        assert manager.get_orders_by_exchange("binance", active_only=True) == [eth_order]
+
+        assert manager.cleanup_old_orders(days=-1) == 1
+        assert manager.get_orders_by_symbol("BTCUSDT") == []
+        assert manager.get_orders_by_symbol("ETHUSDT") == [eth_order]
@@ -0,0 +1,185 @@
+"""Paper Trading約定シミュレーターのテスト"""
+
+import os
+import tempfile
+from datetime import datetime, timezone
+from decimal import Decimal
+from unittest.mock import patch
+from uuid import UUID, uuid4
+
+import numpy as np
+import pytest
+
+from src.backend.exchanges.paper_fill_simulator import BookSnapshot, FillSimulator, LimitQueue
+from src.backend.exchanges.paper_trading_adapter import PaperTradingAdapter
+from src.backend.trading.orders.models import Order, OrderSide, OrderType
+from src.backend.trading.price_bus import PriceBus
+
+BIDS = [[99.0, 1.0], [98.0, 2.0], [97.0, 3.0]]
+ASKS = [[101.0, 1.0], [102.0, 2.0], [103.0, 3.0]]
+
+
+class TestBookSnapshot:
+    """BookSnapshotのテスト"""
+
+    def test_walk_produces_vwap_partial_fills(self):
+        """板を消化してレベルごとに約定し、板を超える数量は残る"""
+        simulator = FillSimulator()
+        snapshot = BookSnapshot(BIDS, ASKS)
+
+        result = simulator.simulate_market_order(snapshot, "buy", 2.0)
+        assert [(fill.price, fill.quantity) for fill in result.fills] == [(101.0, 1.0), (102.0, 1.0)]
+        assert result.average_price == pytest.approx(101.5)
+
+        result = simulator.simulate_market_order(snapshot, "sell", 10.0)
+        assert result.filled_quantity == pytest.approx(6.0)
+        assert result.is_partial
+        assert result.remaining == pytest.approx(4.0)
+
+    def test_vwap_batch_matches_walk(self):
+        """一括計算は1件ずつの板消化と一致する"""
+        simulator = FillSimulator()
+        snapshot = BookSnapshot(BIDS, ASKS)
+        sides = ["buy", "sell", "buy", "sell"]
+        quantities = [0.5, 2.5, 4.0, 10.0]
+
+        batch = simulator.simulate_batch(snapshot, sides, quantities)
+
+        for i, (side, quantity) in enumerate(zip(sides, quantities)):
+            single = simulator.simulate_market_order(snapshot, side, quantity)
+            assert batch["average_price"][i] == pytest.approx(single.average_price)
+            assert batch["filled"][i] == pytest.approx(single.filled_quantity)
+        assert np.allclose(batch["remaining"], [0.0, 0.0, 0.0, 4.0])
+
+    def test_synthetic_book_used_without_depth(self):
+        """板がない場合は仲値から合成板を作る"""
+        simulator = FillSimulator(spread_rate=0.001)
+        snapshot = simulator.snapshot({"bids": [], "asks": []}, mid_price=100.0)
+
+        assert snapshot.best_price("buy") == pytest.approx(100.05)
+        assert snapshot.best_price("sell") == pytest.approx(99.95)
+
+    def test_synthetic_book_covers_order_quantity(self):
+        """合成板は注文数量を満たす厚みで作り、遠いレベルほど不利な価格で約定する"""
+        simulator = FillSimulator()
+        snapshot = simulator.snapshot(mid_price=0.1, quantity=1000.0)
+
+        result = simulator.simulate_market_order(snapshot, "buy", 1000.0)
+        assert result.filled_quantity == pytest.approx(1000.0)
+        assert not result.is_partial
+        assert 0.1 < result.average_price < 0.1 * 1.002
+
+        notional = FillSimulator(synthetic_level_notional=500.0).snapshot(mid_price=0.1)
+        assert notional.asks["sizes"][0] == pytest.approx(5000.0)
+
+    def test_limit_queue_consumes_volume_ahead(self):
+        """指値ちょうどの約定は先行数量を消化してから約定する"""
+        snapshot = BookSnapshot(BIDS, ASKS)
+        queue = FillSimulator().open_limit_queue(snapshot, "buy", 98.0, 1.0)
+        assert queue.queue_ahead == pytest.approx(2.0)
+
+        assert queue.on_trade(98.0, 1.5) == 0.0
+        assert queue.on_trade(98.0, 1.0) == pytest.approx(0.5)
+        assert queue.on_trade(97.5, 0.1) == pytest.approx(0.5)
+        assert LimitQueue("sell", 100.0, 1.0).on_trade(100.0) == 1.0
+
+
+class TestPaperTradingAdapterFillSimulation:
+    """PaperTradingAdapterの板考慮約定テスト"""
+
+    def setup_method(self):
+        self.temp_db = tempfile.NamedTemporaryFile(delete=False, suffix=".db")
+        self.temp_db.close()
+        self.bus = PriceBus()
+        self.config = {
+            "user_id": str(uuid4()),
+            "database_url": f"sqlite:///{self.temp_db.name}",
+            "default_setting": "beginner",
+            "execution_delay": 0.0,
+            "price_bus": self.bus,
+            "price_poll_interval": 60,
+        }
+
+    def teardown_method(self):
+        try:
+            os.unlink(self.temp_db.name)
+        except Exception:
+            pass
+
+    @pytest.mark.asyncio
+    async def test_market_order_partial_fill_on_thin_book(self):
+        """板が薄い場合は約定可能分だけVWAPで約定し、残量は失効する"""
+        adapter = PaperTradingAdapter(self.config)
+        order = Order(
+            exchange="paper_trading",
+            symbol="BTC/USDT",
+            order_type=OrderType.MARKET,
+            side=OrderSide.BUY,
+            amount=Decimal("0.003"),
+        )
+
+        with patch.object(adapter, "get_order_book") as mock_order_book:
+            mock_order_book.return_value = {
+                "bids": [[49900.0, 1.0]],
+                "asks": [[50000.0, 0.001], [50100.0, 0.001]],
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+            }
+            result = await adapter.place_order(order)
+
+        assert result["status"] == "expired"
+        assert result["filled"] == pytest.approx(0.002)
+        assert result["average"] == pytest.approx(50050.0)
+        assert await adapter.get_open_orders() == []
+
+        balances = await adapter.get_balance()
+        assert balances["USDT"]["used"] == pytest.approx(0.0)
+
+    @pytest.mark.asyncio
+    async def test_market_order_fills_in_full_without_book(self):
+        """板が取得できない場合は合成板で全量を約定させる"""
+        adapter = PaperTradingAdapter(self.config)
+        order = Order(
+            exchange="paper_trading",
+            symbol="DOGE/USDT",
+            order_type=OrderType.MARKET,
+            side=OrderSide.SELL,
+            amount=Decimal("1000"),
+        )
+        adapter.wallet_service.update_balance(UUID(adapter.user_id), "DOGE", Decimal("2000"), "deposit")
+
+        with (
+            patch.object(adapter.real_adapter, "get_order_book", side_effect=Exception("REST down")),
+            patch.object(adapter, "get_ticker", return_value={"symbol": "DOGE/USDT", "price": 0.1}),
+        ):
+            result = await adapter.place_order(order)
+
+        assert result["status"] == "filled"
+        assert result["filled"] == pytest.approx(1000.0)
+        assert 0.1 * 0.998 < result["average"] < 0.1
+
+    @pytest.mark.asyncio
+    async def test_limit_order_fills_after_queue_ahead(self):
+        """指値ちょうどの約定ティックは先行数量の後に部分約定する"""
+        adapter = PaperTradingAdapter(self.config)
+        order = Order(
+            exchange="paper_trading",
+            symbol="BTC/USDT",
+            order_type=OrderType.LIMIT,
+            side=OrderSide.BUY,
+            amount=Decimal("0.002"),
+            price=Decimal("45000"),
+        )
+
+        result = await adapter.place_order(order)
+        adapter._limit_queues[result["id"]].queue_ahead = 0.001
+
+        await self.bus.publish("BTCUSDT", 45000.0, quantity=0.0015)
+        partial = await adapter.get_order(result["id"])
+        assert partial["status"] == "partially_filled"
+        assert partial["filled"] == pytest.approx(0.0005)
+
+        await self.bus.publish("BTCUSDT", 44990.0, quantity=0.0001)
+        filled = await adapter.get_order(result["id"])
+        assert filled["status"] == "filled"
+        assert filled["filled"] == pytest.approx(0.002)
+        assert not self.bus.has_subscribers("BTCUSDT")
@@ -0,0 +1,171 @@
+"""Paper Tradingマッチングエンジンのテスト"""
+
+import asyncio
+import os
+import tempfile
+from decimal import Decimal
+from unittest.mock import patch
+from uuid import UUID, uuid4
+
+import pytest
+
+from src.backend.exchanges.paper_matching_engine import PaperMatchingEngine
+from src.backend.exchanges.paper_trading_adapter import PaperTradingAdapter
+from src.backend.trading.orders.models import Order, OrderSide, OrderType
+from src.backend.trading.price_bus import PriceBus
+
+
+def make_limit_order(side, price, symbol="BTC/USDT"):
+    order = Order(
+        exchange="paper_trading",
+        symbol=symbol,
+        order_type=OrderType.LIMIT,
+        side=side,
+        amount=Decimal("0.001"),
+        price=Decimal(str(price)),
+    )
+    order.exchange_order_id = str(uuid4())
+    return order
+
+
+class TestPaperMatchingEngine:
+    """PaperMatchingEngineのテスト"""
+
+    def test_match_fills_all_crossed_orders_in_price_order(self):
+        """1回の価格更新で交差した注文を価格優先で返す"""
+        engine = PaperMatchingEngine()
+        buy_high = make_limit_order(OrderSide.BUY, 101)
+        buy_low = make_limit_order(OrderSide.BUY, 99)
+        buy_mid = make_limit_order(OrderSide.BUY, 100)
+        sell = make_limit_order(OrderSide.SELL, 105)
+        for order in (buy_high, buy_low, buy_mid, sell):
+            engine.add_order(order)
+
+        crossed = engine.on_price("BTCUSDT", 100.0)
+
+        assert crossed == [buy_high, buy_mid]
+        assert engine.books["BTCUSDT"].best_bid() == 99.0
+        assert engine.books["BTCUSDT"].best_ask() == 105.0
+        assert engine.on_price("BTC/USDT", 106.0) == [sell]
+
+    def test_cancelled_order_is_not_matched(self):
+        """キャンセル済み注文は約定せず、空のブックは破棄される"""
+        engine = PaperMatchingEngine()
+        order = make_limit_order(OrderSide.SELL, 100)
+        engine.add_order(order)
+
+        assert engine.cancel_order(order.exchange_order_id) is order
+        assert engine.on_price("BTCUSDT", 200.0) == []
+        assert not engine.has_orders("BTCUSDT")
+        assert engine.get_stats()["symbols"] == 0
+
+
+class TestPaperTradingAdapterMatching:
+    """PaperTradingAdapterの価格バス連携テスト"""
+
+    def setup_method(self):
+        self.temp_db = tempfile.NamedTemporaryFile(delete=False, suffix=".db")
+        self.temp_db.close()
+        self.bus = PriceBus()
+        self.config = {
+            "user_id": str(uuid4()),
+            "database_url": f"sqlite:///{self.temp_db.name}",
+            "default_setting": "beginner",
+            "execution_delay": 0.01,
+            "price_bus": self.bus,
+            "price_poll_interval": 60,
+        }
+
+    def teardown_method(self):
+        try:
+            os.unlink(self.temp_db.name)
+        except Exception:
+            pass
+
+    @pytest.mark.asyncio
+    async def test_limit_order_filled_by_price_tick(self):
+        """価格バスのティックで指値注文が約定し、購読が解除される"""
+        adapter = PaperTradingAdapter(self.config)
+        order = Order(
+            exchange="paper_trading",
+            symbol="BTC/USDT",
+            order_type=OrderType.LIMIT,
+            side=OrderSide.BUY,
+            amount=Decimal("0.001"),
+            price=Decimal("45000"),
+        )
+
+        result = await adapter.place_order(order)
+        await asyncio.sleep(0)
+        assert result["status"] == "submitted"
+        assert self.bus.has_subscribers("BTCUSDT")
+
+        await self.bus.publish("BTCUSDT", 44900.0)
+
+        filled = await adapter.get_order(result["id"])
+        assert filled["status"] == "filled"
+        assert filled["average"] == 45000.0
+        assert await adapter.get_open_orders() == []
+        assert not self.bus.has_subscribers("BTCUSDT")
+
+    @pytest.mark.asyncio
+    async def test_cancel_releases_subscription(self):
+        """キャンセルでシンボルの購読が解除される"""
+        adapter = PaperTradingAdapter(self.config)
+        order = Order(
+            exchange="paper_trading",
+            symbol="BTC/USDT",
+            order_type=OrderType.LIMIT,
+            side=OrderSide.BUY,
+            amount=Decimal("0.001"),
+            price=Decimal("45000"),
+        )
+
+        result = await adapter.place_order(order)
+        await adapter.cancel_order(result["id"])
+
+        assert not self.bus.has_subscribers("BTCUSDT")
+        assert adapter.matching_engine.get_stats()["resting_orders"] == 0
+
+    def _large_buy(self):
+        """見積もり残高（10万USDT）の半分以上をロックする指値買い"""
+        return Order(
+            exchange="paper_trading",
+            symbol="BTC/USDT",
+            order_type=OrderType.LIMIT,
+            side=OrderSide.BUY,
+            amount=Decimal("600"),
+            price=Decimal("100"),
+        )
+
+    @pytest.mark.asyncio
+    async def test_fill_consumes_lock_with_settlement(self):
+        """残高の半分以上をロックした注文も、ロック解除と決済を同時に反映して約定する"""
+        adapter = PaperTradingAdapter(self.config)
+        result = await adapter.place_order(self._large_buy())
+        await asyncio.sleep(0)
+        usdt = adapter.wallet_service.get_asset_balance(UUID(self.config["user_id"]), "USDT")
+        assert usdt["locked"] == pytest.approx(60000.0)
+
+        await self.bus.publish("BTCUSDT", 99.0)
+
+        assert (await adapter.get_order(result["id"]))["status"] == "filled"
+        usdt = adapter.wallet_service.get_asset_balance(UUID(self.config["user_id"]), "USDT")
+        assert usdt == {"total": pytest.approx(40000.0), "locked": 0.0, "available": pytest.approx(40000.0)}
+        assert adapter._order_locks == {}
+
+    @pytest.mark.asyncio
+    async def test_failed_settlement_releases_order(self):
+        """決済に失敗した注文はロックを解除し、アクティブ注文・マッチングエンジンから外す"""
+        adapter = PaperTradingAdapter(self.config)
+        result = await adapter.place_order(self._large_buy())
+        await asyncio.sleep(0)
+
+        with patch.object(adapter.wallet_service, "execute_trade", return_value=False):
+            await self.bus.publish("BTCUSDT", 99.0)
+
+        usdt = adapter.wallet_service.get_asset_balance(UUID(self.config["user_id"]), "USDT")
+        assert usdt["locked"] == 0.0
+        assert result["id"] not in adapter.active_orders
+        assert adapter.matching_engine.get_stats()["resting_orders"] == 0
+        assert not self.bus.has_subscribers("BTCUSDT")
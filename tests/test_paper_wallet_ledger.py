@@ -0,0 +1,149 @@
+"""Paper Tradingインメモリ残高台帳のテスト"""
+
+import asyncio
+import os
+import tempfile
+from decimal import Decimal
+from unittest.mock import patch
+from uuid import uuid4
+
+import pytest
+
+from src.backend.core.config import settings
+from src.backend.database.models import DatabaseManager, PaperWalletModel, PaperWalletTransactionModel
+from src.backend.database.paper_wallet_service import PaperWalletService
+from src.backend.exchanges.paper_trading_adapter import PaperTradingAdapter
+
+
+class TestPaperWalletLedger:
+    """write-behind台帳のテスト"""
+
+    def setup_method(self):
+        self.temp_db = tempfile.NamedTemporaryFile(delete=False, suffix=".db")
+        self.temp_db.close()
+        self.journal_path = self.temp_db.name + ".journal"
+
+        self.db_manager = DatabaseManager(f"sqlite:///{self.temp_db.name}")
+        self.db_manager.create_tables()
+        self.user_id = uuid4()
+
+    def teardown_method(self):
+        for path in (self.temp_db.name, self.journal_path):
+            try:
+                os.unlink(path)
+            except Exception:
+                pass
+
+    def _service(self, **kwargs):
+        kwargs.setdefault("flush_batch_size", 1000)
+        kwargs.setdefault("flush_interval", 3600)
+        return PaperWalletService(self.db_manager, **kwargs)
+
+    def _db_wallet(self, asset):
+        session = self.db_manager.get_session()
+        try:
+            return (
+                session.query(PaperWalletModel)
+                .filter(PaperWalletModel.user_id == self.user_id, PaperWalletModel.asset == asset)
+                .first()
+            )
+        finally:
+            session.close()
+
+    def _db_transaction_count(self):
+        session = self.db_manager.get_session()
+        try:
+            return session.query(PaperWalletTransactionModel).count()
+        finally:
+            session.close()
+
+    def test_writes_are_batched_until_flush(self):
+        """残高はメモリ上で即時反映され、DBへはflushでまとめて書き込まれる"""
+        service = self._service()
+        service.initialize_user_wallet(self.user_id, "beginner")
+        initial_transactions = self._db_transaction_count()
+
+        assert service.lock_balance(self.user_id, "USDT", Decimal("500"), "order-1")
+        assert service.execute_trade(
+            self.user_id, "BTC", "USDT", Decimal("0.01"), Decimal("500"), "BTC", Decimal("0.00001"), "order-1"
+        )
+        assert service.unlock_balance(self.user_id, "USDT", Decimal("500"), "order-1")
+
+        assert service.get_asset_balance(self.user_id, "USDT")["total"] == 99500.0
+        assert service.get_asset_balance(self.user_id, "BTC")["total"] == 0.00999
+        assert self._db_wallet("BTC") is None
+        assert service.ledger.pending_count == 5
+
+        assert service.flush() == 5
+        assert float(self._db_wallet("USDT").balance) == 99500.0
+        assert float(self._db_wallet("BTC").balance) == 0.00999
+        assert self._db_transaction_count() == initial_transactions + 5
+
+    def test_trade_is_atomic(self):
+        """取引の一部が不正な場合は何も適用しない"""
+        service = self._service()
+        service.initialize_user_wallet(self.user_id, "beginner")
+        service.lock_balance(self.user_id, "USDT", Decimal("99990"), "order-1")
+
+        # ロック分を差し引くと残高がロック残高を下回るため拒否される
+        assert not service.execute_trade(
+            self.user_id, "BTC", "USDT", Decimal("1"), Decimal("50"), "BTC", Decimal("0.001"), "order-2"
+        )
+        assert service.get_asset_balance(self.user_id, "BTC")["total"] == 0.0
+        assert service.get_asset_balance(self.user_id, "USDT")["available"] == 10.0
+        assert not service.unlock_balance(self.user_id, "ETH", Decimal("1"))
+
+    def test_journal_replayed_after_crash(self):
+        """flush前に停止してもジャーナルから再生できる（再生は冪等）"""
+        service = self._service(journal_path=self.journal_path)
+        service.initialize_user_wallet(self.user_id, "beginner")
+        service.update_balance(self.user_id, "USDT", Decimal("-1000"), "withdraw")
+        service.update_balance(self.user_id, "ETH", Decimal("2"), "deposit")
+        assert float(self._db_wallet("USDT").balance) == 100000.0
+
+        # プロセス停止を想定し、新しいサービスで再生する
+        recovered = self._service(journal_path=self.journal_path)
+        assert recovered.ledger.stats["recovered_entries"] == 2
+        assert recovered.get_asset_balance(self.user_id, "USDT")["total"] == 99000.0
+        assert recovered.get_asset_balance(self.user_id, "ETH")["total"] == 2.0
+
+        # 既に反映済みのエントリは再生しない
+        with open(self.journal_path, "a", encoding="utf-8") as journal:
+            journal.write("".join(entry.to_json() + "\n" for entry in service.ledger._pending))
+        again = self._service(journal_path=self.journal_path)
+        assert again.ledger.stats["recovered_entries"] == 0
+        assert again.get_asset_balance(self.user_id, "USDT")["total"] == 99000.0
+
+    @pytest.mark.asyncio
+    async def test_background_flush_runs_off_the_event_loop(self):
+        """バックグラウンドタスクが一定間隔で書き戻し、apply() の呼び出し元ではコミットしない"""
+        service = self._service(journal_path=self.journal_path, flush_interval=0.05)
+        service.initialize_user_wallet(self.user_id, "beginner")
+        service.start_background_flush()
+
+        with patch.object(service.ledger, "_write_entries", wraps=service.ledger._write_entries) as write_entries:
+            service.ledger._last_flush = 0.0
+            assert service.update_balance(self.user_id, "USDT", Decimal("-1000"), "withdraw")
+            assert write_entries.call_count == 0
+            assert os.path.exists(self.journal_path)
+
+            await asyncio.sleep(0.2)
+
+        assert write_entries.call_count == 1
+        assert float(self._db_wallet("USDT").balance) == 99000.0
+        # 反映済みのジャーナルファイルは消える
+        assert not os.path.exists(self.journal_path)
+
+        service.update_balance(self.user_id, "ETH", Decimal("1"), "deposit")
+        assert await service.stop_background_flush() == 1
+        assert not service.ledger.background_flush_running
+        assert float(self._db_wallet("ETH").balance) == 1.0
+
+
+def test_adapter_journal_defaults_to_data_dir(tmp_path):
+    """ジャーナルのパスを省略するとデータディレクトリ配下のユーザーごとのファイルになる"""
+    user_id = str(uuid4())
+    with patch.object(settings, "PAPER_WALLET_JOURNAL_DIR", str(tmp_path / "paper_wallet")):
+        adapter = PaperTradingAdapter({"user_id": user_id, "database_url": f"sqlite:///{tmp_path / 'paper.db'}"})
+
+    assert adapter.wallet_service.ledger.journal_path == str(tmp_path / "paper_wallet" / f"{user_id}.jsonl")
@@ -5,11 +5,18 @@ Phase3で実装したPortfolio Management APIの動作確認
 FastAPI dependency_overridesを使用した正しいテスト実装
 """
 
+import numpy as np
+import pandas as pd
 import pytest
 from fastapi.testclient import TestClient
 
+from src.backend.api import portfolio as portfolio_api
 from src.backend.core.security import get_current_user
+from src.backend.data_pipeline.resampler import OHLCVResampler
+from src.backend.exchanges.base import OHLCV
 from src.backend.main import app
+from src.backend.portfolio.covariance import CovarianceService
+from src.backend.portfolio.optimizer import PortfolioOptimizer
 from src.backend.portfolio.strategy_portfolio_manager import AdvancedPortfolioManager
 
 
@@ -209,6 +216,80 @@ class TestPortfolioAPI:
         risk_response = client.get("/api/portfolio/risk-report")
         assert risk_response.status_code == 200
 
+    def test_efficient_frontier_reuses_cache(self, client):
+        """フロンティアはモジュール共有の最適化エンジンで計算し、同じ入力はキャッシュから返す"""
+        payload = {
+            "assets": ["BTC", "ETH", "SOL"],
+            "expected_returns": {"BTC": 0.10, "ETH": 0.14, "SOL": 0.20},
+            "covariance_matrix": {
+                "BTC": {"BTC": 0.04, "ETH": 0.02, "SOL": 0.01},
+                "ETH": {"BTC": 0.02, "ETH": 0.09, "SOL": 0.03},
+                "SOL": {"BTC": 0.01, "ETH": 0.03, "SOL": 0.16},
+            },
+            "num_portfolios": 7,
+            "max_weight": 0.6,
+        }
+
+        first = client.post("/api/portfolio/frontier", json=payload)
+        assert first.status_code == 200
+        data = first.json()
+        assert data["points"] == 7
+        assert all(max(point["weights"].values()) <= 0.6 + 1e-9 for point in data["frontier"])
+
+        second = client.post("/api/portfolio/frontier", json=payload).json()
+        assert second["cache"]["hits"] == data["cache"]["hits"] + 1
+        assert second["frontier"] == data["frontier"]
+
+        payload["expected_returns"].pop("SOL")
+        assert client.post("/api/portfolio/frontier", json=payload).status_code == 400
+
+    def test_efficient_frontier_caps_pool_size(self, client, monkeypatch):
+        """リクエストの max_workers はサーバー側の上限で頭打ちにする"""
+        optimizer = PortfolioOptimizer()
+        monkeypatch.setattr(portfolio_api, "_portfolio_optimizer", optimizer)
+        payload = {
+            "assets": ["BTC", "ETH"],
+            "expected_returns": {"BTC": 0.10, "ETH": 0.14},
+            "covariance_matrix": {"BTC": {"BTC": 0.04, "ETH": 0.02}, "ETH": {"BTC": 0.02, "ETH": 0.09}},
+            "num_portfolios": 40,
+            "max_workers": 32,
+        }
+        try:
+            assert client.post("/api/portfolio/frontier", json=payload).status_code == 200
+            assert optimizer._executor_workers <= portfolio_api.FRONTIER_MAX_WORKERS
+        finally:
+            optimizer.close()
+
+    def test_efficient_frontier_estimates_covariance(self, client, monkeypatch):
+        """共分散を省略すると保存済み価格の推定値（年率換算）でフロンティアを計算する"""
+        rng = np.random.default_rng(0)
+        timestamps = pd.date_range("2024-01-01", periods=60, freq="1h", tz="UTC")
+        resampler = OHLCVResampler(base_timeframe="1h")
+        for symbol in ("BTC/USDT", "ETH/USDT"):
+            closes = 100.0 * np.cumprod(1 + rng.normal(0, 0.01, len(timestamps)))
+            resampler.add_base_bars(
+                symbol, [OHLCV(ts.to_pydatetime(), c, c, c, c, 1.0) for ts, c in zip(timestamps, closes)]
+            )
+        service = CovarianceService(resampler=resampler, min_observations=10)
+        monkeypatch.setattr(portfolio_api, "get_covariance_service", lambda: service)
+
+        payload = {
+            "assets": ["BTCUSDT", "ETHUSDT"],
+            "expected_returns": {"BTCUSDT": 0.10, "ETHUSDT": 0.14},
+            "num_portfolios": 5,
+            "window": 40,
+        }
+        response = client.post("/api/portfolio/frontier", json=payload)
+
+        assert response.status_code == 200
+        assert response.json()["points"] == 5
+        assert service.stats["loads"] == 1
+
+        # 保存済みの足がないシンボルは推定できない
+        payload["assets"].append("SOLUSDT")
+        payload["expected_returns"]["SOLUSDT"] = 0.2
+        assert client.post("/api/portfolio/frontier", json=payload).status_code == 400
+
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -0,0 +1,168 @@
+"""ポートフォリオバックテストのテスト"""
+
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.backend.backtesting.portfolio_backtest import PortfolioBacktestEngine, merge_bars
+from src.backend.portfolio.strategy_portfolio_manager import AdvancedPortfolioManager
+from src.backend.risk.correlation_tracker import STRATEGY_CORRELATION_KEY, get_correlation_tracker
+from src.backend.risk.rolling_risk import get_volatility_tracker
+from src.backend.strategies.base import BaseStrategy, Signal
+
+
+class ScriptedStrategy(BaseStrategy):
+    """指定した本数目の足でシグナルを出すテスト用戦略"""
+
+    def __init__(self, name: str, symbol: str, script: dict):
+        super().__init__(name, symbol, "1h")
+        self.script = script
+        self.seen = []
+
+    def calculate_indicators(self, data):
+        return data
+
+    def generate_signals(self, data):
+        return []
+
+    def update(self, ohlcv):
+        self.seen.append(ohlcv["timestamp"])
+        action = self.script.get(len(self.seen) - 1)
+        if action:
+            return Signal(timestamp=ohlcv["timestamp"], symbol=self.symbol, action=action, price=ohlcv["close"])
+        return None
+
+    def reset(self):
+        super().reset()
+        self.seen = []
+
+
+def make_frame(start, closes, freq="1h"):
+    timestamps = pd.date_range(start, periods=len(closes), freq=freq)
+    return pd.DataFrame(
+        {
+            "timestamp": timestamps,
+            "open_price": closes,
+            "high_price": closes,
+            "low_price": closes,
+            "close_price": closes,
+            "volume": 1.0,
+        }
+    )
+
+
+def test_merge_bars_orders_by_timestamp():
+    data = {
+        "ETHUSDT": make_frame("2024-01-01 00:30", [1.0, 2.0, 3.0]),
+        "BTCUSDT": make_frame("2024-01-01 00:00", [10.0, 20.0, 30.0]),
+        "SOLUSDT": make_frame("2024-01-01 01:00", [5.0]),
+    }
+
+    bars = [(timestamp, symbol) for timestamp, _, symbol, _ in merge_bars(data)]
+
+    assert [timestamp for timestamp, _ in bars] == sorted(timestamp for timestamp, _ in bars)
+    # 同時刻はシンボルの指定順
+    assert bars[2:4] == [(pd.Timestamp("2024-01-01 01:00"), "BTCUSDT"), (pd.Timestamp("2024-01-01 01:00"), "SOLUSDT")]
+
+
+class TestPortfolioBacktestEngine:
+    """PortfolioBacktestEngineのテスト"""
+
+    @pytest.fixture
+    def data(self):
+        rng = np.random.default_rng(0)
+        return {
+            "BTCUSDT": make_frame("2024-01-01", 45000.0 * np.cumprod(1 + rng.normal(0, 0.01, 24))),
+            "ETHUSDT": make_frame("2024-01-01", 3000.0 * np.cumprod(1 + rng.normal(0, 0.01, 24))),
+            "XRPUSDT": make_frame("2024-01-01", np.full(24, 0.5)),
+        }
+
+    @pytest.fixture
+    def manager(self):
+        # 共有トラッカーを参照する既定のマネージャー（バックテストはこれらを変更しない）
+        manager = AdvancedPortfolioManager(initial_capital=100000.0)
+        manager.add_strategy(ScriptedStrategy("BTC A", "BTCUSDT", {2: "enter_long", 8: "exit_long"}), 0.3)
+        manager.add_strategy(ScriptedStrategy("BTC B", "BTCUSDT", {4: "enter_short", 12: "exit_short"}), 0.3)
+        manager.add_strategy(ScriptedStrategy("ETH", "ETHUSDT", {2: "enter_long"}), 0.3)
+        return manager
+
+    def test_single_pass_over_shared_capital(self, manager, data):
+        """購読シンボルの足だけを受け取り、共有資金で1本の資産曲線を作る"""
+        engine = PortfolioBacktestEngine(manager, use_real_data=False)
+
+        result = engine.run_portfolio_backtest(data)
+
+        backtest_manager = engine.portfolio_manager
+        assert backtest_manager is not manager
+        for name, allocation in backtest_manager.strategy_allocations.items():
+            strategy = allocation.strategy_instance
+            assert strategy.seen == data[strategy.symbol]["timestamp"].tolist()
+
+        # 同じシンボルの2戦略のポジションは別々に持ち、ETH のポジションは保有したまま終わる
+        assert result.metrics["strategies"]["BTC A"]["trades"] == 2
+        assert result.metrics["strategies"]["BTC B"]["trades"] == 2
+        assert list(engine.portfolio.positions) == ["ETH:ETHUSDT"]
+        assert result.metrics["bars_processed"] == 48
+
+        equity = result.equity_curve
+        assert len(equity) == 24
+        position = engine.portfolio.positions["ETH:ETHUSDT"]
+        assert equity["equity"].iloc[-1] == pytest.approx(equity["cash"].iloc[-1] + position.unrealized_pnl)
+
+        # エンジンと実行用マネージャーは専用のボラティリティトラッカーを共有する
+        assert backtest_manager.volatility_tracker is engine.volatility_tracker
+        assert engine.volatility_tracker is not get_volatility_tracker()
+        assert "BTCUSDT" in engine.volatility_tracker
+
+        # 実行用マネージャーの取引履歴に戦略名付きで記録され、元のマネージャー・共有トラッカーは変わらない
+        exits = [trade for trade in backtest_manager.trade_history if trade.pnl is not None]
+        assert sorted(trade.strategy_name for trade in exits) == ["BTC A", "BTC B"]
+        assert manager.trade_history == []
+        assert all(allocation.strategy_instance.seen == [] for allocation in manager.strategy_allocations.values())
+        assert backtest_manager.correlation_tracker is not get_correlation_tracker(STRATEGY_CORRELATION_KEY)
+        assert "BTC A" not in get_correlation_tracker(STRATEGY_CORRELATION_KEY).names
+
+    def test_entries_sized_by_target_weight(self, manager, data):
+        """同時刻のエントリーは一括サイジングし、目標配分で按分する"""
+        engine = PortfolioBacktestEngine(manager, use_real_data=False)
+        result = engine.run_portfolio_backtest(data)
+
+        entries = {trade.strategy_name: trade for trade in result.trades if trade.realized_pnl == 0.0}
+        prices = {symbol: df["close_price"].iloc[2] for symbol, df in data.items()}
+        # 固定サイズ（総資産の5%）× 目標配分
+        assert entries["BTC A"].amount == pytest.approx(100000.0 * 0.05 * 0.3 / prices["BTCUSDT"], rel=1e-3)
+        assert entries["ETH"].amount == pytest.approx(100000.0 * 0.05 * 0.3 / prices["ETHUSDT"], rel=1e-3)
+
+    def test_rebalance_applies_to_shared_pool(self, manager, data):
+        engine = PortfolioBacktestEngine(manager, rebalance_interval=timedelta(hours=6), use_real_data=False)
+        result = engine.run_portfolio_backtest(data)
+
+        rebalances = result.metrics["rebalances"]
+        assert [entry["timestamp"] for entry in rebalances] == list(
+            pd.date_range("2024-01-01 06:00", periods=3, freq="6h")
+        )
+        for entry in rebalances:
+            assert sum(entry["weights"].values()) == pytest.approx(1.0)
+        final_equity = engine.portfolio.equity
+        allocations = engine.portfolio_manager.strategy_allocations
+        assert allocations["ETH"].allocated_capital == pytest.approx(
+            rebalances[-1]["equity"] * allocations["ETH"].target_weight
+        )
+        assert final_equity == result.final_capital
+
+    def test_repeated_runs_are_identical(self, manager, data):
+        """実行ごとに配分・資本・取引履歴を元のマネージャーから作り直す"""
+        weights = {name: allocation.target_weight for name, allocation in manager.strategy_allocations.items()}
+        engine = PortfolioBacktestEngine(manager, rebalance_interval=timedelta(hours=6), use_real_data=False)
+
+        first = engine.run_portfolio_backtest(data)
+        first_trades = len(engine.portfolio_manager.trade_history)
+        second = engine.run_portfolio_backtest(data)
+
+        assert second.final_capital == first.final_capital
+        assert len(engine.portfolio_manager.trade_history) == first_trades
+        assert engine.portfolio_manager.trade_archiver is not manager.trade_archiver
+        assert {name: allocation.target_weight for name, allocation in manager.strategy_allocations.items()} == weights
+        assert manager.current_capital == 100000.0
@@ -0,0 +1,204 @@
+"""ポートフォリオ最適化ソルバーのテスト"""
+
+import time
+
+import numpy as np
+import pytest
+
+from src.backend.portfolio import solvers
+from src.backend.portfolio.optimizer import OptimizationConstraint, OptimizationObjective, PortfolioOptimizer
+
+
+def random_problem(n, seed=0):
+    """正定値の共分散と期待リターン"""
+    rng = np.random.default_rng(seed)
+    factors = rng.normal(0, 0.1, size=(n, 3))
+    covariance = factors @ factors.T + np.diag(rng.uniform(0.01, 0.05, n))
+    returns = rng.uniform(0.03, 0.25, n)
+    return returns, covariance
+
+
+def projected_gradient(covariance, lower, upper, iterations=2000):
+    """検証用の素朴な射影勾配法（最小分散）"""
+    step = 1.0 / np.linalg.eigvalsh(covariance).max()
+    weights = solvers.project_to_capped_simplex(np.full(len(covariance), 1 / len(covariance)), lower, upper)
+    for _ in range(iterations):
+        weights = solvers.project_to_capped_simplex(weights - step * covariance @ weights, lower, upper)
+    return weights
+
+
+class TestSolvers:
+    """solversモジュールのテスト"""
+
+    def test_min_variance_matches_closed_form(self):
+        """制約が効かない場合は Σ^-1 1 / 1'Σ^-1 1 と一致する"""
+        covariance = np.array([[0.04, 0.006, 0.002], [0.006, 0.09, 0.004], [0.002, 0.004, 0.0625]])
+        n = len(covariance)
+
+        result = solvers.min_variance(covariance, np.zeros(n), np.full(n, np.inf))
+
+        expected = np.linalg.solve(covariance, np.ones(n))
+        assert result.converged
+        np.testing.assert_allclose(result.weights, expected / expected.sum(), atol=1e-10)
+
+    def test_max_sharpe_matches_tangency_portfolio(self):
+        """制約が効かない場合は接点ポートフォリオ Σ^-1 (μ - rf) と一致する"""
+        covariance = np.array([[0.04, 0.006, 0.002], [0.006, 0.09, 0.004], [0.002, 0.004, 0.0625]])
+        excess = np.array([0.08, 0.10, 0.07])
+        n = len(covariance)
+
+        result = solvers.max_sharpe(covariance, excess, np.zeros(n), np.full(n, np.inf))
+
+        expected = np.linalg.solve(covariance, excess)
+        assert result.converged
+        np.testing.assert_allclose(result.weights, expected / expected.sum(), atol=1e-9)
+
+    def test_box_constraints_match_projected_gradient(self):
+        """上下限が効く場合も射影勾配法の解と一致する"""
+        _, covariance = random_problem(8, seed=1)
+        lower, upper = np.full(8, 0.02), np.full(8, 0.25)
+
+        result = solvers.min_variance(covariance, lower, upper)
+
+        assert result.converged
+        assert np.all(result.weights >= lower - 1e-12) and np.all(result.weights <= upper + 1e-12)
+        assert result.weights.sum() == pytest.approx(1.0)
+        np.testing.assert_allclose(result.weights, projected_gradient(covariance, lower, upper), atol=1e-6)
+
+    def test_risk_parity_equalizes_contributions(self):
+        _, covariance = random_problem(10, seed=2)
+
+        result = solvers.risk_parity(covariance)
+
+        contributions = result.weights * (covariance @ result.weights)
+        assert result.converged
+        np.testing.assert_allclose(contributions / contributions.sum(), np.full(10, 0.1), atol=1e-7)
+
+    def test_infeasible_bounds(self):
+        result = solvers.min_variance(np.eye(3), np.full(3, 0.5), np.ones(3))
+        assert result.status == "infeasible"
+
+    def test_large_universe_converges_quickly(self):
+        """100 資産超でも収束し、実用的な時間で終わる"""
+        returns, covariance = random_problem(120, seed=3)
+        lower, upper = np.zeros(120), np.full(120, 0.05)
+
+        start = time.perf_counter()
+        min_var = solvers.min_variance(covariance, lower, upper)
+        sharpe = solvers.max_sharpe(covariance, returns - 0.02, lower, upper)
+        elapsed = time.perf_counter() - start
+
+        assert min_var.converged and sharpe.converged
+        assert elapsed < 2.0
+
+
+class TestPortfolioOptimizer:
+    """PortfolioOptimizerのテスト"""
+
+    @pytest.fixture
+    def problem(self):
+        assets = ["BTC", "ETH", "SOL", "USDT"]
+        expected_returns = {"BTC": 0.15, "ETH": 0.18, "SOL": 0.22, "USDT": 0.02}
+        covariance = {
+            "BTC": {"BTC": 0.04, "ETH": 0.03, "SOL": 0.035, "USDT": 0.0},
+            "ETH": {"BTC": 0.03, "ETH": 0.06, "SOL": 0.045, "USDT": 0.0},
+            "SOL": {"BTC": 0.035, "ETH": 0.045, "SOL": 0.12, "USDT": 0.0},
+            "USDT": {"BTC": 0.0, "ETH": 0.0, "SOL": 0.0, "USDT": 0.0001},
+        }
+        return assets, expected_returns, covariance
+
+    @pytest.mark.parametrize("objective", list(OptimizationObjective))
+    def test_objectives_report_convergence(self, problem, objective):
+        assets, expected_returns, covariance = problem
+        result = PortfolioOptimizer().optimize(assets, expected_returns, covariance, objective)
+
+        assert result.convergence_status == "optimal"
+        assert result.constraints_satisfied
+        assert sum(result.weights.values()) == pytest.approx(1.0)
+
+    def test_sharpe_is_deterministic_and_beats_equal_weight(self, problem):
+        assets, expected_returns, covariance = problem
+        optimizer = PortfolioOptimizer()
+
+        first = optimizer.optimize(assets, expected_returns, covariance, OptimizationObjective.SHARPE_RATIO)
+        second = optimizer.optimize(assets, expected_returns, covariance, OptimizationObjective.SHARPE_RATIO)
+
+        returns, matrix = optimizer._to_arrays(assets, expected_returns, covariance)
+        _, _, equal_sharpe = optimizer._portfolio_statistics(np.full(4, 0.25), returns, matrix)
+        assert first.weights == second.weights
+        assert first.sharpe_ratio > equal_sharpe
+
+    def test_max_weight_constraint(self, problem):
+        assets, expected_returns, covariance = problem
+        constraints = [OptimizationConstraint(asset, "max_weight", 0.4) for asset in assets]
+
+        result = PortfolioOptimizer().optimize(
+            assets, expected_returns, covariance, OptimizationObjective.MAX_RETURN, constraints
+        )
+
+        assert result.weights == pytest.approx({"BTC": 0.2, "ETH": 0.4, "SOL": 0.4, "USDT": 0.0})
+        assert result.constraints_satisfied
+
+    def test_efficient_frontier_hits_target_returns(self, problem):
+        assets, expected_returns, covariance = problem
+        frontier = PortfolioOptimizer().generate_efficient_frontier(assets, expected_returns, covariance, 5)
+
+        targets = np.linspace(0.02, 0.22, 5)
+        assert [point["expected_return"] for point in frontier] == pytest.approx(list(targets))
+        volatilities = [point["volatility"] for point in frontier]
+        assert volatilities == sorted(volatilities)
+
+
+class TestEfficientFrontier:
+    """効率的フロンティア生成のテスト"""
+
+    @pytest.fixture
+    def universe(self):
+        returns, covariance = random_problem(30, seed=4)
+        assets = [f"A{i}" for i in range(30)]
+        return assets, dict(zip(assets, returns)), covariance
+
+    def test_warm_start_matches_independent_solves(self, universe):
+        """warm start した解が目標リターンごとの個別の解と一致する"""
+        assets, expected_returns, covariance = universe
+        returns = np.array(list(expected_returns.values()))
+        lower, upper = np.zeros(30), np.full(30, np.inf)
+        targets = np.linspace(returns.min(), returns.max(), 12)
+
+        traced = solvers.trace_frontier(covariance, returns, lower, upper, 1.0, targets)
+
+        for target, solution in zip(targets, traced):
+            independent = solvers.min_variance(covariance, lower, upper, 1.0, returns, target)
+            assert solution.converged
+            assert returns @ solution.weights == pytest.approx(target)
+            np.testing.assert_allclose(solution.weights, independent.weights, atol=1e-8)
+
+    def test_cache_and_parallel_generation(self, universe):
+        """同じ入力はキャッシュから返し、並列生成は逐次生成と同じ結果になる"""
+        assets, expected_returns, covariance = universe
+        optimizer = PortfolioOptimizer()
+
+        sequential = optimizer.generate_efficient_frontier(assets, expected_returns, covariance, 8)
+        sequential[0]["weights"]["A0"] = -1.0
+        cached = optimizer.generate_efficient_frontier(assets, expected_returns, covariance, 8)
+        assert optimizer.stats["frontier_cache_hits"] == 1
+        assert optimizer.stats["frontier_cache_misses"] == 1
+        assert cached[0]["weights"]["A0"] >= 0.0
+
+        parallel_optimizer = PortfolioOptimizer()
+        parallel = parallel_optimizer.generate_efficient_frontier(
+            assets, expected_returns, covariance, 8, max_workers=2
+        )
+        assert [point["volatility"] for point in parallel] == pytest.approx([point["volatility"] for point in cached])
+
+        # キャッシュミスでもプロセスプールは使い回す
+        parallel_optimizer.generate_efficient_frontier(assets, expected_returns, covariance, 10, max_workers=2)
+        assert parallel_optimizer.stats["frontier_cache_misses"] == 2
+        assert parallel_optimizer.stats["pool_starts"] == 1
+        parallel_optimizer.close()
+        assert parallel_optimizer._executor is None
+
+        constraints = [OptimizationConstraint(asset, "max_weight", 0.1) for asset in assets]
+        constrained = optimizer.generate_efficient_frontier(assets, expected_returns, covariance, 8, constraints)
+        assert optimizer.stats["frontier_cache_misses"] == 2
+        assert all(max(point["weights"].values()) <= 0.1 + 1e-9 for point in constrained)
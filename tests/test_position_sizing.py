@@ -0,0 +1,90 @@
+"""一括ポジションサイジングのテスト"""
+
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from src.backend.backtesting.engine import BacktestEngine
+from src.backend.risk.position_sizing import RiskManager
+from src.backend.risk.rolling_risk import RollingVolatilityTracker
+
+
+@pytest.fixture
+def risk_manager():
+    return RiskManager(
+        {
+            "max_position_size_pct": 0.15,
+            "strategies": {
+                "kelly_strategy": {"position_sizing": "kelly"},
+                "vol_strategy": {"position_sizing": "volatility"},
+                "unknown_strategy": {"position_sizing": "martingale"},
+            },
+        }
+    )
+
+
+class TestBatchPositionSizing:
+    """RiskManager.calculate_position_sizesのテスト"""
+
+    def test_matches_scalar_sizing(self, risk_manager):
+        """一括計算の結果がシグナルごとの計算と一致する"""
+        rng = np.random.default_rng(0)
+        names = ["fixed_strategy", "kelly_strategy", "vol_strategy", "unknown_strategy"] * 25
+        strength = rng.uniform(0.1, 1.0, len(names))
+        volatility = rng.uniform(0.005, 0.2, len(names))
+        win_rate = rng.uniform(0.3, 0.7, len(names))
+        avg_win = rng.uniform(0.005, 0.05, len(names))
+        avg_loss = rng.uniform(0.005, 0.05, len(names))
+
+        sizes = risk_manager.calculate_position_sizes(names, 10000.0, strength, volatility, win_rate, avg_win, avg_loss)
+        expected = [
+            risk_manager.calculate_position_size(name, 10000.0, s, v, w, aw, al)
+            for name, s, v, w, aw, al in zip(names, strength, volatility, win_rate, avg_win, avg_loss)
+        ]
+        np.testing.assert_allclose(sizes, expected)
+
+    def test_degenerate_inputs_size_zero(self, risk_manager):
+        """ボラティリティ・平均損失が 0 のシグナルはサイズ 0 になる"""
+        sizes = risk_manager.calculate_position_sizes(
+            ["fixed_strategy", "vol_strategy", "kelly_strategy"],
+            10000.0,
+            1.0,
+            [0.0, 0.0, 0.02],
+            avg_loss=[0.01, 0.01, 0.0],
+        )
+        np.testing.assert_array_equal(sizes, [0.0, 0.0, 0.0])
+
+
+class TestRollingVolatilityTracker:
+    """RollingVolatilityTrackerのテスト"""
+
+    def test_volatility_from_prices(self):
+        tracker = RollingVolatilityTracker(window=10, min_observations=5, default_volatility=0.02)
+        prices = 100.0 * np.cumprod(1 + np.random.default_rng(1).normal(0, 0.01, 30))
+
+        for price in prices[:4]:
+            tracker.update_price("BTCUSDT", price)
+        assert tracker.volatility("BTCUSDT") == 0.02
+
+        for price in prices[4:]:
+            tracker.update_price("BTCUSDT", price)
+        returns = prices[1:] / prices[:-1] - 1
+        assert tracker.volatility("BTCUSDT") == pytest.approx(np.std(returns[-10:]))
+        np.testing.assert_allclose(tracker.volatilities(["BTCUSDT", "ETHUSDT"]), [np.std(returns[-10:]), 0.02])
+
+    def test_backtest_engine_feeds_tracker(self, risk_manager):
+        """バックテストのサイジングはローリングボラティリティを使う"""
+        engine = BacktestEngine(initial_capital=10000.0, use_real_data=False)
+        engine.risk_manager = risk_manager
+
+        assert engine._calculate_position_size("BTCUSDT", 100.0, "vol_strategy") == pytest.approx(0.15)
+
+        for i, price in enumerate([100.0, 110.0, 95.0, 120.0, 90.0, 115.0]):
+            engine.process_bar(datetime(2024, 1, 1, i), {"close": price}, {"symbol": "BTCUSDT"}, "vol_strategy")
+
+        volatility = engine.volatility_tracker.volatility("BTCUSDT")
+        assert volatility > 0.1
+        assert engine._calculate_position_size("BTCUSDT", 115.0, "vol_strategy") == pytest.approx(
+            min(0.15 / volatility, 0.15)
+        )
@@ -0,0 +1,136 @@
+"""価格イベントバスとTradingEngineの連携テスト"""
+
+from datetime import datetime, timedelta, timezone
+from unittest.mock import Mock
+
+import pytest
+
+from src.backend.trading.engine import OrderSide, OrderType, TradingEngine
+from src.backend.trading.price_bus import PriceBus
+
+
+class TestPriceBus:
+    """PriceBusのテスト"""
+
+    @pytest.mark.asyncio
+    async def test_symbol_and_wildcard_subscribers(self):
+        """シンボル購読者と全体購読者に配信される"""
+        bus = PriceBus()
+        btc_handler = Mock()
+        eth_handler = Mock()
+        all_handler = Mock()
+
+        bus.subscribe("BTCUSDT", btc_handler)
+        bus.subscribe("ETHUSDT", eth_handler)
+        bus.subscribe_all(all_handler)
+
+        tick = await bus.publish("BTCUSDT", 50000.0, source="test")
+
+        btc_handler.assert_called_once_with(tick)
+        eth_handler.assert_not_called()
+        all_handler.assert_called_once_with(tick)
+        assert bus.get_latest_price("BTCUSDT") == 50000.0
+
+    @pytest.mark.asyncio
+    async def test_async_subscriber_and_unsubscribe(self):
+        """コルーチン購読者の配信と購読解除"""
+        bus = PriceBus()
+        received = []
+
+        async def handler(tick):
+            received.append(tick.price)
+
+        bus.subscribe("BTCUSDT", handler)
+        await bus.publish("BTCUSDT", 1.0)
+        bus.unsubscribe("BTCUSDT", handler)
+        await bus.publish("BTCUSDT", 2.0)
+
+        assert received == [1.0]
+        assert not bus.has_subscribers("BTCUSDT")
+
+    @pytest.mark.asyncio
+    async def test_stale_tick_is_dropped(self):
+        """配信済みより古いティックは破棄される"""
+        bus = PriceBus()
+        handler = Mock()
+        bus.subscribe("BTCUSDT", handler)
+
+        now = datetime.now(timezone.utc)
+        await bus.publish("BTCUSDT", 100.0, timestamp=now)
+        assert await bus.publish("BTCUSDT", 90.0, timestamp=now - timedelta(hours=1)) is None
+
+        assert handler.call_count == 1
+        assert bus.get_latest_price("BTCUSDT") == 100.0
+        assert bus.stats["stale_dropped"] == 1
+
+    @pytest.mark.asyncio
+    async def test_handler_error_does_not_block_others(self):
+        """購読者の例外は他の購読者への配信を妨げない"""
+        bus = PriceBus()
+        failing = Mock(side_effect=RuntimeError("boom"))
+        ok = Mock()
+        bus.subscribe("BTCUSDT", failing)
+        bus.subscribe("BTCUSDT", ok)
+
+        await bus.publish("BTCUSDT", 1.0)
+
+        ok.assert_called_once()
+        assert bus.stats["handler_errors"] == 1
+
+
+class TestTradingEnginePriceBus:
+    """TradingEngineの価格バス購読テスト"""
+
+    @pytest.fixture
+    def engine(self):
+        config = {
+            "max_concurrent_orders": 10,
+            "order_timeout": 300,
+            "enable_dry_run": True,
+            "risk_limits": {
+                "max_position_size": 100000.0,
+                "max_daily_loss": 1000.0,
+                "max_drawdown": 0.1,
+                "max_leverage": 1.0,
+                "max_correlation": 0.7,
+                "max_portfolio_heat": 0.5,
+                "position_size_limit_pct": 0.1,
+            },
+        }
+        engine = TradingEngine(config, price_bus=PriceBus())
+        engine.is_running = True
+        return engine
+
+    @pytest.mark.asyncio
+    async def test_engine_subscribes_to_position_symbols_only(self, engine):
+        """ポジションを持つシンボルのみ購読し、ティックで再評価する"""
+        engine.create_order("BTCUSDT", OrderSide.BUY, OrderType.MARKET, 0.1, price=50000.0)
+        assert engine.price_bus.has_subscribers("BTCUSDT")
+        assert not engine.price_bus.has_subscribers("ETHUSDT")
+
+        engine.risk_manager.check_symbol_risk = Mock(return_value=[])
+        await engine.price_bus.publish("ETHUSDT", 3000.0)
+        engine.risk_manager.check_symbol_risk.assert_not_called()
+
+        await engine.price_bus.publish("BTCUSDT", 51000.0)
+        engine.risk_manager.check_symbol_risk.assert_called_once()
+        assert engine.get_position("BTCUSDT").unrealized_pnl == pytest.approx(100.0)
+        assert engine.position_manager.stats["unrealized_pnl"] == pytest.approx(100.0)
+        assert engine.position_manager.total_exposure == pytest.approx(5100.0)
+
+    @pytest.mark.asyncio
+    async def test_closed_position_is_unsubscribed(self, engine):
+        """ポジション決済で購読が解除される"""
+        engine.create_order("BTCUSDT", OrderSide.BUY, OrderType.MARKET, 0.1, price=50000.0)
+        engine.close_position("BTCUSDT")
+
+        assert not engine.price_bus.has_subscribers("BTCUSDT")
+        assert engine.position_manager.total_exposure == pytest.approx(0.0)
+
+    @pytest.mark.asyncio
+    async def test_stop_unsubscribes_all(self, engine):
+        """停止時に全購読を解除する"""
+        engine.create_order("BTCUSDT", OrderSide.BUY, OrderType.MARKET, 0.1, price=50000.0)
+        await engine.stop()
+
+        assert engine.price_bus.get_stats()["subscribed_symbols"] == 0
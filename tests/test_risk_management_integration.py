@@ -10,7 +10,9 @@ import pytest
 
 from src.backend.risk.circuit_breaker import BreakerState, CircuitBreaker, TripReason
 from src.backend.trading.enhanced_risk_manager import EnhancedRiskManager, PositionManager
+from src.backend.trading.enhanced_risk_manager import Position as TrackedPosition
 from src.backend.trading.orders.models import Order, OrderSide, OrderType
+from src.backend.trading.price_bus import PriceBus
 
 
 # テスト用のPositionクラス
@@ -354,6 +356,33 @@ class TestEnhancedRiskManager:
         # 最終チェック時間が更新されていることを確認
         assert erm._last_risk_check is not None
 
+    @pytest.mark.asyncio
+    async def test_price_ticks_drive_realtime_risk(self, enhanced_risk_config):
+        """監視中は保有シンボルの価格ティックごとにリスクを更新する"""
+        bus = PriceBus()
+        erm = EnhancedRiskManager({**enhanced_risk_config, "realtime_monitoring": True, "price_bus": bus})
+        erm.position_manager.update_position(
+            TrackedPosition(
+                "BTC/USDT", quantity=Decimal("1"), entry_price=Decimal("45000"), current_price=Decimal("46000")
+            )
+        )
+        await erm.start_monitoring()
+
+        with patch.object(erm, "update_realtime_risk", new_callable=AsyncMock) as update:
+            await bus.publish("ETHUSDT", 3000.0)
+            update.assert_not_called()
+
+            await bus.publish("BTCUSDT", 47000.0)
+            update.assert_awaited_once()
+
+        position = erm.position_manager.get_position("BTC/USDT")
+        assert position.current_price == Decimal("47000.0")
+        assert position.unrealized_pnl == Decimal("2000.0")
+        assert erm.get_comprehensive_status()["monitoring"]["monitoring_active"] is True
+
+        await erm.stop_monitoring()
+        assert not bus.has_subscribers("BTCUSDT")
+
     @pytest.mark.asyncio
     async def test_emergency_stop_trigger(self, enhanced_risk_config):
         """緊急停止トリガーテスト"""
@@ -0,0 +1,164 @@
+"""注文前チェック用リスクスナップショットのテスト"""
+
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+from src.backend.trading.engine import Order, OrderSide, OrderType, Position, TradingEngine
+from src.backend.trading.enhanced_risk_manager import EnhancedRiskManager
+from src.backend.trading.enhanced_risk_manager import Position as EnhancedPosition
+from src.backend.trading.risk_manager import RiskManager
+from src.backend.trading.risk_snapshot import LatencyHistogram, RiskSnapshot
+
+
+def make_position(symbol, amount=1.0, entry_price=100.0, current_price=100.0, side=OrderSide.BUY):
+    position = Position(symbol=symbol, side=side, amount=amount, entry_price=entry_price, current_price=current_price)
+    position.unrealized_pnl = (current_price - entry_price) * amount
+    return position
+
+
+def make_order(symbol, amount, price, side=OrderSide.BUY):
+    return Order(id="o1", symbol=symbol, side=side, order_type=OrderType.LIMIT, amount=amount, price=price)
+
+
+@pytest.fixture
+def positions():
+    return {
+        "BTCUSDT": make_position("BTCUSDT", amount=0.1, entry_price=45000.0, current_price=44000.0),
+        "ETHUSDT": make_position("ETHUSDT", amount=1.0, entry_price=3000.0, current_price=3100.0),
+        "SOLUSDT": make_position("SOLUSDT", amount=10.0, entry_price=100.0, current_price=95.0, side=OrderSide.SELL),
+    }
+
+
+class TestRiskSnapshot:
+    """RiskSnapshotのテスト"""
+
+    def test_incremental_updates_match_rebuild(self, positions):
+        """差分更新の合計が全体からの再構築と一致する"""
+        incremental = RiskSnapshot()
+        for symbol, position in positions.items():
+            incremental.update_position(symbol, position)
+
+        positions["ETHUSDT"] = make_position("ETHUSDT", amount=1.0, entry_price=3000.0, current_price=2900.0)
+        incremental.update_position("ETHUSDT", positions["ETHUSDT"])
+        del positions["SOLUSDT"]
+        incremental.update_position("SOLUSDT", None)
+
+        rebuilt = RiskSnapshot()
+        rebuilt.rebuild(positions)
+
+        assert incremental.total_exposure == pytest.approx(rebuilt.total_exposure)
+        assert incremental.total_heat == pytest.approx(rebuilt.total_heat)
+        assert incremental.concentration("BTCUSDT") == pytest.approx(4400.0 / (4400.0 + 2900.0))
+        assert incremental.concentration("SOLUSDT") is None
+
+    def test_correlated_count_cache_follows_composition(self, positions):
+        """保有構成が変わると相関ポジション数を数え直す"""
+        snapshot = RiskSnapshot()
+        snapshot.rebuild(positions)
+        assert snapshot.correlated_count("XRPUSDT", 0.7) == 3
+
+        # 価格変化だけなら構成は変わらない
+        version = snapshot.composition_version
+        snapshot.update_position("BTCUSDT", positions["BTCUSDT"])
+        assert snapshot.composition_version == version
+
+        snapshot.update_position("ADAUSDT", make_position("ADAUSDT"))
+        assert snapshot.correlated_count("XRPUSDT", 0.7) == 4
+
+
+class TestLatencyHistogram:
+    """LatencyHistogramのテスト"""
+
+    def test_percentiles(self):
+        histogram = LatencyHistogram()
+        for value in np.linspace(1e-6, 100e-6, 100):
+            histogram.record(value)
+        histogram.record(5e-3)
+
+        summary = histogram.summary()
+        assert summary["count"] == 101
+        # ビン幅（1/20 デケード ≒ 12%）以内で近似される
+        assert summary["p50_us"] == pytest.approx(50.0, rel=0.15)
+        assert summary["p99_us"] == pytest.approx(100.0, rel=0.15)
+        assert summary["max_us"] == pytest.approx(5000.0)
+
+
+class TestSnapshotOrderChecks:
+    """スナップショットによる注文前チェックのテスト"""
+
+    @pytest.mark.parametrize(
+        "order",
+        [
+            make_order("BTCUSDT", 0.1, 45000.0),
+            make_order("BTCUSDT", 0.2, 45000.0),
+            make_order("ETHUSDT", 2.0, 3000.0),
+            make_order("SOLUSDT", 100.0, 95.0, side=OrderSide.SELL),
+            make_order("XRPUSDT", 1000.0, 0.5),
+        ],
+    )
+    def test_matches_per_limit_checks(self, positions, order):
+        """スナップショットの判定が既存の制限ごとのチェックと一致する"""
+        risk_manager = RiskManager(
+            {
+                "risk_limits": {
+                    "max_position_size": 10000.0,
+                    "max_daily_loss": 1000.0,
+                    "max_drawdown": 0.1,
+                    "max_leverage": 1.0,
+                    "max_correlation": 0.7,
+                    "max_portfolio_heat": 0.5,
+                    "position_size_limit_pct": 0.1,
+                }
+            }
+        )
+        # _check_position_size_limit は float のポジションと Decimal を加算できないため同じ式で求める
+        existing = positions.get(order.symbol)
+        existing_value = existing.get_market_value() if existing and existing.side == order.side else 0.0
+        expected = all(
+            [
+                order.amount * order.price + existing_value <= 10000.0,
+                risk_manager._check_daily_loss_limit(-100.0),
+                risk_manager._check_leverage_limit(order, positions),
+                risk_manager._check_correlation_limit(order, positions),
+                risk_manager._check_portfolio_heat(order, positions),
+            ]
+        )
+        assert risk_manager.check_order_risk(order, positions, -100.0) == expected
+        assert risk_manager.get_statistics()["order_check_latency"]["count"] == 1
+
+    def test_engine_keeps_snapshot_in_sync(self):
+        """TradingEngine のポジション変化がスナップショットに反映される"""
+        engine = TradingEngine({})
+        order = make_order("BTCUSDT", 0.1, 45000.0)
+        order.filled_price = 45000.0
+        engine.position_manager.update_position(order)
+        engine.position_manager.update_price("BTCUSDT", 44000.0)
+
+        snapshot = engine.risk_manager.snapshot
+        assert snapshot.bound
+        assert snapshot.total_exposure == pytest.approx(engine.position_manager.get_total_exposure())
+
+        engine.position_manager.close_position("BTCUSDT")
+        assert len(snapshot) == 0
+
+    @pytest.mark.asyncio
+    async def test_enhanced_concentration_limit(self):
+        """EnhancedRiskManager の集中度チェックはポジション変化に追従する"""
+        erm = EnhancedRiskManager({})
+        order = make_order("BTCUSDT", 0.01, 45000.0)
+
+        erm.position_manager.update_position(
+            EnhancedPosition("BTCUSDT", quantity=Decimal("1"), entry_price=Decimal("100"), current_price=Decimal("100"))
+        )
+        is_allowed, error_msg = await erm.check_order_risk(order)
+        assert not is_allowed
+        assert "concentration" in error_msg
+
+        erm.position_manager.update_position(
+            EnhancedPosition("ETHUSDT", quantity=Decimal("9"), entry_price=Decimal("100"), current_price=Decimal("100"))
+        )
+        is_allowed, error_msg = await erm.check_order_risk(order)
+        assert is_allowed
+        assert erm.get_comprehensive_status()["order_check"]["latency"]["count"] == 2
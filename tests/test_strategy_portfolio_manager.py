@@ -1,16 +1,21 @@
 """戦略統合ポートフォリオマネージャーのテスト"""
 
 from datetime import datetime, timedelta
+from unittest.mock import patch
 
 import numpy as np
 import pytest
 
+from src.backend.core.config import settings
 from src.backend.portfolio.strategy_portfolio_manager import (
     AdvancedPortfolioManager,
+    JsonlTradeArchiver,
     PerformanceMetrics,
     StrategyStatus,
     TradeRecord,
 )
+from src.backend.risk.position_sizing import RiskManager
+from src.backend.risk.rolling_risk import RollingVolatilityTracker, get_volatility_tracker
 from src.backend.strategies.base import BaseStrategy, Signal
 from src.backend.strategies.implementations.macd_strategy import MACDStrategy
 from src.backend.strategies.implementations.rsi_strategy import RSIStrategy
@@ -44,7 +49,7 @@ class TestAdvancedPortfolioManager:
     @pytest.fixture
     def portfolio_manager(self):
         """テスト用のポートフォリオマネージャー"""
-        return AdvancedPortfolioManager(initial_capital=100000.0)
+        return AdvancedPortfolioManager(initial_capital=100000.0, volatility_tracker=RollingVolatilityTracker())
 
     @pytest.fixture
     def mock_strategy1(self):
@@ -177,10 +182,60 @@ class TestAdvancedPortfolioManager:
 
         position_size = portfolio_manager._calculate_position_size("Mock Strategy 1", signal)
 
-        # 基本ポジションサイズ = 30000 * 0.8 = 24000
-        # 最大ポジション制限 = 100000 * 0.1 = 10000
-        expected_size = min(24000, 10000)
-        assert position_size == expected_size
+        # 固定リスク 2% / ボラティリティ既定値 2% = 100% → 上限 20% → max_position_size_pct 10%
+        # 配分資本 30000 * 10% = 3000（最大ポジション制限 100000 * 0.1 = 10000 以内）
+        assert position_size == pytest.approx(3000)
+
+    def test_calculate_position_sizes_batch(self, portfolio_manager, mock_strategy1, mock_strategy2):
+        """同じバーの複数シグナルを一括でサイジングする"""
+        portfolio_manager.add_strategy(mock_strategy1, 0.3)
+        portfolio_manager.add_strategy(mock_strategy2, 0.05)
+
+        signals = [
+            Signal(timestamp=datetime.now(), symbol="BTCUSDT", action="enter_long", strength=strength, price=45000)
+            for strength in [0.8, 0.5, 0.5]
+        ]
+        names = ["Mock Strategy 1", "Mock Strategy 2", "Unknown Strategy"]
+
+        sizes = portfolio_manager._calculate_position_sizes(names, signals)
+
+        # 配分資本 30000 / 5000 の 10%、未登録の戦略は 0
+        np.testing.assert_allclose(sizes, [3000, 500, 0])
+        for name, signal, size in zip(names, signals, sizes):
+            assert portfolio_manager._calculate_position_size(name, signal) == size
+
+    def test_position_sizes_use_rolling_volatility(self, mock_strategy1, mock_strategy2):
+        """サイジング方式は RiskManager の戦略設定、ボラティリティは市場データで更新したトラッカーから取る"""
+        tracker = RollingVolatilityTracker(min_observations=2)
+        risk_manager = RiskManager(
+            {
+                "strategies": {"Mock Strategy 1": {"position_sizing": "volatility"}},
+                "target_volatility": 0.01,
+                "max_position_size_pct": 1.0,
+            }
+        )
+        portfolio_manager = AdvancedPortfolioManager(
+            initial_capital=100000.0, risk_manager=risk_manager, volatility_tracker=tracker
+        )
+        mock_strategy2.symbol = "ETHUSDT"
+        portfolio_manager.add_strategy(mock_strategy1, 0.3)
+        portfolio_manager.add_strategy(mock_strategy2, 0.3)
+
+        for close in [100.0, 110.0, 99.0, 108.9]:
+            bar = {"timestamp": datetime.now(), "open": close, "high": close, "low": close, "close": close}
+            portfolio_manager.process_market_data("BTCUSDT", {**bar, "volume": 1.0})
+        volatility = tracker.volatility("BTCUSDT")
+        assert volatility == pytest.approx(np.std([0.1, -0.1, 0.1]))
+
+        signals = [
+            Signal(timestamp=datetime.now(), symbol=symbol, action="enter_long", strength=0.5, price=100.0)
+            for symbol in ["BTCUSDT", "ETHUSDT"]
+        ]
+        sizes = portfolio_manager._calculate_position_sizes(["Mock Strategy 1", "Mock Strategy 2"], signals)
+
+        # 戦略1: ボラティリティ調整 0.01 / σ * 0.5、戦略2: 固定リスク（ETH は未観測のため既定 2%）→ 上限 20%
+        np.testing.assert_allclose(sizes, [30000 * 0.01 / volatility * 0.5, min(30000 * 0.2, 10000)])
+        assert AdvancedPortfolioManager().volatility_tracker is get_volatility_tracker()
 
     def test_execute_signal(self, portfolio_manager, mock_strategy1):
         """シグナル実行のテスト"""
@@ -311,6 +366,69 @@ class TestAdvancedPortfolioManager:
         assert performance_b.total_return == 500.0
         assert performance_b.win_rate == 1.0
 
+    def test_performance_accumulates_across_archived_trades(self):
+        """履歴を上限で切り詰めても、集計は全取引のバッチ計算と一致する"""
+        archive = []
+        portfolio_manager = AdvancedPortfolioManager(
+            initial_capital=100000.0, max_trade_history=20, trade_archiver=archive.extend
+        )
+        pnls = np.random.default_rng(5).normal(50, 400, 60)
+        now = datetime.now()
+
+        for i, pnl in enumerate(pnls):
+            portfolio_manager.trade_history.append(
+                TradeRecord(
+                    strategy_name=f"Strategy {'AB'[i % 2]}",
+                    symbol="BTCUSDT",
+                    action="exit_long",
+                    quantity=0.1,
+                    price=45000,
+                    timestamp=now + timedelta(minutes=i),
+                    signal_strength=0.5,
+                    pnl=float(pnl),
+                )
+            )
+            signal = Signal(timestamp=now, symbol="BTCUSDT", action="enter_long", strength=0.5, price=45000)
+            assert portfolio_manager.execute_signal(signal, 1000.0)
+
+        assert len(portfolio_manager.trade_history) == 20
+        assert len(archive) == 100
+        assert portfolio_manager.get_portfolio_summary()["trade_summary"]["total_trades"] == 120
+
+        returns = pnls / 100000.0
+        cumulative = np.cumsum(returns)
+        performance = portfolio_manager.calculate_portfolio_performance()
+        assert performance.trades_count == 60
+        assert performance.total_return == pytest.approx(returns.sum())
+        assert performance.win_rate == pytest.approx(np.mean(pnls > 0))
+        assert performance.volatility == pytest.approx(np.std(returns) * np.sqrt(252))
+        assert performance.max_drawdown == pytest.approx(np.min(cumulative - np.maximum.accumulate(cumulative)))
+        assert performance.profit_factor == pytest.approx(returns[returns > 0].sum() / -returns[returns < 0].sum())
+        # VaR は直近 max_trade_history 件のリターンから求める
+        assert performance.var_95 == pytest.approx(np.percentile(returns[-20:], 5))
+
+        strategy_b = portfolio_manager.calculate_strategy_performance("Strategy B")
+        assert strategy_b.trades_count == 30
+        assert strategy_b.total_return == pytest.approx(pnls[1::2].sum())
+        assert strategy_b.avg_trade_return == pytest.approx(pnls[1::2].mean())
+
+    def test_trimmed_trades_archived_to_jsonl_by_default(self, tmp_path):
+        """アーカイブ先を指定しなければ、履歴から外した取引をデータディレクトリの JSON Lines に追記する"""
+        with patch.object(settings, "PORTFOLIO_TRADE_ARCHIVE_DIR", str(tmp_path / "portfolio_trades")):
+            portfolio_manager = AdvancedPortfolioManager(initial_capital=100000.0, max_trade_history=3)
+        assert portfolio_manager.trade_archiver.path == tmp_path / "portfolio_trades" / "trades.jsonl"
+
+        now = datetime(2024, 1, 1)
+        for i in range(5):
+            signal = Signal(timestamp=now, symbol="BTCUSDT", action="enter_long", strength=0.5, price=45000.0 + i)
+            assert portfolio_manager.execute_signal(signal, 1000.0)
+
+        archived = JsonlTradeArchiver(tmp_path / "portfolio_trades" / "trades.jsonl").load()
+        assert [trade.price for trade in archived] == [45000.0, 45001.0]
+        assert [trade.price for trade in portfolio_manager.trade_history] == [45002.0, 45003.0, 45004.0]
+        assert archived[0].timestamp == now
+        assert archived[0].trade_id == "BTCUSDT_20240101_000000"
+
     def test_strategy_correlation_matrix(self, portfolio_manager, mock_strategy1, mock_strategy2):
         """戦略間相関行列のテスト"""
         portfolio_manager.add_strategy(mock_strategy1, 0.4)
@@ -0,0 +1,149 @@
+"""ベクトル化ストレステストのテスト"""
+
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.backend.risk.advanced_risk_manager import AdvancedRiskManager
+from src.backend.risk.stress_engine import (
+    FACTORS,
+    ScenarioSet,
+    StressTestEngine,
+    classify_exposure,
+    factor_returns,
+    historical_scenarios,
+    stored_symbols,
+)
+
+
+@pytest.fixture
+def positions():
+    return {"BTC_Momentum": 0.5, "ETH_MeanRev": 0.3, "SOL_Breakout": 0.2}
+
+
+@pytest.fixture
+def closes():
+    """1時間足の終値（BTC は 24 本目から 10% 下落）"""
+    index = pd.date_range("2024-01-01", periods=72, freq="1h", tz="UTC")
+    btc = np.full(72, 100.0)
+    btc[24:] = 90.0
+    return pd.DataFrame({"BTC/USDT": btc, "ETH/USDT": np.linspace(100, 110, 72), "SOL/USDT": 50.0}, index=index)
+
+
+class TestStressTestEngine:
+    """StressTestEngineのテスト"""
+
+    def test_matches_position_loop(self, positions):
+        """行列積の結果がポジションごとのループ計算と一致する"""
+        scenarios = ScenarioSet.from_config({"crash": {"btc_drop": -0.3, "eth_drop": -0.35}})
+        distribution = StressTestEngine().run(positions, scenarios)
+
+        expected = 0.5 * -0.3 + 0.3 * -0.35 + 0.2 * -0.15
+        assert distribution.portfolio_pnl[0] == pytest.approx(expected)
+        assert distribution.position_impacts(0) == pytest.approx(
+            {"BTC_Momentum": -0.15, "ETH_MeanRev": -0.105, "SOL_Breakout": -0.03}
+        )
+
+    def test_grid_distribution(self, positions):
+        """グリッドの全組み合わせを評価し、損失分布を返す"""
+        levels = np.linspace(-0.5, 0.0, 11)
+        scenarios = ScenarioSet.grid({"btc": levels, "eth": levels, "alt": levels})
+        distribution = StressTestEngine().run(positions, scenarios)
+
+        assert len(distribution) == 11**3
+        worst_name, worst_pnl = distribution.worst(1)[0]
+        assert worst_pnl == pytest.approx(-0.5)
+        assert worst_name == "grid_btc-0.50_eth-0.50_alt-0.50"
+        assert distribution.loss_quantile(0.99) <= distribution.losses.max()
+        assert distribution.expected_shortfall(0.99) >= distribution.loss_quantile(0.99)
+
+    def test_historical_scenarios(self, closes):
+        """過去の 1h / 24h 変動をシナリオにする"""
+        scenarios = historical_scenarios(closes, "1h", ("1h", "24h"))
+        assert len(scenarios) == 71 + 48
+        assert scenarios.shocks[:, FACTORS.index("btc")].min() == pytest.approx(-0.10)
+
+        worst = historical_scenarios(closes, "1h", ("24h",), worst=3)
+        assert len(worst) == 3
+        assert all(name.startswith("hist_24h_") for name in worst.names)
+
+    def test_classify_by_base_asset(self):
+        """ベース通貨で判定し、名前に btc / eth を含むだけの銘柄は alt とする"""
+        assert classify_exposure("BTCUSDT") == "btc"
+        assert classify_exposure("WBTC/USDT") == "btc"
+        assert classify_exposure("ETHBTC") == "eth"
+        assert classify_exposure("ETH_MeanRev") == "eth"
+        assert classify_exposure("ETHFI/USDT") == "alt"
+        assert classify_exposure("BTCST/USDT:USDT") == "alt"
+        assert classify_exposure("SOL_Breakout") == "alt"
+        # マーケット情報で与えたベース通貨を優先する
+        assert classify_exposure("XBTUSD", {"XBTUSD": "BTC"}) == "btc"
+        assert StressTestEngine(base_assets={"XBTUSD": "BTC"}).exposure_vector({"XBTUSD": 1.0}).tolist() == [
+            1.0,
+            0.0,
+            0.0,
+        ]
+
+    def test_factor_returns_fallback(self, closes):
+        """該当銘柄がないファクターは全銘柄の指数で代用する"""
+        index = factor_returns(closes[["BTC/USDT"]])
+        pd.testing.assert_series_equal(index["alt"], index["btc"], check_names=False)
+
+
+class TestAdvancedRiskManagerStress:
+    """AdvancedRiskManager からの利用"""
+
+    def test_named_and_historical(self, positions, closes):
+        risk_manager = AdvancedRiskManager({})
+        assert risk_manager.load_historical_scenarios(closes, "1h") == 71 + 48
+
+        results = risk_manager.perform_all_stress_tests(positions)
+        assert set(results) == set(risk_manager.stress_test_scenarios)
+        single = risk_manager.perform_stress_test(positions, "market_crash")
+        assert results["market_crash"].portfolio_impact == pytest.approx(single.portfolio_impact)
+        assert results["market_crash"].strategy_impacts == pytest.approx(single.strategy_impacts)
+
+        distribution = risk_manager.run_stress_scenarios(positions)
+        assert len(distribution) == len(risk_manager.stress_test_scenarios) + 71 + 48
+        assert distribution.summary()["max_loss"] > 0
+
+    def test_loads_historical_scenarios_at_startup(self, tmp_path, closes):
+        """起動時に DataCollector の保存先から過去変動シナリオを読み込む"""
+        parquet_dir = tmp_path / "parquet"
+        parquet_dir.mkdir()
+        for symbol in closes.columns:
+            (parquet_dir / f"{symbol.replace('/', '_')}_1h.parquet").touch()
+        (parquet_dir / "BTC_USDT_1d.parquet").touch()
+        assert stored_symbols(parquet_dir, "1h") == sorted(closes.columns)
+
+        with patch("src.backend.risk.advanced_risk_manager.load_close_prices", return_value=closes) as load:
+            risk_manager = AdvancedRiskManager({"historical_scenarios": {"data_dir": str(tmp_path), "worst": 10}})
+
+        load.assert_called_once_with(parquet_dir, sorted(closes.columns), "1h")
+        assert len(risk_manager.historical_scenarios) == 20
+
+        # 保存データがなければ空のまま起動する
+        assert (
+            len(
+                AdvancedRiskManager(
+                    {"historical_scenarios": {"data_dir": str(tmp_path / "missing")}}
+                ).historical_scenarios
+            )
+            == 0
+        )
+
+    def test_risk_report_runs_scenarios_once(self, positions, closes):
+        """リスクレポートは名前付きシナリオの結果も同じ分布から取り出す"""
+        risk_manager = AdvancedRiskManager({})
+        risk_manager.load_historical_scenarios(closes, "1h")
+
+        with patch.object(risk_manager.stress_engine, "run", wraps=risk_manager.stress_engine.run) as run:
+            report = risk_manager.generate_risk_report([0.01, -0.02] * 20, {}, positions)
+
+        assert run.call_count == 1
+        single = risk_manager.perform_stress_test(positions, "market_crash")
+        assert report["stress_tests"]["market_crash"]["portfolio_impact"] == pytest.approx(single.portfolio_impact)
+        assert set(report["stress_tests"]) == set(risk_manager.stress_test_scenarios)
+        assert report["stress_distribution"]["scenarios"] == len(risk_manager.stress_test_scenarios) + 71 + 48
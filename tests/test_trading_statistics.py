@@ -0,0 +1,151 @@
+"""取引統計の日次ロールアップのテスト"""
+
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from uuid import uuid4
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from src.backend.database.models import TradingStatistics
+from src.backend.database.services import AnalyticsService, DatabaseServiceFactory, TradeService
+from src.backend.database.trading_statistics import backfill
+from src.backend.trading.orders.models import Order, OrderSide, OrderType
+
+BASE = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+class TestTradingStatisticsRollup:
+    """日次ロールアップと約定集計の一致を確認"""
+
+    def setup_method(self):
+        self.temp_db = tempfile.NamedTemporaryFile(delete=False, suffix=".db")
+        self.temp_db.close()
+        self.factory = DatabaseServiceFactory(f"sqlite:///{self.temp_db.name}")
+        self.factory.initialize_database()
+        self.db_manager = self.factory.db_manager
+        self.user_id = uuid4()
+
+        order = Order(
+            exchange="binance",
+            symbol="BTC/USDT",
+            order_type=OrderType.MARKET,
+            side=OrderSide.BUY,
+            amount=Decimal("1"),
+        )
+        self.order_id = self.factory.get_order_service().create_order(order, self.user_id)
+
+        # 3日間に渡って6時間おきの約定
+        self.trades = [
+            {
+                "order_id": self.order_id,
+                "user_id": self.user_id,
+                "strategy_id": "strategy-1" if i % 3 else "strategy-2",
+                "exchange": "binance",
+                "symbol": "BTC/USDT" if i % 2 else "ETH/USDT",
+                "side": "buy" if i % 4 < 2 else "sell",
+                "quantity": Decimal("0.5"),
+                "price": Decimal(100 + i),
+                "fee_amount": Decimal("0.1"),
+                "executed_at": BASE + timedelta(hours=6 * i),
+            }
+            for i in range(12)
+        ]
+
+    def teardown_method(self):
+        self.db_manager.dispose()
+        try:
+            os.unlink(self.temp_db.name)
+        except Exception:
+            pass
+
+    def assert_rollups_match_scan(self, **kwargs):
+        rollup = AnalyticsService(self.db_manager, use_rollups=True)
+        scan = AnalyticsService(self.db_manager, use_rollups=False)
+
+        expected = scan.get_trading_performance(self.user_id, **kwargs)
+        actual = rollup.get_trading_performance(self.user_id, **kwargs)
+        assert actual.keys() == expected.keys()
+        for key, value in expected.items():
+            if key == "daily_pnl":
+                assert [day["date"] for day in actual[key]] == [day["date"] for day in value]
+                assert [day["pnl"] for day in actual[key]] == pytest.approx([day["pnl"] for day in value])
+            else:
+                assert actual[key] == pytest.approx(value)
+
+        kwargs.pop("strategy_id", None)
+        assert rollup.get_risk_metrics(self.user_id, **kwargs) == pytest.approx(
+            scan.get_risk_metrics(self.user_id, **kwargs)
+        )
+
+    def test_rollups_updated_per_trade(self):
+        """約定ごとの書き込み・一括書き込みの両方でロールアップが約定集計と一致する"""
+        trade_service = self.factory.get_trade_service()
+        for trade in self.trades[:5]:
+            trade_service.create_trade(**trade)
+        trade_service.create_trades(self.trades[5:])
+
+        with self.db_manager.session_scope() as session:
+            # 3日 × (シンボル, 戦略) の組み合わせ分だけ
+            assert session.query(TradingStatistics).count() <= 12
+
+        self.assert_rollups_match_scan()
+        self.assert_rollups_match_scan(strategy_id="strategy-1")
+        # 日の途中から・途中までの期間は端の日だけ約定を直接集計する
+        self.assert_rollups_match_scan(start_date=BASE + timedelta(hours=9), end_date=BASE + timedelta(hours=50))
+        self.assert_rollups_match_scan(start_date=BASE + timedelta(days=1), end_date=BASE + timedelta(hours=30))
+
+    def test_one_row_per_rollup_key(self):
+        """同じキーへの書き込みは1行に加算され、重複行は一意制約で拒否される"""
+        trade_service = self.factory.get_trade_service()
+        trade = {**self.trades[0], "strategy_id": None}
+        for _ in range(3):
+            trade_service.create_trade(**trade)
+        trade_service.create_trades([trade, trade])
+
+        with self.db_manager.session_scope() as session:
+            rows = session.query(TradingStatistics).all()
+            assert len(rows) == 1
+            assert rows[0].strategy_id == ""
+            assert int(rows[0].trade_count) == 5
+            assert rows[0].avg_price == Decimal("100")
+
+        with pytest.raises(IntegrityError):
+            with self.db_manager.session_scope() as session:
+                session.add(
+                    TradingStatistics(
+                        user_id=self.user_id,
+                        exchange="binance",
+                        symbol="ETH/USDT",
+                        trade_date=BASE,
+                    )
+                )
+
+        self.assert_rollups_match_scan()
+
+    def test_backfill_rebuilds_from_existing_trades(self):
+        """ロールアップなしで書き込まれた約定からバックフィルできる"""
+        TradeService(self.db_manager, update_rollups=False).create_trades(self.trades)
+
+        assert AnalyticsService(self.db_manager).get_trading_performance(self.user_id)["total_trades"] == 0
+
+        assert backfill(self.db_manager, user_id=self.user_id, batch_size=5) == 12
+        # 2回実行しても二重計上しない
+        assert backfill(self.db_manager) == 12
+        self.assert_rollups_match_scan()
+
+    @pytest.mark.asyncio
+    async def test_async_rollups(self):
+        """非同期版でもロールアップを更新・参照する"""
+        trade_service = self.factory.get_trade_service()
+        await trade_service.create_trade_async(**self.trades[0])
+        await trade_service.create_trades_async(self.trades[1:])
+
+        analytics = self.factory.get_analytics_service()
+        performance = await analytics.get_trading_performance_async(self.user_id)
+
+        assert performance == analytics.get_trading_performance(self.user_id)
+        assert performance["total_trades"] == 12
+        await self.factory.close()